@@ -20,6 +20,7 @@ if project_root not in sys.path:
 load_dotenv()
 
 from core.interfaces import TaskDefinition, Program, TestSuite
+from monitoring_agent.events import GenerationStarted, OffspringProduced, EvaluationCompleted, GenerationCompleted
 from task_manager.agent import TaskManagerAgent
 from test_generator.agent import TestGeneratorAgent
 from config import settings
@@ -67,13 +68,40 @@ for module in ['task_manager.agent', 'code_generator.agent', 'evaluator_agent.ag
 
                          
 # Check if API key is set
-if settings.PRO_API_KEY.startswith("YOUR_API_KEY") or not settings.PRO_API_KEY:
+if settings.LLM_BACKEND != "local" and (settings.PRO_API_KEY.startswith("YOUR_API_KEY") or not settings.PRO_API_KEY):
     print("Error: Please set your API key in the .env file")
     sys.exit(1)
 
                                               
 current_results = []
 
+def run_config(population_size, generations, num_islands, migration_frequency, migration_rate):
+    """Per-run settings overrides, so concurrent runs from the UI do not change each other's settings."""
+    return {
+        "POPULATION_SIZE": int(population_size),
+        "GENERATIONS": int(generations),
+        "NUM_ISLANDS": int(num_islands),
+        "MIGRATION_INTERVAL": int(migration_frequency),
+        "MIGRATION_RATE": float(migration_rate),
+    }
+
+def subscribe_progress(task_manager, progress_callback, max_generations):
+    """Forwards the task manager's progress events to the UI; bursts are coalesced so the run never waits on it."""
+    stages = [
+        (GenerationStarted, 0, "Starting generation"),
+        (OffspringProduced, 1, "Generated offspring"),
+        (EvaluationCompleted, 2, "Evaluating offspring"),
+        (GenerationCompleted, 3, "Selected survivors"),
+    ]
+
+    async def on_event(event):
+        for event_type, stage, message in stages:
+            if isinstance(event, event_type):
+                await progress_callback(event.generation, max_generations, stage, message)
+                return
+
+    return task_manager.events.subscribe_callback(on_event, [event_type for event_type, _, _ in stages], maxsize=4, overflow="coalesce")
+
 async def run_evolution(
     task_id, 
     description, 
@@ -109,11 +137,7 @@ async def run_evolution(
         allowed_imports = [imp.strip() for imp in allowed_imports_text.split(",") if imp.strip()]
         
                                  
-        settings.POPULATION_SIZE = int(population_size)
-        settings.GENERATIONS = int(generations)
-        settings.NUM_ISLANDS = int(num_islands)
-        settings.MIGRATION_FREQUENCY = int(migration_frequency)
-        settings.MIGRATION_RATE = float(migration_rate)
+        config = run_config(population_size, generations, num_islands, migration_frequency, migration_rate)
         
                                   
         task = TaskDefinition(
@@ -142,7 +166,7 @@ async def run_evolution(
             await asyncio.sleep(0.1)
         
                                                                   
-        task_manager = TaskManagerAgent(task_definition=task)
+        task_manager = TaskManagerAgent(task_definition=task, config=config)
         
                                                                                       
         task_manager.progress_callback = progress_callback
@@ -151,68 +175,7 @@ async def run_evolution(
         progress(0, "Starting evolutionary process...")
         
                                                                       
-        class GenerationProgressListener(logging.Handler):
-            def __init__(self):
-                super().__init__()
-                self.current_gen = 0
-                self.max_gen = settings.GENERATIONS
-                
-            def emit(self, record):
-                try:
-                    msg = record.getMessage()
-                                                            
-                    if "--- Generation " in msg:
-                        gen_parts = msg.split("Generation ")[1].split("/")[0]
-                        try:
-                            self.current_gen = int(gen_parts)
-                                                 
-                            asyncio.create_task(
-                                progress_callback(
-                                    self.current_gen, 
-                                    self.max_gen, 
-                                    0, 
-                                    "Starting generation"
-                                )
-                            )
-                        except ValueError:
-                            pass
-                    elif "Evaluating population" in msg:
-                                                              
-                        asyncio.create_task(
-                            progress_callback(
-                                self.current_gen, 
-                                self.max_gen, 
-                                1, 
-                                "Evaluating population"
-                            )
-                        )
-                    elif "Selected " in msg and " parents" in msg:
-                                                             
-                        asyncio.create_task(
-                            progress_callback(
-                                self.current_gen, 
-                                self.max_gen, 
-                                2, 
-                                "Selected parents"
-                            )
-                        )
-                    elif "Generated " in msg and " offspring" in msg:
-                                                                
-                        asyncio.create_task(
-                            progress_callback(
-                                self.current_gen, 
-                                self.max_gen, 
-                                3, 
-                                "Generated offspring"
-                            )
-                        )
-                except Exception:
-                    pass
-        
-                                   
-        progress_listener = GenerationProgressListener()
-        progress_listener.setLevel(logging.INFO)
-        root_logger.addHandler(progress_listener)
+        progress_subscription = subscribe_progress(task_manager, progress_callback, config["GENERATIONS"])
         
         try:
                                               
@@ -238,7 +201,7 @@ async def run_evolution(
                 return "❌ Evolution completed, but no suitable solutions were found."
         finally:
 
-            root_logger.removeHandler(progress_listener)
+            progress_subscription.close()
 
     except Exception as e:
         import traceback
@@ -278,11 +241,7 @@ async def run_task_from_suite(
 
     allowed_imports = [imp.strip() for imp in allowed_imports_text.split(",") if imp.strip()]
 
-    settings.POPULATION_SIZE = int(population_size)
-    settings.GENERATIONS = int(generations)
-    settings.NUM_ISLANDS = int(num_islands)
-    settings.MIGRATION_FREQUENCY = int(migration_frequency)
-    settings.MIGRATION_RATE = float(migration_rate)
+    config = run_config(population_size, generations, num_islands, migration_frequency, migration_rate)
 
     suite = TestSuite(files={"test_generated.py": test_code}, explanation=explanation)
 
@@ -302,38 +261,11 @@ async def run_task_from_suite(
         logger.info(f"Progress: Generation {generation}/{max_generations} - {message}")
         await asyncio.sleep(0.1)
 
-    task_manager = TaskManagerAgent(task_definition=task)
+    task_manager = TaskManagerAgent(task_definition=task, config=config)
     task_manager.progress_callback = progress_callback
     progress(0, "Starting evolutionary process...")
 
-    class GenerationProgressListener(logging.Handler):
-        def __init__(self):
-            super().__init__()
-            self.current_gen = 0
-            self.max_gen = settings.GENERATIONS
-
-        def emit(self, record):
-            try:
-                msg = record.getMessage()
-                if "--- Generation " in msg:
-                    gen_parts = msg.split("Generation ")[1].split("/")[0]
-                    try:
-                        self.current_gen = int(gen_parts)
-                        asyncio.create_task(progress_callback(self.current_gen, self.max_gen, 0, "Starting generation"))
-                    except ValueError:
-                        pass
-                elif "Evaluating population" in msg:
-                    asyncio.create_task(progress_callback(self.current_gen, self.max_gen, 1, "Evaluating population"))
-                elif "Selected " in msg and " parents" in msg:
-                    asyncio.create_task(progress_callback(self.current_gen, self.max_gen, 2, "Selected parents"))
-                elif "Generated " in msg and " offspring" in msg:
-                    asyncio.create_task(progress_callback(self.current_gen, self.max_gen, 3, "Generated offspring"))
-            except Exception:
-                pass
-
-    progress_listener = GenerationProgressListener()
-    progress_listener.setLevel(logging.INFO)
-    root_logger.addHandler(progress_listener)
+    progress_subscription = subscribe_progress(task_manager, progress_callback, config["GENERATIONS"])
 
     try:
         best_programs = await task_manager.execute()
@@ -355,7 +287,7 @@ async def run_task_from_suite(
         else:
             return "❌ Evolution completed, but no suitable solutions were found."
     finally:
-        root_logger.removeHandler(progress_listener)
+        progress_subscription.close()
 
 def get_code(solution_index):
     """Get the code for a specific solution."""
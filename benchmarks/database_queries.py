@@ -0,0 +1,123 @@
+"""
+Program database benchmark: bulk save throughput, best-program and predicate query latency at
+large program counts, compared with a full sort or scan of every stored program (what
+get_best_programs and filtering used to cost on each call).
+
+    python benchmarks/database_queries.py --programs 100000 1000000
+    python benchmarks/database_queries.py --programs 100000 --backend sqlite --path /tmp/bench.sqlite3
+    python benchmarks/database_queries.py --programs 1000000 --backend columnar
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.interfaces import Program, ProgramQuery
+
+TASK_IDS = ["bench_task_a", "bench_task_b"]
+
+
+def make_programs(count: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield Program(
+            id=f"bench_prog{i}",
+            code="def solve(numbers):\n    return sum(numbers)",
+            fitness_scores={"correctness": rng.choice([0.0, 0.25, 0.5, 0.75, 1.0]), "runtime_ms": rng.uniform(0.1, 100.0)},
+            generation=i // 1000,
+            island_id=i % 4,
+            status="evaluated",
+            task_id=TASK_IDS[i % len(TASK_IDS)],
+        )
+
+
+def full_sort_best(programs, limit: int):
+    return sorted(programs, key=lambda p: p.fitness_scores.get("correctness", -1.0), reverse=True)[:limit]
+
+
+async def run(count: int, backend: str, path: str, batch_size: int, queries: int, limit: int, seed: int) -> None:
+    if backend == "sqlite":
+        from database_agent.sqlite_agent import SQLiteDatabaseAgent
+        if os.path.exists(path):
+            os.remove(path)
+        database = SQLiteDatabaseAgent(path)
+    elif backend == "columnar":
+        from database_agent.columnar_agent import ColumnarDatabaseAgent
+        database = ColumnarDatabaseAgent()
+    else:
+        from database_agent.agent import InMemoryDatabaseAgent
+        database = InMemoryDatabaseAgent()
+
+    start_time = time.monotonic()
+    batch = []
+    for program in make_programs(count, seed):
+        batch.append(program)
+        if len(batch) == batch_size:
+            await database.save_programs(batch)
+            batch = []
+    await database.save_programs(batch)
+    save_seconds = time.monotonic() - start_time
+    print(f"[{backend}] {count} programs saved in {save_seconds:.2f}s ({count / save_seconds * 60:,.0f} programs/minute)")
+
+    # The first query of each objective builds its index; report it apart from the steady state.
+    start_time = time.monotonic()
+    await database.get_best_programs(TASK_IDS[0], limit=limit, objective="correctness")
+    print(f"[{backend}] first query (index build): {(time.monotonic() - start_time) * 1000:.1f} ms")
+
+    rng = random.Random(seed + 1)
+    overwrites = list(make_programs(queries, seed + 2))
+    start_time = time.monotonic()
+    for i in range(queries):
+        # Interleave overwrites so the indexes are queried while they change.
+        overwritten = overwrites[i]
+        overwritten.id = f"bench_prog{rng.randrange(count)}"
+        await database.save_programs([overwritten])
+        await database.get_best_programs(TASK_IDS[i % len(TASK_IDS)], limit=limit, objective="correctness")
+    query_seconds = time.monotonic() - start_time
+    print(f"[{backend}] top-{limit} query with an overwrite each: {query_seconds / queries * 1e6:.0f} us per query ({queries} queries)")
+
+    predicate = ProgramQuery(task_id=TASK_IDS[0], island_id=2, min_correctness=0.9, generation=count // 2000, fields=["id", "generation"])
+    start_time = time.monotonic()
+    for _ in range(queries):
+        matches = await database.query_programs(predicate)
+    print(f"[{backend}] predicate query ({len(matches)} matches): {(time.monotonic() - start_time) / queries * 1e6:.0f} us per query")
+
+    if backend == "in_memory":
+        programs = list(database._programs.values())
+        repeats = 3
+        start_time = time.monotonic()
+        for _ in range(repeats):
+            full_sort_best(programs, limit)
+        print(f"[{backend}] full-sort baseline: {(time.monotonic() - start_time) / repeats * 1000:.1f} ms per query")
+        start_time = time.monotonic()
+        for _ in range(repeats):
+            predicate.apply(programs)
+        print(f"[{backend}] full-scan predicate baseline: {(time.monotonic() - start_time) / repeats * 1000:.1f} ms per query")
+    elif backend == "sqlite":
+        await database.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Program database save/query benchmark")
+    parser.add_argument("--programs", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--backend", choices=["in_memory", "columnar", "sqlite"], default="in_memory")
+    parser.add_argument("--path", default="database_benchmark.sqlite3", help="Database file for the sqlite backend")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    for count in args.programs:
+        asyncio.run(run(count, args.backend, args.path, args.batch_size, args.queries, args.limit, args.seed))
+
+
+if __name__ == "__main__":
+    main()
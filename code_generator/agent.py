@@ -2,8 +2,8 @@ import logging
 import asyncio
 import time
 import re
-from typing import Optional, Dict, Any
-from litellm import acompletion
+from typing import Optional, Dict, Any, List
+from litellm import acompletion, completion_cost
 from litellm.exceptions import (
     APIError,
     AuthenticationError,
@@ -12,27 +12,59 @@ from litellm.exceptions import (
     RateLimitError
 )
 
-from core.interfaces import CodeGeneratorInterface, BaseAgent, Program
-from config import settings
+from core.interfaces import CodeGeneratorInterface, BaseAgent, Program, LLMCallRecord
+from code_generator.latency import LatencyHistogram
+from code_generator.local_backend import LocalLLMBackend
+from code_generator.cassette import open_cassette
+from code_generator.variants import split_variants
 
 logger = logging.getLogger(__name__)
 
 class CodeGeneratorAgent(CodeGeneratorInterface):
-    def __init__(self, config: Optional[Dict[str, Any]] = None):
+    def __init__(self, config: Optional[Dict[str, Any]] = None, backend: Optional[Any] = None):
+        """
+        backend: optional object exposing an ``acompletion`` coroutine compatible with LiteLLM's.
+        Defaults to LiteLLM, or to LocalLLMBackend when the LLM_BACKEND setting is "local".
+        """
         super().__init__(config)
-        if not settings.PRO_API_KEY:
+        if not self.get_setting("PRO_API_KEY"):
             raise ValueError("PRO_API_KEY not found in settings. Please set it in your .env file or config.")
-        self.model_name = settings.PRO_MODEL
+        self.model_name = self.get_setting("PRO_MODEL")
         self.generation_config = {
-            "temperature": settings.LITELLM_TEMPERATURE,
-            "top_p": settings.LITELLM_TOP_P,
-            "top_k": settings.LITELLM_TOP_K,
-            "max_tokens": settings.LITELLM_MAX_TOKENS,
-            "api_base": settings.PRO_BASE_URL
+            "temperature": self.get_setting("LITELLM_TEMPERATURE"),
+            "top_p": self.get_setting("LITELLM_TOP_P"),
+            "top_k": self.get_setting("LITELLM_TOP_K"),
+            "max_tokens": self.get_setting("LITELLM_MAX_TOKENS"),
+            "api_base": self.get_setting("PRO_BASE_URL")
         }
-        logger.info(f"CodeGeneratorAgent initialized with model: {self.model_name}")
+        if backend is None and self.get_setting("LLM_BACKEND") == "local":
+            backend = LocalLLMBackend.from_settings(self.get_setting)
+        elif backend is None and self.get_setting("LLM_BACKEND") != "litellm":
+            raise ValueError(f"Unknown LLM_BACKEND: {self.get_setting('LLM_BACKEND')}")
+        if self.get_setting("LLM_CASSETTE_MODE") == "record":
+            inner_completion = backend.acompletion if backend is not None else acompletion
+            backend = open_cassette("record", self.get_setting("LLM_CASSETTE_PATH"), completion_fn=inner_completion)
+        elif self.get_setting("LLM_CASSETTE_MODE") == "replay":
+            backend = open_cassette("replay", self.get_setting("LLM_CASSETTE_PATH"), strict=self.get_setting("LLM_CASSETTE_STRICT"))
+        self.backend = backend
+        if self.backend is not None and not self.model_name:
+            self.model_name = "local"
+        # Hedged duplicates would consume extra cassette entries and break replay order.
+        self.hedging_enabled = self.get_setting("HEDGING_ENABLED") and self.get_setting("LLM_CASSETTE_MODE") != "replay"
+        self.hedging_percentile = self.get_setting("HEDGING_LATENCY_PERCENTILE")
+        self.hedging_max_extra_call_rate = self.get_setting("HEDGING_MAX_EXTRA_CALL_RATE")
+        self.hedging_min_samples = self.get_setting("HEDGING_MIN_SAMPLES")
+        self.hedging_fallback_model = self.get_setting("HEDGING_FALLBACK_MODEL")
+        self.latency_histograms: Dict[str, LatencyHistogram] = {}
+        self.hedging_stats = {"primary_calls": 0, "hedged_calls": 0, "hedge_wins": 0}
+        self.variant_stats = {"calls": 0, "variants_parsed": 0, "variants_applied": 0, "unchanged": 0, "duplicates": 0}
+        logger.info(f"CodeGeneratorAgent initialized with model: {self.model_name}, backend: {type(self.backend).__name__ if self.backend else 'litellm'}, hedging: {self.hedging_enabled}")
 
-    async def generate_code(self, prompt: str, model_name: Optional[str] = None, temperature: Optional[float] = None, output_format: str = "code") -> str:
+    async def generate_code(self, prompt: str, model_name: Optional[str] = None, temperature: Optional[float] = None, output_format: str = "code", call_records: Optional[List[LLMCallRecord]] = None) -> str:
+        """
+        Generates code (or a diff) for the prompt. When call_records is given, an LLMCallRecord
+        with token counts, latency, retries and cost is appended for this call.
+        """
         effective_model_name = model_name if model_name else self.model_name
         logger.info(f"Attempting to generate code using model: {effective_model_name}, output_format: {output_format}")
         
@@ -81,18 +113,23 @@ Make sure your diff can be applied correctly!
             current_generation_config["temperature"] = temperature
             logger.debug(f"Using temperature override: {temperature}")
 
-        retries = settings.API_MAX_RETRIES
-        delay = settings.API_RETRY_DELAY_SECONDS
+        retries = self.get_setting("API_MAX_RETRIES")
+        delay = self.get_setting("API_RETRY_DELAY_SECONDS")
+        record = LLMCallRecord(model=effective_model_name)
+        if call_records is not None:
+            call_records.append(record)
+        call_start = time.monotonic()
         
         for attempt in range(retries):
+            record.retries = attempt
             try:
                 logger.debug(f"API Call Attempt {attempt + 1} of {retries} to {effective_model_name}.")
-                response = await acompletion(
-                    model=effective_model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    api_key=settings.PRO_API_KEY,
-                    **current_generation_config
-                )
+                if self.hedging_enabled:
+                    response = await self._hedged_completion(effective_model_name, prompt, current_generation_config)
+                else:
+                    response = await self._timed_completion(effective_model_name, prompt, current_generation_config)
+                record.latency_seconds = time.monotonic() - call_start
+                self._record_usage(record, response, priced=self.backend is None)
                 
                 if not response.choices:
                     logger.warning("LLM API returned no choices.")
@@ -117,14 +154,131 @@ Make sure your diff can be applied correctly!
                     delay *= 2 
                 else:
                     logger.error(f"LLM API call failed after {retries} retries for model {effective_model_name}.")
+                    record.latency_seconds = time.monotonic() - call_start
+                    record.outcome = "failed"
                     raise
             except Exception as e:
                 logger.error(f"An unexpected error occurred during code generation with {effective_model_name}: {e}", exc_info=True)
+                record.latency_seconds = time.monotonic() - call_start
+                record.outcome = "failed"
                 raise
         
+        record.outcome = "failed"
         logger.error(f"Code generation failed for model {effective_model_name} after all retries.")
         return ""
 
+    async def _timed_completion(self, model_name: str, prompt: str, generation_config: Dict[str, Any]) -> Any:
+        """Single LLM call; successful calls feed the per-model latency histogram."""
+        completion_fn = self.backend.acompletion if self.backend is not None else acompletion
+        start_time = time.monotonic()
+        response = await completion_fn(
+            model=model_name,
+            messages=[{"role": "user", "content": prompt}],
+            api_key=self.get_setting("PRO_API_KEY"),
+            **generation_config
+        )
+        self._latency_histogram(model_name).observe(time.monotonic() - start_time)
+        return response
+
+    @staticmethod
+    def _record_usage(record: LLMCallRecord, response: Any, priced: bool = True) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            record.prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            record.completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        if not priced:
+            # Custom backends (e.g. the offline stand-in) have no provider pricing.
+            record.cost_usd = 0.0
+            return
+        try:
+            record.cost_usd = completion_cost(completion_response=response)
+        except Exception:
+            # Unknown or custom models have no pricing information in LiteLLM.
+            record.cost_usd = None
+
+    def _latency_histogram(self, model_name: str) -> LatencyHistogram:
+        if model_name not in self.latency_histograms:
+            self.latency_histograms[model_name] = LatencyHistogram(window_size=self.get_setting("LATENCY_HISTOGRAM_WINDOW"))
+        return self.latency_histograms[model_name]
+
+    def _hedge_delay(self, model_name: str) -> Optional[float]:
+        histogram = self.latency_histograms.get(model_name)
+        if histogram is None or histogram.window_count < self.hedging_min_samples:
+            return None
+        return histogram.percentile(self.hedging_percentile)
+
+    def _hedge_budget_available(self) -> bool:
+        allowed = self.hedging_max_extra_call_rate * self.hedging_stats["primary_calls"]
+        return self.hedging_stats["hedged_calls"] + 1 <= allowed
+
+    @staticmethod
+    def _is_valid_response(response: Any) -> bool:
+        try:
+            return bool(response.choices) and bool(response.choices[0].message.content)
+        except (AttributeError, IndexError, TypeError):
+            return False
+
+    async def _hedged_completion(self, model_name: str, prompt: str, generation_config: Dict[str, Any]) -> Any:
+        """
+        Sends the call and, if it is still outstanding after the configured latency percentile,
+        a duplicate (to the fallback model when configured). The first valid response wins and
+        the other call is cancelled. Extra calls are capped at HEDGING_MAX_EXTRA_CALL_RATE.
+        """
+        self.hedging_stats["primary_calls"] += 1
+        primary = asyncio.ensure_future(self._timed_completion(model_name, prompt, generation_config))
+        tasks = [primary]
+        try:
+            delay = self._hedge_delay(model_name)
+            if delay is None:
+                return await primary
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._hedge_budget_available():
+                return await primary
+
+            hedge_model = self.hedging_fallback_model or model_name
+            logger.info(f"LLM call to {model_name} exceeded p{self.hedging_percentile:g} latency ({delay:.2f}s). Sending hedged request to {hedge_model}.")
+            self.hedging_stats["hedged_calls"] += 1
+            hedge = asyncio.ensure_future(self._timed_completion(hedge_model, prompt, generation_config))
+            tasks.append(hedge)
+
+            pending = set(tasks)
+            fallback_result = None
+            first_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        first_error = first_error or task.exception()
+                        continue
+                    result = task.result()
+                    if self._is_valid_response(result):
+                        if task is hedge:
+                            self.hedging_stats["hedge_wins"] += 1
+                        return result
+                    fallback_result = fallback_result or result
+            if fallback_result is not None:
+                return fallback_result
+            raise first_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_latency_histograms(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model latency histograms of successful LLM calls."""
+        return {model: histogram.to_dict() for model, histogram in self.latency_histograms.items()}
+
+    def get_hedging_stats(self) -> Dict[str, Any]:
+        stats = dict(self.hedging_stats)
+        stats["extra_call_rate"] = stats["hedged_calls"] / stats["primary_calls"] if stats["primary_calls"] else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Closes the backend when it holds a resource, such as a cassette being recorded."""
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            close()
+
     def _clean_llm_output(self, raw_code: str) -> str:
         """
         Cleans the raw output from the LLM, typically removing markdown code fences.
@@ -288,7 +442,7 @@ Make sure your diff can be applied correctly!
              
         return modified_code
 
-    async def execute(self, prompt: str, model_name: Optional[str] = None, temperature: Optional[float] = None, output_format: str = "code", parent_code_for_diff: Optional[str] = None) -> str:
+    async def execute(self, prompt: str, model_name: Optional[str] = None, temperature: Optional[float] = None, output_format: str = "code", parent_code_for_diff: Optional[str] = None, call_records: Optional[List[LLMCallRecord]] = None) -> str:
         """
         Generic execution method.
         If output_format is 'diff', it generates a diff and applies it to parent_code_for_diff.
@@ -300,7 +454,8 @@ Make sure your diff can be applied correctly!
             prompt=prompt, 
             model_name=model_name, 
             temperature=temperature,
-            output_format=output_format
+            output_format=output_format,
+            call_records=call_records
         )
 
         if output_format == "diff":
@@ -322,6 +477,44 @@ Make sure your diff can be applied correctly!
         else:         
             return generated_output
 
+    async def execute_variants(self, prompt: str, parent_code: str, model_name: Optional[str] = None, temperature: Optional[float] = None, call_records: Optional[List[LLMCallRecord]] = None) -> List[str]:
+        """
+        Requests several independent diff variants in one call (see code_generator.variants),
+        applies each to the parent separately and returns the distinct modified programs.
+        Variants that fail to apply, leave the parent unchanged or duplicate another are dropped.
+        """
+        generated_output = await self.generate_code(
+            prompt=prompt,
+            model_name=model_name,
+            temperature=temperature,
+            output_format="diff",
+            call_records=call_records
+        )
+        self.variant_stats["calls"] += 1
+        variants = split_variants(generated_output)
+        self.variant_stats["variants_parsed"] += len(variants)
+
+        children: List[str] = []
+        seen = {parent_code.strip()}
+        for index, variant_diff in enumerate(variants):
+            try:
+                child_code = self._apply_diff(parent_code, variant_diff)
+            except Exception as e:
+                logger.error(f"Error applying diff of variant {index + 1}: {e}. Skipping it.", exc_info=True)
+                continue
+            key = child_code.strip()
+            if key == parent_code.strip():
+                self.variant_stats["unchanged"] += 1
+                continue
+            if key in seen:
+                self.variant_stats["duplicates"] += 1
+                continue
+            seen.add(key)
+            children.append(child_code)
+        self.variant_stats["variants_applied"] += len(children)
+        logger.info(f"Multi-variant call produced {len(children)} distinct children from {len(variants)} variants.")
+        return children
+
                                                  
 if __name__ == '__main__':
     import asyncio
@@ -374,7 +567,7 @@ Final line"""
         print("_apply_diff test passed.")
 
         print("\n--- Testing execute with output_format='diff' ---")
-        async def mock_generate_code(prompt, model_name, temperature, output_format):
+        async def mock_generate_code(prompt, model_name, temperature, output_format, call_records=None):
             return diff
         
         agent.generate_code = mock_generate_code 
@@ -429,7 +622,7 @@ Also, change the greeting in `greet` to "Hi, {name}!!!".
                                                                                                                
                                                                                                            
         
-        async def mock_generate_empty_diff(prompt, model_name, temperature, output_format):
+        async def mock_generate_empty_diff(prompt, model_name, temperature, output_format, call_records=None):
             return "  \n  " 
         
         original_generate_code = agent.generate_code 
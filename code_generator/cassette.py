@@ -0,0 +1,148 @@
+"""
+Record/replay cassettes for LLM traffic.
+
+A cassette is an append-only JSONL file with one entry per completion call:
+its sequence index, the SHA-256 of the prompt, the model, and the response text
+and token usage (or the error that was raised). Prompts themselves are not stored.
+Replay serves responses by prompt hash in recorded order without touching the network.
+"""
+import hashlib
+import json
+import logging
+import os
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from litellm.exceptions import APIError, InternalServerError, RateLimitError
+
+from code_generator.local_backend import LocalChoice, LocalCompletionResponse, LocalMessage, LocalUsage
+
+logger = logging.getLogger(__name__)
+
+_REPLAYABLE_ERRORS = {
+    "RateLimitError": RateLimitError,
+    "InternalServerError": InternalServerError,
+}
+
+
+class CassetteMissError(Exception):
+    """Raised in replay mode when the cassette holds no response for a prompt."""
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class CassetteRecorder:
+    """Wraps a completion function and appends every prompt/response pair to the cassette."""
+
+    def __init__(self, path: str, completion_fn: Callable[..., Any]):
+        self.path = path
+        self.completion_fn = completion_fn
+        self.sequence = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                self.sequence = sum(1 for line in f if line.strip())
+        self._file = open(path, "a")
+        logger.info(f"Recording LLM cassette to {path} (starting at sequence {self.sequence})")
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        entry["seq"] = self.sequence
+        self.sequence += 1
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    async def acompletion(self, model: str, messages: List[Dict[str, str]], **kwargs) -> Any:
+        prompt = messages[-1]["content"]
+        entry: Dict[str, Any] = {"prompt_hash": prompt_hash(prompt), "model": model}
+        try:
+            response = await self.completion_fn(model=model, messages=messages, **kwargs)
+        except Exception as e:
+            entry.update({"error": type(e).__name__, "message": str(e)})
+            self._append(entry)
+            raise
+        usage = getattr(response, "usage", None)
+        entry.update({
+            "content": response.choices[0].message.content if response.choices else None,
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        })
+        self._append(entry)
+        return response
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class CassetteReplayer:
+    """
+    Serves recorded responses by prompt hash in the order they were recorded.
+    When a prompt was never recorded (e.g. it embeds a measured runtime that differs
+    between runs), non-strict replay falls back to the next unserved entry by sequence.
+    """
+
+    def __init__(self, path: str, strict: bool = False):
+        self.path = path
+        self.strict = strict
+        self._entries: List[Dict[str, Any]] = []
+        self._by_hash: Dict[str, Deque[int]] = {}
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._by_hash.setdefault(entry["prompt_hash"], deque()).append(len(self._entries))
+                    self._entries.append(entry)
+        self._served = [False] * len(self._entries)
+        self._next_unserved = 0
+        self.stats = {"served": 0, "hash_hits": 0, "order_fallbacks": 0}
+        logger.info(f"Replaying LLM cassette {path} with {len(self._entries)} entries")
+
+    def _take(self, digest: str) -> Dict[str, Any]:
+        queue = self._by_hash.get(digest)
+        while queue:
+            index = queue.popleft()
+            if not self._served[index]:
+                self.stats["hash_hits"] += 1
+                return self._mark_served(index)
+        if self.strict:
+            raise CassetteMissError(f"No recorded response for prompt hash {digest[:12]} in {self.path}")
+        while self._next_unserved < len(self._entries) and self._served[self._next_unserved]:
+            self._next_unserved += 1
+        if self._next_unserved >= len(self._entries):
+            raise CassetteMissError(f"Cassette {self.path} is exhausted ({len(self._entries)} entries served)")
+        self.stats["order_fallbacks"] += 1
+        return self._mark_served(self._next_unserved)
+
+    def _mark_served(self, index: int) -> Dict[str, Any]:
+        self._served[index] = True
+        self.stats["served"] += 1
+        return self._entries[index]
+
+    async def acompletion(self, model: str, messages: List[Dict[str, str]], **kwargs) -> LocalCompletionResponse:
+        entry = self._take(prompt_hash(messages[-1]["content"]))
+        if "error" in entry:
+            error_cls = _REPLAYABLE_ERRORS.get(entry["error"])
+            if error_cls is None:
+                raise APIError(status_code=500, message=entry["message"], llm_provider="cassette", model=model)
+            raise error_cls(message=entry["message"], llm_provider="cassette", model=model)
+        choices = [LocalChoice(message=LocalMessage(content=entry["content"]))] if entry["content"] is not None else []
+        return LocalCompletionResponse(
+            model=entry["model"],
+            choices=choices,
+            usage=LocalUsage(prompt_tokens=entry["prompt_tokens"], completion_tokens=entry["completion_tokens"]),
+            id=f"cassette-{entry['seq']}",
+            backend="cassette",
+        )
+
+
+def open_cassette(mode: str, path: str, completion_fn: Optional[Callable[..., Any]] = None, strict: bool = False) -> Any:
+    """
+    Returns a new recorder or replayer for a cassette path. Each CodeGeneratorAgent opens its
+    own, so a second run in the same process replays the cassette from its first entry again
+    (tasks scheduled together share one generator, and with it one cassette).
+    """
+    if mode == "record":
+        return CassetteRecorder(path, completion_fn)
+    if mode == "replay":
+        return CassetteReplayer(path, strict=strict)
+    raise ValueError(f"Unknown LLM cassette mode: {mode}")
@@ -0,0 +1,51 @@
+import bisect
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Any
+
+
+DEFAULT_LATENCY_BUCKETS_SECONDS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class LatencyHistogram:
+    """Per-model latency tracker: a rolling window for percentiles plus cumulative bucket counts."""
+
+    def __init__(self, window_size: int = 200, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS_SECONDS):
+        self.window_size = window_size
+        self.buckets: List[float] = sorted(buckets)
+        self.bucket_counts: List[int] = [0] * (len(self.buckets) + 1)  # last slot is the +Inf overflow bucket
+        self._window: Deque[float] = deque(maxlen=window_size)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self._window.append(seconds)
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    @property
+    def window_count(self) -> int:
+        return len(self._window)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile over the rolling window, or None when nothing has been observed."""
+        if not self._window:
+            return None
+        ordered = sorted(self._window)
+        rank = math.ceil(pct / 100.0 * len(ordered))
+        return ordered[max(0, min(len(ordered), rank) - 1)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{b:g}s" for b in self.buckets] + ["le_inf"]
+        return {
+            "count": self.count,
+            "mean_seconds": self.total_seconds / self.count if self.count else None,
+            "max_seconds": self.max_seconds if self.count else None,
+            "p50_seconds": self.percentile(50),
+            "p90_seconds": self.percentile(90),
+            "p99_seconds": self.percentile(99),
+            "buckets": dict(zip(labels, self.bucket_counts)),
+        }
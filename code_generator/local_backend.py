@@ -0,0 +1,245 @@
+"""
+Offline, deterministic stand-in for LiteLLM's ``acompletion``.
+
+Serves full programs from a corpus (or a stub implementation) for code prompts and
+small SEARCH/REPLACE diffs produced by simple mutation operators for diff prompts.
+Latency, rate limits, server errors and malformed diffs can be injected; every
+random choice is derived from the seed and the prompt so runs are reproducible
+regardless of how concurrent calls interleave.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from litellm.exceptions import InternalServerError, RateLimitError
+
+from config import settings
+from code_generator.variants import VARIANT_HEADER
+
+logger = logging.getLogger(__name__)
+
+_CODE_BLOCK_PATTERN = re.compile(r"```python\n(.*?)\n```", re.DOTALL)
+_FUNCTION_NAME_PATTERNS = [
+    re.compile(r"Function to Implement: `(\w+)`"),
+    re.compile(r"Function to (?:Improve|Fix): `(\w+)`"),
+]
+_VARIANT_COUNT_PATTERN = re.compile(r"Provide exactly (\d+) independent variants")
+_COMPARISON_SWAPS = [("<=", "<"), (">=", ">"), ("==", "!="), ("<", "<="), (">", ">="), ("!=", "==")]
+
+
+@dataclass
+class LocalMessage:
+    content: str
+    role: str = "assistant"
+
+
+@dataclass
+class LocalChoice:
+    message: LocalMessage
+    index: int = 0
+    finish_reason: str = "stop"
+
+
+@dataclass
+class LocalUsage:
+    prompt_tokens: int
+    completion_tokens: int
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class LocalCompletionResponse:
+    """Mirrors the parts of LiteLLM's ModelResponse the agents read."""
+    model: str
+    choices: List[LocalChoice]
+    usage: LocalUsage
+    id: str = ""
+    backend: str = field(default="local")
+
+
+def load_corpus(path: Optional[str]) -> List[str]:
+    """Loads programs from a directory of .py files or a JSONL file with a 'code' field per line."""
+    if not path:
+        return []
+    programs: List[str] = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".py"):
+                with open(os.path.join(path, name)) as f:
+                    programs.append(f.read())
+    else:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    programs.append(json.loads(line)["code"])
+    logger.info(f"Loaded {len(programs)} programs for the local LLM backend from {path}")
+    return programs
+
+
+class LocalLLMBackend:
+    def __init__(
+        self,
+        seed: int = 0,
+        corpus: Optional[List[str]] = None,
+        latency: Optional[Dict[str, Any]] = None,
+        error_rates: Optional[Dict[str, float]] = None,
+        max_tracked_prompts: int = 10000,
+    ):
+        self.seed = seed
+        self.corpus = list(corpus or [])
+        self.latency = dict(latency or {"distribution": "fixed", "seconds": 0.0})
+        self.error_rates = dict(error_rates or {})
+        # How often each recent prompt was seen, so repeats get fresh responses. The least recently
+        # seen prompts are forgotten first; a forgotten prompt starts over from its first response.
+        self._prompt_counters: "OrderedDict[str, int]" = OrderedDict()
+        self.max_tracked_prompts = max(1, max_tracked_prompts)
+        self.stats = {"calls": 0, "rate_limit_errors": 0, "server_errors": 0, "malformed_diffs": 0}
+
+    @classmethod
+    def from_settings(cls, get_setting: Callable[[str], Any] = settings.get_setting) -> "LocalLLMBackend":
+        """`get_setting` is the calling agent's, so per-task overrides of the LOCAL_LLM_* settings apply."""
+        return cls(
+            seed=get_setting("LOCAL_LLM_SEED"),
+            corpus=load_corpus(get_setting("LOCAL_LLM_CORPUS_PATH")),
+            latency=get_setting("LOCAL_LLM_LATENCY"),
+            error_rates=get_setting("LOCAL_LLM_ERROR_RATES"),
+        )
+
+    def _rng_for(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        occurrence = self._prompt_counters.pop(digest, 0)
+        self._prompt_counters[digest] = occurrence + 1
+        if len(self._prompt_counters) > self.max_tracked_prompts:
+            self._prompt_counters.popitem(last=False)
+        return random.Random(f"{self.seed}:{digest}:{occurrence}")
+
+    def reset(self) -> None:
+        """Forgets the prompts seen so far, so the next run gets the same responses as a fresh backend."""
+        self._prompt_counters.clear()
+        self.stats = {key: 0 for key in self.stats}
+
+    def _sample_latency(self, rng: random.Random) -> float:
+        distribution = self.latency.get("distribution", "fixed")
+        if distribution == "fixed":
+            return float(self.latency.get("seconds", 0.0))
+        if distribution == "uniform":
+            return rng.uniform(self.latency.get("min_seconds", 0.0), self.latency.get("max_seconds", 0.0))
+        if distribution == "exponential":
+            mean = self.latency.get("mean_seconds", 0.0)
+            return rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        if distribution == "lognormal":
+            return rng.lognormvariate(self.latency.get("mu", -1.0), self.latency.get("sigma", 0.5))
+        raise ValueError(f"Unknown latency distribution for local LLM backend: {distribution}")
+
+    async def acompletion(self, model: str, messages: List[Dict[str, str]], **kwargs) -> LocalCompletionResponse:
+        prompt = messages[-1]["content"]
+        rng = self._rng_for(prompt)
+        self.stats["calls"] += 1
+
+        delay = self._sample_latency(rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if rng.random() < self.error_rates.get("rate_limit", 0.0):
+            self.stats["rate_limit_errors"] += 1
+            raise RateLimitError(message="Injected rate limit from local LLM backend", llm_provider="local", model=model)
+        if rng.random() < self.error_rates.get("server_error", 0.0):
+            self.stats["server_errors"] += 1
+            raise InternalServerError(message="Injected 500 from local LLM backend", llm_provider="local", model=model)
+
+        if "<<<<<<< SEARCH" in prompt:
+            content = self._diff_response(prompt, rng)
+        elif "pytest unit tests" in prompt:
+            content = self._tests_response(prompt)
+        else:
+            content = self._program_response(prompt, rng)
+
+        return LocalCompletionResponse(
+            model=model,
+            choices=[LocalChoice(message=LocalMessage(content=content))],
+            usage=LocalUsage(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4),
+            id=f"local-{self.stats['calls']}",
+        )
+
+    @staticmethod
+    def _function_name(prompt: str) -> str:
+        for pattern in _FUNCTION_NAME_PATTERNS:
+            match = pattern.search(prompt)
+            if match:
+                return match.group(1)
+        return "solve"
+
+    def _program_response(self, prompt: str, rng: random.Random) -> str:
+        if self.corpus:
+            return rng.choice(self.corpus)
+        function_name = self._function_name(prompt)
+        return f"def {function_name}(*args, **kwargs):\n    return None"
+
+    def _tests_response(self, prompt: str) -> str:
+        tests_code = "import candidate\n\n\ndef test_candidate_importable():\n    assert candidate is not None\n"
+        return json.dumps({
+            "explanation": "Offline placeholder test generated by the local LLM backend.",
+            "cases": [],
+            "tests_code": tests_code,
+            "suggested_imports": "",
+        })
+
+    def _diff_response(self, prompt: str, rng: random.Random) -> str:
+        match = _CODE_BLOCK_PATTERN.search(prompt)
+        parent_code = match.group(1) if match else ""
+
+        if rng.random() < self.error_rates.get("malformed_diff", 0.0):
+            self.stats["malformed_diffs"] += 1
+            if rng.random() < 0.5:
+                return "<<<<<<< SEARCH\nthis line does not exist in the parent\n=======\npass\n>>>>>>> REPLACE"
+            return "<<<<<<< SEARCH\n" + (parent_code.splitlines() or ["pass"])[0] + "\n======="
+
+        variant_match = _VARIANT_COUNT_PATTERN.search(prompt)
+        if variant_match:
+            variants = []
+            for n in range(1, int(variant_match.group(1)) + 1):
+                search, replace = self._mutate(parent_code, rng)
+                variants.append(f"{VARIANT_HEADER} {n}\n<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE")
+            return "\n\n".join(variants)
+
+        search, replace = self._mutate(parent_code, rng)
+        return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE"
+
+    def _mutate(self, parent_code: str, rng: random.Random):
+        """Returns a (search, replace) pair of stripped single lines, or a whole-program swap from the corpus."""
+        if self.corpus and parent_code.strip() and rng.random() < 0.1:
+            return parent_code.strip(), rng.choice(self.corpus).strip()
+
+        lines = [line.strip() for line in parent_code.splitlines() if line.strip() and not line.strip().startswith("#")]
+        operators = []
+        for line in lines:
+            if re.search(r"\b\d+\b", line):
+                operators.append(("constant", line))
+            if any(op in line for op, _ in _COMPARISON_SWAPS) and not line.startswith("def "):
+                operators.append(("comparison", line))
+        if operators:
+            kind, line = rng.choice(operators)
+            if kind == "constant":
+                numbers = list(re.finditer(r"\b\d+\b", line))
+                number = rng.choice(numbers)
+                old_value = int(number.group(0))
+                new_value = old_value - 1 if old_value > 0 and rng.random() < 0.5 else old_value + 1
+                return line, line[:number.start()] + str(new_value) + line[number.end():]
+            for old, new in _COMPARISON_SWAPS:
+                if old in line:
+                    return line, line.replace(old, new, 1)
+
+        # Fall back to a behaviour-preserving edit so the child still differs from the parent.
+        anchor = next((line for line in lines if line.startswith("return ")), lines[-1] if lines else "pass")
+        return anchor, f"{anchor}  # variant {rng.randint(0, 10 ** 6)}"
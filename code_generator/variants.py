@@ -0,0 +1,28 @@
+"""
+Multi-variant diff responses: one LLM call returns several independent sets of
+SEARCH/REPLACE blocks, each introduced by a ``### VARIANT <n>`` header line.
+"""
+import re
+from typing import List
+
+VARIANT_HEADER = "### VARIANT"
+
+_VARIANT_HEADER_PATTERN = re.compile(r"^\s*#{3}\s*VARIANT\s+\d+\s*:?\s*$", re.MULTILINE | re.IGNORECASE)
+
+
+def split_variants(response_text: str) -> List[str]:
+    """
+    Splits a response into its variants' diff texts. A response without any header is
+    treated as a single variant, so models that ignore the instruction still yield a child.
+    Empty variants are dropped.
+    """
+    headers = list(_VARIANT_HEADER_PATTERN.finditer(response_text))
+    if not headers:
+        return [response_text] if response_text.strip() else []
+    variants = []
+    for index, header in enumerate(headers):
+        end = headers[index + 1].start() if index + 1 < len(headers) else len(response_text)
+        body = response_text[header.end():end].strip("\n")
+        if body.strip():
+            variants.append(body)
+    return variants
@@ -36,6 +36,15 @@ GENERATIONS = 2
 ELITISM_COUNT = 1
 MUTATION_RATE = 0.7
 CROSSOVER_RATE = 0.2
+# "generational" waits for every offspring of a generation; "steady_state" runs a fixed pool of
+# workers that each sample a parent, generate, evaluate and insert continuously. Survivor selection
+# (and with it migration, every MIGRATION_INTERVAL selections) then runs every
+# STEADY_STATE_SELECTION_INTERVAL inserted children, or after STEADY_STATE_SELECTION_INTERVAL_SECONDS.
+EVOLUTION_MODE = os.getenv("EVOLUTION_MODE", "generational")
+STEADY_STATE_WORKERS = int(os.getenv("STEADY_STATE_WORKERS", "4"))
+STEADY_STATE_SELECTION_INTERVAL = None  # None uses POPULATION_SIZE, i.e. one generation's worth of children
+STEADY_STATE_SELECTION_INTERVAL_SECONDS = None
+MUTATION_VARIANTS_PER_CALL = int(os.getenv("MUTATION_VARIANTS_PER_CALL", "1"))  # Independent diffs requested per mutation call; each becomes its own child
 
 # Island Model Settings
 NUM_ISLANDS = 4  # Number of subpopulations
@@ -43,13 +52,114 @@ MIGRATION_INTERVAL = 4  # Number of generations between migrations
 ISLAND_POPULATION_SIZE = POPULATION_SIZE // NUM_ISLANDS  # Programs per island
 MIN_ISLAND_SIZE = 2  # Minimum number of programs per island
 MIGRATION_RATE = 0.2  # Rate at which programs migrate between islands
+# Island-parallel mode (main.py --island-workers): islands are split over ISLAND_PARALLEL_WORKERS processes
+# (0 keeps everything in one process). Every MIGRATION_INTERVAL generations each process sends its best
+# MIGRATION_RATE share of programs to the next process in a ring, waiting up to ISLAND_MIGRATION_WAIT_SECONDS
+# for its own neighbour's batch (0 takes whatever has already arrived).
+ISLAND_PARALLEL_WORKERS = int(os.getenv("ISLAND_PARALLEL_WORKERS", "0"))
+ISLAND_MIGRATION_WAIT_SECONDS = 0.0
 
 # Debug Settings
 DEBUG = os.getenv("DEBUG", False)
 EVALUATION_TIMEOUT_SECONDS = 800
-
-DATABASE_TYPE = "in_memory"
-DATABASE_PATH = "program_database.json"
+# At most EVALUATION_CONCURRENCY evaluations of one task run at once; waiting programs are started
+# shortest-expected-first (parent's measured evaluation time, raised by timeouts in the lineage).
+# Waiting lowers a program's expected cost by EVALUATION_QUEUE_AGING_RATE seconds per second.
+EVALUATION_CONCURRENCY = int(os.getenv("EVALUATION_CONCURRENCY", str(max(4, os.cpu_count() or 4))))
+EVALUATION_QUEUE_AGING_RATE = 1.0
+EVALUATION_COST_LINEAGE_DECAY = 0.5  # Weight of older ancestors' timeouts in a lineage's timeout share
+EVALUATION_COST_MAX_PROGRAMS = 10000  # Programs whose measured time is remembered (least recently used dropped first)
+
+# Program database: "in_memory" (lost when the process exits), "columnar" (in memory, stored in typed
+# columns instead of Program objects, for archives of millions of programs), "map_elites" (in memory, one
+# elite per MAP_ELITES_DESCRIPTORS cell) or "sqlite" (persistent, in
+# DATABASE_PATH; WAL journal, group-committed batch writes and DATABASE_READ_CONNECTIONS reader threads
+# off the event loop)
+DATABASE_TYPE = os.getenv("DATABASE_TYPE", "in_memory")
+DATABASE_PATH = os.getenv("DATABASE_PATH", "program_database.sqlite3")
+DATABASE_READ_CONNECTIONS = 4
+# MAP-Elites database (DATABASE_TYPE=map_elites): keeps only the best program of each cell of a grid over
+# these descriptors, so its size is bounded whatever the run length. Each descriptor maps to its bucket
+# boundaries; "code_length" is measured in characters, any other name is read from fitness_scores
+# (runtime_ms, memory_mb: peak memory the example runs add to the harness). Programs without a value share one
+# extra bucket. Parents are drawn uniformly over the occupied cells instead of from the islands.
+MAP_ELITES_DESCRIPTORS = {
+    "code_length": [250, 500, 1000, 2000],
+    "runtime_ms": [0.1, 1.0, 10.0, 100.0, 1000.0],
+    "memory_mb": [1.0, 8.0, 32.0, 128.0],
+}
+DATABASE_SAVE_BATCH_SIZE = 16  # Evaluated programs buffered before one bulk save_programs call
+# Code storage of the in-memory and columnar databases: "off" keeps the saved Program objects as they are;
+# "dedup" stores each distinct code once; "delta" also stores code as a line delta against the
+# parent's, with a full snapshot at least every CODE_STORE_SNAPSHOT_INTERVAL deltas. Code is
+# rebuilt on read, through an LRU of CODE_STORE_CACHE_SIZE entries.
+DATABASE_CODE_STORE = os.getenv("DATABASE_CODE_STORE", "off")
+CODE_STORE_SNAPSHOT_INTERVAL = 8
+CODE_STORE_CACHE_SIZE = 256
+# Near-duplicate detection (in_memory and columnar databases): MinHash signatures over token shingles of every
+# saved program's code, bucketed by LSH for sub-linear lookups (see database_agent/near_duplicates.py).
+# Offspring whose nearest saved program reaches NEAR_DUPLICATE_THRESHOLD (estimated Jaccard similarity) are
+# flagged before evaluation, and not evaluated at all with NEAR_DUPLICATE_SKIP_EVALUATION. Survivor selection
+# treats a candidate that close to an island member already selected as follows: "penalize" only fills
+# slots no distinct candidate takes, "skip" leaves it out, "off" ignores similarity.
+NEAR_DUPLICATE_INDEX = os.getenv("NEAR_DUPLICATE_INDEX", "false").lower() in ("1", "true", "yes")
+NEAR_DUPLICATE_THRESHOLD = 0.9
+NEAR_DUPLICATE_PERMUTATIONS = 64
+NEAR_DUPLICATE_BANDS = 8  # Must divide NEAR_DUPLICATE_PERMUTATIONS
+NEAR_DUPLICATE_SHINGLE_SIZE = 3  # Tokens per shingle
+NEAR_DUPLICATE_SKIP_EVALUATION = False
+NEAR_DUPLICATE_SELECTION = "penalize"  # off | penalize | skip
+# Compaction of the in_memory database for long runs (see database_agent/compaction.py). Once it holds more than
+# COMPACTION_MAX_PROGRAMS programs, a background pass evicts every program that is not on an island or awaiting
+# selection, not among the COMPACTION_KEEP_TOP_K best of its task, not from the last COMPACTION_KEEP_RECENT_GENERATIONS
+# generations, not awaiting evaluation and not an ancestor of a program kept for one of these reasons.
+# "evict" drops them; "spill" first appends them to COMPACTION_COLD_DIR/<task id>.jsonl, where reads by id and
+# exports still find them; "off" keeps every program in memory.
+COMPACTION_MODE = os.getenv("COMPACTION_MODE", "off")
+COMPACTION_MAX_PROGRAMS = 10000
+COMPACTION_KEEP_TOP_K = 100
+COMPACTION_KEEP_RECENT_GENERATIONS = 1
+COMPACTION_COLD_DIR = os.getenv("COMPACTION_COLD_DIR", "cold_programs")
+COMPACTION_BATCH_SIZE = 500  # Programs examined per step of a pass; the event loop runs between steps
+
+# Checkpoints: one directory per task under CHECKPOINT_DIR (unset disables them). Programs are
+# appended incrementally on every batched save; the full state is also written after every
+# CHECKPOINT_INTERVAL_GENERATIONS generations. Resume with --resume <checkpoint directory>.
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR")
+CHECKPOINT_INTERVAL_GENERATIONS = 1
+
+# Warm start: with ARCHIVE_DIR set, every run appends its best ARCHIVE_PROGRAMS_PER_RUN programs to
+# ARCHIVE_DIR/archive.jsonl and evaluation results to ARCHIVE_DIR/evaluations.jsonl (keyed by code and a
+# fingerprint of the tests). initialize_population seeds from archived programs of the same task id, or
+# of tasks evolving the same function signature whose description similarity reaches
+# WARM_START_SIMILARITY_THRESHOLD; seeds are re-evaluated against the current tests and those below
+# WARM_START_MIN_CORRECTNESS are dropped. The LLM only generates the remaining slots.
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR")
+ARCHIVE_PROGRAMS_PER_RUN = 10
+WARM_START_ENABLED = True
+WARM_START_SIMILARITY_THRESHOLD = 0.6
+WARM_START_MIN_CORRECTNESS = 0.0  # Seeds must score above this
+# Evaluation results kept in memory (least recently used dropped first), with or without ARCHIVE_DIR
+EVALUATION_CACHE_MAX_ENTRIES = 10000
+
+# Run control: the run stops before GENERATIONS when any budget is spent (None disables it) or when
+# the global best has not improved for CONVERGENCE_PATIENCE_GENERATIONS. An island without improvement
+# for ISLAND_STAGNATION_GENERATIONS is frozen (no more parents drawn from it) until it improves again.
+# Runtime gains count as improvement only when larger than CONVERGENCE_RUNTIME_TOLERANCE (relative).
+RUN_MAX_WALL_CLOCK_SECONDS = None
+RUN_MAX_LLM_TOKENS = None
+RUN_MAX_LLM_COST_USD = None
+RUN_MAX_EVALUATION_CPU_SECONDS = None  # User + system CPU time of this task's evaluation subprocesses
+CONVERGENCE_PATIENCE_GENERATIONS = None
+ISLAND_STAGNATION_GENERATIONS = None
+CONVERGENCE_RUNTIME_TOLERANCE = 0.02
+
+# Multi-task scheduling (task_manager.scheduler, main.py --batch): tasks in one process share one LLM
+# client and these slot pools. "fair" hands a free slot to the task holding the fewest slots per unit
+# of priority; "priority" to the highest-priority waiting task.
+SCHEDULER_LLM_SLOTS = int(os.getenv("SCHEDULER_LLM_SLOTS", "8"))
+SCHEDULER_EVALUATION_SLOTS = int(os.getenv("SCHEDULER_EVALUATION_SLOTS", str(os.cpu_count() or 4)))
+SCHEDULER_POLICY = os.getenv("SCHEDULER_POLICY", "fair")
 
 # Logging Configuration
 LOG_LEVEL = "DEBUG" if DEBUG else "INFO"
@@ -60,6 +170,57 @@ LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 API_MAX_RETRIES = 5
 API_RETRY_DELAY_SECONDS = 10
 
+# Hedged LLM requests: if a call is still running after the given percentile of recently
+# observed latency, a duplicate is sent (optionally to a fallback model) and the first valid response wins.
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGING_LATENCY_PERCENTILE = 90.0
+HEDGING_MAX_EXTRA_CALL_RATE = 0.1  # Hedged calls may add at most this fraction of extra LLM calls
+HEDGING_MIN_SAMPLES = 10  # Latency observations required before hedging kicks in
+HEDGING_FALLBACK_MODEL = os.getenv("HEDGING_FALLBACK_MODEL")  # None hedges against the same model
+LATENCY_HISTOGRAM_WINDOW = 200
+
+# LLM backend: "litellm" calls the configured provider, "local" serves deterministic offline
+# programs and diffs (see code_generator/local_backend.py) for load and regression testing.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "litellm")
+LOCAL_LLM_SEED = int(os.getenv("LOCAL_LLM_SEED", "0"))
+LOCAL_LLM_CORPUS_PATH = os.getenv("LOCAL_LLM_CORPUS_PATH")  # Directory of .py files or JSONL with a "code" field
+# distribution: fixed (seconds) | uniform (min_seconds, max_seconds) | exponential (mean_seconds) | lognormal (mu, sigma)
+LOCAL_LLM_LATENCY = {"distribution": "fixed", "seconds": 0.0}
+LOCAL_LLM_ERROR_RATES = {"rate_limit": 0.0, "server_error": 0.0, "malformed_diff": 0.0}
+
+# Record/replay cassettes: "record" appends every prompt/response pair to LLM_CASSETTE_PATH,
+# "replay" serves responses from it by prompt hash and order with no network access.
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "llm_cassette.jsonl")
+LLM_CASSETTE_STRICT = os.getenv("LLM_CASSETTE_STRICT", "false").lower() in ("1", "true", "yes")  # Fail on unknown prompts instead of falling back to sequence order
+
+# Seed for selection and sampling randomness; set it (with a replayed cassette) for reproducible runs
+RANDOM_SEED = int(os.getenv("RANDOM_SEED")) if os.getenv("RANDOM_SEED") else None
+
+# Prompt construction: estimated-token budget per designed prompt. The examples block is built
+# once per task; error dumps are deduplicated and truncated to fit what the budget leaves.
+PROMPT_TOKEN_BUDGET = 4000
+PROMPT_EXAMPLES_MAX_TOKENS = 1200
+PROMPT_MAX_EXAMPLES = 10
+PROMPT_MAX_EXAMPLE_CHARS = 300
+PROMPT_MAX_ERROR_CHARS = 1500
+PROMPT_BUDGET_LOG_SIZE = 1000
+
+# Per-call LLM telemetry rolled up per generation and island; exported as JSON at the end of a run when set
+TELEMETRY_EXPORT_PATH = os.getenv("TELEMETRY_EXPORT_PATH")
+# Individual calls kept for the export; older calls only count towards the rollups
+TELEMETRY_CALL_WINDOW = 1000
+
+# Lineage DAG of the task (programs with their depth and root, and parent→child edges) exported as JSON to
+# LINEAGE_EXPORT_DIR/<task id>.json at the end of a run when set; non-finite fitness values are written as null
+LINEAGE_EXPORT_DIR = os.getenv("LINEAGE_EXPORT_DIR")
+
+# Run history (programs, fitness, lineage, per-call LLM telemetry) streamed to this directory during the run when set:
+# Parquet files when pyarrow is installed ("auto"), gzip-compressed JSONL otherwise. See database_agent/export.py.
+HISTORY_EXPORT_DIR = os.getenv("HISTORY_EXPORT_DIR")
+HISTORY_EXPORT_FORMAT = os.getenv("HISTORY_EXPORT_FORMAT", "auto")  # auto | parquet | jsonl
+HISTORY_EXPORT_BATCH_SIZE = 1000  # Rows per Parquet file / gzip member
+
 RL_TRAINING_INTERVAL_GENERATIONS = 50
 RL_MODEL_PATH = "rl_finetuner_model.pth"
 
@@ -0,0 +1,14 @@
+"""
+The fitness ordering shared by selection, telemetry and the MAP-Elites archive.
+"""
+from typing import Tuple
+
+from core.interfaces import Program
+
+
+def fitness_key(program: Program) -> Tuple[float, float]:
+    """Ordering used for 'better than': higher correctness first, then lower runtime."""
+    return (
+        program.fitness_scores.get("correctness", 0.0),
+        -program.fitness_scores.get("runtime_ms", float('inf')),
+    )
@@ -1,8 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Union
+from typing import AsyncIterator, List, Dict, Any, Optional, Union
 from dataclasses import dataclass, field
 import time
 
+@dataclass
+class LLMCallRecord:
+    """Telemetry for one LLM completion call made on behalf of a program."""
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_seconds: float = 0.0  # Wall time including retries and backoff
+    retries: int = 0
+    cost_usd: Optional[float] = None
+    outcome: str = "pending"  # pending | applied | rejected | failed
+    improved_fitness: Optional[bool] = None  # Set once the resulting child has been evaluated
+    started_at: float = field(default_factory=lambda: time.time())
+
+
 @dataclass
 class Program:
     id: str
@@ -14,6 +28,9 @@ class Program:
     errors: List[str] = field(default_factory=list)
     status: str = "unevaluated"
     created_at: float = field(default_factory=lambda: time.time())  # Track program age
+    llm_calls: List[LLMCallRecord] = field(default_factory=list)  # LLM calls that produced this program
+    task_id: Optional[str] = None  # Task the program was evolved for; persistent databases filter on it
+    near_duplicate_of: Optional[str] = None  # Most similar saved program when flagged before evaluation (see NEAR_DUPLICATE_THRESHOLD)
 
 
 @dataclass
@@ -49,6 +66,71 @@ class TaskDefinition:
     max_memory_mb: Optional[int] = None
 
 
+@dataclass
+class ProgramQuery:
+    """
+    Filters, ordering, limit and projection for DatabaseAgentInterface.query_programs. Every
+    filter left as None is ignored; the rest must all hold.
+    """
+    task_id: Optional[str] = None  # Also matches programs saved without a task id
+    generation: Optional[int] = None
+    min_generation: Optional[int] = None
+    max_generation: Optional[int] = None
+    island_id: Optional[int] = None
+    status: Optional[str] = None
+    parent_id: Optional[str] = None
+    min_correctness: Optional[float] = None
+    max_runtime_ms: Optional[float] = None
+    order_by: Optional[str] = None  # correctness | runtime_ms | generation | created_at
+    descending: bool = False
+    limit: Optional[int] = None
+    fields: Optional[List[str]] = None  # Program attributes to return as dicts instead of whole programs
+
+    def matches(self, program: "Program") -> bool:
+        if self.task_id is not None and program.task_id not in (self.task_id, None):
+            return False
+        if self.generation is not None and program.generation != self.generation:
+            return False
+        if self.min_generation is not None and program.generation < self.min_generation:
+            return False
+        if self.max_generation is not None and program.generation > self.max_generation:
+            return False
+        if self.island_id is not None and program.island_id != self.island_id:
+            return False
+        if self.status is not None and program.status != self.status:
+            return False
+        if self.parent_id is not None and program.parent_id != self.parent_id:
+            return False
+        if self.min_correctness is not None and program.fitness_scores.get("correctness", -1.0) < self.min_correctness:
+            return False
+        if self.max_runtime_ms is not None and program.fitness_scores.get("runtime_ms", float('inf')) > self.max_runtime_ms:
+            return False
+        return True
+
+    def sort_value(self, program: "Program") -> Any:
+        if self.order_by == "correctness":
+            return program.fitness_scores.get("correctness", -1.0)
+        if self.order_by == "runtime_ms":
+            return program.fitness_scores.get("runtime_ms", float('inf'))
+        if self.order_by in ("generation", "created_at"):
+            return getattr(program, self.order_by)
+        raise ValueError(f"Unsupported order_by: {self.order_by}")
+
+    def project(self, program: "Program") -> Union["Program", Dict[str, Any]]:
+        if self.fields is None:
+            return program
+        return {name: getattr(program, name) for name in self.fields}
+
+    def apply(self, programs: List["Program"]) -> List[Union["Program", Dict[str, Any]]]:
+        """Reference evaluation over already loaded programs, for backends without indexes."""
+        selected = [p for p in programs if self.matches(p)]
+        if self.order_by is not None:
+            selected.sort(key=self.sort_value, reverse=self.descending)
+        if self.limit is not None:
+            selected = selected[:self.limit]
+        return [self.project(p) for p in selected]
+
+
 @dataclass
 class TestCase:
     input: Any
@@ -61,6 +143,13 @@ class BaseAgent(ABC):
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = config or {}
 
+    def get_setting(self, name: str) -> Any:
+        """Per-agent override from self.config (keyed by setting name), else the global value in config.settings."""
+        if name in self.config:
+            return self.config[name]
+        from config import settings
+        return settings.get_setting(name)
+
     @abstractmethod
     async def execute(self, *args, **kwargs) -> Any:
         """Main execution method for an agent."""
@@ -86,7 +175,7 @@ class PromptDesignerInterface(BaseAgent):
 
 class CodeGeneratorInterface(BaseAgent):
     @abstractmethod
-    async def generate_code(self, prompt: str, model_name: Optional[str] = None, temperature: Optional[float] = 0.7, output_format: str = "code") -> str:
+    async def generate_code(self, prompt: str, model_name: Optional[str] = None, temperature: Optional[float] = 0.7, output_format: str = "code", call_records: Optional[List[LLMCallRecord]] = None) -> str:
         pass
 
 class TestGeneratorInterface(BaseAgent):
@@ -99,11 +188,20 @@ class EvaluatorAgentInterface(BaseAgent):
     async def evaluate_program(self, program: Program, task: TaskDefinition) -> Program:
         pass
 
+# Program attributes of each node in DatabaseAgentInterface.get_lineage_graph, besides depth and root_id
+LINEAGE_NODE_FIELDS = ("id", "parent_id", "generation", "island_id", "status", "fitness_scores")
+
+
 class DatabaseAgentInterface(BaseAgent):
     @abstractmethod
     async def save_program(self, program: Program):
         pass
 
+    async def save_programs(self, programs: List[Program]) -> None:
+        """Saves a batch of programs; backends should override this with a single bulk write."""
+        for program in programs:
+            await self.save_program(program)
+
     @abstractmethod
     async def get_program(self, program_id: str) -> Optional[Program]:
         pass
@@ -116,6 +214,79 @@ class DatabaseAgentInterface(BaseAgent):
     async def get_programs_for_next_generation(self, task_id: str, generation_size: int) -> List[Program]:
         pass
 
+    async def query_programs(self, query: ProgramQuery) -> List[Union[Program, Dict[str, Any]]]:
+        """Programs matching `query`; backends should push the filters down to their indexes."""
+        return query.apply(await self.get_all_programs())
+
+    async def iter_programs(self, batch_size: int = 1000) -> AsyncIterator[List[Program]]:
+        """Every saved program in batches of at most `batch_size`; backends should page through their storage instead."""
+        programs = await self.get_all_programs()
+        for start in range(0, len(programs), batch_size):
+            yield programs[start:start + batch_size]
+
+    async def get_ancestors(self, program_ids: List[str], max_depth: Optional[int] = None) -> Dict[str, List[Program]]:
+        """Saved ancestors of each program, parent first, at most `max_depth` generations back."""
+        ancestors = {}
+        for program_id in program_ids:
+            chain, seen = [], {program_id}
+            program = await self.get_program(program_id)
+            while program is not None and program.parent_id not in seen and (max_depth is None or len(chain) < max_depth):
+                program = await self.get_program(program.parent_id) if program.parent_id else None
+                if program is not None:
+                    chain.append(program)
+                    seen.add(program.id)
+            ancestors[program_id] = chain
+        return ancestors
+
+    async def get_descendants(self, program_ids: List[str], max_depth: Optional[int] = None) -> Dict[str, List[Program]]:
+        """Saved descendants of each program, breadth first, at most `max_depth` generations down."""
+        children: Dict[Optional[str], List[Program]] = {}
+        positions: Dict[str, int] = {}
+        for position, program in enumerate(await self.get_all_programs()):
+            children.setdefault(program.parent_id, []).append(program)
+            positions[program.id] = position
+        descendants = {}
+        for program_id in program_ids:
+            found, seen, level, depth = [], {program_id}, [program_id], 0
+            while level and (max_depth is None or depth < max_depth):
+                level_programs = sorted((child for node in level for child in children.get(node, []) if child.id not in seen),
+                                        key=lambda child: positions[child.id])
+                seen.update(child.id for child in level_programs)
+                found.extend(level_programs)
+                level = [child.id for child in level_programs]
+                depth += 1
+            descendants[program_id] = found
+        return descendants
+
+    async def count_descendants(self, program_ids: List[str]) -> Dict[str, int]:
+        return {program_id: len(found) for program_id, found in (await self.get_descendants(program_ids)).items()}
+
+    async def get_lineage_graph(self, task_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        The lineage DAG of `task_id` (every program when None) for analysis: one node per program
+        with its depth and root (oldest saved ancestor), and [parent, child] edges.
+        """
+        nodes = await self.query_programs(ProgramQuery(task_id=task_id, fields=list(LINEAGE_NODE_FIELDS)))
+        by_id = {node["id"]: node for node in nodes}
+        for node in nodes:
+            # Walk up to the nearest node already placed, then place the path below it.
+            path, on_path = [], set()
+            current = node
+            while "depth" not in current:
+                path.append(current)
+                on_path.add(current["id"])
+                parent = by_id.get(current["parent_id"])
+                if parent is None or parent["id"] in on_path:
+                    current["depth"], current["root_id"] = 0, current["id"]
+                    path.pop()
+                    break
+                current = parent
+            for descendant in reversed(path):
+                parent = by_id[descendant["parent_id"]]
+                descendant["depth"], descendant["root_id"] = parent["depth"] + 1, parent["root_id"]
+        edges = [[node["parent_id"], node["id"]] for node in nodes if node["parent_id"] in by_id]
+        return {"task_id": task_id, "nodes": nodes, "edges": edges}
+
 class SelectionControllerInterface(BaseAgent):
     @abstractmethod
     def select_parents(self, evaluated_programs: List[Program], num_parents: int) -> List[Program]:
@@ -0,0 +1,47 @@
+"""
+MinHash signatures of program code, shared by the near-duplicate index of the databases and
+by survivor selection.
+
+Code is split into tokens (comments and whitespace dropped), and each run of `shingle_size`
+consecutive tokens is one shingle. A signature keeps, for each of `num_permutations` universal
+hash functions, the smallest hash over the shingles. The share of positions where two
+signatures agree estimates the Jaccard similarity of the two shingle sets.
+"""
+import random
+import re
+import zlib
+from array import array
+from typing import List, Set, Tuple
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_COMMENT = re.compile(r"#[^\n]*")
+_TOKEN = re.compile(r"[A-Za-z_]\w*|\d+(?:\.\d+)?|\S")
+
+Signature = array
+
+
+def signature_similarity(first: Signature, second: Signature) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+
+class MinHasher:
+    def __init__(self, num_permutations: int = 64, shingle_size: int = 3, seed: int = 1):
+        self.num_permutations = num_permutations
+        self.shingle_size = max(1, shingle_size)
+        # Fixed coefficients: signatures stay comparable across runs and processes.
+        rng = random.Random(seed)
+        self._coefficients: List[Tuple[int, int]] = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(_MERSENNE_PRIME))
+                                                     for _ in range(num_permutations)]
+
+    def shingles(self, code: str) -> Set[int]:
+        tokens = _TOKEN.findall(_COMMENT.sub("", code))
+        size = min(self.shingle_size, len(tokens))
+        return {zlib.crc32(" ".join(tokens[i:i + size]).encode("utf-8")) for i in range(len(tokens) - size + 1)} if tokens else set()
+
+    def signature(self, code: str) -> Signature:
+        """O(permutations x shingles) pure Python, about 10 ms for 4 KB of code: keep it off the event loop."""
+        shingles = self.shingles(code)
+        if not shingles:
+            return array("Q", [_MERSENNE_PRIME] * self.num_permutations)
+        return array("Q", [min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles) for a, b in self._coefficients])
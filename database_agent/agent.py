@@ -1,43 +1,210 @@
                  
+import asyncio
+import dataclasses
+import heapq
 import logging
-from typing import List, Dict, Any, Optional, Literal
+import random
+from typing import AsyncIterator, Callable, Iterable, List, Dict, Any, Optional, Literal, Set, Tuple, Union
 import uuid
 
 from core.interfaces import (
+    LINEAGE_NODE_FIELDS,
     DatabaseAgentInterface,
     Program,
+    ProgramQuery,
     BaseAgent,
 )
+from database_agent.code_store import CodeStore
+from database_agent.compaction import ColdStore, CompactionPolicy, CompactionStats, estimate_program_bytes
+from database_agent.indexes import LineageIndex, SecondaryIndex, TopKIndex
+from database_agent.near_duplicates import NearDuplicateIndex
                                                                
 
 logger = logging.getLogger(__name__)
 
+_ALL_TASKS = object()  # Index scope of get_best_programs(task_id=None)
+_INDEXED_ATTRIBUTES = ("task_id", "generation", "island_id", "status", "parent_id")  # task_id first
+
 class InMemoryDatabaseAgent(DatabaseAgentInterface, BaseAgent):
-    """An in-memory database for storing and retrieving programs."""
-    def __init__(self):
-        super().__init__()
+    """
+    An in-memory database for storing and retrieving programs.
+
+    Without a code store, the saved Program objects themselves are kept and returned. With one
+    (see database_agent/code_store.py), a snapshot without its code is kept, and reads return
+    copies whose code is rebuilt from the store. With a near-duplicate index (see
+    database_agent/near_duplicates.py), every saved program's code is indexed as well. With a
+    compaction policy (see database_agent/compaction.py), compact() evicts programs the run no
+    longer needs, optionally spilling them to a cold tier on disk that reads still fall back to.
+    """
+    def __init__(self, code_store: Optional[CodeStore] = None, near_duplicates: Optional[NearDuplicateIndex] = None,
+                 compaction: Optional[CompactionPolicy] = None, cold_store: Optional[ColdStore] = None,
+                 config: Optional[Dict[str, Any]] = None):
+        super().__init__(config)
+        if compaction is not None and compaction.mode == "spill" and cold_store is None:
+            raise ValueError("Spilling compaction needs a cold store.")
         self._programs: Dict[str, Program] = {}
+        self.code_store = code_store
+        self.near_duplicates = near_duplicates
+        self.compaction = compaction
+        self.cold_store = cold_store
+        self.compaction_stats = CompactionStats()
+        self._compaction_floor = 0  # Programs the last compaction pass kept
+        self._saved_during_compaction: Optional[Set[str]] = None  # Saved since the running pass last looked
+        # Called with the ids of each evicted slice, so per-program state kept elsewhere can be dropped too.
+        self.eviction_listeners: List[Callable[[List[str]], None]] = []
+        self._code_hashes: Dict[str, str] = {}
+        self._sequence: Dict[str, int] = {}  # First-save order, the tie-breaker of every ranking
+        self._next_sequence = 0
+        self._best_indexes: Dict[Tuple[Any, str, str], TopKIndex] = {}
+        self._secondary: Dict[str, SecondaryIndex] = {attribute: SecondaryIndex(attribute) for attribute in _INDEXED_ATTRIBUTES}
+        self._indexed_values: Dict[str, Tuple] = {}
+        self._lineage = LineageIndex()
+        self.rng = random.Random(self.get_setting("RANDOM_SEED"))
         logger.info("InMemoryDatabaseAgent initialized.")
 
     async def save_program(self, program: Program) -> None:
         logger.info(f"Saving program: {program.id} (Generation: {program.generation}) to in-memory database.")
         if program.id in self._programs:
             logger.warning(f"Program with ID {program.id} already exists (expected during evolution/migration). It will be overwritten.")
-        self._programs[program.id] = program
+        self._store(program)
         logger.debug(f"Program {program.id} data: {program}")
 
+    async def save_programs(self, programs: List[Program]) -> None:
+        if not programs:
+            return
+        overwritten = 0
+        for program in programs:
+            overwritten += program.id in self._programs
+            self._store(program)
+        logger.info(f"Saved a batch of {len(programs)} programs to in-memory database ({overwritten} overwritten).")
+
+    def _store(self, program: Program) -> None:
+        if self._saved_during_compaction is not None:
+            self._saved_during_compaction.add(program.id)
+        if self.cold_store is not None:
+            self.cold_store.discard(program.id)
+        if self.near_duplicates is not None:
+            self.near_duplicates.add(program.id, program.code)
+        if self.code_store is not None:
+            previous_hash = self._code_hashes.get(program.id)
+            base_hash = self._code_hashes.get(program.parent_id) if program.parent_id else None
+            self._code_hashes[program.id] = self.code_store.put(program.code, base_hash)
+            if previous_hash is not None:
+                self.code_store.release(previous_hash)
+            program = self._copy(program, code="")
+        self._programs[program.id] = program
+        self._update_indexes(program)
+        self._lineage.add(program.id, program.parent_id)
+
+    @staticmethod
+    def _copy(program: Program, code: str) -> Program:
+        return dataclasses.replace(program, code=code, fitness_scores=dict(program.fitness_scores),
+                                   errors=list(program.errors), llm_calls=list(program.llm_calls))
+
+    def _materialize(self, program: Program) -> Program:
+        if self.code_store is None:
+            return program
+        return self._copy(program, self.code_store.get(self._code_hashes[program.id]))
+
+    def storage_stats(self) -> Optional[Dict[str, Any]]:
+        """Code store usage, including bytes saved against storing every program's code in full."""
+        return self.code_store.stats() if self.code_store is not None else None
+
     async def get_program(self, program_id: str) -> Optional[Program]:
         logger.debug(f"Attempting to retrieve program by ID: {program_id}")
         program = self._programs.get(program_id)
         if program:
-            logger.info(f"Retrieved program: {program.id}")
+            program = self._materialize(program)
+            logger.debug(f"Retrieved program: {program.id}")
+        elif self.cold_store is not None and program_id in self.cold_store:
+            program = (await asyncio.to_thread(self.cold_store.read, [program_id]))[0]
+            logger.debug(f"Retrieved program {program_id} from the cold tier.")
         else:
             logger.warning(f"Program with ID: {program_id} not found in database.")
         return program
 
     async def get_all_programs(self) -> List[Program]:
         logger.debug(f"Retrieving all {len(self._programs)} programs from in-memory database.")
-        return list(self._programs.values())
+        return [self._materialize(p) for p in self._programs.values()]
+
+    async def iter_programs(self, batch_size: int = 1000) -> AsyncIterator[List[Program]]:
+        # Ids are snapshotted so saves between batches cannot break the iteration; only one batch is copied at a time.
+        program_ids = list(self._programs)
+        for start in range(0, len(program_ids), batch_size):
+            batch = (self._programs.get(program_id) for program_id in program_ids[start:start + batch_size])
+            yield [self._materialize(program) for program in batch if program is not None]
+        if self.cold_store is not None:
+            cold_ids = self.cold_store.ids()
+            for start in range(0, len(cold_ids), batch_size):
+                batch_ids = [program_id for program_id in cold_ids[start:start + batch_size] if program_id not in self._programs]
+                yield await asyncio.to_thread(self.cold_store.read, batch_ids)
+
+    @staticmethod
+    def _sort_key(program: Program, objective: str, sort_order: str, sequence: int) -> Tuple:
+        """Ascending key for the index; ties keep first-save order, as a stable full sort would."""
+        if objective == "correctness":
+            value = program.fitness_scores.get("correctness", -1.0)
+        elif objective == "runtime_ms":
+            value = program.fitness_scores.get("runtime_ms", float('inf'))
+        else:
+            return (0, sequence)
+        return (-value if sort_order == "desc" else value, sequence)
+
+    def _index_for(self, scope: Any, objective: str, sort_order: str) -> TopKIndex:
+        """
+        The top-k index of one scope (a task id, None for programs saved without one, or
+        _ALL_TASKS), objective and order. Built on first use; saves keep it current afterwards.
+        """
+        index_key = (scope, objective, sort_order)
+        index = self._best_indexes.get(index_key)
+        if index is None:
+            index = TopKIndex(
+                (self._sort_key(p, objective, sort_order, self._sequence[p.id]), p.id)
+                for p in self._programs.values() if scope is _ALL_TASKS or p.task_id == scope
+            )
+            self._best_indexes[index_key] = index
+        return index
+
+    def _update_indexes(self, program: Program) -> None:
+        if program.id not in self._sequence:
+            self._sequence[program.id] = self._next_sequence
+            self._next_sequence += 1
+        sequence = self._sequence[program.id]
+        # Compared with the values indexed at the last save, since the stored object may be the same one.
+        old_values = self._indexed_values.get(program.id)
+        new_values = tuple(getattr(program, attribute) for attribute in _INDEXED_ATTRIBUTES)
+        if old_values != new_values:
+            for attribute, old_value, new_value in zip(_INDEXED_ATTRIBUTES, old_values or (None,) * len(new_values), new_values):
+                if old_values is None or old_value != new_value:
+                    if old_values is not None:
+                        self._secondary[attribute].remove(program.id, old_value)
+                    self._secondary[attribute].add(program.id, new_value)
+            self._indexed_values[program.id] = new_values
+        old_task_id = old_values[0] if old_values is not None else program.task_id
+        for (scope, objective, sort_order), index in self._best_indexes.items():
+            if scope is _ALL_TASKS or scope == program.task_id:
+                index.update(program.id, self._sort_key(program, objective, sort_order, sequence))
+            elif scope == old_task_id:
+                index.remove(program.id)
+
+    def _top_entries(self, scope: Any, objective: str, sort_order: str, limit: int) -> List[Tuple]:
+        # Programs are stored by reference; one changed in place since its last save is re-keyed here.
+        index = self._index_for(scope, objective, sort_order)
+        while True:
+            entries = index.top(limit)
+            stale = False
+            for key, program_id in entries:
+                program = self._programs[program_id]
+                if scope is not _ALL_TASKS and program.task_id != scope:
+                    index.remove(program_id)
+                    stale = True
+                    continue
+                current = self._sort_key(program, objective, sort_order, self._sequence[program_id])
+                if current != key:
+                    index.update(program_id, current)
+                    stale = True
+            if not stale:
+                return entries
 
     async def get_best_programs(
         self,
@@ -46,55 +213,80 @@ class InMemoryDatabaseAgent(DatabaseAgentInterface, BaseAgent):
         objective: Literal["correctness", "runtime_ms"] = "correctness",
         sort_order: Literal["asc", "desc"] = "desc",
     ) -> List[Program]:
-        logger.info(f"Retrieving best programs for task {task_id}. Limit: {limit}, Objective: {objective}, Order: {sort_order}")
-        if not self._programs:
-            logger.info("No programs in database to retrieve 'best' from.")
+        """
+        Top `limit` programs of `task_id` (plus programs saved without a task id; every program
+        when task_id is None) in O(limit log N) from incrementally maintained indexes.
+        """
+        logger.debug(f"Retrieving best programs for task {task_id}. Limit: {limit}, Objective: {objective}, Order: {sort_order}")
+        if not self._programs or limit <= 0:
             return []
-
-        all_progs = list(self._programs.values())
-                                                                              
-                                                                                                                
-                                                                                                          
-        relevant_progs = all_progs
-
-        def sort_key(p: Program):
-            if objective == "correctness":
-                return p.fitness_scores.get("correctness", -1.0)
-            elif objective == "runtime_ms":
-                val = p.fitness_scores.get("runtime_ms", float('inf'))
-                return -val if sort_order == "desc" else val 
-            return 0                                       
-
-                                                                          
-        if objective == "correctness":                               
-            effective_reverse = (sort_order == "desc")
-        elif objective == "runtime_ms":                             
-            effective_reverse = (sort_order == "asc")                                                 
-        else:
-            effective_reverse = False          
-        
-                                                                   
-        if objective == "runtime_ms":
-                                                                            
-                                                                           
-            sorted_programs = sorted(relevant_progs, key=lambda p: p.fitness_scores.get("runtime_ms", float('inf')), reverse=(sort_order == "desc"))
-        elif objective == "correctness":
-                                                               
-                                                                
-            sorted_programs = sorted(relevant_progs, key=lambda p: p.fitness_scores.get("correctness", -1.0), reverse=(sort_order == "desc"))
-        else:
-                                                           
-            sorted_programs = sorted(relevant_progs, key=sort_key, reverse=effective_reverse)
-
-        logger.debug(f"Sorted {len(sorted_programs)} programs. Top 3 (if available): {[p.id for p in sorted_programs[:3]]}")
-        return sorted_programs[:limit]
+        scopes = [_ALL_TASKS] if task_id is None else [task_id, None]
+        entries = []
+        for scope in scopes:
+            entries.extend(self._top_entries(scope, objective, sort_order, limit))
+        entries.sort()
+        best = [self._materialize(self._programs[program_id]) for _, program_id in entries[:limit]]
+        logger.debug(f"Top 3 (if available): {[p.id for p in best[:3]]}")
+        return best
 
     async def get_programs_by_generation(self, generation: int) -> List[Program]:
         logger.debug(f"Retrieving programs for generation: {generation}")
-        generation_programs = [p for p in self._programs.values() if p.generation == generation]
+        generation_programs = [self._materialize(p) for p in self._in_save_order(self._secondary["generation"].ids(generation))]
         logger.info(f"Found {len(generation_programs)} programs for generation {generation}.")
         return generation_programs
 
+    def _in_save_order(self, program_ids) -> List[Program]:
+        return [self._programs[program_id] for program_id in sorted(program_ids, key=self._sequence.__getitem__)]
+
+    def _candidate_ids(self, query: ProgramQuery) -> Optional[Set[str]]:
+        """Ids satisfying the indexed filters of `query`, intersected smallest first; None when none apply."""
+        candidates = []
+        for attribute in ("generation", "island_id", "status", "parent_id"):
+            value = getattr(query, attribute)
+            if value is not None:
+                candidates.append(self._secondary[attribute].ids(value))
+        if query.min_generation is not None or query.max_generation is not None:
+            candidates.append(self._secondary["generation"].ids_between(query.min_generation, query.max_generation))
+        if query.task_id is not None and not candidates:
+            # Only when nothing narrower applies: a task usually holds most of the store.
+            untagged = self._secondary["task_id"].ids(None)
+            task_ids = self._secondary["task_id"].ids(query.task_id)
+            candidates.append(task_ids | untagged if untagged else task_ids)
+        if not candidates:
+            return None
+        candidates.sort(key=len)
+        return candidates[0].intersection(*candidates[1:])
+
+    async def query_programs(self, query: ProgramQuery) -> List[Union[Program, Dict[str, Any]]]:
+        """
+        Evaluates `query` on the secondary indexes (task, generation, island, status, parent)
+        and verifies the remaining filters on the candidates only. A ranking by correctness or
+        runtime with a limit and no other filter than the task is served from the top-k index.
+        """
+        only_task_filter = query == ProgramQuery(task_id=query.task_id, order_by=query.order_by, descending=query.descending,
+                                                 limit=query.limit, fields=query.fields)
+        if only_task_filter and query.order_by in ("correctness", "runtime_ms") and query.limit is not None:
+            selected = await self.get_best_programs(query.task_id, query.limit, query.order_by, "desc" if query.descending else "asc")
+            return [query.project(p) for p in selected]
+
+        candidate_ids = self._candidate_ids(query)
+        if candidate_ids is None:
+            programs = list(self._programs.values())
+        else:
+            programs = self._in_save_order(candidate_ids)
+        selected = [p for p in programs if query.matches(p)]
+        if query.order_by is not None:
+            if query.limit is not None:
+                pick = heapq.nlargest if query.descending else heapq.nsmallest
+                selected = pick(query.limit, selected, key=query.sort_value)
+            else:
+                selected.sort(key=query.sort_value, reverse=query.descending)
+        elif query.limit is not None:
+            selected = selected[:query.limit]
+        if query.fields is not None and "code" not in query.fields:
+            return [query.project(p) for p in selected]
+        return [query.project(self._materialize(p)) for p in selected]
+
     async def get_programs_for_next_generation(self, task_id: str, generation_size: int) -> List[Program]:
         logger.info(f"Attempting to retrieve {generation_size} programs for next generation for task {task_id}.")
         all_progs = list(self._programs.values())
@@ -104,21 +296,172 @@ class InMemoryDatabaseAgent(DatabaseAgentInterface, BaseAgent):
 
         if len(all_progs) <= generation_size:
             logger.debug(f"Returning all {len(all_progs)} programs as it's less than or equal to generation_size {generation_size}.")
-            return all_progs
+            return [self._materialize(p) for p in all_progs]
         
-        import random
-        selected_programs = random.sample(all_progs, generation_size)
+        selected_programs = [self._materialize(p) for p in self.rng.sample(all_progs, generation_size)]
         logger.info(f"Selected {len(selected_programs)} random programs for next generation.")
         return selected_programs
 
+    async def get_ancestors(self, program_ids: List[str], max_depth: Optional[int] = None) -> Dict[str, List[Program]]:
+        return {program_id: [self._materialize(self._programs[ancestor_id]) for ancestor_id in self._lineage.ancestors(program_id, max_depth)]
+                for program_id in program_ids}
+
+    async def get_descendants(self, program_ids: List[str], max_depth: Optional[int] = None) -> Dict[str, List[Program]]:
+        """Descendants of each program from the lineage index, breadth first and in save order within a generation."""
+        return {program_id: [self._materialize(self._programs[descendant_id])
+                             for descendant_id in self._lineage.descendants(program_id, max_depth, self._sequence.__getitem__)]
+                for program_id in program_ids}
+
+    async def count_descendants(self, program_ids: List[str]) -> Dict[str, int]:
+        return {program_id: len(self._lineage.descendants(program_id)) for program_id in program_ids}
+
+    async def get_lineage_graph(self, task_id: Optional[str] = None) -> Dict[str, Any]:
+        """The lineage DAG with the depth and root maintained by the lineage index."""
+        nodes = await self.query_programs(ProgramQuery(task_id=task_id, fields=list(LINEAGE_NODE_FIELDS)))
+        ids = {node["id"] for node in nodes}
+        for node in nodes:
+            node["depth"], node["root_id"] = self._lineage.depth(node["id"]), self._lineage.root(node["id"])
+        edges = [[node["parent_id"], node["id"]] for node in nodes if node["parent_id"] in ids]
+        return {"task_id": task_id, "nodes": nodes, "edges": edges}
+
+    # Compaction
+
+    def needs_compaction(self) -> bool:
+        """True once the store holds more than max_programs, and has grown a batch since the last pass."""
+        policy = self.compaction
+        return policy is not None and len(self._programs) > max(policy.max_programs, self._compaction_floor + policy.batch_size)
+
+    def _retained_ids(self, protected: Iterable[str]) -> Set[str]:
+        policy = self.compaction
+        retained = {program_id for program_id in protected if program_id in self._programs}
+        status = self._secondary["status"]
+        retained |= status.ids("unevaluated") | status.ids("evaluating")
+        if policy.keep_top_k > 0:
+            for task_id in self._secondary["task_id"].values():
+                retained.update(program_id for _, program_id in self._top_entries(task_id, "correctness", "desc", policy.keep_top_k))
+        generations = [generation for generation in self._secondary["generation"].values() if generation is not None]
+        if policy.keep_recent_generations > 0 and generations:
+            retained |= self._secondary["generation"].ids_between(max(generations) - policy.keep_recent_generations + 1, None)
+        self._retain_ancestors(retained, list(retained))
+        return retained
+
+    def _retain_ancestors(self, retained: Set[str], program_ids: Iterable[str]) -> None:
+        """Adds every saved ancestor of `program_ids` to `retained`, walking up until reaching one already kept."""
+        for program_id in program_ids:
+            parent_id = self._lineage.parent(program_id)
+            while parent_id is not None and parent_id in self._programs and parent_id not in retained:
+                retained.add(parent_id)
+                parent_id = self._lineage.parent(parent_id)
+
+    def _fold_in_changes(self, retained: Set[str], protected: Optional[Callable[[], Iterable[str]]]) -> None:
+        """
+        Keeps what changed since the running pass last looked: programs saved in the meantime
+        (re-saved ones may now rank or be pending again) and ids the caller newly protects,
+        with their ancestors.
+        """
+        changed = self._saved_during_compaction
+        self._saved_during_compaction = set()
+        if protected is not None:
+            changed.update(program_id for program_id in protected() if program_id not in retained)
+        changed = {program_id for program_id in changed if program_id in self._programs}
+        retained |= changed
+        self._retain_ancestors(retained, changed)
+
+    def _remove(self, program_id: str) -> int:
+        """Drops a program from memory and every index; returns the code store bytes that freed."""
+        self._programs.pop(program_id)
+        del self._sequence[program_id]
+        for attribute, value in zip(_INDEXED_ATTRIBUTES, self._indexed_values.pop(program_id)):
+            self._secondary[attribute].remove(program_id, value)
+        for index in self._best_indexes.values():
+            index.remove(program_id)
+        self._lineage.remove(program_id)
+        if self.near_duplicates is not None:
+            self.near_duplicates.discard(program_id)
+        code_hash = self._code_hashes.pop(program_id, None)
+        if code_hash is None:
+            return 0
+        stored_bytes = self.code_store.stored_bytes
+        self.code_store.release(code_hash)
+        return stored_bytes - self.code_store.stored_bytes
+
+    async def compact(self, protected: Optional[Callable[[], Iterable[str]]] = None) -> Dict[str, Any]:
+        """
+        One compaction pass over the programs stored when it starts, `batch_size` at a time, with the
+        event loop running between batches. `protected` returns the ids the caller still refers to.
+        The retention rules are applied once, when the pass starts; before every batch, programs
+        saved since and ids newly returned by `protected` are added to what the pass keeps.
+        """
+        policy = self.compaction
+        if policy is None:
+            raise ValueError("InMemoryDatabaseAgent has no compaction policy.")
+        evicted = spilled = reclaimed = 0
+        program_ids = list(self._programs)
+        retained = self._retained_ids(protected() if protected is not None else ())
+        self._saved_during_compaction = set()
+        try:
+            for start in range(0, len(program_ids), policy.batch_size):
+                if start:
+                    self._fold_in_changes(retained, protected)
+                batch = [self._programs[program_id] for program_id in program_ids[start:start + policy.batch_size]
+                         if program_id in self._programs and program_id not in retained]
+                if batch and policy.mode == "spill":
+                    await asyncio.to_thread(self.cold_store.write, [self._materialize(program) for program in batch])
+                    # Saves made during the write win: such programs stay in memory.
+                    self._fold_in_changes(retained, protected)
+                    kept = [program for program in batch if self._programs.get(program.id) is not program or program.id in retained]
+                    for program in kept:
+                        self.cold_store.discard(program.id)
+                    kept_ids = {program.id for program in kept}
+                    batch = [program for program in batch if program.id not in kept_ids]
+                    spilled += len(batch)
+                for program in batch:
+                    reclaimed += estimate_program_bytes(program) + self._remove(program.id)
+                evicted += len(batch)
+                if batch:
+                    evicted_ids = [program.id for program in batch]
+                    for listener in self.eviction_listeners:
+                        listener(evicted_ids)
+                await asyncio.sleep(0)
+        finally:
+            self._saved_during_compaction = None
+        stats = self.compaction_stats
+        stats.passes += 1
+        stats.programs_evicted += evicted
+        stats.programs_spilled += spilled
+        stats.bytes_reclaimed += reclaimed
+        stats.last_pass_evicted = evicted
+        self._compaction_floor = len(program_ids) - evicted  # What the rules kept; later saves count towards the next pass
+        logger.info(f"Compaction pass evicted {evicted} programs ({spilled} spilled to the cold tier), "
+                    f"about {reclaimed / 1e6:.1f} MB reclaimed; {len(self._programs)} programs left in memory.")
+        return self.compaction_report()
+
+    def compaction_report(self) -> Dict[str, Any]:
+        return self.compaction_stats.as_dict(len(self._programs), self.cold_store)
+
     async def count_programs(self) -> int:
-        count = len(self._programs)
+        count = len(self._programs) + (len(self.cold_store) if self.cold_store is not None else 0)
         logger.debug(f"Total programs in database: {count}")
         return count
 
     async def clear_database(self) -> None:
         logger.info("Clearing all programs from in-memory database.")
         self._programs.clear()
+        self._sequence.clear()
+        self._next_sequence = 0
+        self._best_indexes.clear()
+        for index in self._secondary.values():
+            index.clear()
+        self._indexed_values.clear()
+        self._lineage = LineageIndex()
+        self._code_hashes.clear()
+        if self.code_store is not None:
+            self.code_store.clear()
+        if self.near_duplicates is not None:
+            self.near_duplicates.clear()
+        if self.cold_store is not None:
+            self.cold_store.clear()
+        self._compaction_floor = 0
         logger.info("In-memory database cleared.")
 
     async def execute(self, *args, **kwargs) -> Any:
@@ -0,0 +1,118 @@
+"""
+Cross-run archive of good programs, used to warm-start new runs.
+
+At the end of a run the best programs are appended to ``archive.jsonl`` together with the
+task they solved. A later run looks candidates up by task id first, then by similarity of
+the task description among tasks that evolve a function with the same name and arity.
+"""
+import difflib
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.interfaces import Program, TaskDefinition
+from evaluator_agent.cache import code_hash
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILE = "archive.jsonl"
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def task_signature(task: TaskDefinition) -> Tuple[Optional[str], Optional[int]]:
+    """(function name, number of arguments per example input); the arity is None when unknown."""
+    arity = None
+    for example in task.input_output_examples or []:
+        if isinstance(example.get("input"), list):
+            arity = len(example["input"])
+            break
+    return task.function_name_to_evolve, arity
+
+
+def description_similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, _WORD_PATTERN.findall(a.lower()), _WORD_PATTERN.findall(b.lower())).ratio()
+
+
+class ProgramArchive:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, ARCHIVE_FILE)
+        self._entries: Optional[List[Dict[str, Any]]] = None
+
+    def entries(self) -> List[Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = []
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    for line in f:
+                        try:
+                            self._entries.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            continue
+        return self._entries
+
+    def lookup(self, task: TaskDefinition, limit: int, min_similarity: float) -> List[Dict[str, Any]]:
+        """
+        Archived programs for `task`, best candidates first: exact task id matches, then
+        programs of similar tasks (same signature, description similarity >= min_similarity),
+        each ordered by archived fitness. Duplicate code is returned once.
+        """
+        name, arity = task_signature(task)
+        ranked = []
+        for entry in self.entries():
+            if entry["task_id"] == task.id:
+                similarity = 2.0  # Ranks above any description match
+            else:
+                if entry["function_name"] != name or (arity is not None and entry["arity"] not in (None, arity)):
+                    continue
+                similarity = description_similarity(entry["description"], task.description)
+                if similarity < min_similarity:
+                    continue
+            fitness = (entry["fitness_scores"].get("correctness", 0.0), -entry["fitness_scores"].get("runtime_ms", float('inf')))
+            ranked.append(((similarity, fitness), entry))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+
+        selected, seen = [], set()
+        for _, entry in ranked:
+            if entry["code_hash"] in seen:
+                continue
+            seen.add(entry["code_hash"])
+            selected.append(entry)
+            if len(selected) == limit:
+                break
+        return selected
+
+    def add(self, task: TaskDefinition, programs: List[Program], tests_fingerprint: str) -> int:
+        """Appends programs not yet archived for this task; returns how many were added."""
+        name, arity = task_signature(task)
+        known = {(entry["task_id"], entry["code_hash"]) for entry in self.entries()}
+        new_entries = []
+        for program in programs:
+            entry = {
+                "task_id": task.id,
+                "description": task.description,
+                "function_name": name,
+                "arity": arity,
+                "code": program.code,
+                "code_hash": code_hash(program.code),
+                "tests_fingerprint": tests_fingerprint,
+                "fitness_scores": dict(program.fitness_scores),
+                "program_id": program.id,
+                "archived_at": time.time(),
+            }
+            if (task.id, entry["code_hash"]) in known:
+                continue
+            known.add((task.id, entry["code_hash"]))
+            new_entries.append(entry)
+        if new_entries:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                for entry in new_entries:
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.entries().extend(new_entries)
+            logger.info(f"Archived {len(new_entries)} programs of task {task.id} to {self.path}")
+        return len(new_entries)
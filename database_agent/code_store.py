@@ -0,0 +1,147 @@
+"""
+Content-addressed code storage for the in-memory program database.
+
+Code is stored once per distinct content (keyed by SHA-256). In "delta" mode a new blob is
+stored as a line-level delta against its parent's code when that is smaller, and as a full
+snapshot once the chain of deltas behind it would exceed `snapshot_interval`, so rebuilding
+any program touches a bounded number of blobs. Every payload is zlib-compressed. Blobs are
+reference-counted (by programs and by deltas built on them) and dropped when unused. Rebuilt
+code is kept in an LRU cache so hot programs are materialized once.
+"""
+import difflib
+import hashlib
+import json
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+CODE_STORE_MODES = ("dedup", "delta")
+
+
+@dataclass
+class _Blob:
+    payload: bytes  # zlib-compressed code, or zlib-compressed JSON delta ops
+    base: Optional[str] = None  # Hash of the blob a delta applies to
+    depth: int = 0  # Deltas between this blob and the nearest full snapshot
+    references: int = 0
+    size: int = 0  # Length of the encoded code in bytes
+
+
+def _delta_ops(base_lines: List[str], lines: List[str]) -> List[Union[List[int], str]]:
+    """[start, end] copies base lines, a string inserts new text."""
+    ops: List[Union[List[int], str]] = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(lines[j1:j2]))
+    return ops
+
+
+class CodeStore:
+    def __init__(self, mode: str = "delta", snapshot_interval: int = 8, cache_size: int = 256):
+        if mode not in CODE_STORE_MODES:
+            raise ValueError(f"Unknown code store mode: {mode}")
+        self.mode = mode
+        self.snapshot_interval = max(0, snapshot_interval)
+        self.cache_size = max(0, cache_size)
+        self._blobs: Dict[str, _Blob] = {}
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self.logical_bytes = 0  # What the referenced code would take stored in full
+        self.stored_bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __contains__(self, code_hash: str) -> bool:
+        return code_hash in self._blobs
+
+    def put(self, code: str, base_hash: Optional[str] = None) -> str:
+        """Stores `code` (a delta against `base_hash` when given and smaller) and returns its hash."""
+        encoded = code.encode("utf-8")
+        code_hash = hashlib.sha256(encoded).hexdigest()
+        blob = self._blobs.get(code_hash)
+        if blob is None:
+            blob = self._new_blob(code, len(encoded), base_hash)
+            self._blobs[code_hash] = blob
+            self.stored_bytes += len(blob.payload)
+            self._remember(code_hash, code)
+        blob.references += 1
+        self.logical_bytes += blob.size
+        return code_hash
+
+    def _new_blob(self, code: str, size: int, base_hash: Optional[str]) -> _Blob:
+        full = _Blob(zlib.compress(code.encode("utf-8")), size=size)
+        base = self._blobs.get(base_hash) if base_hash is not None else None
+        if self.mode != "delta" or base is None or base.depth >= self.snapshot_interval:
+            return full
+        ops = _delta_ops(self.get(base_hash).splitlines(keepends=True), code.splitlines(keepends=True))
+        payload = zlib.compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"))
+        if len(payload) >= len(full.payload):
+            return full
+        base.references += 1
+        return _Blob(payload, base=base_hash, depth=base.depth + 1, size=size)
+
+    def get(self, code_hash: str) -> str:
+        code = self._cache.get(code_hash)
+        if code is not None:
+            self._cache.move_to_end(code_hash)
+            self.cache_hits += 1
+            return code
+        self.cache_misses += 1
+        blob = self._blobs[code_hash]
+        if blob.base is None:
+            code = zlib.decompress(blob.payload).decode("utf-8")
+        else:
+            base_lines = self.get(blob.base).splitlines(keepends=True)
+            parts = []
+            for op in json.loads(zlib.decompress(blob.payload)):
+                parts.append("".join(base_lines[op[0]:op[1]]) if isinstance(op, list) else op)
+            code = "".join(parts)
+        self._remember(code_hash, code)
+        return code
+
+    def _remember(self, code_hash: str, code: str) -> None:
+        if self.cache_size == 0:
+            return
+        self._cache[code_hash] = code
+        self._cache.move_to_end(code_hash)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def release(self, code_hash: str) -> None:
+        """Drops one program's reference; unreferenced blobs are deleted along with their delta bases' references."""
+        blob = self._blobs[code_hash]
+        self.logical_bytes -= blob.size
+        self._unreference(code_hash)
+
+    def _unreference(self, code_hash: str) -> None:
+        while code_hash is not None:
+            blob = self._blobs[code_hash]
+            blob.references -= 1
+            if blob.references > 0:
+                return
+            del self._blobs[code_hash]
+            self._cache.pop(code_hash, None)
+            self.stored_bytes -= len(blob.payload)
+            code_hash = blob.base
+
+    def clear(self) -> None:
+        self._blobs.clear()
+        self._cache.clear()
+        self.logical_bytes = 0
+        self.stored_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        deltas = sum(1 for blob in self._blobs.values() if blob.base is not None)
+        return {
+            "mode": self.mode,
+            "blobs": len(self._blobs),
+            "delta_blobs": deltas,
+            "logical_bytes": self.logical_bytes,
+            "stored_bytes": self.stored_bytes,
+            "bytes_saved": self.logical_bytes - self.stored_bytes,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
@@ -0,0 +1,496 @@
+"""
+Compact in-memory program database for large archives.
+
+Saved programs are not kept as objects; each one is a row:
+- Generation, island, creation time and the main fitness values live in typed `array` columns
+  indexed by row. Ids, task ids, parents and statuses are interned once and stored as codes.
+- Code is kept in a list by row. Errors, LLM call records, any other fitness keys and the
+  near-duplicate flag live in a `__slots__` record, for the rows that have any.
+
+Reads rebuild `Program` objects from their rows, so the DatabaseAgentInterface API is
+unchanged. As with the code store, they are copies: changes to a program must be saved again.
+As in the in-memory database, secondary indexes (task, generation, island, status) and the best
+rows of each task by an objective (cached on the first ranking) are kept current on every save.
+Index buckets are sorted `array("i")` rows, 4 bytes a program, so the store stays compact.
+Queries start from the smallest applicable bucket; the other filters run over those rows, or
+over whole columns with C-level builtins (map, compress) when no index applies.
+"""
+import heapq
+import logging
+from bisect import bisect_left, insort
+import operator
+import random
+from array import array
+from functools import partial
+from itertools import chain, compress
+from typing import Any, AsyncIterator, Dict, Iterable, List, Literal, Optional, Tuple, Union
+
+from core.interfaces import BaseAgent, DatabaseAgentInterface, Program, ProgramQuery
+from database_agent.code_store import CodeStore
+from database_agent.indexes import LineageIndex
+from database_agent.near_duplicates import NearDuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+FITNESS_COLUMNS = ("correctness", "runtime_ms", "passed_tests", "total_tests")
+# Stored for a missing score: what the other databases rank and filter a missing score as
+_FITNESS_DEFAULTS = (-1.0, float('inf'), 0.0, 0.0)
+_NO_STRING = -1  # Code of a None task id, parent or status
+_NO_ISLAND = -2 ** 31
+_ALL_ROWS = object()  # Best-rows scope of get_best_programs(task_id=None)
+_INDEXED_COLUMNS = ("task_ids", "generations", "island_ids", "statuses")  # task_ids first
+_MIN_BEST_ROWS = 32  # Rows cached per (scope, objective, order), so small limits rarely rebuild
+_NO_ROWS = array("i")
+
+
+class _RowIndex:
+    """Rows by value of one column. Each bucket is a sorted array("i") instead of a set of ints."""
+
+    def __init__(self):
+        self._rows: Dict[int, array] = {}
+
+    def add(self, row: int, value: int) -> None:
+        rows = self._rows.get(value)
+        if rows is None:
+            self._rows[value] = array("i", (row,))
+        elif rows[-1] < row:
+            rows.append(row)  # New rows arrive in row order
+        else:
+            rows.insert(bisect_left(rows, row), row)
+
+    def remove(self, row: int, value: int) -> None:
+        rows = self._rows[value]
+        del rows[bisect_left(rows, row)]
+        if not rows:
+            del self._rows[value]
+
+    def rows(self, value: int) -> array:
+        return self._rows.get(value, _NO_ROWS)
+
+    def rows_between(self, low: Optional[int], high: Optional[int]) -> List[int]:
+        buckets = [rows for value, rows in self._rows.items()
+                   if (low is None or value >= low) and (high is None or value <= high)]
+        return sorted(chain.from_iterable(buckets))
+
+
+class _BestRows:
+    """
+    The best (sort key, row) entries of a scope, sorted, at most `capacity` of them. Every row
+    of the scope that is not an entry sorts after the last one; with fewer entries than
+    `capacity`, the entries are the whole scope.
+    """
+    __slots__ = ("capacity", "entries")
+
+    def __init__(self, capacity: int, entries: List[Tuple[Tuple[float, int], int]]):
+        self.capacity = capacity
+        self.entries = entries
+
+
+class _ProgramRecord:
+    __slots__ = ("errors", "llm_calls", "other_fitness", "near_duplicate_of")
+
+    def __init__(self, errors: list, llm_calls: list, other_fitness: dict, near_duplicate_of: Optional[str] = None):
+        self.errors = errors
+        self.llm_calls = llm_calls
+        self.other_fitness = other_fitness
+        self.near_duplicate_of = near_duplicate_of
+
+
+class ProgramColumns:
+    """Column storage of programs, one row per program id in first-save order."""
+
+    def __init__(self):
+        # One table for every string: a program id, interned once, is also its children's parent id.
+        self._strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+        self._rows_by_code = array("i")  # Row of the program whose id has that code, or -1
+        self.ids = array("i")
+        self.task_ids = array("i")
+        self.parent_ids = array("i")
+        self.statuses = array("i")
+        self.generations = array("i")
+        self.island_ids = array("i")
+        self.created_at = array("d")
+        self.fitness = {key: array("d") for key in FITNESS_COLUMNS}
+        self.fitness_present = bytearray()  # Bit i set when the program has a FITNESS_COLUMNS[i] score
+        self.codes: List[str] = []  # The code itself, or its hash when a code store is used
+        self.records: List[Optional[_ProgramRecord]] = []
+        self.indexes = {name: _RowIndex() for name in _INDEXED_COLUMNS}
+        self._best_rows: Dict[Tuple[Any, str, bool], _BestRows] = {}  # By (task code or _ALL_ROWS, objective, descending)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def row(self, program_id: Optional[str]) -> Optional[int]:
+        code = self._string_codes.get(program_id)
+        if code is None or self._rows_by_code[code] < 0:
+            return None
+        return self._rows_by_code[code]
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NO_STRING
+        code = self._string_codes.get(value)
+        if code is None:
+            code = len(self._strings)
+            self._strings.append(value)
+            self._string_codes[value] = code
+            self._rows_by_code.append(-1)
+        return code
+
+    def string_code(self, value: Optional[str]) -> Optional[int]:
+        """Code of `value`, or None when no program has ever used it."""
+        return _NO_STRING if value is None else self._string_codes.get(value)
+
+    def string(self, code: int) -> Optional[str]:
+        return None if code == _NO_STRING else self._strings[code]
+
+    def put(self, program: Program, code: str) -> int:
+        """Stores `program` (with `code` in place of its own) in its row, appending one for a new id."""
+        present = 0
+        fitness_values = []
+        other_fitness = {}
+        for key, value in program.fitness_scores.items():
+            if key in self.fitness and isinstance(value, (int, float)) and not isinstance(value, bool):
+                present |= 1 << FITNESS_COLUMNS.index(key)
+            else:
+                other_fitness[key] = value
+        for bit, (key, default) in enumerate(zip(FITNESS_COLUMNS, _FITNESS_DEFAULTS)):
+            fitness_values.append(float(program.fitness_scores[key]) if present >> bit & 1 else default)
+        values = (
+            self.intern(program.task_id), self.intern(program.parent_id), self.intern(program.status),
+            program.generation, _NO_ISLAND if program.island_id is None else program.island_id, program.created_at,
+        )
+        record = None
+        if program.errors or program.llm_calls or other_fitness or program.near_duplicate_of:
+            record = _ProgramRecord(list(program.errors), list(program.llm_calls), other_fitness, program.near_duplicate_of)
+
+        row = self.row(program.id)
+        old_values = None if row is None else tuple(getattr(self, name)[row] for name in _INDEXED_COLUMNS)
+        if row is None:
+            row = len(self.codes)
+            id_code = self.intern(program.id)
+            self._rows_by_code[id_code] = row
+            self.ids.append(id_code)
+            for column, value in zip(self._scalar_columns(), values):
+                column.append(value)
+            for key, value in zip(FITNESS_COLUMNS, fitness_values):
+                self.fitness[key].append(value)
+            self.fitness_present.append(present)
+            self.codes.append(code)
+            self.records.append(record)
+        else:
+            for column, value in zip(self._scalar_columns(), values):
+                column[row] = value
+            for key, value in zip(FITNESS_COLUMNS, fitness_values):
+                self.fitness[key][row] = value
+            self.fitness_present[row] = present
+            self.codes[row] = code
+            self.records[row] = record
+        self._update_indexes(row, old_values)
+        return row
+
+    def _update_indexes(self, row: int, old_values: Optional[Tuple]) -> None:
+        for i, name in enumerate(_INDEXED_COLUMNS):
+            value = getattr(self, name)[row]
+            if old_values is None:
+                self.indexes[name].add(row, value)
+            elif old_values[i] != value:
+                self.indexes[name].remove(row, old_values[i])
+                self.indexes[name].add(row, value)
+        task_code = self.task_ids[row]
+        old_task_code = None if old_values is None else old_values[0]
+        for best_key, best in list(self._best_rows.items()):
+            scope, objective, descending = best_key
+            was_in_scope = old_values is not None and (scope is _ALL_ROWS or scope == old_task_code)
+            in_scope = scope is _ALL_ROWS or scope == task_code
+            if not (was_in_scope or in_scope):
+                continue
+            entries = best.entries
+            full = len(entries) >= best.capacity
+            last_key = entries[-1][0] if entries else None
+            position = next((i for i, (_, entry_row) in enumerate(entries) if entry_row == row), None) if was_in_scope else None
+            if position is not None:
+                del entries[position]
+            if in_scope:
+                key = self._sort_key(row, objective, descending)
+                if not full or key <= last_key:
+                    insort(entries, (key, row))
+                    if len(entries) > best.capacity:
+                        entries.pop()
+                    continue
+            if position is not None and full:
+                # A cached row got worse or left the scope: rows past the cache may now belong in it.
+                del self._best_rows[best_key]
+
+    def _sort_key(self, row: int, objective: str, descending: bool) -> Tuple[float, int]:
+        value = self.fitness[objective][row]
+        return (-value if descending else value, row)
+
+    def top(self, scope: Any, objective: str, descending: bool, limit: int) -> List[Tuple[Tuple[float, int], int]]:
+        """
+        The `limit` best (sort key, row) entries of one scope (a task code, or _ALL_ROWS) by a
+        FITNESS_COLUMNS objective. Ranked over the scope on first use, then kept current by put().
+        """
+        best_key = (scope, objective, descending)
+        best = self._best_rows.get(best_key)
+        if best is None or best.capacity < limit:
+            capacity = max(2 * limit, _MIN_BEST_ROWS)
+            rows = range(len(self)) if scope is _ALL_ROWS else self.indexes["task_ids"].rows(scope)
+            ranked = self.rank(rows, self.fitness[objective], descending, capacity)
+            best = _BestRows(capacity, [(self._sort_key(row, objective, descending), row) for row in ranked])
+            self._best_rows[best_key] = best
+        return best.entries[:limit]
+
+    def best(self, task_id: Optional[str], objective: str, descending: bool, limit: int) -> List[int]:
+        """Rows of the `limit` best programs of `task_id` plus those saved without a task id (every row when None)."""
+        if task_id is None:
+            scopes = [_ALL_ROWS]
+        else:
+            scopes = [code for code in (self.string_code(task_id), _NO_STRING) if code is not None]
+        entries = sorted(entry for scope in scopes for entry in self.top(scope, objective, descending, limit))
+        return [row for _, row in entries[:limit]]
+
+    def _candidate_rows(self, query: ProgramQuery) -> Optional[List[int]]:
+        """
+        The smallest index bucket covering a filter of `query`, in row order; None when no index
+        applies. A task usually holds most of the store, so the task index is not used here.
+        """
+        candidates = []
+        for name, value in (("generations", query.generation), ("island_ids", query.island_id)):
+            if value is not None:
+                candidates.append(self.indexes[name].rows(value))
+        if query.status is not None:
+            code = self.string_code(query.status)
+            candidates.append(_NO_ROWS if code is None else self.indexes["statuses"].rows(code))
+        if query.generation is None and (query.min_generation is not None or query.max_generation is not None):
+            candidates.append(self.indexes["generations"].rows_between(query.min_generation, query.max_generation))
+        return list(min(candidates, key=len)) if candidates else None
+
+    def _scalar_columns(self):
+        return (self.task_ids, self.parent_ids, self.statuses, self.generations, self.island_ids, self.created_at)
+
+    def program(self, row: int, code: str) -> Program:
+        record = self.records[row]
+        present = self.fitness_present[row]
+        fitness_scores = {key: self.fitness[key][row] for bit, key in enumerate(FITNESS_COLUMNS) if present >> bit & 1}
+        if record is not None:
+            fitness_scores.update(record.other_fitness)
+        island_id = self.island_ids[row]
+        return Program(
+            id=self._strings[self.ids[row]],
+            code=code,
+            fitness_scores=fitness_scores,
+            generation=self.generations[row],
+            parent_id=self.string(self.parent_ids[row]),
+            island_id=None if island_id == _NO_ISLAND else island_id,
+            errors=list(record.errors) if record is not None else [],
+            status=self.string(self.statuses[row]),
+            created_at=self.created_at[row],
+            llm_calls=list(record.llm_calls) if record is not None else [],
+            task_id=self.string(self.task_ids[row]),
+            near_duplicate_of=record.near_duplicate_of if record is not None else None,
+        )
+
+    def select(self, query: ProgramQuery) -> List[int]:
+        """
+        Rows matching the filters of `query`, in row order: the index candidates, checked against
+        each filter, or one pass over a column per filter when no index applies.
+        """
+        rows = self._candidate_rows(query)  # None: every row
+
+        def keep(column, predicate) -> None:
+            nonlocal rows
+            if rows is None:
+                rows = list(compress(range(len(self)), map(predicate, column)))
+            else:
+                rows = list(compress(rows, map(predicate, map(column.__getitem__, rows))))
+
+        for column, value in ((self.parent_ids, query.parent_id), (self.statuses, query.status)):
+            if value is not None:
+                code = self.string_code(value)
+                if code is None:
+                    return []
+                keep(column, partial(operator.eq, code))
+        # partial(operator.le, v)(x) is v <= x, i.e. x >= v
+        for column, compare, value in (
+            (self.generations, operator.eq, query.generation),
+            (self.island_ids, operator.eq, query.island_id),
+            (self.generations, operator.le, query.min_generation),
+            (self.generations, operator.ge, query.max_generation),
+            (self.fitness["correctness"], operator.le, query.min_correctness),
+            (self.fitness["runtime_ms"], operator.ge, query.max_runtime_ms),
+        ):
+            if value is not None:
+                keep(column, partial(compare, value))
+        if query.task_id is not None:
+            # Programs saved without a task id belong to every task, as in the other databases.
+            keep(self.task_ids, {_NO_STRING, self.string_code(query.task_id)}.__contains__)
+        return list(range(len(self))) if rows is None else rows
+
+    def sort_column(self, order_by: str):
+        if order_by in self.fitness:
+            return self.fitness[order_by]
+        if order_by == "generation":
+            return self.generations
+        if order_by == "created_at":
+            return self.created_at
+        raise ValueError(f"Unsupported order_by: {order_by}")
+
+    @staticmethod
+    def rank(rows: Iterable[int], column, descending: bool, limit: Optional[int]) -> List[int]:
+        """Rows ordered by `column`; ties keep row order, like a stable sort of the programs."""
+        key = column.__getitem__
+        if limit is None:
+            return sorted(rows, key=key, reverse=descending)
+        return (heapq.nlargest if descending else heapq.nsmallest)(limit, rows, key=key)
+
+
+class ColumnarDatabaseAgent(DatabaseAgentInterface, BaseAgent):
+    """An in-memory program database in columns, for archives of millions of programs."""
+
+    def __init__(self, code_store: Optional[CodeStore] = None, near_duplicates: Optional[NearDuplicateIndex] = None,
+                 config: Optional[Dict[str, Any]] = None):
+        super().__init__(config)
+        self.columns = ProgramColumns()
+        self.code_store = code_store
+        self.near_duplicates = near_duplicates
+        self._lineage: Optional[LineageIndex] = None  # Built on the first lineage query, then kept current
+        self.rng = random.Random(self.get_setting("RANDOM_SEED"))
+        logger.info("ColumnarDatabaseAgent initialized.")
+
+    def _store(self, program: Program) -> None:
+        code = program.code
+        if self.near_duplicates is not None:
+            self.near_duplicates.add(program.id, code)
+        if self.code_store is not None:
+            row = self.columns.row(program.id)
+            previous_hash = self.columns.codes[row] if row is not None else None
+            parent_row = self.columns.row(program.parent_id)
+            base_hash = self.columns.codes[parent_row] if parent_row is not None else None
+            code = self.code_store.put(code, base_hash)
+            if previous_hash is not None:
+                self.code_store.release(previous_hash)
+        self.columns.put(program, code)
+        if self._lineage is not None:
+            self._lineage.add(program.id, program.parent_id)
+
+    def _lineage_index(self) -> LineageIndex:
+        if self._lineage is None:
+            columns = self.columns
+            self._lineage = LineageIndex((columns.string(columns.ids[row]), columns.string(columns.parent_ids[row]))
+                                         for row in range(len(columns)))
+        return self._lineage
+
+    def _program(self, row: int, with_code: bool = True) -> Program:
+        code = self.columns.codes[row]
+        if self.code_store is not None:
+            code = self.code_store.get(code) if with_code else ""
+        return self.columns.program(row, code)
+
+    def storage_stats(self) -> Optional[Dict[str, Any]]:
+        """Code store usage, including bytes saved against storing every program's code in full."""
+        return self.code_store.stats() if self.code_store is not None else None
+
+    async def save_program(self, program: Program) -> None:
+        logger.debug(f"Saving program: {program.id} (Generation: {program.generation}) to columnar database.")
+        self._store(program)
+
+    async def save_programs(self, programs: List[Program]) -> None:
+        if not programs:
+            return
+        overwritten = 0
+        for program in programs:
+            overwritten += self.columns.row(program.id) is not None
+            self._store(program)
+        logger.info(f"Saved a batch of {len(programs)} programs to columnar database ({overwritten} overwritten).")
+
+    async def get_program(self, program_id: str) -> Optional[Program]:
+        row = self.columns.row(program_id)
+        if row is None:
+            logger.warning(f"Program with ID: {program_id} not found in database.")
+            return None
+        return self._program(row)
+
+    async def get_all_programs(self) -> List[Program]:
+        return [self._program(row) for row in range(len(self.columns))]
+
+    async def iter_programs(self, batch_size: int = 1000) -> AsyncIterator[List[Program]]:
+        # Rows are only ever appended, so row numbers stay valid between batches (short of a clear).
+        rows = len(self.columns)
+        for start in range(0, rows, batch_size):
+            yield [self._program(row) for row in range(start, min(start + batch_size, rows, len(self.columns)))]
+
+    async def get_best_programs(
+        self,
+        task_id: str,
+        limit: int = 5,
+        objective: Literal["correctness", "runtime_ms"] = "correctness",
+        sort_order: Literal["asc", "desc"] = "desc",
+    ) -> List[Program]:
+        """
+        Top `limit` programs of `task_id` (plus programs saved without a task id; every program
+        when task_id is None), read from the cached best rows of the task.
+        """
+        if limit <= 0:
+            return []
+        if objective in self.columns.fitness:
+            rows = self.columns.best(task_id, objective, sort_order == "desc", limit)
+        else:
+            rows = self.columns.select(ProgramQuery(task_id=task_id))[:limit]
+        return [self._program(row) for row in rows]
+
+    async def get_programs_by_generation(self, generation: int) -> List[Program]:
+        return [self._program(row) for row in self.columns.select(ProgramQuery(generation=generation))]
+
+    async def query_programs(self, query: ProgramQuery) -> List[Union[Program, Dict[str, Any]]]:
+        only_task_filter = query == ProgramQuery(task_id=query.task_id, order_by=query.order_by, descending=query.descending,
+                                                 limit=query.limit, fields=query.fields)
+        if only_task_filter and query.order_by in self.columns.fitness and query.limit is not None:
+            with_code = query.fields is None or "code" in query.fields
+            return [query.project(self._program(row, with_code))
+                    for row in self.columns.best(query.task_id, query.order_by, query.descending, query.limit)]
+        rows = self.columns.select(query)
+        if query.order_by is not None:
+            rows = self.columns.rank(rows, self.columns.sort_column(query.order_by), query.descending, query.limit)
+        elif query.limit is not None:
+            rows = rows[:query.limit]
+        with_code = query.fields is None or "code" in query.fields
+        return [query.project(self._program(row, with_code)) for row in rows]
+
+    async def get_programs_for_next_generation(self, task_id: str, generation_size: int) -> List[Program]:
+        # Random programs of the whole database, as the in-memory database selects them.
+        rows = range(len(self.columns))
+        if len(rows) > generation_size:
+            rows = self.rng.sample(rows, generation_size)
+        return [self._program(row) for row in rows]
+
+    async def get_ancestors(self, program_ids: List[str], max_depth: Optional[int] = None) -> Dict[str, List[Program]]:
+        lineage = self._lineage_index()
+        return {program_id: [self._program(self.columns.row(ancestor_id)) for ancestor_id in lineage.ancestors(program_id, max_depth)]
+                for program_id in program_ids}
+
+    async def get_descendants(self, program_ids: List[str], max_depth: Optional[int] = None) -> Dict[str, List[Program]]:
+        lineage = self._lineage_index()
+        return {program_id: [self._program(self.columns.row(descendant_id))
+                             for descendant_id in lineage.descendants(program_id, max_depth, self.columns.row)]
+                for program_id in program_ids}
+
+    async def count_descendants(self, program_ids: List[str]) -> Dict[str, int]:
+        lineage = self._lineage_index()
+        return {program_id: len(lineage.descendants(program_id)) for program_id in program_ids}
+
+    async def count_programs(self) -> int:
+        return len(self.columns)
+
+    async def clear_database(self) -> None:
+        logger.info("Clearing all programs from columnar database.")
+        self.columns = ProgramColumns()
+        self._lineage = None
+        if self.code_store is not None:
+            self.code_store.clear()
+        if self.near_duplicates is not None:
+            self.near_duplicates.clear()
+
+    async def execute(self, *args, **kwargs) -> Any:
+        raise NotImplementedError("ColumnarDatabaseAgent does not have a generic execute. Use specific methods like save_program, get_program etc.")
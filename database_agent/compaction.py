@@ -0,0 +1,121 @@
+"""
+Compaction of the in-memory program database for long runs.
+
+A compaction pass keeps:
+- the programs the caller protects (island members, the population, offspring awaiting selection);
+- the `keep_top_k` best programs of each task by correctness;
+- programs of the last `keep_recent_generations` generations, and programs awaiting evaluation;
+- every saved ancestor of a program kept for any of the reasons above.
+
+Everything else is evicted. In "spill" mode evicted programs are first appended to a cold tier
+on disk (a JSONL file with an in-memory offset per id), where get_program and iter_programs
+still find them. In "evict" mode they are dropped. The pass works through the store in slices
+of `batch_size` programs and yields to the event loop in between, so it can run as a background
+task while the evolution goes on. What to keep is worked out once per pass; before each slice,
+programs saved since and newly protected ids (with their ancestors) are added to it.
+"""
+import json
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.interfaces import LLMCallRecord, Program
+
+COMPACTION_MODES = ("off", "evict", "spill")
+
+
+@dataclass
+class CompactionPolicy:
+    mode: str = "evict"  # evict | spill
+    max_programs: int = 10000  # A pass is due once the store holds more programs than this
+    keep_top_k: int = 100
+    keep_recent_generations: int = 1
+    batch_size: int = 500
+
+    def __post_init__(self):
+        if self.mode not in COMPACTION_MODES or self.mode == "off":
+            raise ValueError(f"Unknown compaction mode: {self.mode}")
+
+
+def estimate_program_bytes(program: Program) -> int:
+    """Approximate memory held by a stored program object: itself, its strings, scores and call records."""
+    size = sys.getsizeof(program) + sys.getsizeof(program.__dict__) + sys.getsizeof(program.code)
+    size += sys.getsizeof(program.errors) + sum(sys.getsizeof(error) for error in program.errors)
+    size += sys.getsizeof(program.fitness_scores) + sum(sys.getsizeof(value) for value in program.fitness_scores.values())
+    size += sys.getsizeof(program.llm_calls)
+    for record in program.llm_calls:
+        size += sys.getsizeof(record) + sys.getsizeof(record.__dict__)
+    return size
+
+
+class ColdStore:
+    """
+    Evicted programs, appended as JSON lines to one file. Only the offset of each program's
+    latest line stays in memory. Writes and reads are meant to run in worker threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # A cold tier belongs to one database instance: programs spilled by an earlier run are not reloaded.
+        open(path, "wb").close()
+        self._offsets: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.bytes_written = 0
+
+    def __contains__(self, program_id: str) -> bool:
+        return program_id in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def ids(self) -> List[str]:
+        return list(self._offsets)
+
+    def write(self, programs: List[Program]) -> None:
+        with self._lock, open(self.path, "ab") as f:
+            for program in programs:
+                offset = f.tell()
+                line = json.dumps(asdict(program), separators=(",", ":")).encode("utf-8") + b"\n"
+                f.write(line)
+                self._offsets[program.id] = offset
+                self.bytes_written += len(line)
+
+    def read(self, program_ids: Iterable[str]) -> List[Program]:
+        programs = []
+        with self._lock, open(self.path, "rb") as f:
+            for program_id in program_ids:
+                offset = self._offsets.get(program_id)
+                if offset is not None:
+                    f.seek(offset)
+                    fields = json.loads(f.readline())
+                    fields["llm_calls"] = [LLMCallRecord(**record) for record in fields.get("llm_calls", [])]
+                    programs.append(Program(**fields))
+        return programs
+
+    def discard(self, program_id: str) -> None:
+        """Forgets a program that is stored in memory again; its line stays in the file, unreferenced."""
+        self._offsets.pop(program_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            open(self.path, "wb").close()
+            self._offsets.clear()
+            self.bytes_written = 0
+
+
+@dataclass
+class CompactionStats:
+    passes: int = 0
+    programs_evicted: int = 0
+    programs_spilled: int = 0
+    bytes_reclaimed: int = 0  # Estimated, see estimate_program_bytes; includes code store bytes freed
+    last_pass_evicted: int = 0
+
+    def as_dict(self, stored: int, cold: Optional[ColdStore]) -> Dict[str, Any]:
+        return dict(asdict(self), programs_in_memory=stored, programs_in_cold_tier=len(cold) if cold is not None else 0,
+                    cold_tier_bytes=cold.bytes_written if cold is not None else 0)
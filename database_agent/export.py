@@ -0,0 +1,237 @@
+"""
+Streaming export of run history for offline analysis.
+
+Two tables are written, in batches of at most `batch_size` rows:
+
+- ``programs``: one row per program with its task, generation, island, status, timestamps,
+  code and errors. Lineage is the ``parent_id`` column. ``correctness`` and ``runtime_ms``
+  have their own columns, and the full fitness scores are kept as well.
+- ``llm_calls``: one row per LLM call (see core.interfaces.LLMCallRecord), keyed by ``call_id``,
+  with the generation and island it was made for and the child it produced (``program_id``;
+  comma-separated for a multi-variant call, null for a failed or rejected call). During a run
+  the rows come from the TelemetryCollector, which sees every call exactly once. An export of a
+  saved database only has the calls stored on programs: one row per distinct call, without the
+  failed and rejected ones.
+
+When pyarrow is installed, each batch becomes one Parquet file with a single row group
+(``<table>/part-00000.parquet``, ...). Nested values (fitness scores, errors) are stored there as
+JSON strings. Otherwise each batch is appended as its own gzip member to
+``<table>.jsonl.gz``, which gzip readers decompress as one stream. Both layouts only ever add
+files or bytes, so an export can grow during a run and be read while it does. Rows are
+snapshots: a program exported twice (for instance by a resumed run) appears twice, and
+readers should keep the last row per id.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+from dataclasses import asdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.interfaces import DatabaseAgentInterface, Program
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("auto", "parquet", "jsonl")
+SETTLED_STATUSES = ("evaluated", "failed_evaluation")
+
+PROGRAM_COLUMNS = {
+    "id": "string", "task_id": "string", "generation": "int64", "island_id": "int64", "parent_id": "string",
+    "status": "string", "created_at": "float64", "correctness": "float64", "runtime_ms": "float64",
+    "fitness_scores": "json", "errors": "json", "code": "string", "near_duplicate_of": "string",
+}
+LLM_CALL_COLUMNS = {
+    "call_id": "int64", "generation": "int64", "island_id": "int64", "program_id": "string", "model": "string", "prompt_tokens": "int64",
+    "completion_tokens": "int64", "latency_seconds": "float64", "retries": "int64", "cost_usd": "float64",
+    "outcome": "string", "improved_fitness": "bool", "started_at": "float64",
+}
+TABLES = {"programs": PROGRAM_COLUMNS, "llm_calls": LLM_CALL_COLUMNS}
+
+
+def _number(value: Any) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def program_row(program: Program) -> Dict[str, Any]:
+    """The row of `program` in the programs table."""
+    fitness = dict(program.fitness_scores)
+    return {
+        "id": program.id, "task_id": program.task_id, "generation": program.generation, "island_id": program.island_id,
+        "parent_id": program.parent_id, "status": program.status, "created_at": program.created_at,
+        "correctness": _number(fitness.get("correctness")), "runtime_ms": _number(fitness.get("runtime_ms")),
+        "fitness_scores": fitness, "errors": [str(error) for error in program.errors], "code": program.code,
+        "near_duplicate_of": program.near_duplicate_of,
+    }
+
+
+class _JsonlTable:
+    def __init__(self, directory: str, name: str):
+        self.path = os.path.join(directory, f"{name}.jsonl.gz")
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, separators=(",", ":"), default=str) + "\n")
+
+
+class _ParquetTable:
+    _TYPES = {"string": "string", "json": "string", "int64": "int64", "float64": "float64", "bool": "bool_"}
+
+    def __init__(self, directory: str, name: str, columns: Dict[str, str]):
+        self.directory = os.path.join(directory, name)
+        os.makedirs(self.directory, exist_ok=True)
+        self.columns = columns
+        self.schema = pyarrow.schema([(column, getattr(pyarrow, self._TYPES[kind])()) for column, kind in columns.items()])
+        # Continue the numbering of an earlier export into the same directory.
+        self.parts = sum(1 for entry in os.listdir(self.directory) if entry.startswith("part-") and entry.endswith(".parquet"))
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        data = {column: [row.get(column) for row in rows] for column in self.columns}
+        for column, kind in self.columns.items():
+            if kind == "json":
+                data[column] = [json.dumps(value, separators=(",", ":"), default=str) for value in data[column]]
+        table = pyarrow.Table.from_pydict(data, schema=self.schema)
+        path = os.path.join(self.directory, f"part-{self.parts:05d}.parquet")
+        # Written under a temporary name so readers never see a partial file.
+        pyarrow.parquet.write_table(table, path + ".tmp", row_group_size=len(rows))
+        os.replace(path + ".tmp", path)
+        self.parts += 1
+
+
+class RunExporter:
+    """
+    Appends programs to an export directory. Rows are buffered per table and written once
+    `batch_size` of them are pending (the rest on flush); writes run in a worker thread, one
+    at a time and in order, so the event loop keeps going while a batch is compressed.
+    """
+
+    def __init__(self, directory: str, batch_size: int = 1000, export_format: str = "auto"):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        if export_format == "parquet" and pyarrow is None:
+            raise ValueError("The parquet export format needs pyarrow installed.")
+        self.directory = directory
+        self.batch_size = max(1, batch_size)
+        self.format = "parquet" if export_format == "parquet" or (export_format == "auto" and pyarrow is not None) else "jsonl"
+        os.makedirs(directory, exist_ok=True)
+        if self.format == "parquet":
+            self._tables = {name: _ParquetTable(directory, name, columns) for name, columns in TABLES.items()}
+        else:
+            self._tables = {name: _JsonlTable(directory, name) for name in TABLES}
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {name: [] for name in TABLES}
+        self._write_lock = asyncio.Lock()
+        self.rows_written = {name: 0 for name in TABLES}
+        logger.info(f"Exporting run history to {directory} as {self.format}.")
+
+    def add_calls(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Buffers llm_calls rows; they are written with the next full batch, or on flush."""
+        self._buffers["llm_calls"].extend(rows)
+
+    async def append(self, programs: Iterable[Program]) -> None:
+        """Snapshots the programs now; full batches of every table are written before this returns."""
+        self._buffers["programs"].extend(program_row(program) for program in programs)
+        for name, buffer in self._buffers.items():
+            while len(buffer) >= self.batch_size:
+                batch = buffer[:self.batch_size]
+                del buffer[:self.batch_size]
+                await self._write(name, batch)
+
+    async def flush(self) -> None:
+        """Writes the rows still buffered, as a final, smaller batch of each table."""
+        for name, buffer in self._buffers.items():
+            if buffer:
+                batch, self._buffers[name] = buffer, []
+                await self._write(name, batch)
+
+    async def _write(self, name: str, rows: List[Dict[str, Any]]) -> None:
+        async with self._write_lock:
+            await asyncio.to_thread(self._tables[name].write, rows)
+            self.rows_written[name] += len(rows)
+        logger.debug(f"Exported {len(rows)} {name} rows to {self.directory}.")
+
+
+class RunHistoryExport:
+    """
+    Incremental export for a running evolution: settled programs (evaluated or failed) are
+    exported the first time they are saved. Programs still waiting for evaluation are left
+    for the save that carries their scores. `call_recorded` is meant for
+    TelemetryCollector.call_listeners.
+    """
+
+    def __init__(self, exporter: RunExporter):
+        self.exporter = exporter
+        self._exported: Set[str] = set()
+
+    async def programs_saved(self, programs: Iterable[Program]) -> None:
+        settled = []
+        for program in programs:
+            if program.status in SETTLED_STATUSES and program.id not in self._exported:
+                self._exported.add(program.id)
+                settled.append(program)
+        await self.exporter.append(settled)
+
+    def forget(self, program_ids: Iterable[str]) -> None:
+        """Drops evicted programs from the exported set; one saved again after its eviction is exported again."""
+        self._exported.difference_update(program_ids)
+
+    def call_recorded(self, row: Dict[str, Any]) -> None:
+        self.exporter.add_calls([row])
+
+    async def close(self) -> None:
+        await self.exporter.flush()
+
+
+async def export_database(database: DatabaseAgentInterface, directory: str, batch_size: int = 1000,
+                          export_format: str = "auto") -> Dict[str, int]:
+    """
+    Exports every program of `database`, paging through it with iter_programs so only one batch
+    is held at a time. Returns the rows written to each table.
+    """
+    exporter = RunExporter(directory, batch_size, export_format)
+    # Children of one multi-variant call share its record; a stored copy is recognised by its start time and usage.
+    seen_calls: Set[Tuple] = set()
+    async for batch in database.iter_programs(exporter.batch_size):
+        for program in batch:
+            for record in program.llm_calls:
+                key = (record.started_at, record.model, record.prompt_tokens, record.completion_tokens)
+                if key not in seen_calls:
+                    seen_calls.add(key)
+                    exporter.add_calls([dict(asdict(record), call_id=len(seen_calls) - 1, generation=program.generation,
+                                             island_id=program.island_id, program_id=program.id)])
+        await exporter.append(batch)
+    await exporter.flush()
+    logger.info(f"Exported {exporter.rows_written} rows to {directory}.")
+    return exporter.rows_written
+
+
+def main() -> None:
+    import argparse
+    from database_agent.sqlite_agent import SQLiteDatabaseAgent
+
+    parser = argparse.ArgumentParser(description="Export the programs of a SQLite program database (see DATABASE_PATH)")
+    parser.add_argument("database", help="SQLite database file")
+    parser.add_argument("output", help="Export directory")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per Parquet file or gzip member")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="auto")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def run() -> None:
+        database = SQLiteDatabaseAgent(args.database)
+        try:
+            await export_database(database, args.output, args.batch_size, args.format)
+        finally:
+            await database.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
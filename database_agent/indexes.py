@@ -0,0 +1,206 @@
+"""
+Incrementally maintained indexes for the in-memory program database.
+"""
+import heapq
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+SortKey = Tuple
+
+
+class TopKIndex:
+    """
+    Min-heap of (sort key, program id) entries with lazy deletion: updating or removing a program
+    only records its current key, and outdated heap entries are dropped when they surface. The
+    heap is rebuilt once outdated entries outnumber live ones. Updates cost O(log N) and a top-k
+    query O(k log N).
+    """
+
+    def __init__(self, entries: Iterable[Tuple[SortKey, Hashable]] = ()):
+        self._keys: Dict[Hashable, SortKey] = {}
+        for key, program_id in entries:
+            self._keys[program_id] = key
+        self._heap: List[Tuple[SortKey, Hashable]] = [(key, program_id) for program_id, key in self._keys.items()]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, program_id: Hashable, key: SortKey) -> None:
+        if self._keys.get(program_id) == key:
+            return
+        self._keys[program_id] = key
+        heapq.heappush(self._heap, (key, program_id))
+        self._maybe_compact()
+
+    def remove(self, program_id: Hashable) -> None:
+        if self._keys.pop(program_id, None) is not None:
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if len(self._heap) > 2 * len(self._keys) + 64:
+            self._heap = [(key, program_id) for program_id, key in self._keys.items()]
+            heapq.heapify(self._heap)
+
+    def top(self, k: int) -> List[Tuple[SortKey, Hashable]]:
+        """The k smallest live entries in order."""
+        result = []
+        seen = set()
+        while self._heap and len(result) < k:
+            entry = heapq.heappop(self._heap)
+            # A key that changed back to an earlier value leaves a duplicate entry; keep one.
+            if self._keys.get(entry[1]) == entry[0] and entry[1] not in seen:
+                seen.add(entry[1])
+                result.append(entry)
+        for entry in result:
+            heapq.heappush(self._heap, entry)
+        return result
+
+
+class SecondaryIndex:
+    """Program ids by the value of one attribute, for equality and range lookups."""
+
+    def __init__(self, attribute: str):
+        self.attribute = attribute
+        self._ids: Dict[Hashable, Set[Hashable]] = {}
+
+    def add(self, program_id: Hashable, value: Hashable) -> None:
+        self._ids.setdefault(value, set()).add(program_id)
+
+    def remove(self, program_id: Hashable, value: Hashable) -> None:
+        ids = self._ids.get(value)
+        if ids is not None:
+            ids.discard(program_id)
+            if not ids:
+                del self._ids[value]
+
+    def ids(self, value: Hashable) -> Set[Hashable]:
+        return self._ids.get(value, set())
+
+    def values(self) -> List[Hashable]:
+        return list(self._ids)
+
+    def ids_between(self, low: Optional[Hashable], high: Optional[Hashable]) -> Set[Hashable]:
+        """Ids whose value lies in [low, high]; None bounds are open. Scans the distinct values only."""
+        result: Set[Hashable] = set()
+        for value, ids in self._ids.items():
+            if value is not None and (low is None or value >= low) and (high is None or value <= high):
+                result |= ids
+        return result
+
+    def count(self, value: Hashable) -> int:
+        return len(self._ids.get(value, ()))
+
+    def clear(self) -> None:
+        self._ids.clear()
+
+
+class LineageIndex:
+    """
+    Parent→children adjacency of saved programs, with each program's depth (saved ancestors
+    above it) and root (its oldest saved ancestor). Saving a parent after its children, or a
+    program again with another parent, updates depth and root over the subtree below it.
+    """
+
+    def __init__(self, links: Iterable[Tuple[str, Optional[str]]] = ()):
+        self._parents: Dict[str, Optional[str]] = {}
+        self._children: Dict[str, Set[str]] = {}
+        self._depths: Dict[str, int] = {}
+        self._roots: Dict[str, str] = {}
+        for program_id, parent_id in links:
+            self.add(program_id, parent_id)
+
+    def __contains__(self, program_id: str) -> bool:
+        return program_id in self._parents
+
+    def __len__(self) -> int:
+        return len(self._parents)
+
+    def add(self, program_id: str, parent_id: Optional[str]) -> None:
+        if program_id in self._parents:
+            old_parent_id = self._parents[program_id]
+            if old_parent_id == parent_id:
+                return
+            if old_parent_id is not None:
+                siblings = self._children[old_parent_id]
+                siblings.discard(program_id)
+                if not siblings:
+                    del self._children[old_parent_id]
+        self._parents[program_id] = parent_id
+        if parent_id is not None:
+            self._children.setdefault(parent_id, set()).add(program_id)
+        self._relink(program_id)
+
+    def remove(self, program_id: str) -> None:
+        """Forgets `program_id`; its saved children become the roots of their subtrees."""
+        if program_id not in self._parents:
+            return
+        parent_id = self._parents.pop(program_id)
+        if parent_id is not None:
+            siblings = self._children[parent_id]
+            siblings.discard(program_id)
+            if not siblings:
+                del self._children[parent_id]
+        del self._depths[program_id]
+        del self._roots[program_id]
+        # The children keep their link, so they are placed under the program again if it comes back.
+        for child in self._children.get(program_id, ()):
+            self._relink(child)
+
+    def _relink(self, program_id: str) -> None:
+        parent_id = self._parents[program_id]
+        if parent_id in self._parents and parent_id != program_id:
+            self._depths[program_id] = self._depths[parent_id] + 1
+            self._roots[program_id] = self._roots[parent_id]
+        else:
+            self._depths[program_id] = 0
+            self._roots[program_id] = program_id
+        visited = {program_id}
+        level = [program_id]
+        while level:
+            next_level = []
+            for node in level:
+                for child in self._children.get(node, ()):
+                    if child not in visited:  # Guards against cycles in corrupt parent links
+                        visited.add(child)
+                        self._depths[child] = self._depths[node] + 1
+                        self._roots[child] = self._roots[node]
+                        next_level.append(child)
+            level = next_level
+
+    def parent(self, program_id: str) -> Optional[str]:
+        return self._parents.get(program_id)
+
+    def children(self, program_id: str) -> Set[str]:
+        return self._children.get(program_id, set())
+
+    def depth(self, program_id: str) -> int:
+        return self._depths[program_id]
+
+    def root(self, program_id: str) -> str:
+        return self._roots[program_id]
+
+    def ancestors(self, program_id: str, max_depth: Optional[int] = None) -> List[str]:
+        """Saved ancestors of `program_id`, parent first."""
+        ancestors: List[str] = []
+        seen = {program_id}
+        parent_id = self._parents.get(program_id)
+        while parent_id in self._parents and parent_id not in seen and (max_depth is None or len(ancestors) < max_depth):
+            ancestors.append(parent_id)
+            seen.add(parent_id)
+            parent_id = self._parents[parent_id]
+        return ancestors
+
+    def descendants(self, program_id: str, max_depth: Optional[int] = None, order_key=None) -> List[str]:
+        """Saved descendants of `program_id`, breadth first; each level ordered by `order_key`."""
+        descendants: List[str] = []
+        seen = {program_id}
+        level = [program_id]
+        depth = 0
+        while level and (max_depth is None or depth < max_depth):
+            next_level = [child for node in level for child in self._children.get(node, ()) if child not in seen]
+            next_level = sorted(set(next_level), key=order_key)
+            seen.update(next_level)
+            descendants.extend(next_level)
+            level = next_level
+            depth += 1
+        return descendants
@@ -0,0 +1,222 @@
+"""
+MAP-Elites program database.
+
+Evaluated programs are binned into the cells of a grid over behavioural descriptors (code
+length, runtime bucket, memory bucket, ...). Each cell keeps only its best program, so the
+database holds at most one program per cell of each task however long the run is. Programs
+not evaluated yet are kept aside until their evaluated version is saved.
+"""
+import logging
+import random
+from bisect import bisect_right
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
+
+from core.fitness import fitness_key
+from core.interfaces import BaseAgent, DatabaseAgentInterface, Program
+
+logger = logging.getLogger(__name__)
+
+Cell = Tuple[Optional[int], ...]
+
+
+def descriptor_value(program: Program, name: str) -> Optional[float]:
+    """The code length in characters for "code_length"; any other descriptor is read from fitness_scores."""
+    if name == "code_length":
+        return float(len(program.code))
+    value = program.fitness_scores.get(name)
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value == value:
+        return float(value)
+    return None
+
+
+class MapElitesArchive:
+    """
+    The elites of one task, in a dict keyed by cell: insert-or-replace is O(1). Occupied cells
+    are also kept in a list, so a uniform sample over them does not scan the grid.
+    """
+
+    def __init__(self, descriptors: Dict[str, Sequence[float]]):
+        # Bucket i of a descriptor holds values below its i-th boundary; None when the value is missing.
+        self.descriptors = {name: sorted(boundaries) for name, boundaries in descriptors.items()}
+        self._elites: Dict[Cell, Program] = {}
+        self._cells: Dict[str, Cell] = {}  # Elite id -> its cell
+        self._occupied: List[Cell] = []
+        self._positions: Dict[Cell, int] = {}  # Cell -> index in _occupied
+        self.offers = 0
+        self.insertions = 0
+
+    def __len__(self) -> int:
+        return len(self._elites)
+
+    def __contains__(self, program_id: str) -> bool:
+        return program_id in self._cells
+
+    @property
+    def grid_size(self) -> int:
+        size = 1
+        for boundaries in self.descriptors.values():
+            size *= len(boundaries) + 2  # One bucket per interval, plus missing values
+        return size
+
+    def cell(self, program: Program) -> Cell:
+        cell = []
+        for name, boundaries in self.descriptors.items():
+            value = descriptor_value(program, name)
+            cell.append(None if value is None else bisect_right(boundaries, value))
+        return tuple(cell)
+
+    def get(self, program_id: str) -> Optional[Program]:
+        cell = self._cells.get(program_id)
+        return self._elites[cell] if cell is not None else None
+
+    def elites(self) -> List[Program]:
+        return list(self._elites.values())
+
+    def offer(self, program: Program) -> bool:
+        """
+        Makes `program` the elite of its cell when the cell is empty or it beats the elite there.
+        An elite saved again with other descriptors moves to its new cell if it wins there, and
+        otherwise stays, as saved now, in the cell it holds.
+        """
+        self.offers += 1
+        cell = self.cell(program)
+        previous_cell = self._cells.get(program.id)
+        incumbent = self._elites.get(cell)
+        if incumbent is not None and incumbent.id != program.id:
+            if fitness_key(program) <= fitness_key(incumbent):
+                if previous_cell is not None:
+                    self._elites[previous_cell] = program
+                return False
+            del self._cells[incumbent.id]
+        if previous_cell is not None and previous_cell != cell:
+            self._remove(previous_cell)
+        if incumbent is None:
+            self._positions[cell] = len(self._occupied)
+            self._occupied.append(cell)
+        self._elites[cell] = program
+        self._cells[program.id] = cell
+        self.insertions += 1
+        return True
+
+    def _remove(self, cell: Cell) -> None:
+        elite = self._elites.pop(cell)
+        del self._cells[elite.id]
+        # Swap with the last occupied cell so removal stays O(1).
+        position = self._positions.pop(cell)
+        last = self._occupied.pop()
+        if last != cell:
+            self._occupied[position] = last
+            self._positions[last] = position
+
+    def sample(self, count: int, rng: random.Random) -> List[Program]:
+        """Elites of `count` distinct cells drawn uniformly (every elite when there are fewer cells)."""
+        if count >= len(self._occupied):
+            return list(self._elites.values())
+        return [self._elites[cell] for cell in rng.sample(self._occupied, count)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "elites": len(self._elites),
+            "grid_cells": self.grid_size,
+            "coverage": len(self._elites) / self.grid_size,
+            "offers": self.offers,
+            "insertions": self.insertions,
+        }
+
+
+class MapElitesDatabaseAgent(DatabaseAgentInterface, BaseAgent):
+    """A program database that keeps one elite per descriptor cell and task."""
+
+    def __init__(self, descriptors: Optional[Dict[str, Sequence[float]]] = None, config: Optional[Dict[str, Any]] = None):
+        super().__init__(config)
+        self.descriptors = descriptors if descriptors is not None else self.get_setting("MAP_ELITES_DESCRIPTORS")
+        self._archives: Dict[Optional[str], MapElitesArchive] = {}
+        self._unevaluated: Dict[str, Program] = {}
+        self.rng = random.Random(self.get_setting("RANDOM_SEED"))
+        logger.info(f"MapElitesDatabaseAgent initialized with descriptors {list(self.descriptors)}.")
+
+    def _archive(self, task_id: Optional[str]) -> MapElitesArchive:
+        archive = self._archives.get(task_id)
+        if archive is None:
+            archive = self._archives[task_id] = MapElitesArchive(self.descriptors)
+        return archive
+
+    def _task_archives(self, task_id: Optional[str]) -> List[MapElitesArchive]:
+        # Programs saved without a task id belong to every task, as in the other databases.
+        if task_id is None:
+            return list(self._archives.values())
+        return [self._archives[key] for key in (task_id, None) if key in self._archives]
+
+    async def save_program(self, program: Program) -> None:
+        await self.save_programs([program])
+
+    async def save_programs(self, programs: List[Program]) -> None:
+        if not programs:
+            return
+        inserted = 0
+        for program in programs:
+            if program.status in ("unevaluated", "evaluating"):
+                self._unevaluated[program.id] = program
+                continue
+            self._unevaluated.pop(program.id, None)
+            inserted += self._archive(program.task_id).offer(program)
+        logger.info(f"Offered {len(programs)} programs to the MAP-Elites archive ({inserted} became elites).")
+
+    async def get_program(self, program_id: str) -> Optional[Program]:
+        if program_id in self._unevaluated:
+            return self._unevaluated[program_id]
+        for archive in self._archives.values():
+            if program_id in archive:
+                return archive.get(program_id)
+        logger.debug(f"Program {program_id} is not an elite of the MAP-Elites archive.")
+        return None
+
+    async def get_all_programs(self) -> List[Program]:
+        programs = list(self._unevaluated.values())
+        for archive in self._archives.values():
+            programs.extend(archive.elites())
+        return programs
+
+    async def get_elites(self, task_id: Optional[str]) -> List[Program]:
+        return [elite for archive in self._task_archives(task_id) for elite in archive.elites()]
+
+    async def get_best_programs(
+        self,
+        task_id: str,
+        limit: int = 5,
+        objective: Literal["correctness", "runtime_ms"] = "correctness",
+        sort_order: Literal["asc", "desc"] = "desc",
+    ) -> List[Program]:
+        # The archive is bounded by its grid, so a full sort of the elites stays cheap.
+        default = -1.0 if objective == "correctness" else float('inf')
+        elites = await self.get_elites(task_id)
+        elites.sort(key=lambda p: p.fitness_scores.get(objective, default), reverse=(sort_order == "desc"))
+        return elites[:limit]
+
+    async def get_programs_by_generation(self, generation: int) -> List[Program]:
+        return [p for p in await self.get_all_programs() if p.generation == generation]
+
+    async def get_programs_for_next_generation(self, task_id: str, generation_size: int) -> List[Program]:
+        """Elites of distinct cells drawn uniformly over the occupied cells, whatever their fitness."""
+        archives = self._task_archives(task_id)
+        if len(archives) == 1:
+            return archives[0].sample(generation_size, self.rng)
+        elites = [elite for archive in archives for elite in archive.elites()]
+        if len(elites) <= generation_size:
+            return elites
+        return self.rng.sample(elites, generation_size)
+
+    async def count_programs(self) -> int:
+        return len(self._unevaluated) + sum(len(archive) for archive in self._archives.values())
+
+    def archive_stats(self) -> Dict[Optional[str], Dict[str, Any]]:
+        """Occupancy of each task's grid."""
+        return {task_id: archive.stats() for task_id, archive in self._archives.items()}
+
+    async def clear_database(self) -> None:
+        logger.info("Clearing the MAP-Elites archive.")
+        self._archives.clear()
+        self._unevaluated.clear()
+
+    async def execute(self, *args, **kwargs) -> Any:
+        raise NotImplementedError("MapElitesDatabaseAgent does not have a generic execute. Use specific methods like save_program, get_program etc.")
@@ -0,0 +1,124 @@
+"""
+Near-duplicate detection over program code with MinHash (see core/minhash.py) and
+locality-sensitive hashing.
+
+For lookups the signature is cut into `bands` bands. Programs that agree on a whole band share
+a bucket, and only bucket mates are compared. Insertion and removal touch one bucket per band,
+and a query only looks at candidates that share a bucket with it, so neither scans the index.
+Pairs with similarity s share a bucket with probability 1 - (1 - s^r)^b (r rows per band,
+b bands): about 0.99 at s = 0.9 with the default 8 bands of 8 rows. Signatures of the most
+recently seen code are cached, so checking an offspring and then indexing it hashes it once.
+`signature` may be called from worker threads (TaskManagerAgent hashes offspring off the event
+loop); everything else belongs to the event loop.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from core.minhash import MinHasher, Signature, signature_similarity
+
+
+class NearDuplicateIndex:
+    def __init__(self, num_permutations: int = 64, bands: int = 8, shingle_size: int = 3, seed: int = 1, cache_size: int = 256):
+        if bands <= 0 or num_permutations % bands:
+            raise ValueError(f"num_permutations ({num_permutations}) must be a multiple of bands ({bands})")
+        self.num_permutations = num_permutations
+        self.bands = bands
+        self.rows = num_permutations // bands
+        self.hasher = MinHasher(num_permutations, shingle_size, seed)
+        self.shingle_size = self.hasher.shingle_size
+        self._signatures: Dict[str, Signature] = {}
+        self._buckets: Dict[int, Set[str]] = {}
+        self._recent: "OrderedDict[str, Signature]" = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self.cache_size = max(0, cache_size)
+        self.queries = 0
+        self.candidates_compared = 0
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, program_id: str) -> bool:
+        return program_id in self._signatures
+
+    def shingles(self, code: str) -> Set[int]:
+        return self.hasher.shingles(code)
+
+    def signature(self, code: str) -> Signature:
+        with self._recent_lock:
+            signature = self._recent.get(code)
+            if signature is not None:
+                self._recent.move_to_end(code)
+                return signature
+        signature = self.hasher.signature(code)
+        with self._recent_lock:
+            self._recent[code] = signature
+            while len(self._recent) > self.cache_size:
+                self._recent.popitem(last=False)
+        return signature
+
+    def signature_of(self, program_id: str) -> Optional[Signature]:
+        return self._signatures.get(program_id)
+
+    def _band_keys(self, signature: Signature) -> List[int]:
+        rows = self.rows
+        return [hash((band, tuple(signature[band * rows:(band + 1) * rows]))) for band in range(self.bands)]
+
+    def add(self, program_id: str, code: str) -> Signature:
+        """Indexes `code` under `program_id`, replacing what was indexed under that id before."""
+        self.discard(program_id)
+        signature = self.signature(code)
+        self._signatures[program_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(program_id)
+        return signature
+
+    def discard(self, program_id: str) -> None:
+        signature = self._signatures.pop(program_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self._buckets[key]
+            bucket.discard(program_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def similar(self, code: Optional[str] = None, threshold: float = 0.9, limit: Optional[int] = None,
+                signature: Optional[Signature] = None, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Indexed programs whose estimated similarity to `code` (or to a precomputed `signature`) is at
+        least `threshold`, most similar first, as (program id, similarity) pairs.
+        """
+        if signature is None:
+            signature = self.signature(code or "")
+        self.queries += 1
+        candidates: Set[str] = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        candidates.discard(exclude)
+        self.candidates_compared += len(candidates)
+        matches = []
+        for candidate in candidates:
+            similarity = signature_similarity(signature, self._signatures[candidate])
+            if similarity >= threshold:
+                matches.append((candidate, similarity))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit] if limit is not None else matches
+
+    def nearest(self, code: str, threshold: float = 0.9, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        matches = self.similar(code, threshold, limit=1, exclude=exclude)
+        return matches[0] if matches else None
+
+    def clear(self) -> None:
+        self._signatures.clear()
+        self._buckets.clear()
+        with self._recent_lock:
+            self._recent.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "programs": len(self._signatures),
+            "buckets": len(self._buckets),
+            "queries": self.queries,
+            "candidates_per_query": self.candidates_compared / self.queries if self.queries else 0.0,
+        }
@@ -0,0 +1,370 @@
+"""
+Persistent program database on SQLite.
+
+- WAL journal, so readers never block the writer and a crash loses at most the last batch.
+- One writer thread with its own connection. Concurrent save calls are group-committed: whatever
+  is queued when the writer becomes free goes into one transaction with executemany, and every
+  caller whose programs were in it gets its outcome.
+- A pool of reader threads, each with its own connection, so queries never block the event loop.
+- Indexed columns for task, generation, island, status and the fitness keys; the full program
+  is stored as JSON next to them. Rankings break ties by first save (rowid), like the in-memory
+  database.
+"""
+import asyncio
+import functools
+import json
+import logging
+import random
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple, Union
+
+from core.interfaces import BaseAgent, DatabaseAgentInterface, LLMCallRecord, Program, ProgramQuery
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS programs (
+    id TEXT PRIMARY KEY,
+    task_id TEXT,
+    generation INTEGER NOT NULL,
+    island_id INTEGER,
+    parent_id TEXT,
+    status TEXT NOT NULL,
+    correctness REAL NOT NULL,
+    runtime_ms REAL NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+DROP INDEX IF EXISTS idx_programs_task_correctness;
+CREATE INDEX IF NOT EXISTS idx_programs_task_rank ON programs (task_id, correctness DESC);
+CREATE INDEX IF NOT EXISTS idx_programs_task_runtime ON programs (task_id, runtime_ms);
+CREATE INDEX IF NOT EXISTS idx_programs_generation ON programs (generation);
+CREATE INDEX IF NOT EXISTS idx_programs_island ON programs (island_id);
+CREATE INDEX IF NOT EXISTS idx_programs_status ON programs (status);
+CREATE INDEX IF NOT EXISTS idx_programs_parent ON programs (parent_id);
+"""
+
+# An upsert keeps a re-saved program's rowid, which is its place in save order.
+INSERT_SQL = (
+    "INSERT INTO programs (id, task_id, generation, island_id, parent_id, status, correctness, runtime_ms, created_at, data) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET task_id = excluded.task_id, "
+    "generation = excluded.generation, island_id = excluded.island_id, parent_id = excluded.parent_id, status = excluded.status, "
+    "correctness = excluded.correctness, runtime_ms = excluded.runtime_ms, created_at = excluded.created_at, data = excluded.data"
+)
+
+# Program attributes stored in their own columns; projections onto these skip decoding the JSON
+COLUMN_FIELDS = ("id", "task_id", "generation", "island_id", "parent_id", "status", "created_at")
+
+# Recursive walks over the parent index; the depth bound also ends walks over corrupt, cyclic links.
+ANCESTORS_SQL = """
+WITH RECURSIVE chain(id, depth) AS (
+    SELECT parent_id, 1 FROM programs WHERE id = ? AND parent_id IS NOT NULL
+    UNION ALL
+    SELECT programs.parent_id, chain.depth + 1 FROM programs JOIN chain ON programs.id = chain.id
+    WHERE programs.parent_id IS NOT NULL AND chain.depth < ?
+)
+SELECT programs.data FROM chain JOIN programs ON programs.id = chain.id ORDER BY chain.depth
+"""
+DESCENDANTS_CTE = """
+WITH RECURSIVE tree(id, depth) AS (
+    SELECT id, 1 FROM programs WHERE parent_id = ?
+    UNION ALL
+    SELECT programs.id, tree.depth + 1 FROM programs JOIN tree ON programs.parent_id = tree.id WHERE tree.depth < ?
+)
+"""
+
+# SQLite's default limit on bound parameters per statement is 999 in older builds
+_ID_CHUNK = 500
+
+
+def _row(data: Dict[str, Any]) -> Tuple:
+    fitness = data["fitness_scores"]
+    return (
+        data["id"], data["task_id"], data["generation"], data["island_id"], data["parent_id"], data["status"],
+        float(fitness.get("correctness", -1.0)), float(fitness.get("runtime_ms", float('inf'))), data["created_at"],
+        json.dumps(data, separators=(",", ":")),
+    )
+
+
+def _program(data: str) -> Program:
+    fields = json.loads(data)
+    fields["llm_calls"] = [LLMCallRecord(**record) for record in fields.get("llm_calls", [])]
+    return Program(**fields)
+
+
+class SQLiteDatabaseAgent(DatabaseAgentInterface, BaseAgent):
+    """A persistent program database in a single SQLite file."""
+
+    def __init__(self, path: Optional[str] = None, read_connections: Optional[int] = None, config: Optional[Dict[str, Any]] = None):
+        super().__init__(config)
+        self.path = path or self.get_setting("DATABASE_PATH")
+        self.rng = random.Random(self.get_setting("RANDOM_SEED"))
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._readers = ThreadPoolExecutor(max_workers=max(1, read_connections or self.get_setting("DATABASE_READ_CONNECTIONS")),
+                                           thread_name_prefix="sqlite-reader")
+        self._pending: List[Tuple[List[Dict[str, Any]], asyncio.Future]] = []  # Rows of each waiting caller, and its outcome
+        self._write_lock = asyncio.Lock()
+        self.rows_written = 0
+        self.transactions = 0
+        self._next_analyze = 1000  # Statistics are refreshed whenever the rows written double
+
+        connection = self._open_connection()
+        connection.executescript(SCHEMA)
+        connection.close()
+        logger.info(f"SQLiteDatabaseAgent initialized with database file {self.path}.")
+
+    def _open_connection(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly around each batch.
+        connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        """The calling pool thread's own connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._open_connection()
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    async def _read(self, function, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._readers, function, *args)
+
+    # Writes
+
+    def _insert_sync(self, batch: List[Dict[str, Any]]) -> None:
+        connection = self._connection()
+        rows = [_row(data) for data in batch]
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(INSERT_SQL, rows)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self.rows_written += len(rows)
+        self.transactions += 1
+        if self.rows_written >= self._next_analyze:
+            # Sampled statistics let the planner pick the most selective index for query_programs.
+            connection.execute("PRAGMA analysis_limit=1000")
+            connection.execute("ANALYZE")
+            self._next_analyze = 2 * self.rows_written
+
+    async def save_program(self, program: Program) -> None:
+        await self.save_programs([program])
+
+    @staticmethod
+    def _settle(batch: List[Tuple[List[Dict[str, Any]], asyncio.Future]], write: asyncio.Future) -> None:
+        """Gives every caller whose programs were in `batch` the outcome of its transaction."""
+        for _, committed in batch:
+            if committed.done():
+                continue  # The caller was cancelled while waiting
+            if write.cancelled():
+                committed.cancel()
+            elif write.exception() is not None:
+                committed.set_exception(write.exception())
+            else:
+                committed.set_result(None)
+
+    async def save_programs(self, programs: List[Program]) -> None:
+        if not programs:
+            return
+        loop = asyncio.get_running_loop()
+        committed = loop.create_future()
+        # Snapshot now: the caller may keep changing the programs while the write is queued.
+        self._pending.append(([asdict(program) for program in programs], committed))
+        async with self._write_lock:
+            if self._pending:  # Otherwise committed by the batch that held the lock before us
+                batch, self._pending = self._pending, []
+                rows = [data for contribution, _ in batch for data in contribution]
+                write = loop.run_in_executor(self._writer, self._insert_sync, rows)
+                write.add_done_callback(functools.partial(self._settle, batch))
+                # Contributors are settled even if this caller is cancelled while the write runs.
+                await asyncio.wait([write])
+                if not write.cancelled() and write.exception() is None:
+                    logger.debug(f"Committed a batch of {len(rows)} programs from {len(batch)} callers to {self.path}.")
+        await committed
+
+    async def clear_database(self) -> None:
+        logger.info(f"Clearing all programs from {self.path}.")
+        async with self._write_lock:
+            for _, committed in self._pending:
+                if not committed.done():
+                    committed.set_result(None)  # Cleared along with everything else
+            self._pending.clear()
+            await asyncio.get_running_loop().run_in_executor(self._writer, lambda: self._connection().execute("DELETE FROM programs"))
+
+    async def clear_task(self, task_id: str) -> None:
+        """Deletes the programs of `task_id`, e.g. those of an earlier run of the task in the same file."""
+        async with self._write_lock:
+            deleted = await asyncio.get_running_loop().run_in_executor(
+                self._writer, lambda: self._connection().execute("DELETE FROM programs WHERE task_id = ?", (task_id,)).rowcount)
+        if deleted:
+            logger.info(f"Deleted {deleted} programs of an earlier run of task {task_id} from {self.path}.")
+
+    # Reads
+
+    def _query_programs(self, sql: str, parameters: Tuple = ()) -> List[Program]:
+        return [_program(data) for (data,) in self._connection().execute(sql, parameters).fetchall()]
+
+    def _query_page(self, after_rowid: int, limit: int) -> List[Tuple[int, str]]:
+        return self._connection().execute("SELECT rowid, data FROM programs WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                                          (after_rowid, limit)).fetchall()
+
+    def _query_ids(self, ids: List[str]) -> List[Program]:
+        programs = []
+        for start in range(0, len(ids), _ID_CHUNK):
+            chunk = ids[start:start + _ID_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            programs.extend(self._query_programs(f"SELECT data FROM programs WHERE id IN ({placeholders})", tuple(chunk)))
+        return programs
+
+    @staticmethod
+    def _task_filter(task_id: Optional[str]) -> Tuple[str, Tuple]:
+        # Programs saved without a task id belong to every task, as in the in-memory database.
+        if task_id is None:
+            return "", ()
+        return "WHERE (task_id = ? OR task_id IS NULL)", (task_id,)
+
+    async def get_program(self, program_id: str) -> Optional[Program]:
+        programs = await self._read(self._query_programs, "SELECT data FROM programs WHERE id = ?", (program_id,))
+        if not programs:
+            logger.warning(f"Program with ID: {program_id} not found in database.")
+            return None
+        return programs[0]
+
+    async def get_all_programs(self) -> List[Program]:
+        return await self._read(self._query_programs, "SELECT data FROM programs ORDER BY rowid")
+
+    async def iter_programs(self, batch_size: int = 1000) -> AsyncIterator[List[Program]]:
+        # Keyset pagination on rowid: each page is one indexed range read, however deep into the table.
+        last_rowid = 0
+        while True:
+            rows = await self._read(self._query_page, last_rowid, batch_size)
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [_program(data) for _, data in rows]
+
+    async def get_best_programs(
+        self,
+        task_id: str,
+        limit: int = 5,
+        objective: Literal["correctness", "runtime_ms"] = "correctness",
+        sort_order: Literal["asc", "desc"] = "desc",
+    ) -> List[Program]:
+        # Ties keep save order in both directions, as in the in-memory database.
+        if objective not in ("correctness", "runtime_ms"):
+            order = "rowid"
+        else:
+            order = f"{objective} {'DESC' if sort_order == 'desc' else 'ASC'}, rowid"
+        if task_id is None:
+            return await self._read(self._query_programs, f"SELECT data FROM programs ORDER BY {order} LIMIT ?", (limit,))
+        # One ordered index range per branch instead of a scan and sort for the OR of both.
+        branch = "SELECT data, correctness, runtime_ms, rowid FROM programs WHERE {} ORDER BY " + order + " LIMIT ?"
+        sql = (f"SELECT data FROM (SELECT * FROM ({branch.format('task_id = ?')}) UNION ALL "
+               f"SELECT * FROM ({branch.format('task_id IS NULL')})) ORDER BY {order} LIMIT ?")
+        return await self._read(self._query_programs, sql, (task_id, limit, limit, limit))
+
+    async def get_programs_by_generation(self, generation: int) -> List[Program]:
+        return await self._read(self._query_programs, "SELECT data FROM programs WHERE generation = ?", (generation,))
+
+    @staticmethod
+    def _where(query: ProgramQuery) -> Tuple[str, List[Any]]:
+        clauses, parameters = [], []
+        if query.task_id is not None:
+            clauses.append("(task_id = ? OR task_id IS NULL)")
+            parameters.append(query.task_id)
+        for column, operator, value in (
+            ("generation", "=", query.generation),
+            ("generation", ">=", query.min_generation),
+            ("generation", "<=", query.max_generation),
+            ("island_id", "=", query.island_id),
+            ("status", "=", query.status),
+            ("parent_id", "=", query.parent_id),
+            ("correctness", ">=", query.min_correctness),
+            ("runtime_ms", "<=", query.max_runtime_ms),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {operator} ?")
+                parameters.append(value)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", parameters
+
+    async def query_programs(self, query: ProgramQuery) -> List[Union[Program, Dict[str, Any]]]:
+        """Runs `query` as one SQL statement; projections onto indexed columns never decode the stored JSON."""
+        where, parameters = self._where(query)
+        order = ""
+        if query.order_by is not None:
+            if query.order_by not in ("correctness", "runtime_ms", "generation", "created_at"):
+                raise ValueError(f"Unsupported order_by: {query.order_by}")
+            order = f"ORDER BY {query.order_by} {'DESC' if query.descending else 'ASC'}, rowid"
+        limit = ""
+        if query.limit is not None:
+            limit = "LIMIT ?"
+            parameters.append(query.limit)
+        columns_only = query.fields is not None and all(name in COLUMN_FIELDS for name in query.fields)
+        selected = ", ".join(query.fields) if columns_only else "data"
+        sql = f"SELECT {selected} FROM programs {where} {order} {limit}"
+
+        def run() -> List[Union[Program, Dict[str, Any]]]:
+            rows = self._connection().execute(sql, parameters).fetchall()
+            if columns_only:
+                return [dict(zip(query.fields, row)) for row in rows]
+            return [query.project(_program(data)) for (data,) in rows]
+        return await self._read(run)
+
+    async def get_programs_for_next_generation(self, task_id: str, generation_size: int) -> List[Program]:
+        where, parameters = self._task_filter(task_id)
+        rows = await self._read(lambda: self._connection().execute(f"SELECT id FROM programs {where} ORDER BY rowid", parameters).fetchall())
+        ids = [program_id for (program_id,) in rows]
+        if len(ids) > generation_size:
+            ids = self.rng.sample(ids, generation_size)
+        return await self._read(self._query_ids, ids)
+
+    def _walk(self, sql: str, program_ids: List[str], max_depth: Optional[int], decode: bool) -> Dict[str, Any]:
+        connection = self._connection()
+        if max_depth is None:
+            max_depth = connection.execute("SELECT COUNT(*) FROM programs").fetchone()[0]
+        if max_depth < 1:
+            return {program_id: [] if decode else 0 for program_id in program_ids}
+        results = {}
+        for program_id in program_ids:
+            rows = connection.execute(sql, (program_id, max_depth)).fetchall()
+            results[program_id] = [_program(data) for (data,) in rows] if decode else rows[0][0]
+        return results
+
+    async def get_ancestors(self, program_ids: List[str], max_depth: Optional[int] = None) -> Dict[str, List[Program]]:
+        return await self._read(self._walk, ANCESTORS_SQL, program_ids, max_depth, True)
+
+    async def get_descendants(self, program_ids: List[str], max_depth: Optional[int] = None) -> Dict[str, List[Program]]:
+        sql = DESCENDANTS_CTE + "SELECT programs.data FROM tree JOIN programs ON programs.id = tree.id ORDER BY tree.depth, programs.rowid"
+        return await self._read(self._walk, sql, program_ids, max_depth, True)
+
+    async def count_descendants(self, program_ids: List[str]) -> Dict[str, int]:
+        return await self._read(self._walk, DESCENDANTS_CTE + "SELECT COUNT(*) FROM tree", program_ids, None, False)
+
+    async def count_programs(self) -> int:
+        return await self._read(lambda: self._connection().execute("SELECT COUNT(*) FROM programs").fetchone()[0])
+
+    async def close(self) -> None:
+        """Waits for queued writes, then closes every connection."""
+        async with self._write_lock:
+            pass
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    async def execute(self, *args, **kwargs) -> Any:
+        raise NotImplementedError("SQLiteDatabaseAgent does not have a generic execute. Use specific methods like save_program, get_program etc.")
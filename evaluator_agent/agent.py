@@ -15,16 +15,31 @@ import shutil
 from typing import Optional, Dict, Any, Tuple, Union, List
 
 from core.interfaces import EvaluatorAgentInterface, Program, TaskDefinition, BaseAgent, TestSuite
-from config import settings
 
 logger = logging.getLogger(__name__)
 
+# A pytest plugin (loaded with -p) that writes the CPU time of the pytest process and its children to a file.
+_PYTEST_CPU_PLUGIN = '''
+import os
+
+def pytest_unconfigure(config):
+    times = os.times()
+    with open(os.environ["EVALUATION_CPU_FILE"], "w") as f:
+        f.write(str(times.user + times.system + times.children_user + times.children_system))
+'''
+
 class EvaluatorAgent(EvaluatorAgentInterface, BaseAgent):
-    def __init__(self, task_definition: Optional[TaskDefinition] = None):
-        super().__init__()
+    def __init__(self, task_definition: Optional[TaskDefinition] = None, config: Optional[Dict[str, Any]] = None):
+        super().__init__(config)
         self.task_definition = task_definition
-        self.evaluation_model_name = settings.EVALUATION_MODEL
-        self.evaluation_timeout_seconds = settings.EVALUATION_TIMEOUT_SECONDS
+        self.evaluation_model_name = self.get_setting("EVALUATION_MODEL")
+        self.evaluation_timeout_seconds = self.get_setting("EVALUATION_TIMEOUT_SECONDS")
+        # Example runtime and peak memory are MAP-Elites descriptors. Other databases keep runtime_ms at
+        # inf for example tasks, so it does not take part in their fitness ordering.
+        self.records_descriptors = self.get_setting("DATABASE_TYPE") == "map_elites"
+        # User + system CPU of this evaluator's sandboxes as they report it themselves; a sandbox killed
+        # or crashed before reporting is charged its wall-clock time (see RUN_MAX_EVALUATION_CPU_SECONDS).
+        self.cpu_seconds = 0.0
         logger.info(f"EvaluatorAgent initialized with model: {self.evaluation_model_name}, timeout: {self.evaluation_timeout_seconds}s")
         if self.task_definition:
             logger.info(f"EvaluatorAgent task_definition: {self.task_definition.id}")
@@ -112,6 +127,25 @@ if function_to_test_name not in globals():
         
 function_to_test = globals()[function_to_test_name]
 
+def _peak_memory_kb():
+    # VmHWM starts afresh in this process; ru_maxrss on Linux carries over the peak of the process that started it.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Bytes on macOS, kilobytes elsewhere
+        return peak / 1024 if sys.platform == "darwin" else float(peak)
+    except ImportError:  # Not available on Windows
+        return None
+
+# Peak memory is reported above this baseline, so the interpreter and harness do not count.
+_baseline_memory_kb = _peak_memory_kb()
+
 for i, test_case in enumerate(test_cases):
     input_args = test_case.get("input")
     
@@ -150,6 +184,11 @@ for i, test_case in enumerate(test_cases):
 final_output = {{"test_outputs": results}}
 if num_tests > 0:
     final_output["average_runtime_ms"] = total_execution_time / num_tests
+_peak_kb = _peak_memory_kb()
+if _peak_kb is not None and _baseline_memory_kb is not None:
+    final_output["peak_memory_mb"] = max(0.0, _peak_kb - _baseline_memory_kb) / 1024
+_times = __import__("os").times()
+final_output["cpu_seconds"] = _times.user + _times.system + _times.children_user + _times.children_system
 
 def custom_json_serializer(obj):
     if isinstance(obj, float):
@@ -169,9 +208,10 @@ print(json.dumps(final_output, default=custom_json_serializer))
         cmd = [sys.executable, temp_file_path]
 
         proc = None
+        reported_cpu_seconds = None
+        start_time = time.monotonic()
         try:
             logger.debug(f"Executing code: {' '.join(cmd)} in {temp_dir}")
-            start_time = time.monotonic()
             preexec_fn = None
             if max_memory_mb is not None:
                 limit_bytes = max_memory_mb * 1024 * 1024
@@ -217,6 +257,7 @@ print(json.dumps(final_output, default=custom_json_serializer))
 
                 parsed_output = json_loads_with_infinity(stdout_str)
                 logger.debug(f"Parsed execution output: {parsed_output}")
+                reported_cpu_seconds = parsed_output.get("cpu_seconds")
                 return parsed_output, None
             except json.JSONDecodeError as e:
                 error_message = f"Failed to decode JSON output: {e}. Raw output: '{stdout_str}'"
@@ -242,6 +283,8 @@ print(json.dumps(final_output, default=custom_json_serializer))
             logger.error(f"An unexpected error occurred during code execution: {e}", exc_info=True)
             return None, f"Unexpected execution error: {str(e)}"
         finally:
+            if proc is not None:
+                self.cpu_seconds += reported_cpu_seconds if reported_cpu_seconds is not None else time.monotonic() - start_time
             try:
                 if os.path.exists(temp_file_path):
                     os.remove(temp_file_path)
@@ -263,20 +306,34 @@ print(json.dumps(final_output, default=custom_json_serializer))
                 with open(file_path, "w") as tf:
                     tf.write(contents)
 
-            cmd = ["pytest", "-q"]
+            plugin_dir = os.path.join(temp_dir, ".evaluation")
+            os.makedirs(plugin_dir)
+            with open(os.path.join(plugin_dir, "evaluation_cpu.py"), "w") as f:
+                f.write(_PYTEST_CPU_PLUGIN)
+            cpu_file = os.path.join(plugin_dir, "cpu_seconds")
+            env = dict(os.environ, EVALUATION_CPU_FILE=cpu_file,
+                       PYTHONPATH=os.pathsep.join(filter(None, [plugin_dir, os.environ.get("PYTHONPATH")])))
+
+            cmd = ["pytest", "-q", "-p", "evaluation_cpu"]
             logger.debug(f"Running pytest: {' '.join(cmd)} in {temp_dir}")
 
             start_time = time.monotonic()
-            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=temp_dir)
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=temp_dir, env=env)
             try:
                 stdout, stderr = proc.communicate(timeout=timeout_seconds)
             except subprocess.TimeoutExpired:
                 proc.kill()
                 stdout, stderr = proc.communicate()
+                self.cpu_seconds += time.monotonic() - start_time
                 logger.warning(f"Pytest timed out after {timeout_seconds}s")
                 return {}, f"Timeout after {timeout_seconds}s"
 
             runtime = (time.monotonic() - start_time) * 1000
+            try:
+                with open(cpu_file) as f:
+                    self.cpu_seconds += float(f.read())
+            except (OSError, ValueError):
+                self.cpu_seconds += runtime / 1000
             stdout_str = stdout.decode("utf-8", errors="replace")
             stderr_str = stderr.decode("utf-8", errors="replace")
             logger.debug(f"Pytest stdout:\n{stdout_str}")
@@ -398,6 +455,12 @@ print(json.dumps(final_output, default=custom_json_serializer))
             program.fitness_scores["correctness"] = correctness
             program.fitness_scores["passed_tests"] = float(passed_tests)
             program.fitness_scores["total_tests"] = float(total_tests)
+            if execution_results and self.records_descriptors:
+                # Behavioural descriptors of the MAP-Elites database (see config.settings.MAP_ELITES_DESCRIPTORS)
+                if "average_runtime_ms" in execution_results:
+                    program.fitness_scores["runtime_ms"] = execution_results["average_runtime_ms"]
+                if "peak_memory_mb" in execution_results:
+                    program.fitness_scores["memory_mb"] = execution_results["peak_memory_mb"]
             logger.info(f"Program {program.id} correctness: {correctness} ({passed_tests}/{total_tests} tests passed)")
 
             if correctness < 1.0:
@@ -0,0 +1,115 @@
+"""
+Evaluation cache: results keyed by the program code and a fingerprint of the tests it ran
+against, so identical code is not sent to the sandbox twice and archived programs can be
+re-validated for free while the task's tests are unchanged. Optionally persisted as an
+append-only JSONL file shared across runs.
+
+At most `max_entries` results are kept in memory; the least recently used ones are dropped
+first. New results are written to the file by `flush()`, which callers run off the event loop.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.interfaces import Program, TaskDefinition
+
+logger = logging.getLogger(__name__)
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def tests_fingerprint(task: TaskDefinition) -> str:
+    """Changes whenever anything that decides a program's fitness for the task changes."""
+    suite = asdict(task.test_suite) if task.test_suite is not None else None
+    if suite is not None:
+        suite = {"files": suite["files"], "tests_code": suite["tests_code"], "cases": suite["cases"]}
+    payload = {
+        "function_name": task.function_name_to_evolve,
+        "examples": task.input_output_examples,
+        "test_suite": suite,
+        "allowed_imports": sorted(task.allowed_imports or []),
+        "max_memory_mb": task.max_memory_mb,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class EvaluationCache:
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._unwritten: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A line cut off by a crash
+                    self._add((entry["code_hash"], entry["tests_fingerprint"]), entry)
+            logger.info(f"Loaded {len(self._entries)} cached evaluations from {path}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, key: Tuple[str, str], entry: Dict[str, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup(self, program: Program, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Applies a cached result to `program` and returns the cache entry on a hit, None on a miss."""
+        key = (code_hash(program.code), fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        program.fitness_scores = dict(entry["fitness_scores"])
+        program.status = entry["status"]
+        program.errors = list(entry["errors"])
+        return entry
+
+    def store(self, program: Program, fingerprint: str, seconds: Optional[float] = None) -> None:
+        """Caches the result of an evaluation that took `seconds`; the file is only written by `flush`."""
+        if program.status not in ("evaluated", "failed_evaluation"):
+            return
+        entry = {
+            "code_hash": code_hash(program.code),
+            "tests_fingerprint": fingerprint,
+            "fitness_scores": dict(program.fitness_scores),
+            "status": program.status,
+            "errors": list(program.errors),
+            "seconds": seconds,
+        }
+        key = (entry["code_hash"], fingerprint)
+        with self._lock:
+            if key in self._entries:
+                return
+            self._add(key, entry)
+            if self.path:
+                self._unwritten.append(entry)
+
+    def flush(self) -> None:
+        """Appends the results stored since the last flush to the file. Blocking; run it in a thread."""
+        with self._lock:
+            if not self.path or not self._unwritten:
+                return
+            entries, self._unwritten = self._unwritten, []
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write("".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries))
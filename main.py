@@ -2,10 +2,12 @@
 Main entry point for the AlphaEvolve Pro application.
 Orchestrates the different agents and manages the evolutionary loop.
 """
+import argparse
 import asyncio
 import logging
 import sys
 import os
+from typing import List, Optional
 
                                                
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__)))
@@ -13,6 +15,8 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from task_manager.agent import TaskManagerAgent
+from task_manager.scheduler import MultiTaskScheduler, load_task_file
+from task_manager.island_parallel import IslandParallelCoordinator
 from core.interfaces import TaskDefinition
 from config import settings
 
@@ -27,7 +31,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def main():
+async def main(resume_from: Optional[str] = None, island_workers: Optional[int] = None):
     logger.info("Starting OpenAlpha_Evolve autonomous algorithmic evolution")
     logger.info(f"Configuration: Population Size={settings.POPULATION_SIZE}, Generations={settings.GENERATIONS}")
     logger.info(f"LLM Models: Pro={settings.PRO_MODEL}, Flash={settings.FLASH_MODEL}, Eval={settings.EVALUATION_MODEL}")
@@ -111,9 +115,16 @@ async def main():
     )
 
                                                               
-    task_manager = TaskManagerAgent(
-        task_definition=task
-    )
+    if island_workers is None:
+        island_workers = settings.ISLAND_PARALLEL_WORKERS
+    if resume_from:
+        task_manager = await TaskManagerAgent.from_checkpoint(resume_from)
+    elif island_workers > 1:
+        task_manager = IslandParallelCoordinator(task, num_workers=island_workers)
+    else:
+        task_manager = TaskManagerAgent(
+            task_definition=task
+        )
 
                                       
     best_programs = await task_manager.execute()
@@ -129,5 +140,37 @@ async def main():
 
     logger.info("OpenAlpha_Evolve run finished.")
 
+async def run_batch(task_files: List[str], llm_slots: Optional[int] = None, evaluation_slots: Optional[int] = None, policy: Optional[str] = None):
+    """Runs every task in the given task files concurrently over shared LLM and evaluation slots."""
+    scheduler = MultiTaskScheduler(llm_slots=llm_slots, evaluation_slots=evaluation_slots, policy=policy)
+    for path in task_files:
+        for scheduled in load_task_file(path):
+            scheduler.add_task(scheduled.task, scheduled.config, scheduled.priority)
+    results = await scheduler.run()
+    for result in results:
+        if result.error:
+            logger.info(f"Task {result.task_id}: failed ({result.error})")
+        elif result.best_programs:
+            logger.info(f"Task {result.task_id}: best program {result.best_programs[0].id}, fitness {result.best_programs[0].fitness_scores}")
+        else:
+            logger.info(f"Task {result.task_id}: no suitable programs were found.")
+        throughput = result.throughput
+        logger.info(f"Task {result.task_id}: {throughput['offspring']} offspring in {throughput['wall_seconds']:.1f}s "
+                    f"({throughput['offspring_per_minute']:.1f}/min), {throughput['llm_calls']} LLM calls, "
+                    f"waited {throughput['llm_slot_wait_seconds']:.1f}s for LLM slots and "
+                    f"{throughput['evaluation_slot_wait_seconds']:.1f}s for evaluation slots")
+    return results
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Run OpenAlpha_Evolve on the built-in task")
+    parser.add_argument("--resume", metavar="CHECKPOINT_DIR", help="Continue the run saved in this checkpoint directory (see CHECKPOINT_DIR)")
+    parser.add_argument("--island-workers", type=int, help="Run the islands in this many processes with queue-based migration (default: ISLAND_PARALLEL_WORKERS)")
+    parser.add_argument("--batch", nargs="+", metavar="TASK_FILE", help="Run the tasks in these JSON task files concurrently instead of the built-in task")
+    parser.add_argument("--llm-slots", type=int, help="Concurrent LLM calls shared by all batch tasks (default: SCHEDULER_LLM_SLOTS)")
+    parser.add_argument("--evaluation-slots", type=int, help="Concurrent evaluations shared by all batch tasks (default: SCHEDULER_EVALUATION_SLOTS)")
+    parser.add_argument("--policy", choices=["fair", "priority"], help="How free slots are handed out between batch tasks (default: SCHEDULER_POLICY)")
+    args = parser.parse_args()
+    if args.batch:
+        asyncio.run(run_batch(args.batch, args.llm_slots, args.evaluation_slots, args.policy))
+    else:
+        asyncio.run(main(args.resume, args.island_workers))
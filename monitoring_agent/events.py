@@ -0,0 +1,177 @@
+"""
+Typed progress events published by TaskManagerAgent, and the in-process bus that delivers them.
+
+Publishing never blocks and never awaits: each subscription has a bounded buffer, and a full
+buffer drops the oldest event, drops the new one, or coalesces (keeps only the latest event of
+each type). Publishers can check ``wants(event_type)`` first and skip building events nobody
+listens to, so an unobserved run pays close to nothing.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Type
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+
+@dataclass
+class ProgressEvent:
+    task_id: str
+    generation: int
+    timestamp: float = field(default_factory=time.time, kw_only=True)
+
+
+@dataclass
+class GenerationStarted(ProgressEvent):
+    max_generations: int
+
+
+@dataclass
+class GenerationCompleted(ProgressEvent):
+    population_size: int
+    best_program_id: Optional[str]
+    best_fitness: Dict[str, Any]
+
+
+@dataclass
+class OffspringProduced(ProgressEvent):
+    program_id: str
+    parent_id: str
+    island_id: Optional[int]
+
+
+@dataclass
+class EvaluationCompleted(ProgressEvent):
+    program_id: str
+    status: str
+    fitness_scores: Dict[str, Any]
+
+
+@dataclass
+class NewBestProgram(ProgressEvent):
+    program_id: str
+    fitness_scores: Dict[str, Any]
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", event_types: Sequence[Type[ProgressEvent]], maxsize: int, overflow: str):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.bus = bus
+        self.event_types = tuple(event_types)
+        self.maxsize = max(1, maxsize)
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+        self._buffer: Deque[ProgressEvent] = deque()
+        self._ready = asyncio.Event()
+
+    def offer(self, event: ProgressEvent) -> None:
+        if self.overflow == "coalesce":
+            for index, queued in enumerate(self._buffer):
+                if type(queued) is type(event):
+                    del self._buffer[index]
+                    self.dropped += 1
+                    break
+        if len(self._buffer) >= self.maxsize:
+            self.dropped += 1
+            if self.overflow == "drop_newest":
+                return
+            self._buffer.popleft()
+        self._buffer.append(event)
+        self._ready.set()
+
+    def get_nowait(self) -> Optional[ProgressEvent]:
+        if not self._buffer:
+            return None
+        event = self._buffer.popleft()
+        if not self._buffer:
+            self._ready.clear()
+        return event
+
+    async def get(self) -> Optional[ProgressEvent]:
+        """The next event; None once the subscription is closed and drained."""
+        while not self._buffer:
+            if self.closed:
+                return None
+            await self._ready.wait()
+        return self.get_nowait()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ProgressEvent:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+        self._wanted: Dict[type, int] = {}
+        self._callback_tasks: Dict[Subscription, asyncio.Task] = {}
+        self.published = 0
+
+    def subscribe(self, event_types: Sequence[Type[ProgressEvent]] = (ProgressEvent,), maxsize: int = 100,
+                  overflow: str = "drop_oldest") -> Subscription:
+        subscription = Subscription(self, event_types, maxsize, overflow)
+        self._subscriptions.append(subscription)
+        self._wanted.clear()
+        return subscription
+
+    def subscribe_callback(self, callback: Callable[[ProgressEvent], Awaitable[None]],
+                           event_types: Sequence[Type[ProgressEvent]] = (ProgressEvent,), maxsize: int = 100,
+                           overflow: str = "coalesce") -> Subscription:
+        """Runs `callback` for each event in a background task; slow callbacks only affect their own buffer."""
+        subscription = self.subscribe(event_types, maxsize, overflow)
+
+        async def deliver():
+            async for event in subscription:
+                try:
+                    await callback(event)
+                except Exception as e:
+                    logger.error(f"Progress event subscriber failed on {type(event).__name__}: {e}", exc_info=True)
+
+        self._callback_tasks[subscription] = asyncio.create_task(deliver())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+            self._wanted.clear()
+        self._callback_tasks.pop(subscription, None)
+
+    def wants(self, event_type: Type[ProgressEvent]) -> bool:
+        """Whether any subscriber receives events of this type; cached until subscriptions change."""
+        wanted = self._wanted.get(event_type)
+        if wanted is None:
+            wanted = sum(1 for s in self._subscriptions if issubclass(event_type, s.event_types))
+            self._wanted[event_type] = wanted
+        return wanted > 0
+
+    def publish(self, event: ProgressEvent) -> None:
+        if not self._subscriptions:
+            return
+        self.published += 1
+        for subscription in self._subscriptions:
+            if isinstance(event, subscription.event_types):
+                subscription.offer(event)
+
+    async def close(self) -> None:
+        """Closes every subscription and waits for callback subscribers to handle what is buffered."""
+        tasks = list(self._callback_tasks.values())
+        for subscription in list(self._subscriptions):
+            subscription.close()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,210 @@
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass, asdict, field
+from typing import Callable, Dict, Iterable, List, Optional, Any, Tuple
+
+from core.fitness import fitness_key
+from core.interfaces import Program, LLMCallRecord
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TelemetryRollup:
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_seconds: float = 0.0
+    retries: int = 0
+    cost_usd: float = 0.0
+    calls_applied: int = 0
+    calls_rejected: int = 0
+    calls_failed: int = 0
+    calls_improved: int = 0
+    offspring: int = 0
+    programs_evaluated: int = 0
+    evaluation_seconds: float = 0.0
+    models: Dict[str, int] = field(default_factory=dict)
+
+    def add_call(self, record: LLMCallRecord) -> None:
+        self.llm_calls += 1
+        self.prompt_tokens += record.prompt_tokens
+        self.completion_tokens += record.completion_tokens
+        self.llm_seconds += record.latency_seconds
+        self.retries += record.retries
+        self.cost_usd += record.cost_usd or 0.0
+        self.models[record.model] = self.models.get(record.model, 0) + 1
+        if record.outcome == "applied":
+            self.calls_applied += 1
+        elif record.outcome == "rejected":
+            self.calls_rejected += 1
+        elif record.outcome == "failed":
+            self.calls_failed += 1
+
+    def merge(self, other: "TelemetryRollup") -> None:
+        for name, value in asdict(other).items():
+            if name == "models":
+                for model, count in value.items():
+                    self.models[model] = self.models.get(model, 0) + count
+            else:
+                setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["total_tokens"] = self.prompt_tokens + self.completion_tokens
+        data["improvement_yield"] = self.calls_improved / self.llm_calls if self.llm_calls else 0.0
+        data["tokens_per_offspring"] = data["total_tokens"] / self.offspring if self.offspring else 0.0
+        return data
+
+
+class TelemetryCollector:
+    """
+    Aggregates per-call LLM telemetry and evaluation time per generation and per island.
+    Calls are recorded when their outcome (applied/rejected/failed) is known; whether the
+    child improved on its parent is folded in once the child has been evaluated. Only the
+    rollups cover the whole run: individual calls are kept for the last `max_calls` calls.
+
+    Each call is also passed once, as a row, to every function in `call_listeners` (the run
+    history export). Applied calls are passed on once all of their children have been
+    evaluated, so the row says whether they improved on the parent; `flush_calls` passes on the
+    rest at the end of a run.
+    """
+
+    def __init__(self, max_calls: int = 1000):
+        self._calls: "deque[Tuple[LLMCallRecord, int, Optional[int], Optional[str]]]" = deque(maxlen=max(0, max_calls))
+        self.calls_recorded = 0
+        self.call_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        # id(record) -> [row without the record's fields, record, ids of the children not evaluated yet]
+        self._unsettled: Dict[int, List[Any]] = {}
+        self._by_generation: Dict[int, TelemetryRollup] = {}
+        self._by_island: Dict[Optional[int], TelemetryRollup] = {}
+        self._parent_keys: Dict[str, Tuple[float, float]] = {}
+
+    def _rollups(self, generation: int, island_id: Optional[int]) -> List[TelemetryRollup]:
+        return [
+            self._by_generation.setdefault(generation, TelemetryRollup()),
+            self._by_island.setdefault(island_id, TelemetryRollup()),
+        ]
+
+    def record_calls(self, records: List[LLMCallRecord], generation: int, island_id: Optional[int], program_id: Optional[str] = None) -> None:
+        """`program_id` is the child the calls produced; comma-separated ids for a multi-variant call."""
+        for record in records:
+            for rollup in self._rollups(generation, island_id):
+                rollup.add_call(record)
+            self._calls.append((record, generation, island_id, program_id))
+            if self.call_listeners:
+                row = {"call_id": self.calls_recorded, "generation": generation, "island_id": island_id, "program_id": program_id}
+                if record.outcome == "applied" and program_id:
+                    self._unsettled[id(record)] = [row, record, set(program_id.split(","))]
+                else:
+                    self._emit(row, record)
+            self.calls_recorded += 1
+
+    def _emit(self, row: Dict[str, Any], record: LLMCallRecord) -> None:
+        row = dict(asdict(record), **row)
+        for listener in self.call_listeners:
+            listener(row)
+
+    def flush_calls(self) -> None:
+        """Passes on the calls whose children were never evaluated."""
+        for row, record, _ in self._unsettled.values():
+            self._emit(row, record)
+        self._unsettled.clear()
+
+    def register_offspring(self, child: Program, parent: Program) -> None:
+        """Remembers the parent's fitness so the child's evaluation can be judged as an improvement."""
+        self._parent_keys[child.id] = fitness_key(parent)
+        for rollup in self._rollups(child.generation, child.island_id):
+            rollup.offspring += 1
+
+    def record_evaluation(self, program: Program, seconds: float) -> None:
+        for rollup in self._rollups(program.generation, program.island_id):
+            rollup.programs_evaluated += 1
+            rollup.evaluation_seconds += seconds
+
+        parent_key = self._parent_keys.pop(program.id, None)
+        if parent_key is not None and program.llm_calls:
+            improved = program.fitness_scores.get("correctness", 0.0) > 0.0 and fitness_key(program) > parent_key
+            # A multi-variant call is shared by several children; it counts as improved once.
+            newly_improved = 0
+            for record in program.llm_calls:
+                if improved and not record.improved_fitness:
+                    newly_improved += 1
+                record.improved_fitness = bool(record.improved_fitness) or improved
+            if newly_improved:
+                for rollup in self._rollups(program.generation, program.island_id):
+                    rollup.calls_improved += newly_improved
+        for record in program.llm_calls:
+            unsettled = self._unsettled.get(id(record))
+            if unsettled is not None:
+                unsettled[2].discard(program.id)
+                if not unsettled[2]:
+                    del self._unsettled[id(record)]
+                    self._emit(unsettled[0], record)
+
+    def forget(self, program_ids: Iterable[str]) -> None:
+        """
+        Drops what is kept for programs that will not be evaluated any more (evicted from the
+        database): their parents' fitness, and their place among the children a call waits for.
+        """
+        program_ids = set(program_ids)
+        for program_id in program_ids:
+            self._parent_keys.pop(program_id, None)
+        for key, (row, record, pending) in list(self._unsettled.items()):
+            if pending & program_ids:
+                pending -= program_ids
+                if not pending:
+                    del self._unsettled[key]
+                    self._emit(row, record)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Rollups and pending improvement checks, for checkpoints. Individual call entries are not kept."""
+        return {
+            "by_generation": [[gen, asdict(rollup)] for gen, rollup in self._by_generation.items()],
+            "by_island": [[island, asdict(rollup)] for island, rollup in self._by_island.items()],
+            "parent_keys": {program_id: list(key) for program_id, key in self._parent_keys.items()},
+            "calls_recorded": self.calls_recorded,
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._by_generation = {gen: TelemetryRollup(**data) for gen, data in state["by_generation"]}
+        self._by_island = {island: TelemetryRollup(**data) for island, data in state["by_island"]}
+        self._parent_keys = {program_id: tuple(key) for program_id, key in state["parent_keys"].items()}
+        self.calls_recorded = state.get("calls_recorded", 0)  # Call ids continue where the checkpointed run stopped
+
+    @property
+    def calls(self) -> List[Dict[str, Any]]:
+        """The most recent calls, oldest first."""
+        entries = []
+        for record, generation, island_id, program_id in self._calls:
+            entry = asdict(record)
+            entry.update({"generation": generation, "island_id": island_id, "program_id": program_id})
+            entries.append(entry)
+        return entries
+
+    def per_generation(self) -> Dict[int, Dict[str, Any]]:
+        return {gen: rollup.to_dict() for gen, rollup in sorted(self._by_generation.items())}
+
+    def per_island(self) -> Dict[Optional[int], Dict[str, Any]]:
+        return {island: rollup.to_dict() for island, rollup in self._by_island.items()}
+
+    def totals(self) -> Dict[str, Any]:
+        total = TelemetryRollup()
+        for rollup in self._by_generation.values():
+            total.merge(rollup)
+        return total.to_dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "totals": self.totals(),
+            "per_generation": self.per_generation(),
+            "per_island": {str(island): data for island, data in self.per_island().items()},
+            "calls_recorded": self.calls_recorded,
+            "calls": self.calls,
+        }
+
+    def export_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Exported LLM telemetry for {self.calls_recorded} calls ({len(self._calls)} most recent listed) to {path}")
@@ -1,27 +1,61 @@
                         
-from typing import Optional, Dict, Any
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple, Deque
 import logging
 
 from core.interfaces import PromptDesignerInterface, Program, TaskDefinition, BaseAgent
+from code_generator.variants import VARIANT_HEADER
+from prompt_designer.budget import (
+    PromptBudgetUsage, estimate_tokens, truncate_middle, truncate_to_tokens, condense_errors, sample_examples
+)
 
 logger = logging.getLogger(__name__)
 
 class PromptDesignerAgent(PromptDesignerInterface, BaseAgent):
-    def __init__(self, task_definition: TaskDefinition):
-        super().__init__()
+    def __init__(self, task_definition: TaskDefinition, config: Optional[Dict[str, Any]] = None):
+        super().__init__(config)
         self.task_definition = task_definition
-        logger.info(f"PromptDesignerAgent initialized for task: {self.task_definition.id}")
+        self.token_budget = self.get_setting("PROMPT_TOKEN_BUDGET")
+        self._examples_block_cache: Optional[Tuple[str, int, int]] = None
+        self.budget_usage: Deque[PromptBudgetUsage] = deque(maxlen=self.get_setting("PROMPT_BUDGET_LOG_SIZE"))
+        logger.info(f"PromptDesignerAgent initialized for task: {self.task_definition.id} (token budget per prompt: {self.token_budget})")
+
+    @property
+    def last_budget_usage(self) -> Optional[PromptBudgetUsage]:
+        return self.budget_usage[-1] if self.budget_usage else None
+
+    def _record_budget_usage(self, usage: PromptBudgetUsage, prompt: str, sections: Dict[str, str]) -> None:
+        usage.used_tokens = estimate_tokens(prompt)
+        usage.sections = {name: estimate_tokens(text) for name, text in sections.items()}
+        self.budget_usage.append(usage)
+        if usage.over_budget:
+            logger.warning(f"{usage.prompt_type} prompt uses ~{usage.used_tokens} tokens, over the budget of {usage.budget_tokens} (sections: {usage.sections}).")
+        else:
+            logger.debug(f"{usage.prompt_type} prompt uses ~{usage.used_tokens}/{usage.budget_tokens} tokens (sections: {usage.sections}).")
+
+    def get_budget_summary(self) -> Dict[str, Any]:
+        """Aggregated token budget use over the recorded prompts, per prompt type."""
+        summary: Dict[str, Dict[str, Any]] = {}
+        for usage in self.budget_usage:
+            entry = summary.setdefault(usage.prompt_type, {"prompts": 0, "used_tokens": 0, "max_tokens": 0, "over_budget": 0, "truncated": 0})
+            entry["prompts"] += 1
+            entry["used_tokens"] += usage.used_tokens
+            entry["max_tokens"] = max(entry["max_tokens"], usage.used_tokens)
+            entry["over_budget"] += int(usage.over_budget)
+            entry["truncated"] += int(usage.truncated)
+        for entry in summary.values():
+            entry["mean_tokens"] = entry["used_tokens"] / entry["prompts"]
+        return summary
 
     def design_initial_prompt(self) -> str:
         logger.info(f"Designing initial prompt for task: {self.task_definition.id}")
-                                                           
+        examples_block, examples_included, examples_total = self._examples_block()
         prompt = (
             f"You are an expert Python programmer. Your task is to write a Python function based on the following specifications.\n\n"
             f"Task Description: {self.task_definition.description}\n\n"
             f"Function to Implement: `{self.task_definition.function_name_to_evolve}`\n\n"
             f"Input/Output Examples:\n"
-                                         
-            f"{self._format_input_output_examples()}\n\n"
+            f"{examples_block}\n\n"
             f"Evaluation Criteria: {self.task_definition.evaluation_criteria}\n\n"
             f"Allowed Standard Library Imports: {self.task_definition.allowed_imports}. Do not use any other external libraries or packages.\n\n"
             f"Your Response Format:\n"
@@ -29,20 +63,58 @@ class PromptDesignerAgent(PromptDesignerInterface, BaseAgent):
             f"The code should be self-contained or rely only on the allowed imports. "
             f"Do not include any surrounding text, explanations, comments outside the function, or markdown code fences (like ```python or ```)."
         )
+        usage = PromptBudgetUsage("initial", self.token_budget, examples_included=examples_included,
+                                  examples_total=examples_total, truncated=examples_included < examples_total)
+        self._record_budget_usage(usage, prompt, {"description": self.task_definition.description, "examples": examples_block})
         logger.debug(f"Designed initial prompt:\n--PROMPT START--\n{prompt}\n--PROMPT END--")
         return prompt
 
-    def _format_input_output_examples(self) -> str:
-        if not self.task_definition.input_output_examples:
-            return "No input/output examples provided."
+    def _examples_block(self) -> Tuple[str, int, int]:
+        """The formatted examples block, built once per task: (text, examples included, examples total)."""
+        if self._examples_block_cache is None:
+            self._examples_block_cache = self._format_input_output_examples()
+        return self._examples_block_cache
+
+    def _format_input_output_examples(self) -> Tuple[str, int, int]:
+        examples = self.task_definition.input_output_examples
+        if not examples:
+            return "No input/output examples provided.", 0, 0
+        max_chars = self.get_setting("PROMPT_MAX_EXAMPLE_CHARS")
+        max_tokens = self.get_setting("PROMPT_EXAMPLES_MAX_TOKENS")
         formatted_examples = []
-        for i, example in enumerate(self.task_definition.input_output_examples):
-            input_str = str(example.get('input'))
-            output_str = str(example.get('output'))
-            formatted_examples.append(f"Example {i+1}:\n  Input: {input_str}\n  Expected Output: {output_str}")
-        return "\n".join(formatted_examples)
+        used_tokens = 0
+        for i in sample_examples(examples, self.get_setting("PROMPT_MAX_EXAMPLES")):
+            input_str = truncate_middle(str(examples[i].get('input')), max_chars)
+            output_str = truncate_middle(str(examples[i].get('output')), max_chars)
+            formatted = f"Example {i+1}:\n  Input: {input_str}\n  Expected Output: {output_str}"
+            example_tokens = estimate_tokens(formatted)
+            if formatted_examples and used_tokens + example_tokens > max_tokens:
+                break
+            formatted_examples.append(formatted)
+            used_tokens += example_tokens
+        if len(formatted_examples) < len(examples):
+            formatted_examples.append(f"({len(examples) - len(formatted_examples)} further examples omitted; the evaluation uses all {len(examples)}.)")
+            return "\n".join(formatted_examples), len(formatted_examples) - 1, len(examples)
+        return "\n".join(formatted_examples), len(examples), len(examples)
 
-    def _format_evaluation_feedback(self, program: Program, evaluation_feedback: Optional[Dict[str, Any]]) -> str:
+    def _format_errors(self, errors: List[str], token_budget: int) -> Tuple[List[str], bool]:
+        """Deduplicated, truncated errors that fit the token budget; the flag reports whether anything was cut."""
+        condensed = condense_errors(errors, self.get_setting("PROMPT_MAX_ERROR_CHARS"))
+        truncated = len(condensed) < len(errors) or any(len(str(e)) > self.get_setting("PROMPT_MAX_ERROR_CHARS") for e in errors)
+        included = []
+        remaining = max(token_budget, 0)
+        for error in condensed:
+            error_tokens = estimate_tokens(error)
+            if error_tokens > remaining:
+                if remaining >= 32:
+                    included.append(truncate_to_tokens(error, remaining))
+                truncated = True
+                break
+            included.append(error)
+            remaining -= error_tokens
+        return included, truncated
+
+    def _format_evaluation_feedback(self, program: Program, evaluation_feedback: Optional[Dict[str, Any]], error_token_budget: Optional[int] = None, usage: Optional[PromptBudgetUsage] = None) -> str:
         if not evaluation_feedback:
             return "No detailed evaluation feedback is available for the previous version of this code. Attempt a general improvement or refinement."
 
@@ -58,11 +130,18 @@ class PromptDesignerAgent(PromptDesignerInterface, BaseAgent):
         if runtime is not None:
             feedback_parts.append(f"- Runtime: {runtime:.2f} ms")
         
+        if error_token_budget is None:
+            error_token_budget = self.token_budget
         if errors:
-            error_messages = "\n".join([f"  - {e}" for e in errors])
+            included_errors, truncated = self._format_errors(errors, error_token_budget)
+            if usage is not None:
+                usage.errors_total = len(errors)
+                usage.errors_included = len(included_errors)
+                usage.truncated = usage.truncated or truncated
+            error_messages = "\n".join([f"  - {e}" for e in included_errors])
             feedback_parts.append(f"- Errors Encountered During Evaluation:\n{error_messages}")
         elif stderr:
-            feedback_parts.append(f"- Standard Error Output During Execution:\n{stderr}")
+            feedback_parts.append(f"- Standard Error Output During Execution:\n{truncate_to_tokens(stderr, error_token_budget)}")
         elif correctness is not None and correctness < 1.0:
             feedback_parts.append("- The code did not achieve 100% correctness but produced no explicit errors or stderr. Review logic for test case failures.")
         elif correctness == 1.0:
@@ -73,13 +152,18 @@ class PromptDesignerAgent(PromptDesignerInterface, BaseAgent):
 
         return "Summary of the previous version's evaluation:\n" + "\n".join(feedback_parts)
 
-    def design_mutation_prompt(self, program: Program, evaluation_feedback: Optional[Dict[str, Any]] = None) -> str:
-        logger.info(f"Designing mutation prompt for program: {program.id} (Generation: {program.generation})")
-        logger.debug(f"Parent program code (to be mutated):\n{program.code}")
-        
-        feedback_summary = self._format_evaluation_feedback(program, evaluation_feedback)
-        logger.debug(f"Formatted evaluation feedback for prompt:\n{feedback_summary}")
+    @staticmethod
+    def _variant_instructions(num_variants: int) -> str:
+        if num_variants <= 1:
+            return ""
+        return (
+            f"\n\nProvide exactly {num_variants} independent variants. "
+            f"Start each variant with a line of the form `{VARIANT_HEADER} <n>` (n = 1..{num_variants}) followed by that variant's diff blocks. "
+            "Each variant is applied to the original code on its own, so a variant must not depend on changes made in another one. "
+            "Make the variants genuinely different from each other."
+        )
 
+    def _render_mutation_prompt(self, program: Program, feedback_summary: str, num_variants: int) -> str:
         diff_instructions = (
             "Your Response Format:\n"
             "Propose improvements to the 'Current Code' below by providing your changes as a sequence of diff blocks. "
@@ -93,6 +177,7 @@ class PromptDesignerAgent(PromptDesignerInterface, BaseAgent):
             "- If you are adding new code where nothing existed, the SEARCH block can be a comment indicating the location, or an adjacent existing line."
             "- If you are deleting code, the REPLACE block should be empty."
             "- Provide all suggested changes as one or more such diff blocks. Do not include any other text, explanations, or markdown outside these blocks."
+            f"{self._variant_instructions(num_variants)}"
         )
 
         prompt = (
@@ -109,17 +194,28 @@ class PromptDesignerAgent(PromptDesignerInterface, BaseAgent):
             f"Consider the original evaluation criteria: {self.task_definition.evaluation_criteria}\n\n"
             f"{diff_instructions}"
         )
-        logger.debug(f"Designed mutation prompt (requesting diff):\n--PROMPT START--\n{prompt}\n--PROMPT END--")
         return prompt
 
-    def design_bug_fix_prompt(self, program: Program, error_message: str, execution_output: Optional[str] = None) -> str:
-        logger.info(f"Designing bug-fix prompt for program: {program.id} (Generation: {program.generation})")
-        logger.debug(f"Buggy program code:\n{program.code}")
-        logger.debug(f"Primary error message: {error_message}")
-        if execution_output:
-            logger.debug(f"Additional execution output (stdout/stderr): {execution_output}")
+    def design_mutation_prompt(self, program: Program, evaluation_feedback: Optional[Dict[str, Any]] = None, num_variants: int = 1) -> str:
+        logger.info(f"Designing mutation prompt for program: {program.id} (Generation: {program.generation})")
+        logger.debug(f"Parent program code (to be mutated):\n{program.code}")
+        
+        usage = PromptBudgetUsage("mutation", self.token_budget)
+        # Everything but the error list is fixed; the errors get whatever budget is left.
+        feedback_without_errors = self._format_evaluation_feedback(program, {k: v for k, v in (evaluation_feedback or {}).items() if k != "errors"})
+        fixed_tokens = estimate_tokens(self._render_mutation_prompt(program, feedback_without_errors, num_variants))
+        feedback_summary = self._format_evaluation_feedback(program, evaluation_feedback, error_token_budget=self.token_budget - fixed_tokens, usage=usage)
+        logger.debug(f"Formatted evaluation feedback for prompt:\n{feedback_summary}")
+        prompt = self._render_mutation_prompt(program, feedback_summary, num_variants)
+        self._record_budget_usage(usage, prompt, {"description": self.task_definition.description, "code": program.code, "feedback": feedback_summary})
+        logger.debug(f"Designed mutation prompt (requesting diff):\n--PROMPT START--\n{prompt}\n--PROMPT END--")
+        return prompt
 
-        output_segment = f"Execution Output (stdout/stderr that might be relevant):\n{execution_output}\n" if execution_output else "No detailed execution output was captured beyond the error message itself.\n"
+    def _render_bug_fix_prompt(self, program: Program, error_message: str, execution_output: Optional[str], num_variants: int) -> str:
+        if execution_output is not None:
+            output_segment = f"Execution Output (stdout/stderr that might be relevant):\n{execution_output}\n"
+        else:
+            output_segment = "No detailed execution output was captured beyond the error message itself.\n"
         
         diff_instructions = (
             "Your Response Format:\n"
@@ -132,6 +228,7 @@ class PromptDesignerAgent(PromptDesignerInterface, BaseAgent):
             ">>>>>>> REPLACE\n\n"
             "- The SEARCH block must be an *exact* segment from the 'Buggy Code'."
             "- Provide all suggested changes as one or more such diff blocks. Do not include any other text, explanations, or markdown outside these blocks."
+            f"{self._variant_instructions(num_variants)}"
         )
 
         prompt = (
@@ -148,6 +245,37 @@ class PromptDesignerAgent(PromptDesignerInterface, BaseAgent):
             f"The corrected function must adhere to the overall task description and allowed imports.\n\n"
             f"{diff_instructions}"
         )
+        return prompt
+
+    def design_bug_fix_prompt(self, program: Program, error_message: str, execution_output: Optional[str] = None, num_variants: int = 1) -> str:
+        logger.info(f"Designing bug-fix prompt for program: {program.id} (Generation: {program.generation})")
+        logger.debug(f"Buggy program code:\n{program.code}")
+        logger.debug(f"Primary error message: {error_message}")
+        if execution_output:
+            logger.debug(f"Additional execution output (stdout/stderr): {execution_output}")
+
+        usage = PromptBudgetUsage("bug_fix", self.token_budget, errors_total=1 + int(bool(execution_output)))
+        # The code has to stay verbatim for SEARCH blocks to match, so only the error text is trimmed:
+        # it gets what the prompt rendered without any error text leaves of the budget.
+        fixed_tokens = estimate_tokens(self._render_bug_fix_prompt(program, "", "" if execution_output else None, num_variants))
+        remaining_tokens = self.token_budget - fixed_tokens
+        error_budget = max(remaining_tokens // 2 if execution_output else remaining_tokens, 64)
+        trimmed_error = truncate_to_tokens(truncate_middle(error_message, self.get_setting("PROMPT_MAX_ERROR_CHARS")), error_budget)
+        usage.truncated = trimmed_error != error_message
+        if execution_output:
+            output_budget = max(remaining_tokens - estimate_tokens(trimmed_error), 64)
+            trimmed_output = truncate_to_tokens(truncate_middle(execution_output, self.get_setting("PROMPT_MAX_ERROR_CHARS")), output_budget)
+            usage.truncated = usage.truncated or trimmed_output != execution_output
+            # The primary error is often repeated verbatim inside the captured output.
+            if trimmed_output.strip() == trimmed_error.strip():
+                trimmed_output = None
+        else:
+            trimmed_output = None
+        usage.errors_included = 1 + int(bool(trimmed_output))
+        error_message = trimmed_error
+
+        prompt = self._render_bug_fix_prompt(program, error_message, trimmed_output, num_variants)
+        self._record_budget_usage(usage, prompt, {"description": self.task_definition.description, "code": program.code, "errors": error_message + (trimmed_output or "")})
         logger.debug(f"Designed bug-fix prompt (requesting diff):\n--PROMPT START--\n{prompt}\n--PROMPT END--")
         return prompt
 
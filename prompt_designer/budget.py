@@ -0,0 +1,98 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_ADDRESS_PATTERN = re.compile(r"0x[0-9a-fA-F]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate. Word and punctuation runs approximate BPE tokens for code;
+    the character-based bound catches long identifiers and non-ASCII text.
+    """
+    if not text:
+        return 0
+    return max(len(_TOKEN_PATTERN.findall(text)), len(text) // 4)
+
+
+def truncate_middle(text: str, max_chars: int) -> str:
+    """Keeps the head and the tail of long text; for tracebacks the tail holds the actual exception."""
+    if len(text) <= max_chars:
+        return text
+    marker = f"\n... [{len(text) - max_chars} characters omitted] ...\n"
+    head = max_chars // 3
+    tail = max_chars - head
+    return text[:head] + marker + text[-tail:]
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # Shrink by the observed chars-per-token ratio until the estimate fits.
+    max_chars = len(text)
+    while max_chars > 0 and estimate_tokens(truncate_middle(text, max_chars)) > max_tokens:
+        max_chars = int(max_chars * 0.8)
+    return truncate_middle(text, max_chars)
+
+
+def condense_errors(errors: Sequence[str], max_chars_per_error: int) -> List[str]:
+    """Drops duplicate errors (ignoring whitespace and memory addresses) and truncates long dumps."""
+    condensed = []
+    seen = set()
+    for error in errors:
+        text = str(error)
+        key = _ADDRESS_PATTERN.sub("0x?", _WHITESPACE_PATTERN.sub(" ", text).strip())
+        if key in seen:
+            continue
+        seen.add(key)
+        condensed.append(truncate_middle(text, max_chars_per_error))
+    return condensed
+
+
+def sample_examples(examples: Sequence[Dict[str, Any]], limit: int) -> List[int]:
+    """
+    Picks up to `limit` representative example indices: one per distinct input/output
+    shape first, then evenly spaced fill. Returned indices keep the original order.
+    """
+    if len(examples) <= limit:
+        return list(range(len(examples)))
+    chosen: List[int] = []
+    seen_shapes = set()
+    for i, example in enumerate(examples):
+        shape = (type(example.get("input")).__name__, type(example.get("output")).__name__,
+                 len(example.get("input")) if isinstance(example.get("input"), (list, dict, str)) else None)
+        if shape not in seen_shapes:
+            seen_shapes.add(shape)
+            chosen.append(i)
+            if len(chosen) == limit:
+                return sorted(chosen)
+    step = len(examples) / float(limit)
+    for k in range(limit):
+        index = int(k * step)
+        while index in chosen and index < len(examples) - 1:
+            index += 1
+        if index not in chosen:
+            chosen.append(index)
+        if len(chosen) == limit:
+            break
+    return sorted(chosen)
+
+
+@dataclass
+class PromptBudgetUsage:
+    """How one prompt spent its token budget."""
+    prompt_type: str
+    budget_tokens: int
+    used_tokens: int = 0
+    sections: Dict[str, int] = field(default_factory=dict)
+    examples_included: int = 0
+    examples_total: int = 0
+    errors_included: int = 0
+    errors_total: int = 0
+    truncated: bool = False
+
+    @property
+    def over_budget(self) -> bool:
+        return self.used_tokens > self.budget_tokens
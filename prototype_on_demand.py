@@ -80,8 +80,19 @@ async def main():
     parser.add_argument("brief", nargs="?", help="Short problem description")
     parser.add_argument("-f", "--function-name", dest="func_name", help="Name of the function to evolve")
     parser.add_argument("-i", "--imports", dest="imports", help="Comma separated list of allowed imports")
+    parser.add_argument("--offline", action="store_true", help="Use the deterministic local LLM backend instead of a live provider")
+    parser.add_argument("--resume", metavar="CHECKPOINT_DIR", help="Continue a checkpointed run; the brief and tests are taken from the checkpoint")
     args = parser.parse_args()
 
+    if args.offline:
+        settings.LLM_BACKEND = "local"
+        logger.info("Running with the offline local LLM backend")
+
+    if args.resume:
+        manager = await TaskManagerAgent.from_checkpoint(args.resume)
+        await run_and_save_best(manager)
+        return
+
     brief = args.brief or input("Enter task brief: ")
     logger.info("Brief provided: %s", brief)
 
@@ -110,6 +121,11 @@ async def main():
 
     logger.info("Starting TaskManagerAgent for task %s", task_id)
     manager = TaskManagerAgent(task_definition=task)
+    await run_and_save_best(manager)
+
+
+async def run_and_save_best(manager: TaskManagerAgent) -> None:
+    task_id = manager.task_definition.id
     best = await manager.execute()
 
     if best:
@@ -1,19 +1,43 @@
 import random
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
+from core.fitness import fitness_key
 from core.interfaces import SelectionControllerInterface, Program, BaseAgent
 from config import settings
+from core.minhash import signature_similarity
 
 logger = logging.getLogger(__name__)
 
+def survivor_key(program: Program) -> Tuple[float, float, int]:
+    """fitness_key, then the older generation: the ranking used to pick migrants and survivors."""
+    return fitness_key(program) + (-program.generation,)
+
+def fitness_improved(new_key: Tuple[float, float], old_key: Optional[Tuple[float, float]], runtime_tolerance: float) -> bool:
+    """
+    Compares (correctness, runtime_ms) keys: higher correctness always counts; at equal correctness
+    a runtime counts only when lower by more than runtime_tolerance (relative), so timing noise is
+    not mistaken for progress.
+    """
+    if old_key is None:
+        return True
+    new_correctness, new_runtime = new_key
+    old_correctness, old_runtime = old_key
+    if new_correctness != old_correctness:
+        return new_correctness > old_correctness
+    if old_runtime == float('inf'):
+        return new_runtime < old_runtime
+    return new_runtime < old_runtime * (1.0 - runtime_tolerance)
+
 class Island:
     def __init__(self, island_id: int, initial_programs: Optional[List[Program]] = None):
         self.island_id = island_id
         self.programs = initial_programs or []
         self.generation = 0  # Island's internal generation counter
         self.best_fitness = 0.0
+        self.best_runtime_ms = float('inf')
         self.last_improvement_generation = 0
+        self.frozen = False  # Frozen islands are skipped by parent selection (see task_manager.run_control)
         
         if settings.DEBUG:
             logger.debug(f"Initializing Island {island_id} with {len(self.programs)} programs")
@@ -48,28 +72,39 @@ class Island:
                         f"Generation={best_program.generation}")
         return best_program
 
-    def update_metrics(self):
+    def update_metrics(self, runtime_tolerance: Optional[float] = None):
+        if runtime_tolerance is None:
+            runtime_tolerance = settings.CONVERGENCE_RUNTIME_TOLERANCE
         best_program = self.get_best_program()
         if best_program:
-            current_best = best_program.fitness_scores.get("correctness", 0.0)
-            if current_best > self.best_fitness:
-                self.best_fitness = current_best
+            current_best = (best_program.fitness_scores.get("correctness", 0.0),
+                            best_program.fitness_scores.get("runtime_ms", float('inf')))
+            if fitness_improved(current_best, (self.best_fitness, self.best_runtime_ms), runtime_tolerance):
+                self.best_fitness, self.best_runtime_ms = current_best
                 self.last_improvement_generation = self.generation
                 if settings.DEBUG:
                     logger.debug(f"Island {self.island_id} new best fitness: {self.best_fitness} "
-                               f"at generation {self.generation}")
+                               f"(runtime {self.best_runtime_ms} ms) at generation {self.generation}")
         self.generation += 1
         if settings.DEBUG:
             logger.debug(f"Island {self.island_id} generation incremented to {self.generation}")
 
 class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
-    def __init__(self):
-        super().__init__()
-        self.elitism_count = settings.ELITISM_COUNT
-        self.num_islands = settings.NUM_ISLANDS
-        self.migration_interval = settings.MIGRATION_INTERVAL
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        super().__init__(config)
+        self.elitism_count = self.get_setting("ELITISM_COUNT")
+        self.num_islands = self.get_setting("NUM_ISLANDS")
+        self.migration_interval = self.get_setting("MIGRATION_INTERVAL")
+        self.runtime_tolerance = self.get_setting("CONVERGENCE_RUNTIME_TOLERANCE")
         self.islands: Dict[int, Island] = {}
         self.current_generation = 0
+        self.rng = random.Random(self.get_setting("RANDOM_SEED"))
+        self.near_duplicate_selection = self.get_setting("NEAR_DUPLICATE_SELECTION")
+        if self.near_duplicate_selection not in ("off", "penalize", "skip"):
+            raise ValueError(f"Unknown NEAR_DUPLICATE_SELECTION: {self.near_duplicate_selection}")
+        self.near_duplicate_threshold = self.get_setting("NEAR_DUPLICATE_THRESHOLD")
+        self.near_duplicates: Optional[Any] = None  # The database's NearDuplicateIndex, when it keeps one
+        self.near_duplicates_held_back = 0  # Survivor candidates that lost their slot to a near-duplicate
         logger.info(f"SelectionControllerAgent initialized with {self.num_islands} islands and elitism_count: {self.elitism_count}")
 
     def initialize_islands(self, initial_programs: List[Program]) -> None:
@@ -100,8 +135,12 @@ class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
             logger.warning(f"Requested {num_parents} parents, but population size is only {len(population)}. Selecting all individuals as parents.")
             return list(population)
 
-        # Select a random island
-        island_id = random.randint(0, self.num_islands - 1)
+        # Select a random island, skipping frozen (stagnant) ones
+        active_island_ids = [island_id for island_id, island in self.islands.items() if not island.frozen]
+        if active_island_ids and len(active_island_ids) < len(self.islands):
+            island_id = self.rng.choice(active_island_ids)
+        else:
+            island_id = self.rng.randint(0, self.num_islands - 1)
         island = self.islands[island_id]
         island_programs = island.programs
 
@@ -152,7 +191,7 @@ class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
 
         if total_fitness <= 0.0001 * len(roulette_candidates):
             num_to_select_randomly = min(remaining_slots, len(roulette_candidates))
-            random_parents = random.sample(roulette_candidates, num_to_select_randomly)
+            random_parents = self.rng.sample(roulette_candidates, num_to_select_randomly)
             parents.extend(random_parents)
             if settings.DEBUG:
                 logger.debug(f"Selected {len(random_parents)} random parents due to low fitness")
@@ -160,7 +199,7 @@ class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
             for _ in range(remaining_slots):
                 if not roulette_candidates:
                     break
-                pick = random.uniform(0, total_fitness)
+                pick = self.rng.uniform(0, total_fitness)
                 current_sum = 0
                 chosen_parent = None
                 for program in roulette_candidates:
@@ -176,7 +215,7 @@ class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
                                    f"with correctness {chosen_parent.fitness_scores.get('correctness')}")
                 else:
                     if roulette_candidates:
-                        fallback_parent = random.choice(roulette_candidates)
+                        fallback_parent = self.rng.choice(roulette_candidates)
                         parents.append(fallback_parent)
                         roulette_candidates.remove(fallback_parent)
                         if settings.DEBUG:
@@ -184,6 +223,17 @@ class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
                                        f"with correctness {fallback_parent.fitness_scores.get('correctness')}")
         return parents
 
+    def sample_parent(self, population: List[Program], pool_size: int) -> Optional[Program]:
+        """
+        Draws a single parent for steady-state evolution: a regular parent selection of
+        pool_size candidates from a random island, then one of them uniformly, so the
+        island's elite is not chosen for every child.
+        """
+        candidates = self.select_parents(population, max(1, pool_size))
+        if not candidates:
+            return None
+        return self.rng.choice(candidates)
+
     def select_survivors(self, current_population: List[Program], offspring_population: List[Program], population_size: int) -> List[Program]:
         """
         Select survivors for each island, combining current island members with their offspring.
@@ -194,7 +244,7 @@ class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
         
         # Update island metrics
         for island in self.islands.values():
-            island.update_metrics()
+            island.update_metrics(self.runtime_tolerance)
 
         # Check if it's time for migration
         if self.current_generation % self.migration_interval == 0:
@@ -244,18 +294,11 @@ class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
                 reverse=True
             )
 
-            survivors = []
-            seen_program_ids = set()
-            for program in sorted_combined:
-                if len(survivors) < programs_per_island:
-                    if program.id not in seen_program_ids:
-                        survivors.append(program)
-                        seen_program_ids.add(program.id)
-                        if settings.DEBUG:
-                            logger.debug(f"Island {island_id} selected survivor: {program.id} "
-                                       f"with correctness {program.fitness_scores.get('correctness')}")
-                else:
-                    break
+            survivors = self._fill_survivors(sorted_combined, programs_per_island)
+            if settings.DEBUG:
+                for program in survivors:
+                    logger.debug(f"Island {island_id} selected survivor: {program.id} "
+                               f"with correctness {program.fitness_scores.get('correctness')}")
 
             island.programs = survivors
             all_survivors.extend(survivors)
@@ -264,6 +307,71 @@ class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
 
         return all_survivors
 
+    def _fill_survivors(self, ranked: List[Program], slots: int) -> List[Program]:
+        """
+        The first `slots` distinct programs of `ranked`. With a near-duplicate index, a program whose
+        estimated similarity to one already selected reaches NEAR_DUPLICATE_THRESHOLD is held back:
+        "penalize" gives it only the slots left once every other candidate is placed, "skip" drops it.
+        """
+        check_similarity = self.near_duplicates is not None and self.near_duplicate_selection != "off"
+        survivors: List[Program] = []
+        signatures = []
+        held_back: List[Program] = []
+        seen_program_ids = set()
+        for program in ranked:
+            if len(survivors) >= slots:
+                break
+            if program.id in seen_program_ids:
+                continue
+            seen_program_ids.add(program.id)
+            if check_similarity:
+                signature = self.near_duplicates.signature_of(program.id)
+                if signature is None:
+                    signature = self.near_duplicates.signature(program.code)
+                if any(signature_similarity(signature, other) >= self.near_duplicate_threshold for other in signatures):
+                    held_back.append(program)
+                    continue
+                signatures.append(signature)
+            survivors.append(program)
+        if self.near_duplicate_selection == "penalize":
+            readmitted = held_back[:slots - len(survivors)]
+            survivors.extend(readmitted)
+            held_back = held_back[len(readmitted):]
+        self.near_duplicates_held_back += len(held_back)
+        return survivors
+
+    def get_state(self) -> Dict[str, Any]:
+        """Island membership and counters, with programs referenced by id (for checkpoints)."""
+        return {
+            "current_generation": self.current_generation,
+            "islands": [
+                {
+                    "island_id": island.island_id,
+                    "program_ids": [p.id for p in island.programs],
+                    "generation": island.generation,
+                    "best_fitness": island.best_fitness,
+                    "best_runtime_ms": island.best_runtime_ms,
+                    "last_improvement_generation": island.last_improvement_generation,
+                    "frozen": island.frozen,
+                }
+                for island in self.islands.values()
+            ],
+        }
+
+    def load_state(self, state: Dict[str, Any], programs_by_id: Dict[str, Program]) -> None:
+        self.current_generation = state["current_generation"]
+        self.islands = {}
+        for island_state in state["islands"]:
+            island = Island(island_state["island_id"])
+            island.programs = [programs_by_id[pid] for pid in island_state["program_ids"] if pid in programs_by_id]
+            island.generation = island_state["generation"]
+            island.best_fitness = island_state["best_fitness"]
+            island.best_runtime_ms = island_state.get("best_runtime_ms", float('inf'))
+            island.last_improvement_generation = island_state["last_improvement_generation"]
+            island.frozen = island_state.get("frozen", False)
+            self.islands[island.island_id] = island
+        logger.info(f"Restored {len(self.islands)} islands at generation {self.current_generation}")
+
     def _perform_migration(self) -> None:
         """Perform migration between islands."""
         if settings.DEBUG:
@@ -286,7 +394,7 @@ class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
         # Get the best programs from surviving islands
         for underperforming_id in underperforming_islands:
             # Select a random surviving island
-            donor_island_id = random.choice(surviving_islands)
+            donor_island_id = self.rng.choice(surviving_islands)
             donor_island = self.islands[donor_island_id]
             
             # Get the best program from the donor island
@@ -298,6 +406,62 @@ class SelectionControllerAgent(SelectionControllerInterface, BaseAgent):
                     logger.debug(f"Reseeded island {underperforming_id} with best program from island {donor_island_id} "
                                f"(correctness: {best_program.fitness_scores.get('correctness')})")
 
+    def emigrants(self, count: int) -> List[Program]:
+        """The best `count` scored programs across all islands, to send to another island process."""
+        candidates = {}
+        for island in self.islands.values():
+            for program in island.programs:
+                if program.status not in ("unevaluated", "evaluating"):
+                    candidates[program.id] = program
+        ranked = sorted(
+            candidates.values(),
+            key=survivor_key,
+            reverse=True
+        )
+        return ranked[:max(0, count)]
+
+    def immigrate(self, programs: List[Program]) -> List[Program]:
+        """
+        Inserts programs received from another island process into the worst island, replacing
+        its weakest members so the island keeps its size. Programs already present are skipped, and
+        at most all but one of the island's members are replaced (the best newcomers are taken), so
+        the island's own lineage survives. Returns the programs actually inserted.
+        """
+        if not self.islands:
+            return []
+        present_ids = {p.id for island in self.islands.values() for p in island.programs}
+        newcomers = []
+        for program in programs:
+            if program.id not in present_ids:
+                present_ids.add(program.id)
+                newcomers.append(program)
+        if not newcomers:
+            return []
+
+        def island_key(island: Island):
+            best = island.get_best_program()
+            if best is None:
+                return (-1.0, 0.0)
+            return fitness_key(best)
+        target = min(self.islands.values(), key=island_key)
+
+        def rank(candidates: List[Program]) -> List[Program]:
+            return sorted(
+                candidates,
+                key=survivor_key,
+                reverse=True
+            )
+        ranked = rank(target.programs)
+        newcomers = rank(newcomers)[:max(0, len(ranked) - 1)]
+        if not newcomers:
+            return []
+        keep = len(ranked) - len(newcomers)
+        for program in newcomers:
+            program.island_id = target.island_id
+        target.programs = ranked[:keep] + newcomers
+        logger.info(f"Island {target.island_id} received {len(newcomers)} immigrants from another island process.")
+        return newcomers
+
     async def execute(self, action: str, **kwargs) -> Any:
         if action == "select_parents":
             return self.select_parents(kwargs['population'], kwargs['num_parents'])
@@ -1,159 +1,760 @@
 import logging
 import asyncio
+import json
+import math
+import os
+import time
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Sequence, Set, Tuple
 
 from core.interfaces import (
     TaskManagerInterface, TaskDefinition, Program, BaseAgent,
     PromptDesignerInterface, CodeGeneratorInterface, EvaluatorAgentInterface,
-    DatabaseAgentInterface, SelectionControllerInterface
+    DatabaseAgentInterface, SelectionControllerInterface, LLMCallRecord
 )
-from config import settings
+from core.fitness import fitness_key
 
 from prompt_designer.agent import PromptDesignerAgent
 from code_generator.agent import CodeGeneratorAgent
 from evaluator_agent.agent import EvaluatorAgent
+from evaluator_agent.cache import EvaluationCache, tests_fingerprint
+from database_agent.code_store import CodeStore
+from database_agent.compaction import ColdStore, CompactionPolicy
 from database_agent.agent import InMemoryDatabaseAgent
+from database_agent.columnar_agent import ColumnarDatabaseAgent
+from database_agent.map_elites_agent import MapElitesDatabaseAgent
+from database_agent.near_duplicates import NearDuplicateIndex
+from database_agent.sqlite_agent import SQLiteDatabaseAgent
+from database_agent.archive import ProgramArchive
+from database_agent.export import RunExporter, RunHistoryExport
 from selection_controller.agent import SelectionControllerAgent
+from monitoring_agent.telemetry import TelemetryCollector
+from monitoring_agent.events import (
+    EventBus, GenerationStarted, GenerationCompleted, OffspringProduced, EvaluationCompleted, NewBestProgram
+)
+from task_manager.run_control import RunController
+from task_manager.evaluation_queue import EvaluationCostModel, EvaluationQueue
+from task_manager.checkpoint import (
+    CheckpointWriter, load_checkpoint, task_to_dict, task_from_dict, rng_state_to_json, rng_state_from_json
+)
 
 logger = logging.getLogger(__name__)
 
+
+def _finite(value: Any) -> Any:
+    """`value` with infinite and NaN floats (e.g. the runtime of a failed program) replaced by None, for strict JSON."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
 class TaskManagerAgent(TaskManagerInterface):
-    def __init__(self, task_definition: TaskDefinition, config: Optional[Dict[str, Any]] = None):
+    def __init__(self, task_definition: TaskDefinition, config: Optional[Dict[str, Any]] = None,
+                 code_generator: Optional[CodeGeneratorInterface] = None):
+        """
+        config: per-task overrides keyed by setting name (e.g. {"POPULATION_SIZE": 20}); anything not
+        given falls back to config.settings, so several tasks can run side by side with different values.
+        code_generator: optional shared generator (see task_manager.scheduler); one is created otherwise.
+        """
         super().__init__(config)
         self.task_definition = task_definition
-        self.prompt_designer: PromptDesignerInterface = PromptDesignerAgent(task_definition=self.task_definition)
-        self.code_generator: CodeGeneratorInterface = CodeGeneratorAgent()
-        self.evaluator: EvaluatorAgentInterface = EvaluatorAgent(task_definition=self.task_definition)
-        self.database: DatabaseAgentInterface = InMemoryDatabaseAgent()
-        self.selection_controller: SelectionControllerInterface = SelectionControllerAgent()
-
-        self.population_size = settings.POPULATION_SIZE
-        self.num_generations = settings.GENERATIONS
+        self.prompt_designer: PromptDesignerInterface = PromptDesignerAgent(task_definition=self.task_definition, config=self.config)
+        self.code_generator: CodeGeneratorInterface = code_generator or CodeGeneratorAgent(config=self.config)
+        self._owns_code_generator = code_generator is None  # A shared generator is closed by its owner
+        self.evaluator: EvaluatorAgentInterface = EvaluatorAgent(task_definition=self.task_definition, config=self.config)
+        self.database: DatabaseAgentInterface = self._create_database()
+        self.selection_controller: SelectionControllerInterface = SelectionControllerAgent(config=self.config)
+        self.selection_controller.near_duplicates = getattr(self.database, "near_duplicates", None)
+        self.near_duplicates_flagged = 0
+        self._compaction_task: Optional[asyncio.Task] = None
+        self.telemetry = TelemetryCollector(self.get_setting("TELEMETRY_CALL_WINDOW"))
+        self.events = EventBus()  # Progress events for the UI, CLI and metrics (see monitoring_agent/events.py)
+        self._best_key = None
+        # Read lazily: the scheduler and tests replace the evaluator after construction.
+        self.run_controller = RunController.from_settings(self.telemetry, self.get_setting,
+                                                          lambda: getattr(self.evaluator, "cpu_seconds", 0.0))
+
+        self.population_size = self.get_setting("POPULATION_SIZE")
+        self.num_generations = self.get_setting("GENERATIONS")
         self.num_parents_to_select = self.population_size // 2
-        self.num_islands = settings.NUM_ISLANDS
+        self.variants_per_call = max(1, self.get_setting("MUTATION_VARIANTS_PER_CALL"))
+        self.evolution_mode = self.get_setting("EVOLUTION_MODE")
+        if self.evolution_mode not in ("generational", "steady_state"):
+            raise ValueError(f"Unknown EVOLUTION_MODE: {self.evolution_mode}")
+        self.steady_state_workers = self.get_setting("STEADY_STATE_WORKERS")
+        self.steady_state_selection_interval = self.get_setting("STEADY_STATE_SELECTION_INTERVAL") or self.population_size
+        self.steady_state_selection_seconds = self.get_setting("STEADY_STATE_SELECTION_INTERVAL_SECONDS")
+        self.save_batch_size = max(1, self.get_setting("DATABASE_SAVE_BATCH_SIZE"))
+        self._save_buffer: List[Program] = []
+        checkpoint_root = self.get_setting("CHECKPOINT_DIR")
+        self.checkpoint_dir = os.path.join(checkpoint_root, task_definition.id) if checkpoint_root else None
+        self.checkpoint_interval = max(1, self.get_setting("CHECKPOINT_INTERVAL_GENERATIONS"))
+        self.checkpointer: Optional[CheckpointWriter] = None
+        self._unchecked_saves: List[Program] = []  # Saved since the last checkpoint
+        self._unchecked_evictions: Set[str] = set()  # Evicted by compaction since the last checkpoint
+        self._population: List[Program] = []
+        self._completed_generation = 0
+        self._generation_progress: Optional[Dict[str, Any]] = None
+        self._restored_programs: Dict[str, Program] = {}
+        self._resumed = False
+        self._finished = False
+        # Optional coroutine function called with the generation number after each survivor selection
+        # (generational mode); island-parallel workers use it to exchange migrants between processes.
+        self.after_generation: Optional[Callable[[int], Awaitable[None]]] = None
+        self.num_islands = self.get_setting("NUM_ISLANDS")
         self.programs_per_island = self.population_size // self.num_islands
+        archive_dir = self.get_setting("ARCHIVE_DIR")
+        self.archive = ProgramArchive(archive_dir) if archive_dir else None
+        history_dir = self.get_setting("HISTORY_EXPORT_DIR")
+        self.history_export: Optional[RunHistoryExport] = None
+        if history_dir:
+            exporter = RunExporter(os.path.join(history_dir, task_definition.id), self.get_setting("HISTORY_EXPORT_BATCH_SIZE"),
+                                   self.get_setting("HISTORY_EXPORT_FORMAT"))
+            self.history_export = RunHistoryExport(exporter)
+            self.telemetry.call_listeners.append(self.history_export.call_recorded)
+        self.evaluation_cache = EvaluationCache(os.path.join(archive_dir, "evaluations.jsonl") if archive_dir else None,
+                                                self.get_setting("EVALUATION_CACHE_MAX_ENTRIES"))
+        self.tests_fingerprint = tests_fingerprint(task_definition)
+        self.evaluation_queue = EvaluationQueue(
+            self.get_setting("EVALUATION_CONCURRENCY"),
+            EvaluationCostModel(self.get_setting("EVALUATION_TIMEOUT_SECONDS"), self.get_setting("EVALUATION_COST_LINEAGE_DECAY"),
+                                max_programs=self.get_setting("EVALUATION_COST_MAX_PROGRAMS")),
+            self.get_setting("EVALUATION_QUEUE_AGING_RATE"),
+        )
+        eviction_listeners = getattr(self.database, "eviction_listeners", None)
+        if eviction_listeners is not None:
+            eviction_listeners.append(self._forget_evicted)
+
+    def _create_database(self) -> DatabaseAgentInterface:
+        database_type = self.get_setting("DATABASE_TYPE")
+        near_duplicates = None
+        if self.get_setting("NEAR_DUPLICATE_INDEX"):
+            if database_type in ("in_memory", "columnar"):
+                near_duplicates = NearDuplicateIndex(self.get_setting("NEAR_DUPLICATE_PERMUTATIONS"), self.get_setting("NEAR_DUPLICATE_BANDS"),
+                                                     self.get_setting("NEAR_DUPLICATE_SHINGLE_SIZE"))
+            else:
+                logger.warning(f"NEAR_DUPLICATE_INDEX is only supported by the in_memory and columnar databases, not {database_type}.")
+        compaction, cold_store = self._compaction_policy(database_type)
+        if database_type in ("in_memory", "columnar"):
+            code_store_mode = self.get_setting("DATABASE_CODE_STORE")
+            code_store = None
+            if code_store_mode != "off":
+                code_store = CodeStore(code_store_mode, self.get_setting("CODE_STORE_SNAPSHOT_INTERVAL"),
+                                       self.get_setting("CODE_STORE_CACHE_SIZE"))
+            if database_type == "columnar":
+                return ColumnarDatabaseAgent(code_store, near_duplicates, config=self.config)
+            return InMemoryDatabaseAgent(code_store, near_duplicates, compaction, cold_store, config=self.config)
+        if database_type == "map_elites":
+            return MapElitesDatabaseAgent(self.get_setting("MAP_ELITES_DESCRIPTORS"), config=self.config)
+        if database_type == "sqlite":
+            return SQLiteDatabaseAgent(self.get_setting("DATABASE_PATH"), self.get_setting("DATABASE_READ_CONNECTIONS"), config=self.config)
+        raise ValueError(f"Unknown DATABASE_TYPE: {database_type}")
+
+    def _compaction_policy(self, database_type: str) -> Tuple[Optional[CompactionPolicy], Optional[ColdStore]]:
+        mode = self.get_setting("COMPACTION_MODE")
+        if mode == "off":
+            return None, None
+        if database_type != "in_memory":
+            logger.warning(f"COMPACTION_MODE is only supported by the in_memory database, not {database_type}.")
+            return None, None
+        policy = CompactionPolicy(mode, self.get_setting("COMPACTION_MAX_PROGRAMS"), self.get_setting("COMPACTION_KEEP_TOP_K"),
+                                  self.get_setting("COMPACTION_KEEP_RECENT_GENERATIONS"), max(1, self.get_setting("COMPACTION_BATCH_SIZE")))
+        cold_store = None
+        if mode == "spill":
+            cold_store = ColdStore(os.path.join(self.get_setting("COMPACTION_COLD_DIR"), f"{self.task_definition.id}.jsonl"))
+        return policy, cold_store
 
     async def initialize_population(self) -> List[Program]:
         logger.info(f"Initializing population for task: {self.task_definition.id}")
-        initial_population = []
+        initial_population = await self._warm_start_programs()
         
-        # Generate initial programs
-        for i in range(self.population_size):
+        # Generate initial programs for the slots the archive did not fill
+        for i in range(len(initial_population), self.population_size):
             program_id = f"{self.task_definition.id}_gen0_prog{i}"
             logger.debug(f"Generating initial program {i+1}/{self.population_size} with id {program_id}")
             initial_prompt = self.prompt_designer.design_initial_prompt()
-            generated_code = await self.code_generator.generate_code(initial_prompt, temperature=0.8)
+            call_records: List[LLMCallRecord] = []
+            generated_code = await self.code_generator.generate_code(initial_prompt, temperature=0.8, call_records=call_records)
+            for record in call_records:
+                record.outcome = "applied" if generated_code.strip() else "rejected"
             
             program = Program(
                 id=program_id,
                 code=generated_code,
                 generation=0,
-                status="unevaluated"
+                status="unevaluated",
+                llm_calls=call_records,
+                task_id=self.task_definition.id
             )
             initial_population.append(program)
-            await self.database.save_program(program)
+        await self._save_programs(initial_population)
 
         # Initialize islands with the initial population
         await self.selection_controller.execute("initialize_islands", initial_programs=initial_population)
+        for program in initial_population:
+            self.telemetry.record_calls(program.llm_calls, 0, program.island_id, program.id)
         
         logger.info(f"Initialized population with {len(initial_population)} programs across {self.num_islands} islands.")
         return initial_population
 
+    async def _warm_start_programs(self) -> List[Program]:
+        """
+        Archived programs of this task or similar ones, re-evaluated against the current tests
+        (free for unchanged code and tests, via the evaluation cache). Seeds that no longer score
+        above WARM_START_MIN_CORRECTNESS are dropped, so their slots go to the LLM instead.
+        """
+        if self.archive is None or not self.get_setting("WARM_START_ENABLED"):
+            return []
+        entries = self.archive.lookup(self.task_definition, self.population_size,
+                                      self.get_setting("WARM_START_SIMILARITY_THRESHOLD"))
+        if not entries:
+            logger.info(f"Warm start: no archived programs match task {self.task_definition.id}.")
+            return []
+        candidates = [
+            Program(id=f"{self.task_definition.id}_gen0_seed{i}", code=entry["code"], generation=0, status="unevaluated",
+                    task_id=self.task_definition.id)
+            for i, entry in enumerate(entries)
+        ]
+        candidates = list(await asyncio.gather(*[self._evaluate_safely(program) for program in candidates]))
+        min_correctness = self.get_setting("WARM_START_MIN_CORRECTNESS")
+        seeds = [p for p in candidates if p.fitness_scores.get("correctness", 0.0) > min_correctness]
+        logger.info(f"Warm start: {len(seeds)}/{len(candidates)} archived programs still pass for task {self.task_definition.id}; "
+                    f"generating {self.population_size - len(seeds)} new programs.")
+        return seeds
+
     async def evaluate_population(self, population: List[Program]) -> List[Program]:
         logger.info(f"Evaluating population of {len(population)} programs.")
-        evaluated_programs = []
-        evaluation_tasks = [self.evaluator.evaluate_program(prog, self.task_definition) for prog in population if prog.status != "evaluated"]
-        
-        results = await asyncio.gather(*evaluation_tasks, return_exceptions=True)
-        
-        for i, result in enumerate(results):
-            original_program = population[i]
-            if isinstance(result, Exception):
-                logger.error(f"Error evaluating program {original_program.id}: {result}", exc_info=result)
-                original_program.status = "failed_evaluation"
-                original_program.errors.append(str(result))
-                evaluated_programs.append(original_program)
-            else:
-                evaluated_programs.append(result)
-            await self.database.save_program(evaluated_programs[-1])
-            
+        pending = [prog for prog in population if prog.status not in ("evaluated", "failed_evaluation")]
+        evaluated_programs = await asyncio.gather(*[self._evaluate_safely(prog) for prog in pending])
+        await self._save_programs(evaluated_programs)
         logger.info(f"Finished evaluating population. {len(evaluated_programs)} programs processed.")
-        return evaluated_programs
+        results_by_program = {id(original): result for original, result in zip(pending, evaluated_programs)}
+        return [results_by_program.get(id(prog), prog) for prog in population]
+
+    async def _evaluate_safely(self, program: Program) -> Program:
+        """Evaluates a program; evaluation errors mark it failed instead of propagating."""
+        try:
+            if await self._flag_near_duplicate(program) and self.get_setting("NEAR_DUPLICATE_SKIP_EVALUATION"):
+                program.status = "failed_evaluation"
+                program.fitness_scores["correctness"] = 0.0
+                program.errors.append(f"Not evaluated: near-duplicate of program {program.near_duplicate_of} (NEAR_DUPLICATE_SKIP_EVALUATION).")
+                self.telemetry.record_evaluation(program, 0.0)
+            else:
+                program = await self._timed_evaluation(program)
+        except Exception as e:
+            logger.error(f"Error evaluating program {program.id}: {e}", exc_info=e)
+            program.status = "failed_evaluation"
+            program.errors.append(str(e))
+        self._publish_evaluation(program)
+        return program
+
+    async def _flag_near_duplicate(self, program: Program) -> bool:
+        """Points an offspring at its nearest saved program when their similarity reaches NEAR_DUPLICATE_THRESHOLD."""
+        index = getattr(self.database, "near_duplicates", None)
+        if index is None or program.parent_id is None:
+            return False
+        # Hashing is pure Python and takes milliseconds per program; the lookup itself is cheap.
+        signature = await asyncio.to_thread(index.signature, program.code)
+        matches = index.similar(threshold=self.get_setting("NEAR_DUPLICATE_THRESHOLD"), limit=1, signature=signature, exclude=program.id)
+        if not matches:
+            return False
+        program.near_duplicate_of, similarity = matches[0]
+        self.near_duplicates_flagged += 1
+        logger.info(f"Offspring {program.id} is a near-duplicate of {program.near_duplicate_of} (estimated similarity {similarity:.2f}).")
+        return True
+
+    def _publish_evaluation(self, program: Program) -> None:
+        if self.events.wants(EvaluationCompleted):
+            self.events.publish(EvaluationCompleted(self.task_definition.id, program.generation, program_id=program.id,
+                                                    status=program.status, fitness_scores=dict(program.fitness_scores)))
+        key = fitness_key(program)
+        if self._best_key is None or key > self._best_key:
+            self._best_key = key
+            if self.events.wants(NewBestProgram):
+                self.events.publish(NewBestProgram(self.task_definition.id, program.generation, program_id=program.id,
+                                                   fitness_scores=dict(program.fitness_scores)))
+
+    def _publish_offspring(self, offspring: Program, parent: Program) -> None:
+        if self.events.wants(OffspringProduced):
+            self.events.publish(OffspringProduced(self.task_definition.id, offspring.generation, program_id=offspring.id,
+                                                  parent_id=parent.id, island_id=offspring.island_id))
+
+    def _publish_generation_completed(self, gen: int, population: List[Program]) -> None:
+        if not self.events.wants(GenerationCompleted):
+            return
+        best = max(population, key=fitness_key) if population else None
+        self.events.publish(GenerationCompleted(self.task_definition.id, gen, population_size=len(population),
+                                                best_program_id=best.id if best else None,
+                                                best_fitness=dict(best.fitness_scores) if best else {}))
+
+    @staticmethod
+    def _child_index(program: Program) -> int:
+        _, _, index = program.id.rpartition("_child")
+        return int(index) if index.isdigit() else 0
+
+    async def _buffer_saves(self, programs: List[Program]) -> None:
+        self._save_buffer.extend(programs)
+        if len(self._save_buffer) >= self.save_batch_size:
+            await self._flush_saves()
+
+    async def _flush_saves(self) -> None:
+        if not self._save_buffer:
+            return
+        batch, self._save_buffer = self._save_buffer, []
+        await self._save_programs(batch)
+        await self._checkpoint()
+
+    async def _save_programs(self, programs: List[Program]) -> None:
+        await self.database.save_programs(programs)
+        if self.checkpoint_dir is not None:
+            self._unchecked_saves.extend(programs)
+        if self.history_export is not None:
+            await self.history_export.programs_saved(programs)
+        self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        """Starts a background compaction pass once the database has outgrown COMPACTION_MAX_PROGRAMS."""
+        needs_compaction = getattr(self.database, "needs_compaction", None)
+        if needs_compaction is None or not needs_compaction():
+            return
+        if self._compaction_task is None or self._compaction_task.done():
+            self._compaction_task = asyncio.create_task(self._compact())
+
+    async def _compact(self) -> None:
+        try:
+            await self.database.compact(self._compaction_protected_ids)
+        except Exception as e:
+            logger.error(f"Compaction of the program database failed: {e}", exc_info=True)
+
+    def _forget_evicted(self, program_ids: List[str]) -> None:
+        """
+        Drops per-program state of programs compaction evicted. The evaluation cache and the cost
+        model are bounded by their own LRU caps; checkpoint fingerprints are dropped after the
+        next checkpoint, which may still write programs saved before their eviction.
+        """
+        self.telemetry.forget(program_ids)
+        if self.history_export is not None:
+            self.history_export.forget(program_ids)
+        if self.checkpoint_dir is not None:
+            self._unchecked_evictions.update(program_ids)
+
+    def _compaction_protected_ids(self) -> List[str]:
+        protected = [p.id for p in self._referenced_programs(())]
+        if self._generation_progress is not None:
+            protected.extend(self._generation_progress["offspring_ids"])  # Evaluated, awaiting survivor selection
+        return protected
+
+    async def _checkpoint(self) -> None:
+        """
+        Queues an incremental checkpoint of the programs saved since the previous one and of the
+        programs the run state refers to; the write itself happens off the event loop.
+        """
+        if self.checkpoint_dir is None:
+            return
+        if self.checkpointer is None:
+            self.checkpointer = CheckpointWriter(self.checkpoint_dir)
+        saved, self._unchecked_saves = self._unchecked_saves, []
+        await self.checkpointer.write(self._referenced_programs(saved), self._checkpoint_state())
+        if self._unchecked_evictions:
+            self.checkpointer.forget(self._unchecked_evictions)
+            self._unchecked_evictions = set()
+
+    def _referenced_programs(self, saved: Sequence[Program]) -> List[Program]:
+        """Programs a resumed run needs: the population, island members, pending offspring and the programs just saved."""
+        referenced = list(saved) + list(self._population) + list(getattr(self, "_pending_offspring", []))
+        for island in self.selection_controller.islands.values():
+            referenced.extend(island.programs)
+        return referenced
+
+    def _checkpoint_state(self) -> Dict[str, Any]:
+        progress = self._generation_progress
+        if progress is not None:
+            progress = dict(progress, completed_tasks=list(progress["completed_tasks"]), offspring_ids=list(progress["offspring_ids"]))
+        steady_state = None
+        if self.evolution_mode == "steady_state" and hasattr(self, "_pending_offspring"):
+            steady_state = {
+                "pending_offspring_ids": [p.id for p in self._pending_offspring],
+                "offspring_completed": self._offspring_completed,
+                "next_child_index": self._next_child_index,
+            }
+        database_rng = getattr(self.database, "rng", None)
+        return {
+            "task": task_to_dict(self.task_definition),
+            "config": self.config,
+            "evolution_mode": self.evolution_mode,
+            "completed_generation": self._completed_generation,
+            "generation_progress": progress,
+            "population_ids": [p.id for p in self._population],
+            "steady_state": steady_state,
+            "selection": self.selection_controller.get_state(),
+            "selection_rng": rng_state_to_json(self.selection_controller.rng.getstate()),
+            "database_rng": rng_state_to_json(database_rng.getstate()) if database_rng else None,
+            "telemetry": self.telemetry.get_state(),
+            "run_control": self.run_controller.get_state(),
+            "finished": self._finished,
+        }
+
+    @classmethod
+    async def from_checkpoint(cls, directory: str, config: Optional[Dict[str, Any]] = None) -> "TaskManagerAgent":
+        """
+        Rebuilds a task manager from a checkpoint directory so that execute() continues the run
+        where it stopped: finished offspring tasks, evaluations and selections are not redone.
+        """
+        state, programs = load_checkpoint(directory)
+        manager = cls(task_definition=task_from_dict(state["task"]), config=config if config is not None else state.get("config"))
+        manager.evolution_mode = state["evolution_mode"]
+        await manager.database.save_programs(list(programs.values()))
+        manager.selection_controller.load_state(state["selection"], programs)
+        manager.selection_controller.rng.setstate(rng_state_from_json(state["selection_rng"]))
+        if state["database_rng"] is not None and hasattr(manager.database, "rng"):
+            manager.database.rng.setstate(rng_state_from_json(state["database_rng"]))
+        manager.telemetry.load_state(state["telemetry"])
+        if state.get("run_control") is not None:
+            manager.run_controller.load_state(state["run_control"])
+
+        manager._restored_programs = programs
+        scored = [fitness_key(p) for p in programs.values() if p.status not in ("unevaluated", "evaluating")]
+        manager._best_key = max(scored) if scored else None
+        manager._population = [programs[pid] for pid in state["population_ids"] if pid in programs]
+        manager._completed_generation = state["completed_generation"]
+        manager._generation_progress = state["generation_progress"]
+        manager._finished = state["finished"]
+        if state["steady_state"] is not None:
+            manager._pending_offspring = [programs[pid] for pid in state["steady_state"]["pending_offspring_ids"] if pid in programs]
+            manager._offspring_completed = state["steady_state"]["offspring_completed"]
+            manager._next_child_index = state["steady_state"]["next_child_index"]
+        manager._resumed = True
+        manager.checkpoint_dir = directory
+        manager.checkpointer = CheckpointWriter(directory, resume_state=state, resume_programs=programs)
+        logger.info(f"Resumed task {manager.task_definition.id} from {directory}: {len(programs)} programs, "
+                    f"{manager._completed_generation} generations completed, mode {manager.evolution_mode}.")
+        return manager
+
+    async def _timed_evaluation(self, program: Program) -> Program:
+        cached = self.evaluation_cache.lookup(program, self.tests_fingerprint)
+        if cached is not None:
+            logger.debug(f"Evaluation cache hit for program {program.id}.")
+            # Counted like an evaluation, so improvement checks and lineage costs still see the result.
+            self.telemetry.record_evaluation(program, 0.0)
+            if cached.get("seconds") is not None:
+                self.evaluation_queue.cost_model.observe(program, cached["seconds"])
+            return program
+        async with self.evaluation_queue.slot(program):
+            start_time = time.monotonic()
+            try:
+                program = await self.evaluator.evaluate_program(program, self.task_definition)
+            finally:
+                seconds = time.monotonic() - start_time
+                self.telemetry.record_evaluation(program, seconds)
+        self.evaluation_cache.store(program, self.tests_fingerprint, seconds)
+        if self.evaluation_cache.path:
+            await asyncio.to_thread(self.evaluation_cache.flush)
+        return program
 
     async def manage_evolutionary_cycle(self):
-        logger.info(f"Starting evolutionary cycle for task: {self.task_definition.description[:50]}...")
-        current_population = await self.initialize_population()
-        current_population = await self.evaluate_population(current_population)
+        if self._finished:
+            logger.info(f"Run for task {self.task_definition.id} had already finished; reporting its result.")
+            return await self._finish_evolution()
+        self.run_controller.start()
+        clear_task = getattr(self.database, "clear_task", None)
+        if clear_task is not None and not self._resumed:
+            await clear_task(self.task_definition.id)  # A persistent database may still hold an earlier run of the task
+        if self.evolution_mode == "steady_state":
+            return await self.manage_steady_state_cycle()
+        if self._resumed:
+            logger.info(f"Resuming evolutionary cycle for task {self.task_definition.id} after generation {self._completed_generation}.")
+            current_population = self._population
+        else:
+            logger.info(f"Starting evolutionary cycle for task: {self.task_definition.description[:50]}...")
+            current_population = await self.initialize_population()
+            current_population = await self.evaluate_population(current_population)
+            self._population = current_population
+            await self._checkpoint()
 
-        for gen in range(1, self.num_generations + 1):
+        for gen in range(self._completed_generation + 1, self.num_generations + 1):
+            if self.run_controller.check_budgets():
+                break
             logger.info(f"--- Generation {gen}/{self.num_generations} ---")
+            if self.events.wants(GenerationStarted):
+                self.events.publish(GenerationStarted(self.task_definition.id, gen, max_generations=self.num_generations))
 
-            # Select parents from islands
-            parents = self.selection_controller.select_parents(current_population, self.num_parents_to_select)
-            if not parents:
-                logger.warning(f"Generation {gen}: No parents selected. Ending evolution early.")
-                break
-            logger.info(f"Generation {gen}: Selected {len(parents)} parents.")
+            progress = self._generation_progress if self._generation_progress and self._generation_progress["generation"] == gen else None
+            if progress:
+                # Resumed mid-generation: same parents, and only the offspring tasks that had not finished.
+                parents = [self._restored_programs[pid] for pid in progress["parent_ids"]]
+                logger.info(f"Generation {gen}: Resuming with {len(progress['completed_tasks'])} offspring tasks already done.")
+            else:
+                parents = await self._select_parents(current_population)
+                if not parents:
+                    logger.warning(f"Generation {gen}: No parents selected. Ending evolution early.")
+                    break
+                logger.info(f"Generation {gen}: Selected {len(parents)} parents.")
+                progress = {"generation": gen, "parent_ids": [p.id for p in parents], "completed_tasks": [], "offspring_ids": []}
+            self._generation_progress = progress
+            completed_tasks = set(progress["completed_tasks"])
 
             # Generate offspring
-            offspring_population = []
+            offspring_population = [self._restored_programs[pid] for pid in progress["offspring_ids"] if pid in self._restored_programs]
             num_offspring_per_parent = (self.population_size + len(parents) - 1) // len(parents)
             
             generation_tasks = []
+            child_count = 0
             for i, parent in enumerate(parents):
-                for j in range(num_offspring_per_parent):
-                    if len(offspring_population) + len(parents) >= self.population_size and j > 0:
-                        pass
-                    
-                    child_id = f"{self.task_definition.id}_gen{gen}_child{len(offspring_population)}"
-                    generation_tasks.append(self.generate_offspring(parent, gen, child_id))
+                if self.variants_per_call > 1:
+                    # One call per batch of up to variants_per_call children of the same parent.
+                    for batch_start in range(0, num_offspring_per_parent, self.variants_per_call):
+                        batch_size = min(self.variants_per_call, num_offspring_per_parent - batch_start)
+                        child_ids = [f"{self.task_definition.id}_gen{gen}_child{child_count + k}" for k in range(batch_size)]
+                        child_count += batch_size
+                        if child_ids[0] not in completed_tasks:
+                            generation_tasks.append(self._generate_and_evaluate(child_ids[0], self.generate_offspring_variants(parent, gen, child_ids)))
+                    continue
+                for _ in range(num_offspring_per_parent):
+                    child_id = f"{self.task_definition.id}_gen{gen}_child{child_count}"
+                    child_count += 1
+                    if child_id not in completed_tasks:
+                        generation_tasks.append(self._generate_and_evaluate(child_id, self.generate_offspring(parent, gen, child_id)))
             
-            generated_offspring_results = await asyncio.gather(*generation_tasks, return_exceptions=True)
-
-            for result in generated_offspring_results:
-                if isinstance(result, Exception):
-                    logger.error(f"Error generating offspring: {result}", exc_info=result)
-                elif result:
-                    offspring_population.append(result)
-                    await self.database.save_program(result)
+            # Pipelined: each task evaluates its offspring as soon as its own LLM call returns, so
+            # generation latency and sandbox execution overlap across tasks.
+            for evaluated in await asyncio.gather(*generation_tasks):
+                offspring_population.extend(evaluated)
+            await self._flush_saves()
 
             logger.info(f"Generation {gen}: Generated {len(offspring_population)} offspring.")
             if not offspring_population:
                 logger.warning(f"Generation {gen}: No offspring generated. May indicate issues with LLM or prompting.")
-                if not parents:
-                    break
-
-            # Evaluate offspring
-            offspring_population = await self.evaluate_population(offspring_population)
+            # Completion order depends on timing; restore creation order so selection ties stay reproducible.
+            offspring_population.sort(key=self._child_index)
 
             # Select survivors using island model
             current_population = self.selection_controller.select_survivors(current_population, offspring_population, self.population_size)
+            self._population = current_population
+            self._completed_generation = gen
+            self._generation_progress = None
+            stop_reason = self.run_controller.observe_generation(gen, self.selection_controller.islands)
+            self._publish_generation_completed(gen, current_population)
+            if self.after_generation is not None:
+                await self.after_generation(gen)
+                current_population = self._population
             logger.info(f"Generation {gen}: New population size: {len(current_population)}.")
+            if gen % self.checkpoint_interval == 0:
+                await self._checkpoint()
 
-            # Log best program in this generation
-            best_program_this_gen = sorted(
-                current_population,
-                key=lambda p: (p.fitness_scores.get("correctness", -1), -p.fitness_scores.get("runtime_ms", float('inf'))),
-                reverse=True
-            )
-            if best_program_this_gen:
-                logger.info(f"Generation {gen}: Best program: ID={best_program_this_gen[0].id}, Fitness={best_program_this_gen[0].fitness_scores}")
-            else:
-                logger.warning(f"Generation {gen}: No programs in current population after survival selection.")
+            if not self._log_generation_summary(gen, current_population) or stop_reason:
                 break
 
-        logger.info("Evolutionary cycle completed.")
+        return await self._finish_evolution()
+
+    async def _select_parents(self, population: List[Program]) -> List[Program]:
+        """
+        Parents from the islands; with DATABASE_TYPE=map_elites, elites of distinct cells drawn
+        uniformly over the archive's occupied cells instead, whatever their fitness.
+        """
+        if isinstance(self.database, MapElitesDatabaseAgent):
+            elites = await self.database.get_programs_for_next_generation(self.task_definition.id, self.num_parents_to_select)
+            if elites:
+                return elites
+        return self.selection_controller.select_parents(population, self.num_parents_to_select)
+
+    async def _sample_parent(self) -> Optional[Program]:
+        if isinstance(self.database, MapElitesDatabaseAgent):
+            elites = await self.database.get_programs_for_next_generation(self.task_definition.id, 1)
+            if elites:
+                return elites[0]
+        return self.selection_controller.sample_parent(self._population, self.num_parents_to_select)
+
+    async def _generate_and_evaluate(self, task_key: str, generation) -> List[Program]:
+        """Awaits one offspring generation task, then evaluates and buffers its children."""
+        try:
+            result = await generation
+        except Exception as e:
+            logger.error(f"Error generating offspring: {e}", exc_info=e)
+            result = None
+        offspring = [child for child in (result if isinstance(result, list) else [result]) if child]
+        evaluated = list(await asyncio.gather(*[self._evaluate_safely(child) for child in offspring]))
+        # Marking the task done and buffering its children happen without an await in between,
+        # so no checkpoint can record a finished task whose offspring are not saved.
+        progress = self._generation_progress
+        progress["completed_tasks"].append(task_key)
+        progress["offspring_ids"].extend(child.id for child in evaluated)
+        await self._buffer_saves(evaluated)
+        return evaluated
+
+    def _log_generation_summary(self, gen: int, current_population: List[Program]) -> bool:
+        """Logs the generation's telemetry and best program; returns False when the population is empty."""
+        best_program_this_gen = sorted(
+            current_population,
+            key=lambda p: (p.fitness_scores.get("correctness", -1), -p.fitness_scores.get("runtime_ms", float('inf'))),
+            reverse=True
+        )
+        gen_telemetry = self.telemetry.per_generation().get(gen)
+        if gen_telemetry:
+            logger.info(f"Generation {gen}: LLM calls={gen_telemetry['llm_calls']}, tokens={gen_telemetry['total_tokens']}, "
+                        f"LLM seconds={gen_telemetry['llm_seconds']:.1f}, evaluation seconds={gen_telemetry['evaluation_seconds']:.1f}, "
+                        f"improvement yield={gen_telemetry['improvement_yield']:.2f}")
+        if best_program_this_gen:
+            logger.info(f"Generation {gen}: Best program: ID={best_program_this_gen[0].id}, Fitness={best_program_this_gen[0].fitness_scores}")
+            return True
+        logger.warning(f"Generation {gen}: No programs in current population after survival selection.")
+        return False
+
+    async def manage_steady_state_cycle(self):
+        """
+        Steady-state evolution without generation barriers. A fixed pool of workers each loop:
+        sample a parent from the islands, generate, evaluate, save and insert the child, until
+        the same offspring budget as the generational loop (population_size * num_generations)
+        is spent. Survivor selection, and migration with it, runs every
+        steady_state_selection_interval inserted children (or steady_state_selection_seconds).
+        Children are labelled with the number of the selection round they will take part in.
+        """
+        if self._resumed:
+            logger.info(f"Resuming steady-state evolution for task {self.task_definition.id}: "
+                        f"{self._offspring_completed} offspring done, {len(self._pending_offspring)} awaiting selection.")
+        else:
+            logger.info(f"Starting steady-state evolution with {self.steady_state_workers} workers for task: {self.task_definition.description[:50]}...")
+            current_population = await self.initialize_population()
+            self._population = await self.evaluate_population(current_population)
+            self._pending_offspring: List[Program] = []
+            self._offspring_completed = 0
+            self._next_child_index = 0
+            await self._checkpoint()
+        self._offspring_budget = self.population_size * self.num_generations
+        # Work that was in flight when a resumed run stopped is simply started again.
+        self._offspring_started = self._offspring_completed
+        self._last_selection_time = time.monotonic()
+
+        workers = [asyncio.create_task(self._steady_state_worker(worker_id)) for worker_id in range(self.steady_state_workers)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        if self._pending_offspring:
+            self._run_steady_state_selection()
+        await self._flush_saves()
+        return await self._finish_evolution()
+
+    async def _steady_state_worker(self, worker_id: int) -> None:
+        while self._offspring_started < self._offspring_budget and not self.run_controller.check_budgets():
+            batch_size = min(self.variants_per_call, self._offspring_budget - self._offspring_started)
+            self._offspring_started += batch_size
+            first_child = self._next_child_index
+            self._next_child_index += batch_size
+            gen = self.selection_controller.current_generation + 1
+
+            parent = await self._sample_parent()
+            if parent is None:
+                logger.warning(f"Steady-state worker {worker_id}: no parent available. Stopping.")
+                return
+            child_ids = [f"{self.task_definition.id}_gen{gen}_child{first_child + k}" for k in range(batch_size)]
+            try:
+                if self.variants_per_call > 1:
+                    offspring = await self.generate_offspring_variants(parent, gen, child_ids)
+                else:
+                    child = await self.generate_offspring(parent, gen, child_ids[0])
+                    offspring = [child] if child else []
+            except Exception as e:
+                logger.error(f"Steady-state worker {worker_id}: error generating offspring of {parent.id}: {e}", exc_info=e)
+                offspring = []
+
+            evaluated = [await self._evaluate_safely(child) for child in offspring]
+            for child in evaluated:
+                self._insert_steady_state_offspring(child)
+            self._offspring_completed += batch_size
+            await self._buffer_saves(evaluated)
+
+    def _insert_steady_state_offspring(self, child: Program) -> None:
+        # No awaits in here: insertion and selection are atomic with respect to the other workers.
+        self._pending_offspring.append(child)
+        interval_reached = len(self._pending_offspring) >= self.steady_state_selection_interval
+        time_reached = (self.steady_state_selection_seconds is not None
+                        and time.monotonic() - self._last_selection_time >= self.steady_state_selection_seconds)
+        if interval_reached or time_reached:
+            self._run_steady_state_selection()
+
+    def _run_steady_state_selection(self) -> None:
+        gen = self.selection_controller.current_generation + 1
+        offspring, self._pending_offspring = self._pending_offspring, []
+        self._population = self.selection_controller.select_survivors(self._population, offspring, self.population_size)
+        self._last_selection_time = time.monotonic()
+        self.run_controller.observe_generation(gen, self.selection_controller.islands)
+        self._publish_generation_completed(gen, self._population)
+        logger.info(f"Steady-state selection round {gen}: inserted {len(offspring)} offspring, population size {len(self._population)}, "
+                    f"{self._offspring_started}/{self._offspring_budget} offspring started.")
+        self._log_generation_summary(gen, self._population)
+
+    async def _finish_evolution(self) -> List[Program]:
+        if self.run_controller.stop_reason:
+            logger.info(f"Evolutionary cycle stopped early ({self.run_controller.stop_reason}).")
+        else:
+            logger.info("Evolutionary cycle completed.")
+        self._finished = True
+        if self._compaction_task is not None:
+            await self._compaction_task
+        await self._checkpoint()
+        if self.checkpointer is not None:
+            await self.checkpointer.flush()
+        logger.info(f"LLM telemetry totals: {self.telemetry.totals()}")
+        logger.info(f"Run usage: {self.run_controller.usage()}")
+        logger.info(f"Evaluation cost predictions: {self.evaluation_queue.cost_model.error_summary()}")
+        code_store = getattr(self.database, "code_store", None)
+        if code_store is not None:
+            logger.info(f"Code store: {code_store.stats()}")
+        if isinstance(self.database, MapElitesDatabaseAgent):
+            logger.info(f"MAP-Elites archive: {self.database.archive_stats()}")
+        if getattr(self.database, "compaction", None) is not None:
+            logger.info(f"Compaction: {self.database.compaction_report()}")
+        near_duplicates = getattr(self.database, "near_duplicates", None)
+        if near_duplicates is not None:
+            logger.info(f"Near-duplicate index: {near_duplicates.stats()}; {self.near_duplicates_flagged} offspring flagged, "
+                        f"{self.selection_controller.near_duplicates_held_back} survivor candidates held back.")
+        telemetry_path = self.get_setting("TELEMETRY_EXPORT_PATH")
+        if telemetry_path:
+            self.telemetry.export_json(telemetry_path)
+        lineage_dir = self.get_setting("LINEAGE_EXPORT_DIR")
+        if lineage_dir:
+            graph = await self.database.get_lineage_graph(self.task_definition.id)
+            lineage_path = os.path.join(lineage_dir, f"{self.task_definition.id}.json")
+            os.makedirs(lineage_dir, exist_ok=True)
+            with open(lineage_path, "w") as f:
+                json.dump(_finite(graph), f, indent=2, allow_nan=False)
+            logger.info(f"Exported the lineage of {len(graph['nodes'])} programs to {lineage_path}")
+        if self.history_export is not None:
+            self.telemetry.flush_calls()
+            await self.history_export.close()
+            logger.info(f"Run history export: {self.history_export.exporter.rows_written} rows in {self.history_export.exporter.directory}")
         final_best = await self.database.get_best_programs(task_id=self.task_definition.id, limit=1, objective="correctness")
+        if self.archive is not None:
+            await self._archive_best_programs()
         if final_best:
             logger.info(f"Overall Best Program: {final_best[0].id}, Code:\n{final_best[0].code}\nFitness: {final_best[0].fitness_scores}")
+            ancestors = (await self.database.get_ancestors([final_best[0].id]))[final_best[0].id]
+            if ancestors:
+                logger.info(f"Best program lineage: {len(ancestors)} saved ancestors, from {ancestors[-1].id}: {[p.id for p in reversed(ancestors)]}")
         else:
             logger.info("No best program found at the end of evolution.")
+        close = getattr(self.database, "close", None)
+        if close is not None:
+            await close()
+        close_generator = getattr(self.code_generator, "close", None) if self._owns_code_generator else None
+        if close_generator is not None:
+            close_generator()
         return final_best
 
-    async def generate_offspring(self, parent: Program, generation_num: int, child_id: str) -> Optional[Program]:
-        logger.debug(f"Generating offspring from parent {parent.id} for generation {generation_num}")
-        
+    async def _archive_best_programs(self) -> None:
+        limit = self.get_setting("ARCHIVE_PROGRAMS_PER_RUN")
+        best = await self.database.get_best_programs(task_id=self.task_definition.id, limit=limit, objective="correctness")
+        best = [p for p in best if p.fitness_scores.get("correctness", 0.0) > 0.0]
+        self.archive.add(self.task_definition, best, self.tests_fingerprint)
+        logger.info(f"Evaluation cache: {self.evaluation_cache.hits} hits, {self.evaluation_cache.misses} misses.")
+
+    def _design_offspring_prompt(self, parent: Program, num_variants: int = 1):
+        """Returns (prompt, prompt_type): a bug-fix prompt for broken parents, a mutation prompt otherwise."""
         prompt_type = "mutation"
         
         if parent.errors and parent.fitness_scores.get("correctness", 1.0) < 0.1:
@@ -165,7 +766,8 @@ class TaskManagerAgent(TaskManagerInterface):
             mutation_prompt = self.prompt_designer.design_bug_fix_prompt(
                 program=parent,
                 error_message=primary_error,
-                execution_output=execution_details
+                execution_output=execution_details,
+                num_variants=num_variants
             )
             logger.info(f"Attempting bug fix for parent {parent.id} using diff. Error: {primary_error}")
             prompt_type = "bug_fix"
@@ -177,30 +779,47 @@ class TaskManagerAgent(TaskManagerInterface):
             }
             feedback = {k: v for k, v in feedback.items() if v is not None}
 
-            mutation_prompt = self.prompt_designer.design_mutation_prompt(program=parent, evaluation_feedback=feedback)
+            mutation_prompt = self.prompt_designer.design_mutation_prompt(program=parent, evaluation_feedback=feedback, num_variants=num_variants)
             logger.info(f"Attempting mutation for parent {parent.id} using diff.")
-        
-        generated_code = await self.code_generator.execute(
-            prompt=mutation_prompt,
-            temperature=0.75,
-            output_format="diff",
-            parent_code_for_diff=parent.code
-        )
+        return mutation_prompt, prompt_type
 
+    @staticmethod
+    def _rejection_reason(generated_code: str, parent: Program, prompt_type: str) -> Optional[str]:
         if not generated_code.strip():
             logger.warning(f"Offspring generation for parent {parent.id} ({prompt_type}) resulted in empty code/diff. Skipping.")
-            return None
-        
+            return "empty"
         if generated_code == parent.code:
             logger.warning(f"Offspring generation for parent {parent.id} ({prompt_type}) using diff resulted in no change to the code. Skipping.")
-            return None
-        
+            return "unchanged"
         if "<<<<<<< SEARCH" in generated_code and "=======" in generated_code and ">>>>>>> REPLACE" in generated_code:
             logger.warning(f"Offspring generation for parent {parent.id} ({prompt_type}) seems to have returned raw diff. LLM or diff application may have failed. Skipping. Content:\n{generated_code[:500]}")
-            return None
-        
+            return "raw_diff"
         if "# Error:" in generated_code[:100]:
             logger.warning(f"Failed to generate valid code for offspring of {parent.id} ({prompt_type}). LLM Output indicates error: {generated_code[:200]}")
+            return "llm_error"
+        return None
+
+    async def generate_offspring(self, parent: Program, generation_num: int, child_id: str) -> Optional[Program]:
+        logger.debug(f"Generating offspring from parent {parent.id} for generation {generation_num}")
+        mutation_prompt, prompt_type = self._design_offspring_prompt(parent)
+        
+        call_records: List[LLMCallRecord] = []
+        try:
+            generated_code = await self.code_generator.execute(
+                prompt=mutation_prompt,
+                temperature=0.75,
+                output_format="diff",
+                parent_code_for_diff=parent.code,
+                call_records=call_records
+            )
+        except Exception:
+            self.telemetry.record_calls(call_records, generation_num, parent.island_id)
+            raise
+
+        if self._rejection_reason(generated_code, parent, prompt_type):
+            for record in call_records:
+                record.outcome = "rejected"
+            self.telemetry.record_calls(call_records, generation_num, parent.island_id)
             return None
 
         offspring = Program(
@@ -209,11 +828,61 @@ class TaskManagerAgent(TaskManagerInterface):
             generation=generation_num,
             parent_id=parent.id,
             island_id=parent.island_id,  # Inherit island ID from parent
-            status="unevaluated"
+            status="unevaluated",
+            llm_calls=call_records,
+            task_id=self.task_definition.id
         )
+        for record in call_records:
+            record.outcome = "applied"
+        self.telemetry.record_calls(call_records, generation_num, offspring.island_id, offspring.id)
+        self.telemetry.register_offspring(offspring, parent)
+        self._publish_offspring(offspring, parent)
         logger.info(f"Successfully generated offspring {offspring.id} from parent {parent.id} ({prompt_type}).")
         return offspring
 
+    async def generate_offspring_variants(self, parent: Program, generation_num: int, child_ids: List[str]) -> List[Program]:
+        """
+        Asks for len(child_ids) independent diffs in a single LLM call and turns every distinct,
+        successfully applied variant into its own child of `parent`. The call's record is shared
+        by all resulting children.
+        """
+        logger.debug(f"Generating up to {len(child_ids)} offspring variants from parent {parent.id} for generation {generation_num}")
+        mutation_prompt, prompt_type = self._design_offspring_prompt(parent, num_variants=len(child_ids))
+
+        call_records: List[LLMCallRecord] = []
+        try:
+            variant_codes = await self.code_generator.execute_variants(
+                prompt=mutation_prompt,
+                parent_code=parent.code,
+                temperature=0.75,
+                call_records=call_records
+            )
+        except Exception:
+            self.telemetry.record_calls(call_records, generation_num, parent.island_id)
+            raise
+
+        offspring_list = []
+        for child_id, generated_code in zip(child_ids, [code for code in variant_codes if not self._rejection_reason(code, parent, prompt_type)]):
+            offspring_list.append(Program(
+                id=child_id,
+                code=generated_code,
+                generation=generation_num,
+                parent_id=parent.id,
+                island_id=parent.island_id,
+                status="unevaluated",
+                llm_calls=call_records,
+                task_id=self.task_definition.id
+            ))
+
+        for record in call_records:
+            record.outcome = "applied" if offspring_list else "rejected"
+        self.telemetry.record_calls(call_records, generation_num, parent.island_id, ",".join(child.id for child in offspring_list) or None)
+        for offspring in offspring_list:
+            self.telemetry.register_offspring(offspring, parent)
+            self._publish_offspring(offspring, parent)
+        logger.info(f"Generated {len(offspring_list)}/{len(child_ids)} offspring variants from parent {parent.id} ({prompt_type}) in one call.")
+        return offspring_list
+
     async def execute(self) -> Any:
         return await self.manage_evolutionary_cycle()
 
@@ -0,0 +1,209 @@
+"""
+Checkpoints of a running evolution.
+
+A checkpoint directory holds two files:
+
+- ``programs.jsonl``: an append-only log of program snapshots. Each checkpoint appends
+  only the programs that are new or changed since the previous one, so writes stay
+  proportional to the work done in between rather than to the size of the database.
+- ``state.json``: islands, generation counters, RNG states, in-progress work and the
+  task definition, plus the byte offset of the program log it is consistent with.
+  It is written to a temporary file and moved into place with ``os.replace``.
+
+Log lines past the recorded offset belong to a checkpoint that never completed and are
+ignored, and truncated before the next append or when the run resumes. Serialization to JSON and the file I/O run
+in a worker thread so the event loop keeps scheduling LLM calls and evaluations. A run that
+starts without resuming moves an earlier checkpoint in its directory aside instead of
+overwriting it.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.interfaces import LLMCallRecord, Program, TaskDefinition, TestSuite
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FORMAT_VERSION = 1
+STATE_FILE = "state.json"
+PROGRAMS_FILE = "programs.jsonl"
+
+
+def program_to_dict(program: Program) -> Dict[str, Any]:
+    return asdict(program)
+
+
+def program_from_dict(data: Dict[str, Any]) -> Program:
+    data = dict(data)
+    data["llm_calls"] = [LLMCallRecord(**record) for record in data.get("llm_calls", [])]
+    return Program(**data)
+
+
+def task_to_dict(task: TaskDefinition) -> Dict[str, Any]:
+    return asdict(task)
+
+
+def task_from_dict(data: Dict[str, Any]) -> TaskDefinition:
+    data = dict(data)
+    if data.get("test_suite") is not None:
+        data["test_suite"] = TestSuite(**data["test_suite"])
+    return TaskDefinition(**data)
+
+
+def rng_state_to_json(state: Tuple) -> List[Any]:
+    version, internal_state, gauss_next = state
+    return [version, list(internal_state), gauss_next]
+
+
+def rng_state_from_json(data: List[Any]) -> Tuple:
+    version, internal_state, gauss_next = data
+    return (version, tuple(internal_state), gauss_next)
+
+
+def _fingerprint(program: Program) -> Tuple:
+    """Everything about a stored program that can change after it is first saved."""
+    return (
+        program.status,
+        program.island_id,
+        program.generation,
+        tuple(sorted(program.fitness_scores.items())),
+        len(program.errors),
+        len(program.llm_calls),
+        tuple(record.improved_fitness for record in program.llm_calls),
+    )
+
+
+def load_checkpoint(directory: str) -> Tuple[Dict[str, Any], Dict[str, Program]]:
+    """Returns the checkpoint state and the programs it refers to, keyed by id."""
+    with open(os.path.join(directory, STATE_FILE)) as f:
+        state = json.load(f)
+    if state.get("version") != CHECKPOINT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint format version {state.get('version')} in {directory}")
+
+    programs: Dict[str, Program] = {}
+    log_path = os.path.join(directory, PROGRAMS_FILE)
+    if os.path.exists(log_path):
+        with open(log_path, "rb") as f:
+            data = f.read(state["programs_log_offset"])
+        for line in data.splitlines():
+            if line.strip():
+                program = program_from_dict(json.loads(line))
+                programs[program.id] = program
+    logger.info(f"Loaded checkpoint from {directory}: {len(programs)} programs, saved at {time.ctime(state['saved_at'])}")
+    return state, programs
+
+
+def _rotated_path(directory: str) -> str:
+    """A free sibling path for an earlier run's checkpoint directory: <dir>.<timestamp>[.<n>]."""
+    base = f"{directory.rstrip(os.sep)}.{time.strftime('%Y%m%d-%H%M%S')}"
+    path, n = base, 1
+    while os.path.exists(path):
+        path, n = f"{base}.{n}", n + 1
+    return path
+
+
+class CheckpointWriter:
+    def __init__(self, directory: str, resume_state: Optional[Dict[str, Any]] = None, resume_programs: Optional[Dict[str, Program]] = None):
+        self.directory = directory
+        self.state_path = os.path.join(directory, STATE_FILE)
+        self.log_path = os.path.join(directory, PROGRAMS_FILE)
+        if resume_state is None and os.path.exists(self.state_path):
+            rotated = _rotated_path(directory)
+            logger.warning(f"{directory} holds a checkpoint of an earlier run; moved it to {rotated}. Use --resume to continue a run instead.")
+            os.replace(directory, rotated)
+        os.makedirs(directory, exist_ok=True)
+        # Fingerprints of the programs as they are on disk; entries are only added once a write lands.
+        self._fingerprints: Dict[str, Tuple] = {}
+        # Fingerprints of programs in writes that are queued but have not landed yet.
+        self._queued: Dict[str, Tuple] = {}
+        # Programs of failed writes, retried with the next checkpoint.
+        self._unwritten: Dict[str, Tuple[Tuple, Dict[str, Any]]] = {}
+        self._write_task: Optional[asyncio.Task] = None
+        # Length of the program log the last committed state refers to; a write that failed may have left more.
+        self._log_offset = 0
+        self.checkpoints_written = 0
+        self.last_write_seconds = 0.0
+
+        if resume_state is not None:
+            # Drop log lines from a checkpoint that was cut off before its state was committed.
+            with open(self.log_path, "r+b") as f:
+                f.truncate(resume_state["programs_log_offset"])
+            self._log_offset = resume_state["programs_log_offset"]
+            for program in (resume_programs or {}).values():
+                self._fingerprints[program.id] = _fingerprint(program)
+        logger.info(f"Checkpointing to {directory}")
+
+    async def write(self, programs: List[Program], state: Dict[str, Any]) -> None:
+        """
+        Snapshots the given programs that changed since they were last written, and the state,
+        and writes them in the background. Callers pass what may have changed: programs saved
+        since the previous checkpoint and the ones the run state refers to.
+        Writes are serialized: a new checkpoint waits for the previous one to land first.
+        """
+        changed: Dict[str, Tuple[Tuple, Dict[str, Any]]] = {}
+        for program in programs:
+            fingerprint = _fingerprint(program)
+            if program.id not in changed and self._queued.get(program.id, self._fingerprints.get(program.id)) != fingerprint:
+                changed[program.id] = (fingerprint, program_to_dict(program))
+                self._queued[program.id] = fingerprint
+        state = dict(state, version=CHECKPOINT_FORMAT_VERSION, saved_at=time.time())
+        previous = self._write_task
+        self._write_task = asyncio.create_task(self._write_after(previous, changed, state))
+
+    async def _write_after(self, previous: Optional[asyncio.Task], changed: Dict[str, Tuple[Tuple, Dict[str, Any]]],
+                           state: Dict[str, Any]) -> None:
+        if previous is not None:
+            await previous
+        changed = {**self._unwritten, **changed}
+        self._unwritten = {}
+        start_time = time.monotonic()
+        try:
+            await asyncio.to_thread(self._write_sync, [entry for _, entry in changed.values()], state)
+        except Exception as e:
+            self._unwritten = changed
+            logger.error(f"Failed to write checkpoint to {self.directory} ({len(changed)} programs will be retried): {e}", exc_info=True)
+            return
+        for program_id, (fingerprint, _) in changed.items():
+            if program_id not in self._queued:
+                continue  # Forgotten while the write was in flight
+            self._fingerprints[program_id] = fingerprint
+            if self._queued[program_id] == fingerprint:
+                del self._queued[program_id]
+        self.checkpoints_written += 1
+        self.last_write_seconds = time.monotonic() - start_time
+        logger.debug(f"Checkpoint written to {self.directory}: {len(changed)} changed programs in {self.last_write_seconds:.3f}s")
+
+    def forget(self, program_ids: Iterable[str]) -> None:
+        """
+        Drops the fingerprints of programs evicted from the database. Queued writes still land;
+        a forgotten program passed to write() again is simply written again.
+        """
+        for program_id in program_ids:
+            self._fingerprints.pop(program_id, None)
+            self._queued.pop(program_id, None)
+
+    def _write_sync(self, changed: List[Dict[str, Any]], state: Dict[str, Any]) -> None:
+        with open(self.log_path, "a") as f:
+            # Drop whatever a failed write left after the last committed checkpoint, torn lines included.
+            f.truncate(self._log_offset)
+            for entry in changed:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            state["programs_log_offset"] = f.tell()
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+        self._log_offset = state["programs_log_offset"]
+
+    async def flush(self) -> None:
+        """Waits until every requested checkpoint is on disk."""
+        if self._write_task is not None:
+            await self._write_task
@@ -0,0 +1,128 @@
+"""
+Cost-aware evaluation queue: at most `capacity` evaluations run at once, and when a slot frees
+up it goes to the waiting program with the shortest expected evaluation time, so a few programs
+running close to the timeout cannot hold up many cheap ones.
+
+The expected time of a child is its parent's measured evaluation time, pulled towards the
+timeout by how often its lineage has timed out recently. Waiting lowers a job's effective cost
+by `aging_rate` seconds per second waited, so expensive jobs are delayed but never starved.
+Measurements are kept for the `max_programs` most recently observed or used parents.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.interfaces import Program
+
+logger = logging.getLogger(__name__)
+
+
+def timed_out(program: Program) -> bool:
+    return any("timed out" in error.lower() or "timeout" in error.lower() for error in program.errors)
+
+
+class EvaluationCostModel:
+    def __init__(self, timeout_seconds: float, lineage_decay: float = 0.5, default_seconds: float = 1.0, max_programs: int = 10000):
+        self.timeout_seconds = timeout_seconds
+        self.lineage_decay = lineage_decay
+        self.default_seconds = default_seconds
+        self.max_programs = max(1, max_programs)
+        # Per program, least recently used first: (measured evaluation time, decayed share of timeouts along its lineage)
+        self._programs: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._mean_seconds: Optional[float] = None
+        self._observations = 0
+        self._absolute_error = 0.0
+        self._relative_error = 0.0
+        self._signed_error = 0.0
+
+    def _parent(self, program: Program) -> Optional[Tuple[float, float]]:
+        parent = self._programs.get(program.parent_id)
+        if parent is not None:
+            self._programs.move_to_end(program.parent_id)
+        return parent
+
+    def predict(self, program: Program) -> float:
+        parent = self._parent(program)
+        if parent is None:
+            base = self._mean_seconds if self._mean_seconds is not None else self.default_seconds
+            timeout_share = 0.0
+        else:
+            base, timeout_share = parent
+        return (1.0 - timeout_share) * base + timeout_share * self.timeout_seconds
+
+    def observe(self, program: Program, seconds: float, predicted: Optional[float] = None) -> None:
+        parent = self._parent(program)
+        parent_share = parent[1] if parent is not None else 0.0
+        self._programs[program.id] = (seconds, self.lineage_decay * parent_share
+                                      + (1.0 - self.lineage_decay) * (1.0 if timed_out(program) else 0.0))
+        self._programs.move_to_end(program.id)
+        while len(self._programs) > self.max_programs:
+            self._programs.popitem(last=False)
+        self._mean_seconds = seconds if self._mean_seconds is None else 0.9 * self._mean_seconds + 0.1 * seconds
+        if predicted is not None:
+            self._observations += 1
+            self._absolute_error += abs(predicted - seconds)
+            self._relative_error += abs(predicted - seconds) / max(seconds, 1e-3)
+            self._signed_error += predicted - seconds
+
+    def error_summary(self) -> Dict[str, Any]:
+        """Predicted-versus-actual evaluation time over every scheduled job."""
+        n = self._observations
+        return {
+            "jobs": n,
+            "mean_absolute_error_seconds": self._absolute_error / n if n else 0.0,
+            "mean_relative_error": self._relative_error / n if n else 0.0,
+            "mean_bias_seconds": self._signed_error / n if n else 0.0,  # Positive: predictions too high
+        }
+
+
+class EvaluationQueue:
+    def __init__(self, capacity: int, cost_model: EvaluationCostModel, aging_rate: float = 1.0):
+        self.capacity = max(1, capacity)
+        self.cost_model = cost_model
+        self.aging_rate = aging_rate
+        self.in_use = 0
+        self._waiters: List[Any] = []  # (predicted seconds, enqueued at, sequence, future)
+        self._sequence = 0
+
+    def _pick_waiter(self):
+        now = time.monotonic()
+        return min(self._waiters, key=lambda w: (w[0] - self.aging_rate * (now - w[1]), w[2]))
+
+    def _release(self) -> None:
+        self.in_use -= 1
+        while self._waiters and self.in_use < self.capacity:
+            waiter = self._pick_waiter()
+            self._waiters.remove(waiter)
+            if not waiter[3].done():
+                self.in_use += 1
+                waiter[3].set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, program: Program):
+        """Holds an evaluation slot for `program`; the measured time is fed back to the cost model."""
+        predicted = self.cost_model.predict(program)
+        if self.in_use < self.capacity and not self._waiters:
+            self.in_use += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._sequence += 1
+            waiter = (predicted, time.monotonic(), self._sequence, future)
+            self._waiters.append(waiter)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif future.done() and not future.cancelled():
+                    self._release()  # Granted just before the cancellation arrived
+                raise
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release()
+        self.cost_model.observe(program, time.monotonic() - start_time, predicted)
@@ -0,0 +1,240 @@
+"""
+Island-parallel evolution: islands are split into groups, and each group runs its own
+TaskManagerAgent evolution loop in a separate process, so selection, diff application,
+prompt building and result parsing use all cores instead of one event loop.
+
+Processes form a ring. Every MIGRATION_INTERVAL generations each one sends its best
+MIGRATION_RATE share of programs to the next process's inbox queue and inserts whatever
+arrived in its own inbox into its worst island. Migration between the islands inside one
+process still happens in SelectionControllerAgent. Each process reports its best program
+after every generation to the coordinator, which tracks the global best.
+
+Each process points its own stderr at a file for the length of the run. When a process dies
+without reporting a result (for example because an import fails before the evolution loop starts),
+the coordinator records its exit code and the tail of that file.
+"""
+import asyncio
+import dataclasses
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from core.fitness import fitness_key
+from core.interfaces import Program, TaskDefinition
+from task_manager.checkpoint import task_from_dict, task_to_dict
+
+logger = logging.getLogger(__name__)
+
+
+def split_islands(num_islands: int, population_size: int, num_workers: int) -> List[Tuple[int, int]]:
+    """(islands, population size) per worker; islands and population are spread as evenly as possible."""
+    num_workers = max(1, min(num_workers, num_islands))
+    shares = []
+    assigned_population = 0
+    for worker_index in range(num_workers):
+        islands = num_islands // num_workers + (1 if worker_index < num_islands % num_workers else 0)
+        if worker_index == num_workers - 1:
+            population = population_size - assigned_population
+        else:
+            population = population_size * islands // num_islands
+        population = max(islands, population)
+        assigned_population += population
+        shares.append((islands, population))
+    return shares
+
+
+def _drain(inbox, wait_seconds: float) -> List[Program]:
+    """Everything in the inbox; waits up to wait_seconds for the first batch when it is empty."""
+    programs: List[Program] = []
+    try:
+        if wait_seconds > 0:
+            programs.extend(inbox.get(timeout=wait_seconds))
+        while True:
+            programs.extend(inbox.get_nowait())
+    except queue.Empty:
+        pass
+    return programs
+
+
+async def _island_worker_main(worker_index: int, num_workers: int, task_data: Dict[str, Any], config: Dict[str, Any],
+                              inboxes: List[Any], results: Any) -> None:
+    # Imported here so that a failing import is reported like any other startup error.
+    from task_manager.agent import TaskManagerAgent
+    manager = TaskManagerAgent(task_definition=task_from_dict(task_data), config=config)
+    migration_interval = max(1, manager.get_setting("MIGRATION_INTERVAL"))
+    migrant_count = max(1, math.ceil(manager.get_setting("MIGRATION_RATE") * manager.population_size))
+    wait_seconds = manager.get_setting("ISLAND_MIGRATION_WAIT_SECONDS")
+    stats = {"emigrants_sent": 0, "immigrants_received": 0}
+
+    async def after_generation(gen: int) -> None:
+        best = manager.selection_controller.emigrants(1)
+        results.put(("generation", worker_index, gen, best[0] if best else None))
+        if num_workers < 2 or gen % migration_interval != 0:
+            return
+        emigrants = manager.selection_controller.emigrants(migrant_count)
+        inboxes[(worker_index + 1) % num_workers].put(emigrants)
+        stats["emigrants_sent"] += len(emigrants)
+        arrived = await asyncio.to_thread(_drain, inboxes[worker_index], wait_seconds)
+        immigrants = manager.selection_controller.immigrate(arrived)
+        if immigrants:
+            for program in immigrants:
+                program.task_id = manager.task_definition.id  # Now part of this process's run
+            await manager._save_programs(immigrants)
+            manager._population = [p for island in manager.selection_controller.islands.values() for p in island.programs]
+            stats["immigrants_received"] += len(immigrants)
+
+    manager.after_generation = after_generation
+    best_programs = await manager.execute()
+    # Migrants still queued for a process that has already finished are dropped instead of blocking exit.
+    for inbox in inboxes:
+        inbox.cancel_join_thread()
+    results.put(("done", worker_index, best_programs, dict(manager.telemetry.totals(), **stats)))
+
+
+def run_island_worker(worker_index: int, num_workers: int, task_data: Dict[str, Any], config: Dict[str, Any],
+                      inboxes: List[Any], results: Any) -> None:
+    """Process entry point for one group of islands."""
+    try:
+        logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO), format=settings.LOG_FORMAT)
+        asyncio.run(_island_worker_main(worker_index, num_workers, task_data, config, inboxes, results))
+    except Exception:
+        results.put(("error", worker_index, traceback.format_exc()))
+
+
+def _run_with_stderr(stderr_path: str, target: Callable[..., None], *args: Any) -> None:
+    """Process entry point: points this process's stderr (fd 2) at `stderr_path`, then runs `target`."""
+    with open(stderr_path, "ab") as log:
+        sys.stderr.flush()
+        os.dup2(log.fileno(), 2)
+    target(*args)
+
+
+def _tail(path: str, max_chars: int = 4000) -> str:
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - max_chars))
+            return f.read().decode("utf-8", errors="replace").strip()
+    except OSError:
+        return ""
+
+
+class IslandParallelCoordinator:
+    def __init__(self, task_definition: TaskDefinition, config: Optional[Dict[str, Any]] = None, num_workers: Optional[int] = None):
+        self.task_definition = task_definition
+        self.config = dict(config or {})
+
+        def setting(name):
+            return self.config.get(name, settings.get_setting(name))
+        num_islands = setting("NUM_ISLANDS")
+        self.shares = split_islands(num_islands, setting("POPULATION_SIZE"), num_workers or setting("ISLAND_PARALLEL_WORKERS") or 1)
+        self.num_workers = len(self.shares)
+        self.global_best: Optional[Program] = None
+        self.global_best_history: List[Tuple[int, int, Dict[str, float]]] = []  # (worker, generation, fitness)
+        self.worker_totals: Dict[int, Dict[str, Any]] = {}
+        self.worker_errors: Dict[int, str] = {}
+        self.worker_exitcodes: Dict[int, Optional[int]] = {}
+        # Process entry point; replaceable so tests can start processes that fail in other ways.
+        self.worker_target: Callable[..., None] = run_island_worker
+        logger.info(f"Island-parallel run of task {task_definition.id}: {num_islands} islands over {self.num_workers} processes {self.shares}")
+
+    def worker_task(self, worker_index: int) -> TaskDefinition:
+        # Distinct ids keep program ids and checkpoint directories apart across processes.
+        return dataclasses.replace(self.task_definition, id=f"{self.task_definition.id}_w{worker_index}")
+
+    def worker_config(self, worker_index: int) -> Dict[str, Any]:
+        islands, population = self.shares[worker_index]
+        return dict(self.config, NUM_ISLANDS=islands, POPULATION_SIZE=population)
+
+    def _observe(self, worker_index: int, generation: int, program: Optional[Program]) -> None:
+        if program is None:
+            return
+        if self.global_best is None or fitness_key(program) > fitness_key(self.global_best):
+            self.global_best = program
+            self.global_best_history.append((worker_index, generation, dict(program.fitness_scores)))
+            logger.info(f"New global best from island process {worker_index} at generation {generation}: "
+                        f"{program.id}, fitness {program.fitness_scores}")
+
+    @staticmethod
+    def _next_message(results: Any, processes: List[Any]) -> Optional[Tuple]:
+        while True:
+            try:
+                return results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    try:
+                        return results.get_nowait()
+                    except queue.Empty:
+                        return None
+
+    async def run(self) -> List[Program]:
+        with tempfile.TemporaryDirectory(prefix="island-workers-") as stderr_dir:
+            await self._run_processes(stderr_dir)
+
+        llm_calls = sum(totals.get("llm_calls", 0) for totals in self.worker_totals.values())
+        migrants = sum(totals.get("immigrants_received", 0) for totals in self.worker_totals.values())
+        logger.info(f"Island-parallel run finished: {len(self.worker_totals)}/{self.num_workers} processes completed, "
+                    f"{llm_calls} LLM calls, {migrants} migrants exchanged.")
+        if self.global_best is not None:
+            logger.info(f"Global best program: {self.global_best.id}, fitness {self.global_best.fitness_scores}")
+            return [self.global_best]
+        return []
+
+    async def _run_processes(self, stderr_dir: str) -> None:
+        context = multiprocessing.get_context("spawn")
+        inboxes = [context.Queue() for _ in range(self.num_workers)]
+        results = context.Queue()
+        stderr_paths = [os.path.join(stderr_dir, f"worker-{k}.stderr") for k in range(self.num_workers)]
+        processes = [
+            context.Process(
+                target=_run_with_stderr,
+                args=(stderr_paths[k], self.worker_target,
+                      k, self.num_workers, task_to_dict(self.worker_task(k)), self.worker_config(k), inboxes, results),
+                name=f"island-worker-{k}",
+            )
+            for k in range(self.num_workers)
+        ]
+        for process in processes:
+            process.start()
+
+        pending = set(range(self.num_workers))
+        try:
+            while pending:
+                message = await asyncio.to_thread(self._next_message, results, processes)
+                if message is None:
+                    break
+                kind, worker_index = message[0], message[1]
+                if kind == "generation":
+                    self._observe(worker_index, message[2], message[3])
+                elif kind == "done":
+                    for program in message[2] or []:
+                        self._observe(worker_index, -1, program)
+                    self.worker_totals[worker_index] = message[3]
+                    pending.discard(worker_index)
+                elif kind == "error":
+                    logger.error(f"Island process {worker_index} failed:\n{message[2]}")
+                    self.worker_errors[worker_index] = message[2]
+                    pending.discard(worker_index)
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                    process.join(timeout=5)
+            for worker_index, process in enumerate(processes):
+                self.worker_exitcodes[worker_index] = process.exitcode
+            for worker_index in sorted(pending):
+                stderr = _tail(stderr_paths[worker_index])
+                self.worker_errors[worker_index] = (f"process exited with code {processes[worker_index].exitcode} without reporting a result"
+                                                    + (f"; stderr:\n{stderr}" if stderr else ""))
+                logger.error(f"Island process {worker_index} failed: {self.worker_errors[worker_index]}")
+
+    async def execute(self) -> List[Program]:
+        return await self.run()
@@ -0,0 +1,151 @@
+"""
+Run budgets, convergence detection and stagnant-island freezing.
+
+Budgets cover wall-clock time, LLM tokens and dollars (from the telemetry rollups) and
+evaluation CPU-seconds (user + system time of the run's own sandboxes, as counted by its
+evaluator, so tasks sharing a process are charged separately).
+Convergence means the global best has not improved for a number of generations; an
+island that has not improved for long enough is frozen so parent selection (and with
+it the LLM and evaluation budget) goes to islands that still make progress.
+"""
+import logging
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from monitoring_agent.telemetry import TelemetryCollector
+from selection_controller.agent import fitness_improved
+
+logger = logging.getLogger(__name__)
+
+
+class RunController:
+    def __init__(
+        self,
+        telemetry: TelemetryCollector,
+        max_wall_clock_seconds: Optional[float] = None,
+        max_llm_tokens: Optional[int] = None,
+        max_llm_cost_usd: Optional[float] = None,
+        max_evaluation_cpu_seconds: Optional[float] = None,
+        convergence_patience: Optional[int] = None,
+        island_stagnation_generations: Optional[int] = None,
+        runtime_tolerance: float = 0.0,
+        evaluation_cpu_seconds: Optional[Callable[[], float]] = None,
+    ):
+        """`evaluation_cpu_seconds` returns the CPU time the run's evaluations have used so far."""
+        self.telemetry = telemetry
+        self.evaluation_cpu_seconds = evaluation_cpu_seconds or (lambda: 0.0)
+        self.max_wall_clock_seconds = max_wall_clock_seconds
+        self.max_llm_tokens = max_llm_tokens
+        self.max_llm_cost_usd = max_llm_cost_usd
+        self.max_evaluation_cpu_seconds = max_evaluation_cpu_seconds
+        self.convergence_patience = convergence_patience
+        self.island_stagnation_generations = island_stagnation_generations
+        self.runtime_tolerance = runtime_tolerance
+
+        self._start_time = time.monotonic()
+        self._start_cpu = self.evaluation_cpu_seconds()
+        self._prior_elapsed_seconds = 0.0  # Carried over from before a resume
+        self._prior_cpu_seconds = 0.0
+        self.global_best_key: Optional[Tuple[float, float]] = None
+        self.last_global_improvement_generation = 0
+        self.stop_reason: Optional[str] = None
+
+    @classmethod
+    def from_settings(cls, telemetry: TelemetryCollector, get_setting: Callable[[str], Any],
+                      evaluation_cpu_seconds: Optional[Callable[[], float]] = None) -> "RunController":
+        """Limits read through `get_setting`, the owning agent's, so per-task overrides apply."""
+        return cls(
+            telemetry,
+            max_wall_clock_seconds=get_setting("RUN_MAX_WALL_CLOCK_SECONDS"),
+            max_llm_tokens=get_setting("RUN_MAX_LLM_TOKENS"),
+            max_llm_cost_usd=get_setting("RUN_MAX_LLM_COST_USD"),
+            max_evaluation_cpu_seconds=get_setting("RUN_MAX_EVALUATION_CPU_SECONDS"),
+            convergence_patience=get_setting("CONVERGENCE_PATIENCE_GENERATIONS"),
+            island_stagnation_generations=get_setting("ISLAND_STAGNATION_GENERATIONS"),
+            runtime_tolerance=get_setting("CONVERGENCE_RUNTIME_TOLERANCE"),
+            evaluation_cpu_seconds=evaluation_cpu_seconds,
+        )
+
+    def start(self) -> None:
+        """Starts the clocks; time and CPU spent before a resume are kept."""
+        self._start_time = time.monotonic()
+        self._start_cpu = self.evaluation_cpu_seconds()
+
+    def usage(self) -> Dict[str, float]:
+        totals = self.telemetry.totals()
+        return {
+            "wall_clock_seconds": self._prior_elapsed_seconds + time.monotonic() - self._start_time,
+            "llm_tokens": totals["total_tokens"],
+            "llm_cost_usd": totals["cost_usd"],
+            "evaluation_cpu_seconds": self._prior_cpu_seconds + self.evaluation_cpu_seconds() - self._start_cpu,
+        }
+
+    def check_budgets(self) -> Optional[str]:
+        """Returns (and remembers) the reason to stop if a budget is spent, else None."""
+        if self.stop_reason:
+            return self.stop_reason
+        usage = self.usage()
+        limits = [
+            ("wall_clock_seconds", self.max_wall_clock_seconds),
+            ("llm_tokens", self.max_llm_tokens),
+            ("llm_cost_usd", self.max_llm_cost_usd),
+            ("evaluation_cpu_seconds", self.max_evaluation_cpu_seconds),
+        ]
+        for name, limit in limits:
+            if limit is not None and usage[name] >= limit:
+                self.stop_reason = f"budget exhausted: {name} {usage[name]:.2f} >= {limit}"
+                logger.warning(f"Stopping run, {self.stop_reason}")
+                return self.stop_reason
+        return None
+
+    def observe_generation(self, generation: int, islands: Dict[int, Any]) -> Optional[str]:
+        """
+        Call after survivor selection. Updates the global best, freezes islands that have
+        stagnated for island_stagnation_generations (never the last active one), unfreezes
+        islands that improved again (e.g. through migration) and returns a stop reason once
+        the global best has not improved for convergence_patience generations.
+        """
+        for island in islands.values():
+            best = island.get_best_program()
+            if best is None:
+                continue
+            key = (best.fitness_scores.get("correctness", 0.0), best.fitness_scores.get("runtime_ms", float('inf')))
+            if fitness_improved(key, self.global_best_key, self.runtime_tolerance):
+                self.global_best_key = key
+                self.last_global_improvement_generation = generation
+
+        if self.island_stagnation_generations is not None:
+            for island in islands.values():
+                stagnant_for = island.generation - island.last_improvement_generation
+                if island.frozen and stagnant_for < self.island_stagnation_generations:
+                    island.frozen = False
+                    logger.info(f"Island {island.island_id} improved again; unfreezing it.")
+                elif not island.frozen and stagnant_for >= self.island_stagnation_generations:
+                    if sum(1 for other in islands.values() if not other.frozen) > 1:
+                        island.frozen = True
+                        logger.info(f"Freezing island {island.island_id}: no improvement for {stagnant_for} generations.")
+
+        if (self.convergence_patience is not None and not self.stop_reason
+                and generation - self.last_global_improvement_generation >= self.convergence_patience):
+            self.stop_reason = (f"converged: global best {self.global_best_key} unchanged since generation "
+                                f"{self.last_global_improvement_generation}")
+            logger.info(f"Stopping run, {self.stop_reason}")
+        return self.stop_reason
+
+    def get_state(self) -> Dict[str, Any]:
+        usage = self.usage()
+        return {
+            "elapsed_seconds": usage["wall_clock_seconds"],
+            "evaluation_cpu_seconds": usage["evaluation_cpu_seconds"],
+            "global_best_key": list(self.global_best_key) if self.global_best_key else None,
+            "last_global_improvement_generation": self.last_global_improvement_generation,
+            "stop_reason": self.stop_reason,
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._prior_elapsed_seconds = state["elapsed_seconds"]
+        self._prior_cpu_seconds = state["evaluation_cpu_seconds"]
+        self.start()
+        self.global_best_key = tuple(state["global_best_key"]) if state["global_best_key"] else None
+        self.last_global_improvement_generation = state["last_global_improvement_generation"]
+        self.stop_reason = state["stop_reason"]
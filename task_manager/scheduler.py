@@ -0,0 +1,291 @@
+"""
+Runs many tasks in one process over shared capacity.
+
+All tasks share one code generator (one LLM client, with its hedging and retry state) and two
+slot pools: LLM calls and program evaluations. When a slot frees up it goes to a waiting task
+chosen by the pool's policy:
+
+- ``fair``: the task holding the fewest slots relative to its priority weight, so a task with
+  many concurrent offspring cannot starve the others.
+- ``priority``: the task with the highest priority, FIFO among equals.
+
+Each task keeps its own TaskManagerAgent, config overrides, database and telemetry. Of the code
+generator's settings, only the model and the temperature can be overridden per task: they are
+passed with each of the task's calls. Overrides of the other LLM client settings are rejected.
+"""
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from core.interfaces import CodeGeneratorInterface, EvaluatorAgentInterface, Program, TaskDefinition
+from code_generator.agent import CodeGeneratorAgent
+from task_manager.agent import TaskManagerAgent
+from task_manager.checkpoint import task_from_dict
+
+logger = logging.getLogger(__name__)
+
+SCHEDULING_POLICIES = ("fair", "priority")
+# Code generator settings a task can override, and the call argument that carries each of them.
+PER_CALL_SETTINGS = {"PRO_MODEL": "model_name", "LITELLM_TEMPERATURE": "temperature"}
+# Settings of the shared LLM client, read once when it is built.
+SHARED_CLIENT_SETTINGS = frozenset({
+    "API_MAX_RETRIES", "API_RETRY_DELAY_SECONDS", "HEDGING_ENABLED", "HEDGING_FALLBACK_MODEL", "HEDGING_LATENCY_PERCENTILE",
+    "HEDGING_MAX_EXTRA_CALL_RATE", "HEDGING_MIN_SAMPLES", "LATENCY_HISTOGRAM_WINDOW", "LITELLM_MAX_TOKENS", "LITELLM_TOP_K",
+    "LITELLM_TOP_P", "LLM_BACKEND", "LLM_CASSETTE_MODE", "LLM_CASSETTE_PATH", "LLM_CASSETTE_STRICT", "LOCAL_LLM_CORPUS_PATH",
+    "LOCAL_LLM_ERROR_RATES", "LOCAL_LLM_LATENCY", "LOCAL_LLM_SEED", "PRO_API_KEY", "PRO_BASE_URL",
+})
+
+
+def check_task_config(task_id: str, config: Dict[str, Any]) -> None:
+    """Raises ValueError for overrides of settings that belong to the shared LLM client."""
+    shared = sorted(SHARED_CLIENT_SETTINGS.intersection(config))
+    if shared:
+        raise ValueError(f"Task {task_id} overrides settings of the shared LLM client, which cannot differ per task: {', '.join(shared)}")
+
+
+@dataclass
+class SlotUsage:
+    """Per-task usage of one slot pool."""
+    acquired: int = 0
+    in_use: int = 0
+    wait_seconds: float = 0.0
+    busy_seconds: float = 0.0
+
+
+class SlotPool:
+    def __init__(self, name: str, capacity: int, policy: str = "fair"):
+        if policy not in SCHEDULING_POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.policy = policy
+        self.in_use = 0
+        self._priorities: Dict[str, float] = {}
+        self._waiters: List[Any] = []  # (arrival sequence, task_id, future)
+        self._sequence = 0
+        self.usage: Dict[str, SlotUsage] = {}
+
+    def register(self, task_id: str, priority: float = 1.0) -> None:
+        self._priorities[task_id] = priority
+        self.usage.setdefault(task_id, SlotUsage())
+
+    def _pick_waiter(self):
+        if self.policy == "priority":
+            key = lambda w: (-self._priorities.get(w[1], 1.0), w[0])
+        else:
+            key = lambda w: (self.usage[w[1]].in_use / max(self._priorities.get(w[1], 1.0), 1e-9), w[0])
+        return min(self._waiters, key=key)
+
+    def _grant(self, task_id: str) -> None:
+        self.in_use += 1
+        self.usage[task_id].in_use += 1
+        self.usage[task_id].acquired += 1
+
+    def _release(self, task_id: str) -> None:
+        self.in_use -= 1
+        self.usage[task_id].in_use -= 1
+        while self._waiters and self.in_use < self.capacity:
+            waiter = self._pick_waiter()
+            self._waiters.remove(waiter)
+            if not waiter[2].done():
+                self._grant(waiter[1])
+                waiter[2].set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, task_id: str):
+        self.usage.setdefault(task_id, SlotUsage())
+        start_time = time.monotonic()
+        if self.in_use < self.capacity and not self._waiters:
+            self._grant(task_id)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._sequence += 1
+            waiter = (self._sequence, task_id, future)
+            self._waiters.append(waiter)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif future.done() and not future.cancelled():
+                    self._release(task_id)  # Granted just before the cancellation arrived
+                raise
+        acquired_time = time.monotonic()
+        self.usage[task_id].wait_seconds += acquired_time - start_time
+        try:
+            yield
+        finally:
+            self.usage[task_id].busy_seconds += time.monotonic() - acquired_time
+            self._release(task_id)
+
+
+class ScheduledCodeGenerator(CodeGeneratorInterface):
+    """
+    Routes one task's LLM calls through the shared generator, one LLM slot per call. The task's
+    model and temperature overrides (see PER_CALL_SETTINGS) go with every call that does not set
+    them itself.
+    """
+
+    def __init__(self, generator: CodeGeneratorInterface, pool: SlotPool, task_id: str,
+                 config: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.generator = generator
+        self.pool = pool
+        self.task_id = task_id
+        self.call_overrides = {argument: config[name] for name, argument in PER_CALL_SETTINGS.items() if name in (config or {})}
+
+    def _with_overrides(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        for argument, value in self.call_overrides.items():
+            if kwargs.get(argument) is None:
+                kwargs[argument] = value
+        return kwargs
+
+    async def generate_code(self, prompt: str, *args, **kwargs) -> str:
+        async with self.pool.slot(self.task_id):
+            return await self.generator.generate_code(prompt, *args, **self._with_overrides(kwargs))
+
+    async def execute(self, *args, **kwargs) -> Any:
+        async with self.pool.slot(self.task_id):
+            return await self.generator.execute(*args, **self._with_overrides(kwargs))
+
+    async def execute_variants(self, *args, **kwargs) -> List[str]:
+        async with self.pool.slot(self.task_id):
+            return await self.generator.execute_variants(*args, **self._with_overrides(kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.generator, name)
+
+
+class ScheduledEvaluator(EvaluatorAgentInterface):
+    """Runs one task's evaluations in the shared evaluation slots."""
+
+    def __init__(self, evaluator: EvaluatorAgentInterface, pool: SlotPool, task_id: str):
+        super().__init__()
+        self.evaluator = evaluator
+        self.pool = pool
+        self.task_id = task_id
+
+    async def evaluate_program(self, program: Program, task: TaskDefinition) -> Program:
+        async with self.pool.slot(self.task_id):
+            return await self.evaluator.evaluate_program(program, task)
+
+    async def execute(self, *args, **kwargs) -> Any:
+        async with self.pool.slot(self.task_id):
+            return await self.evaluator.execute(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.evaluator, name)
+
+
+@dataclass
+class ScheduledTask:
+    task: TaskDefinition
+    config: Dict[str, Any] = field(default_factory=dict)
+    priority: float = 1.0
+
+
+@dataclass
+class TaskRunResult:
+    task_id: str
+    best_programs: List[Program]
+    throughput: Dict[str, Any]
+    error: Optional[str] = None
+
+
+class MultiTaskScheduler:
+    def __init__(
+        self,
+        llm_slots: Optional[int] = None,
+        evaluation_slots: Optional[int] = None,
+        policy: Optional[str] = None,
+        code_generator: Optional[CodeGeneratorInterface] = None,
+    ):
+        policy = policy or settings.SCHEDULER_POLICY
+        self.llm_pool = SlotPool("llm", llm_slots or settings.SCHEDULER_LLM_SLOTS, policy)
+        self.evaluation_pool = SlotPool("evaluation", evaluation_slots or settings.SCHEDULER_EVALUATION_SLOTS, policy)
+        self.code_generator = code_generator or CodeGeneratorAgent()
+        self._owns_code_generator = code_generator is None
+        self.managers: Dict[str, TaskManagerAgent] = {}
+        self._wall_seconds: Dict[str, float] = {}
+
+    def add_task(self, task: TaskDefinition, config: Optional[Dict[str, Any]] = None, priority: float = 1.0) -> TaskManagerAgent:
+        if task.id in self.managers:
+            raise ValueError(f"Task {task.id} is already scheduled")
+        config = dict(config or {})
+        check_task_config(task.id, config)
+        manager = TaskManagerAgent(task_definition=task, config=config,
+                                   code_generator=ScheduledCodeGenerator(self.code_generator, self.llm_pool, task.id, config))
+        manager.evaluator = ScheduledEvaluator(manager.evaluator, self.evaluation_pool, task.id)
+        self.llm_pool.register(task.id, priority)
+        self.evaluation_pool.register(task.id, priority)
+        self.managers[task.id] = manager
+        return manager
+
+    async def _run_task(self, task_id: str) -> TaskRunResult:
+        manager = self.managers[task_id]
+        start_time = time.monotonic()
+        try:
+            best_programs = await manager.execute()
+            error = None
+        except Exception as e:
+            logger.error(f"Task {task_id} failed: {e}", exc_info=True)
+            best_programs, error = [], str(e)
+        self._wall_seconds[task_id] = time.monotonic() - start_time
+        return TaskRunResult(task_id, best_programs or [], self.throughput(task_id), error)
+
+    async def run(self) -> List[TaskRunResult]:
+        """Runs every added task concurrently; one failing task does not stop the others."""
+        logger.info(f"Running {len(self.managers)} tasks with {self.llm_pool.capacity} LLM slots and "
+                    f"{self.evaluation_pool.capacity} evaluation slots ({self.llm_pool.policy} scheduling).")
+        results = await asyncio.gather(*[self._run_task(task_id) for task_id in self.managers])
+        close_generator = getattr(self.code_generator, "close", None) if self._owns_code_generator else None
+        if close_generator is not None:
+            close_generator()  # Every task has finished with the shared generator (and its cassette)
+        for result in results:
+            logger.info(f"Task {result.task_id} throughput: {result.throughput}")
+        return list(results)
+
+    def throughput(self, task_id: str) -> Dict[str, Any]:
+        totals = self.managers[task_id].telemetry.totals()
+        llm = self.llm_pool.usage[task_id]
+        evaluation = self.evaluation_pool.usage[task_id]
+        wall_seconds = self._wall_seconds.get(task_id, 0.0)
+        minutes = wall_seconds / 60.0
+        return {
+            "wall_seconds": wall_seconds,
+            "llm_calls": totals["llm_calls"],
+            "offspring": totals["offspring"],
+            "programs_evaluated": totals["programs_evaluated"],
+            "total_tokens": totals["total_tokens"],
+            "offspring_per_minute": totals["offspring"] / minutes if minutes else 0.0,
+            "evaluations_per_minute": totals["programs_evaluated"] / minutes if minutes else 0.0,
+            "llm_slot_wait_seconds": llm.wait_seconds,
+            "llm_slot_busy_seconds": llm.busy_seconds,
+            "evaluation_slot_wait_seconds": evaluation.wait_seconds,
+            "evaluation_slot_busy_seconds": evaluation.busy_seconds,
+        }
+
+
+def load_task_file(path: str) -> List[ScheduledTask]:
+    """
+    Reads a JSON task file: one object or a list of objects, each with the TaskDefinition fields
+    plus optional "config" (setting overrides for that task) and "priority" keys. Overrides of
+    the shared LLM client's settings raise ValueError.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    entries = data if isinstance(data, list) else [data]
+    tasks = []
+    for entry in entries:
+        entry = dict(entry)
+        config = entry.pop("config", None) or {}
+        priority = float(entry.pop("priority", 1.0))
+        task = task_from_dict(entry)
+        check_task_config(task.id, config)
+        tasks.append(ScheduledTask(task, config, priority))
+    return tasks
@@ -0,0 +1,66 @@
+import random
+import unittest
+
+from core.interfaces import Program
+from database_agent.agent import InMemoryDatabaseAgent
+from database_agent.indexes import TopKIndex
+
+
+def full_sort(programs, objective, sort_order):
+    """The ranking get_best_programs had before it was indexed."""
+    default = -1.0 if objective == "correctness" else float('inf')
+    return sorted(programs, key=lambda p: p.fitness_scores.get(objective, default), reverse=(sort_order == "desc"))
+
+
+class TestTopKIndex(unittest.TestCase):
+    def test_updates_and_removals_are_reflected_in_top_k(self):
+        index = TopKIndex([((3,), "a"), ((1,), "b"), ((2,), "c")])
+        index.update("a", (0,))
+        index.remove("b")
+        index.update("c", (5,))
+        index.update("c", (2,))  # Back to an earlier key: still listed once
+        self.assertEqual([pid for _, pid in index.top(10)], ["a", "c"])
+        for i in range(200):
+            index.update("a", (i,))
+        self.assertLess(len(index._heap), 2 * len(index) + 65)
+
+
+class TestIndexedBestPrograms(unittest.IsolatedAsyncioTestCase):
+    async def test_matches_a_full_sort_through_overwrites(self):
+        rng = random.Random(7)
+        database = InMemoryDatabaseAgent()
+        latest = {}
+        for step in range(600):
+            program_id = f"p{rng.randrange(150)}"
+            fitness = {}
+            if rng.random() < 0.9:
+                fitness = {"correctness": rng.choice([0.0, 0.25, 0.5, 1.0]), "runtime_ms": rng.choice([1.0, 2.0, 5.0])}
+            program = Program(id=program_id, code="", fitness_scores=fitness, task_id=rng.choice(["t", "u", None]))
+            if rng.random() < 0.5:
+                await database.save_program(program)
+            else:
+                await database.save_programs([program])
+            latest[program_id] = program
+            if step % 50 == 0:
+                for objective in ("correctness", "runtime_ms"):
+                    for order in ("asc", "desc"):
+                        expected = full_sort([p for p in database._programs.values() if p.task_id in ("t", None)], objective, order)[:7]
+                        best = await database.get_best_programs("t", limit=7, objective=objective, sort_order=order)
+                        self.assertEqual([p.id for p in best], [p.id for p in expected])
+        everything = await database.get_best_programs(None, limit=len(latest))
+        self.assertEqual([p.id for p in everything], [p.id for p in full_sort(database._programs.values(), "correctness", "desc")])
+
+    async def test_program_changed_in_place_is_reranked(self):
+        database = InMemoryDatabaseAgent()
+        a = Program(id="a", code="", fitness_scores={"correctness": 0.5}, task_id="t")
+        b = Program(id="b", code="", fitness_scores={"correctness": 0.8}, task_id="t")
+        await database.save_programs([a, b])
+        self.assertEqual([p.id for p in await database.get_best_programs("t", limit=1)], ["b"])
+        b.fitness_scores["correctness"] = 0.1
+        self.assertEqual([p.id for p in await database.get_best_programs("t", limit=1)], ["a"])
+        await database.clear_database()
+        self.assertEqual(await database.get_best_programs("t"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
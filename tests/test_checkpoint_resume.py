@@ -0,0 +1,188 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from core.interfaces import Program, TaskDefinition
+from task_manager.agent import TaskManagerAgent
+from task_manager.checkpoint import CheckpointWriter, load_checkpoint
+
+
+class CountingCodeGenerator:
+    """Returns a new program per call; the call numbered `block_on_call` never returns."""
+
+    def __init__(self, block_on_call=None):
+        self.calls = 0
+        self.block_on_call = block_on_call
+
+    async def generate_code(self, prompt, temperature=None, call_records=None, **kwargs):
+        self.calls += 1
+        return f"def add(a, b):\n    return a + b  # initial {self.calls}"
+
+    async def execute(self, prompt, temperature=None, output_format="code", parent_code_for_diff=None, call_records=None, **kwargs):
+        self.calls += 1
+        if self.calls == self.block_on_call:
+            await asyncio.Event().wait()
+        return f"def add(a, b):\n    return a + b  # child {self.calls}"
+
+
+class CountingEvaluator:
+    def __init__(self):
+        self.evaluated = []
+
+    async def evaluate_program(self, program, task):
+        self.evaluated.append(program.id)
+        program.fitness_scores = {"correctness": 1.0, "runtime_ms": float(len(self.evaluated))}
+        program.status = "evaluated"
+        return program
+
+
+class TestCheckpointResume(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch("config.settings.CHECKPOINT_DIR", self.tmp_dir.name),
+            patch("config.settings.POPULATION_SIZE", 4),
+            patch("config.settings.GENERATIONS", 2),
+            patch("config.settings.NUM_ISLANDS", 2),
+            patch("config.settings.DATABASE_SAVE_BATCH_SIZE", 1),
+            patch("selection_controller.agent.settings.NUM_ISLANDS", 2),
+        ]
+        for p in self.patches:
+            p.start()
+        self.task = TaskDefinition(id="resume_task", description="Add two numbers", function_name_to_evolve="add",
+                                   input_output_examples=[{"input": [1, 2], "output": float("inf")}])
+        self.checkpoint_dir = os.path.join(self.tmp_dir.name, "resume_task")
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def make_manager(self, code_generator):
+        manager = TaskManagerAgent(task_definition=self.task)
+        manager.code_generator = code_generator
+        manager.evaluator = CountingEvaluator()
+        return manager
+
+    async def test_interrupted_generation_resumes_without_redoing_work(self):
+        # Initial population: 4 calls. Generation 1 has 4 offspring tasks; the third one hangs.
+        first = self.make_manager(CountingCodeGenerator(block_on_call=7))
+        run = asyncio.create_task(first.execute())
+        # Wait until the three finished offspring tasks are recorded, not merely evaluated.
+        while not first._generation_progress or len(first._generation_progress["completed_tasks"]) < 3:
+            await asyncio.sleep(0.01)
+        run.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await run
+        await first.checkpointer.flush()
+
+        state, programs = load_checkpoint(self.checkpoint_dir)
+        self.assertEqual(state["completed_generation"], 0)
+        self.assertEqual(len(state["generation_progress"]["completed_tasks"]), 3)
+        self.assertEqual(len(programs), 7)
+
+        resumed = await TaskManagerAgent.from_checkpoint(self.checkpoint_dir)
+        resumed.code_generator = CountingCodeGenerator()
+        resumed.evaluator = CountingEvaluator()
+        self.assertEqual(resumed.selection_controller.rng.getstate(), first.selection_controller.rng.getstate())
+        best = await resumed.execute()
+
+        # One missing offspring of generation 1, then the four of generation 2; nothing else.
+        self.assertEqual(resumed.code_generator.calls, 5)
+        self.assertEqual(len(resumed.evaluator.evaluated), 5)
+        self.assertEqual(resumed.selection_controller.current_generation, 2)
+        self.assertEqual(await resumed.database.count_programs(), 12)
+        self.assertEqual(best[0].fitness_scores["correctness"], 1.0)
+
+        state, _ = load_checkpoint(self.checkpoint_dir)
+        self.assertTrue(state["finished"])
+        self.assertEqual(state["completed_generation"], 2)
+
+    async def test_checkpoint_is_incremental_and_ignores_uncommitted_lines(self):
+        manager = self.make_manager(CountingCodeGenerator())
+        await manager.execute()
+        log_path = os.path.join(self.checkpoint_dir, "programs.jsonl")
+        with open(log_path) as f:
+            lines = [json.loads(line) for line in f]
+        # Each program is rewritten only when it changes, not on every checkpoint.
+        self.assertLess(len(lines), 3 * 12)
+        self.assertTrue(all(line["status"] == "evaluated" for line in lines))
+
+        with open(log_path, "a") as f:
+            f.write('{"partial": ')
+        state, programs = load_checkpoint(self.checkpoint_dir)
+        self.assertEqual(len(programs), 12)
+
+        resumed = await TaskManagerAgent.from_checkpoint(self.checkpoint_dir)
+        resumed.code_generator = CountingCodeGenerator()
+        best = await resumed.execute()
+        self.assertEqual(resumed.code_generator.calls, 0)
+        self.assertEqual(best[0].id, (await manager.database.get_best_programs(task_id="resume_task", limit=1))[0].id)
+        with open(log_path) as f:
+            self.assertNotIn("partial", f.read())
+
+    async def test_checkpoints_never_load_the_whole_database(self):
+        manager = self.make_manager(CountingCodeGenerator())
+        with patch.object(manager.database, "get_all_programs", side_effect=AssertionError("full scan")):
+            await manager.execute()
+        _, programs = load_checkpoint(self.checkpoint_dir)
+        self.assertEqual(len(programs), 12)
+
+    async def test_a_new_run_moves_an_earlier_checkpoint_aside(self):
+        await self.make_manager(CountingCodeGenerator()).execute()
+        second = self.make_manager(CountingCodeGenerator())
+        with self.assertLogs("task_manager.checkpoint", level="WARNING"):
+            await second.execute()
+        rotated = [name for name in os.listdir(self.tmp_dir.name) if name.startswith("resume_task.")]
+        self.assertEqual(len(rotated), 1)
+        self.assertEqual(len(load_checkpoint(os.path.join(self.tmp_dir.name, rotated[0]))[1]), 12)
+        self.assertEqual(len(load_checkpoint(self.checkpoint_dir)[1]), 12)
+
+
+class TestCheckpointWriter(unittest.IsolatedAsyncioTestCase):
+    async def test_programs_of_a_failed_write_are_retried(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer = CheckpointWriter(directory)
+            programs = [Program(id=f"p{i}", code="") for i in range(3)]
+            with patch.object(writer, "_write_sync", side_effect=OSError("disk full")):
+                with self.assertLogs("task_manager.checkpoint", level="ERROR"):
+                    await writer.write(programs, {})
+                    await writer.flush()
+            # The next checkpoint only passes one program, but the three unwritten ones go along.
+            await writer.write([Program(id="p3", code="")], {})
+            await writer.flush()
+            _, stored = load_checkpoint(directory)
+            self.assertEqual(sorted(stored), ["p0", "p1", "p2", "p3"])
+            await writer.write(programs, {})
+            await writer.flush()
+            with open(os.path.join(directory, "programs.jsonl")) as f:
+                self.assertEqual(len(f.readlines()), 4)
+
+    async def test_a_torn_write_is_truncated_before_the_retry(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer = CheckpointWriter(directory)
+            await writer.write([Program(id="p0", code="")], {})
+            await writer.flush()
+
+            def torn_write(changed, state):
+                with open(writer.log_path, "a") as f:
+                    f.write(json.dumps(changed[0])[:20])
+                raise OSError("disk full")
+
+            with patch.object(writer, "_write_sync", side_effect=torn_write):
+                with self.assertLogs("task_manager.checkpoint", level="ERROR"):
+                    await writer.write([Program(id="p1", code="")], {})
+                    await writer.flush()
+            await writer.write([Program(id="p2", code="")], {})
+            await writer.flush()
+            _, stored = load_checkpoint(directory)
+            self.assertEqual(sorted(stored), ["p0", "p1", "p2"])
+            with open(writer.log_path) as f:
+                self.assertEqual([json.loads(line)["id"] for line in f], ["p0", "p1", "p2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
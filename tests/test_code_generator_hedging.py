@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from code_generator.agent import CodeGeneratorAgent
+from code_generator.latency import LatencyHistogram
+
+
+def make_response(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentile_and_buckets(self):
+        histogram = LatencyHistogram(window_size=10, buckets=(1.0, 5.0))
+        for seconds in [0.5, 0.5, 2.0, 3.0, 10.0]:
+            histogram.observe(seconds)
+        self.assertEqual(histogram.percentile(50), 2.0)
+        self.assertEqual(histogram.percentile(100), 10.0)
+        data = histogram.to_dict()
+        self.assertEqual(data["count"], 5)
+        self.assertEqual(data["buckets"], {"le_1s": 2, "le_5s": 2, "le_inf": 1})
+
+
+class TestHedgedCompletion(unittest.IsolatedAsyncioTestCase):
+    def make_agent(self):
+        agent = CodeGeneratorAgent()
+        agent.hedging_enabled = True
+        agent.hedging_min_samples = 3
+        agent.hedging_max_extra_call_rate = 1.0
+        agent.hedging_fallback_model = "fallback-model"
+        for _ in range(5):
+            agent._latency_histogram("primary-model").observe(0.01)
+        return agent
+
+    async def test_slow_call_is_hedged_and_loser_cancelled(self):
+        agent = self.make_agent()
+        cancelled = []
+
+        async def fake_acompletion(model, messages, **kwargs):
+            if model == "primary-model":
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(model)
+                    raise
+                return make_response("slow")
+            return make_response("fast")
+
+        with patch("code_generator.agent.acompletion", fake_acompletion):
+            result = await agent.generate_code("prompt", model_name="primary-model")
+            await asyncio.sleep(0)
+
+        self.assertEqual(result, "fast")
+        self.assertEqual(cancelled, ["primary-model"])
+        self.assertEqual(agent.get_hedging_stats()["hedge_wins"], 1)
+        self.assertIn("fallback-model", agent.get_latency_histograms())
+
+    async def test_invalid_first_response_waits_for_other_call(self):
+        agent = self.make_agent()
+
+        async def fake_acompletion(model, messages, **kwargs):
+            if model == "primary-model":
+                await asyncio.sleep(0.2)
+                return make_response("primary")
+            return make_response("")
+
+        with patch("code_generator.agent.acompletion", fake_acompletion):
+            result = await agent.generate_code("prompt", model_name="primary-model")
+        self.assertEqual(result, "primary")
+
+    async def test_extra_call_budget_is_respected(self):
+        agent = self.make_agent()
+        agent.hedging_max_extra_call_rate = 0.0
+        models = []
+
+        async def fake_acompletion(model, messages, **kwargs):
+            models.append(model)
+            await asyncio.sleep(0.05)
+            return make_response("ok")
+
+        with patch("code_generator.agent.acompletion", fake_acompletion):
+            await agent.generate_code("prompt", model_name="primary-model")
+        self.assertEqual(models, ["primary-model"])
+        self.assertEqual(agent.get_hedging_stats()["hedged_calls"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
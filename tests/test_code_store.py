@@ -0,0 +1,81 @@
+import unittest
+
+from core.interfaces import Program, ProgramQuery
+from database_agent.agent import InMemoryDatabaseAgent
+from database_agent.code_store import CodeStore
+
+BASE_CODE = "".join(f"def helper_{i}(x):\n    return x + {i}\n\n" for i in range(40))
+
+
+def variant(step):
+    return BASE_CODE + f"def solve(x):\n    return helper_{step % 40}(x) * {step}\n"
+
+
+class TestCodeStore(unittest.TestCase):
+    def test_identical_code_is_stored_once(self):
+        store = CodeStore("dedup")
+        first = store.put(BASE_CODE)
+        self.assertEqual(store.put(BASE_CODE), first)
+        stats = store.stats()
+        self.assertEqual(stats["blobs"], 1)
+        self.assertGreater(stats["bytes_saved"], len(BASE_CODE))
+        store.release(first)
+        self.assertIn(first, store)
+        store.release(first)
+        self.assertNotIn(first, store)
+        self.assertEqual(store.stats()["stored_bytes"], 0)
+
+    def test_delta_chains_round_trip_and_are_bounded_by_snapshots(self):
+        store = CodeStore("delta", snapshot_interval=3, cache_size=0)
+        hashes, parent = [], None
+        for step in range(10):
+            parent = store.put(variant(step), parent)
+            hashes.append(parent)
+        for step, code_hash in enumerate(hashes):
+            self.assertEqual(store.get(code_hash), variant(step))
+        self.assertEqual(max(blob.depth for blob in store._blobs.values()), 3)
+        self.assertEqual(store.stats()["delta_blobs"], 7)
+
+        # A base stays while a delta depends on it, and goes with the last one.
+        for code_hash in hashes[:-1]:
+            store.release(code_hash)
+        self.assertEqual(store.get(hashes[-1]), variant(9))
+        store.release(hashes[-1])
+        self.assertEqual(store.stats()["blobs"], 0)
+
+    def test_hot_code_is_served_from_the_lru(self):
+        store = CodeStore("delta", cache_size=2)
+        hashes = [store.put(variant(step)) for step in range(3)]
+        store.get(hashes[2])
+        store.get(hashes[0])
+        self.assertEqual((store.cache_hits, store.cache_misses), (1, 1))
+
+
+class TestInMemoryDatabaseCodeStore(unittest.IsolatedAsyncioTestCase):
+    async def test_programs_read_back_unchanged_with_bytes_saved(self):
+        database = InMemoryDatabaseAgent(CodeStore("delta"))
+        programs = [Program(id="p0", code=BASE_CODE, fitness_scores={"correctness": 0.0}, task_id="t")]
+        for step in range(1, 30):
+            programs.append(Program(id=f"p{step}", code=variant(step), fitness_scores={"correctness": step / 30},
+                                    parent_id=programs[-1].id, task_id="t"))
+        await database.save_programs(programs)
+        programs[3].code = variant(100)
+        await database.save_program(programs[3])
+
+        for program in programs:
+            self.assertEqual(await database.get_program(program.id), program)
+        self.assertEqual(await database.get_all_programs(), programs)
+        self.assertEqual((await database.get_best_programs("t", limit=1))[0].code, variant(29))
+        self.assertEqual(await database.query_programs(ProgramQuery(parent_id="p4", fields=["id", "code"])),
+                         [{"id": "p5", "code": variant(5)}])
+        # Returned programs are copies: changing one does not change the stored code.
+        (await database.get_program("p1")).code = ""
+        self.assertEqual((await database.get_program("p1")).code, variant(1))
+        self.assertGreater(database.storage_stats()["bytes_saved"], 10 * len(BASE_CODE))
+
+        await database.clear_database()
+        self.assertEqual(database.storage_stats()["blobs"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
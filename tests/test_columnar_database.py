@@ -0,0 +1,128 @@
+import random
+import tracemalloc
+import unittest
+
+from core.interfaces import LLMCallRecord, Program, ProgramQuery
+from database_agent.agent import InMemoryDatabaseAgent
+from database_agent.code_store import CodeStore
+from database_agent.columnar_agent import ColumnarDatabaseAgent
+
+
+def random_programs(count, seed=5):
+    rng = random.Random(seed)
+    programs = []
+    for i in range(count):
+        fitness = {}
+        if rng.random() < 0.9:
+            fitness = {"correctness": rng.choice([0.0, 0.5, 0.9, 1.0]), "runtime_ms": float(rng.randrange(1, 100)),
+                       "passed_tests": 3.0, "total_tests": 4.0}
+        programs.append(Program(
+            id=f"p{i}",
+            code=f"def solve(x):\n    return x + {i % 7}\n",
+            fitness_scores=fitness,
+            generation=rng.randrange(40),
+            parent_id=f"p{rng.randrange(i)}" if i else None,
+            island_id=rng.choice([None, 0, 1, 2, 3]),
+            status=rng.choice(["evaluated", "failed_evaluation"]),
+            task_id=rng.choice(["t", "u", None]),
+        ))
+    return programs
+
+
+QUERIES = [
+    ProgramQuery(island_id=3, min_correctness=0.9, min_generation=20),
+    ProgramQuery(task_id="t", status="evaluated", order_by="runtime_ms", limit=5),
+    ProgramQuery(parent_id="p3"),
+    ProgramQuery(parent_id="missing"),
+    ProgramQuery(generation=7, fields=["id", "island_id"]),
+    ProgramQuery(max_generation=3, max_runtime_ms=50.0, order_by="correctness", descending=True, limit=4, fields=["id", "fitness_scores"]),
+    ProgramQuery(task_id="u", order_by="generation", descending=True),
+    ProgramQuery(task_id="unknown", order_by="created_at", limit=10),
+]
+
+
+class TestColumnarDatabase(unittest.IsolatedAsyncioTestCase):
+    async def test_programs_read_back_unchanged(self):
+        database = ColumnarDatabaseAgent()
+        program = Program(id="a", code="print(1)", fitness_scores={"correctness": 1, "runtime_ms": 2.5, "note": "slow"},
+                          errors=["warning"], llm_calls=[LLMCallRecord(model="m", prompt_tokens=3)], task_id="t")
+        await database.save_program(program)
+        await database.save_program(Program(id="b", code="", island_id=0, parent_id="a"))
+        self.assertEqual(await database.get_program("a"), program)
+        self.assertEqual((await database.get_program("b")).island_id, 0)
+        self.assertIsNone(await database.get_program("missing"))
+        # Reads are copies, and a save replaces the row.
+        (await database.get_program("a")).errors.append("lost")
+        program.status = "evaluated"
+        await database.save_program(program)
+        self.assertEqual(await database.get_all_programs(), [program, await database.get_program("b")])
+        self.assertEqual(await database.count_programs(), 2)
+        await database.clear_database()
+        self.assertEqual(await database.count_programs(), 0)
+
+    async def test_matches_the_in_memory_database(self):
+        columnar, reference = ColumnarDatabaseAgent(CodeStore("delta")), InMemoryDatabaseAgent()
+        programs = random_programs(400)
+        for database in (columnar, reference):
+            await database.save_programs(programs)
+        for program in programs[:80]:
+            program.generation += 1
+            program.fitness_scores["correctness"] = 0.25
+        for database in (columnar, reference):
+            await database.save_programs(programs[:80])
+
+        for query in QUERIES:
+            self.assertEqual(await columnar.query_programs(query), await reference.query_programs(query), query)
+        for task_id in ("t", None):
+            for objective in ("correctness", "runtime_ms"):
+                for order in ("asc", "desc"):
+                    self.assertEqual(await columnar.get_best_programs(task_id, 9, objective, order),
+                                     await reference.get_best_programs(task_id, 9, objective, order))
+        self.assertEqual(await columnar.get_programs_by_generation(7), await reference.get_programs_by_generation(7))
+        columnar.rng, reference.rng = random.Random(0), random.Random(0)
+        self.assertEqual(await columnar.get_programs_for_next_generation("t", 20),
+                         await reference.get_programs_for_next_generation("t", 20))
+        self.assertGreater(columnar.storage_stats()["bytes_saved"], 0)
+
+    async def test_rankings_stay_current_as_programs_are_saved_again(self):
+        columnar, reference = ColumnarDatabaseAgent(), InMemoryDatabaseAgent()
+        programs = random_programs(300)
+        rng = random.Random(2)
+        for database in (columnar, reference):
+            await database.save_programs(programs)
+        for step in range(200):
+            for task_id in ("t", "u", None):
+                self.assertEqual(await columnar.get_best_programs(task_id, 5, "correctness", "desc"),
+                                 await reference.get_best_programs(task_id, 5, "correctness", "desc"), step)
+            # Best programs get worse, change task, island and status, and new ones arrive.
+            program = (await reference.get_best_programs(rng.choice(["t", "u", None]), 3))[rng.randrange(3)]
+            program.fitness_scores["correctness"] = rng.choice([0.0, 0.5, 1.0])
+            program.task_id, program.island_id = rng.choice(["t", "u", None]), rng.choice([None, 0, 1])
+            program.status = "evaluated"
+            new_program = Program(id=f"new{step}", code="", fitness_scores={"correctness": rng.random()}, task_id="t")
+            for database in (columnar, reference):
+                await database.save_programs([program, new_program])
+        for query in QUERIES:
+            self.assertEqual(await columnar.query_programs(query), await reference.query_programs(query), query)
+
+class TestColumnarMemory(unittest.TestCase):
+    def test_uses_far_less_memory_than_program_objects(self):
+        programs = random_programs(1000)
+        database = ColumnarDatabaseAgent()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            copies = [Program(p.id, p.code, dict(p.fitness_scores), p.generation, p.parent_id, p.island_id, [], p.status,
+                              p.created_at, [], p.task_id) for p in programs]
+            objects_bytes = tracemalloc.get_traced_memory()[0] - before
+            del copies
+            before = tracemalloc.get_traced_memory()[0]
+            for program in programs:
+                database._store(program)
+            columnar_bytes = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        self.assertLess(columnar_bytes, objects_bytes / 2)
+
+if __name__ == '__main__':
+    unittest.main()
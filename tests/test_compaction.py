@@ -0,0 +1,186 @@
+import asyncio
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from core.interfaces import Program, ProgramQuery, TaskDefinition
+from database_agent.agent import InMemoryDatabaseAgent
+from database_agent.code_store import CodeStore
+from database_agent.compaction import ColdStore, CompactionPolicy
+from task_manager.agent import TaskManagerAgent
+
+
+def evolved_programs(generations, per_generation, seed=0):
+    """Each generation's programs descend from the two best of the previous one; many fail with long errors."""
+    rng = random.Random(seed)
+    programs, parents = [], []
+    for generation in range(generations):
+        current = []
+        for i in range(per_generation):
+            parent = rng.choice(parents) if parents else None
+            failed = rng.random() < 0.5
+            current.append(Program(
+                id=f"g{generation}_p{i}", code=f"def solve():\n    return {generation * per_generation + i}\n",
+                generation=generation, parent_id=parent.id if parent else None, task_id="t",
+                status="failed_evaluation" if failed else "evaluated",
+                errors=["Traceback (most recent call last): ..." * 20] if failed else [],
+                fitness_scores={"correctness": 0.0 if failed else rng.random()},
+            ))
+        programs.extend(current)
+        parents = sorted(current, key=lambda p: -p.fitness_scores["correctness"])[:2]
+    return programs
+
+
+def expected_retained(programs, protected, top_k, recent_generations):
+    by_id = {p.id: p for p in programs}
+    best = sorted((p for p in programs), key=lambda p: -p.fitness_scores.get("correctness", -1.0))[:top_k]
+    last_generation = max(p.generation for p in programs)
+    kept = set(protected) | {p.id for p in best} | {p.id for p in programs if p.generation > last_generation - recent_generations}
+    for program_id in list(kept):
+        parent_id = by_id[program_id].parent_id
+        while parent_id is not None:
+            kept.add(parent_id)
+            parent_id = by_id[parent_id].parent_id
+    return kept
+
+
+class TestCompaction(unittest.IsolatedAsyncioTestCase):
+    async def test_pass_keeps_protected_top_recent_and_their_ancestors(self):
+        programs = evolved_programs(12, 20)
+        database = InMemoryDatabaseAgent(CodeStore("delta"), compaction=CompactionPolicy("evict", max_programs=50, keep_top_k=5,
+                                                                                         keep_recent_generations=1, batch_size=7))
+        await database.save_programs(programs)
+        self.assertTrue(database.needs_compaction())
+        protected = ["g3_p4", "g7_p1"]
+        report = await database.compact(lambda: protected)
+
+        kept = expected_retained(programs, protected, 5, 1)
+        self.assertEqual(set(database._programs), kept)
+        self.assertEqual(report["programs_evicted"], len(programs) - len(kept))
+        self.assertEqual(report["programs_in_memory"], len(kept))
+        self.assertGreater(report["bytes_reclaimed"], 0)
+        self.assertFalse(database.needs_compaction())
+
+        # Queries, rankings and lineage only see what is left, and stay consistent.
+        best = await database.get_best_programs("t", limit=5)
+        self.assertEqual(len(best), 5)
+        self.assertTrue(all(p.id in kept for p in await database.query_programs(ProgramQuery(task_id="t", status="failed_evaluation"))))
+        ancestors = (await database.get_ancestors(["g7_p1"]))["g7_p1"]
+        self.assertEqual(len(ancestors), 7)
+        self.assertEqual((await database.get_program("g7_p1")).code, next(p.code for p in programs if p.id == "g7_p1"))
+        await database.save_programs([Program(id="new", code="pass", task_id="t", parent_id="g7_p1", generation=12, status="evaluated")])
+        self.assertEqual((await database.get_ancestors(["new"]))["new"][0].id, "g7_p1")
+
+    async def test_spilled_programs_stay_readable(self):
+        programs = evolved_programs(6, 10, seed=1)
+        with tempfile.TemporaryDirectory() as directory:
+            cold_store = ColdStore(os.path.join(directory, "cold", "t.jsonl"))
+            database = InMemoryDatabaseAgent(compaction=CompactionPolicy("spill", max_programs=10, keep_top_k=2, batch_size=16),
+                                             cold_store=cold_store)
+            await database.save_programs(programs)
+            report = await database.compact()
+            self.assertGreater(report["programs_spilled"], 0)
+            self.assertEqual(report["programs_spilled"], len(cold_store))
+            self.assertEqual(await database.count_programs(), len(programs))
+
+            spilled_id = cold_store.ids()[0]
+            original = next(p for p in programs if p.id == spilled_id)
+            self.assertNotIn(spilled_id, database._programs)
+            self.assertEqual(await database.get_program(spilled_id), original)
+            exported = [p.id async for batch in database.iter_programs(7) for p in batch]
+            self.assertEqual(sorted(exported), sorted(p.id for p in programs))
+
+            # Saving a spilled program again brings it back to memory.
+            await database.save_programs([original])
+            self.assertIn(spilled_id, database._programs)
+            self.assertNotIn(spilled_id, cold_store)
+            self.assertEqual(await database.count_programs(), len(programs))
+
+    async def test_saves_during_a_pass_are_kept(self):
+        database = InMemoryDatabaseAgent(compaction=CompactionPolicy("evict", max_programs=10, keep_top_k=0,
+                                                                     keep_recent_generations=0, batch_size=5))
+        await database.save_programs(evolved_programs(4, 25, seed=2))
+        compaction = asyncio.create_task(database.compact())
+        await asyncio.sleep(0)  # The pass takes its snapshot
+        late = [Program(id=f"late{i}", code="", generation=9, task_id="t", status="evaluated") for i in range(30)]
+        for i in range(0, 30, 5):
+            await database.save_programs(late[i:i + 5])
+            await asyncio.sleep(0)
+        await compaction
+        self.assertEqual(set(database._programs), {p.id for p in late})
+
+    async def test_rules_are_applied_once_per_pass_and_saves_are_folded_in(self):
+        programs = evolved_programs(10, 20, seed=4)
+        database = InMemoryDatabaseAgent(compaction=CompactionPolicy("evict", max_programs=10, keep_top_k=2,
+                                                                     keep_recent_generations=1, batch_size=10))
+        await database.save_programs(programs)
+        kept = expected_retained(programs, [], 2, 1)
+        # Programs the pass reaches last; the late child's parent and grandparent would be evicted otherwise.
+        parent = next(p for p in reversed(programs) if p.id not in kept and p.parent_id not in kept)
+        late = Program(id="late", code="", generation=3, parent_id=parent.id, task_id="t", status="evaluated")
+        with patch.object(database, "_retained_ids", wraps=database._retained_ids) as retained_ids:
+            compaction = asyncio.create_task(database.compact())
+            await asyncio.sleep(0)
+            await database.save_programs([late])
+            await compaction
+        self.assertEqual(retained_ids.call_count, 1)
+        self.assertEqual(set(database._programs), kept | {"late", parent.id, parent.parent_id})
+
+    async def test_evicted_programs_are_forgotten_by_the_task_manager(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manager = TaskManagerAgent(TaskDefinition(id="t", description="d"),
+                                       config={"COMPACTION_MODE": "evict", "COMPACTION_MAX_PROGRAMS": 10, "COMPACTION_BATCH_SIZE": 10, "COMPACTION_KEEP_TOP_K": 2,
+                                               "HISTORY_EXPORT_DIR": directory, "HISTORY_EXPORT_FORMAT": "jsonl",
+                                               "CHECKPOINT_DIR": os.path.join(directory, "checkpoints")})
+            programs = evolved_programs(5, 10, seed=5)
+            for program in programs:
+                manager.telemetry.register_offspring(program, program)
+            await manager._save_programs(programs)
+            await manager._checkpoint()
+            await manager.checkpointer.flush()
+            await manager._compaction_task
+            evicted = {p.id for p in programs} - set(manager.database._programs)
+            self.assertTrue(evicted)
+            self.assertFalse(evicted & set(manager.telemetry._parent_keys))
+            self.assertFalse(evicted & manager.history_export._exported)
+            self.assertTrue(evicted <= set(manager.checkpointer._fingerprints))  # Until the next checkpoint has been queued
+            await manager._checkpoint()
+            await manager.checkpointer.flush()
+            self.assertFalse(evicted & set(manager.checkpointer._fingerprints))
+            self.assertEqual(len(manager.history_export._exported), len(programs) - len(evicted))
+            await manager.history_export.close()
+
+    async def test_task_manager_compacts_in_the_background(self):
+        manager = TaskManagerAgent(TaskDefinition(id="t", description="d"),
+                                   config={"COMPACTION_MODE": "evict", "COMPACTION_MAX_PROGRAMS": 40, "COMPACTION_BATCH_SIZE": 10,
+                                           "COMPACTION_KEEP_TOP_K": 3, "COMPACTION_KEEP_RECENT_GENERATIONS": 1})
+        programs = evolved_programs(30, 10, seed=3)
+        manager._population = programs[-10:]
+        peak = 0
+        for generation in range(30):
+            await manager._save_programs(programs[generation * 10:(generation + 1) * 10])
+            peak = max(peak, len(manager.database._programs))
+            for _ in range(5):  # Evaluating the next generation
+                await asyncio.sleep(0)
+        await manager._compaction_task
+        self.assertGreater(manager.database.compaction_stats.passes, 1)
+        # What stays is the lineage of the kept programs, not the dead ends around it.
+        kept = expected_retained(programs, [p.id for p in manager._population], 3, 1)
+        self.assertLess(peak, len(kept) + 40)
+        await manager.database.compact(manager._compaction_protected_ids)
+        self.assertEqual(set(manager.database._programs), kept)
+
+    async def test_other_backends_warn_and_spill_needs_a_cold_store(self):
+        with self.assertRaises(ValueError):
+            InMemoryDatabaseAgent(compaction=CompactionPolicy("spill"))
+        with self.assertRaises(ValueError):
+            CompactionPolicy("sometimes")
+        with self.assertLogs("task_manager.agent", level="WARNING"):
+            manager = TaskManagerAgent(TaskDefinition(id="t", description="d"), config={"COMPACTION_MODE": "evict", "DATABASE_TYPE": "columnar"})
+        self.assertIsNone(getattr(manager.database, "compaction", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
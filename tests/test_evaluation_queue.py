@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+
+from core.interfaces import Program
+from task_manager.evaluation_queue import EvaluationCostModel, EvaluationQueue
+
+
+def child(pid, parent_id):
+    return Program(id=pid, code="", parent_id=parent_id)
+
+
+class TestEvaluationCostModel(unittest.TestCase):
+    def test_prediction_follows_parent_time_and_lineage_timeouts(self):
+        model = EvaluationCostModel(timeout_seconds=100.0, lineage_decay=0.5)
+        model.observe(Program(id="fast", code=""), 0.002)
+        model.observe(Program(id="slow", code="", errors=["Execution timed out after 100 seconds."]), 100.0)
+        model.observe(Program(id="recovered", code="", parent_id="slow"), 2.0)
+
+        self.assertAlmostEqual(model.predict(child("a", "fast")), 0.002)
+        self.assertAlmostEqual(model.predict(child("b", "slow")), 100.0)
+        # Parent ran in 2s, but its parent timed out: a quarter of the way to the timeout.
+        self.assertAlmostEqual(model.predict(child("c", "recovered")), 0.75 * 2.0 + 0.25 * 100.0)
+
+    def test_only_recently_used_parents_are_remembered(self):
+        model = EvaluationCostModel(timeout_seconds=100.0, max_programs=2)
+        model.observe(Program(id="a", code=""), 5.0)
+        model.observe(Program(id="b", code=""), 7.0)
+        model.predict(child("x", "a"))  # Still a parent
+        model.observe(Program(id="c", code=""), 9.0)
+
+        self.assertEqual(list(model._programs), ["a", "c"])
+        self.assertAlmostEqual(model.predict(child("y", "a")), 5.0)
+        self.assertAlmostEqual(model.predict(child("z", "b")), model._mean_seconds)
+
+    def test_error_summary_compares_predictions_with_measurements(self):
+        model = EvaluationCostModel(timeout_seconds=10.0)
+        model.observe(Program(id="a", code=""), 1.0, predicted=3.0)
+        model.observe(Program(id="b", code=""), 2.0, predicted=1.0)
+        summary = model.error_summary()
+        self.assertEqual(summary["jobs"], 2)
+        self.assertAlmostEqual(summary["mean_absolute_error_seconds"], 1.5)
+        self.assertAlmostEqual(summary["mean_bias_seconds"], 0.5)
+
+
+class TestEvaluationQueue(unittest.IsolatedAsyncioTestCase):
+    async def run_jobs(self, queue, jobs):
+        """jobs: (program, seconds after the previous job to enqueue it, evaluation seconds)."""
+        started = []
+
+        async def job(program, duration):
+            async with queue.slot(program):
+                started.append(program.id)
+                await asyncio.sleep(duration)
+
+        tasks = []
+        for program, enqueue_delay, duration in jobs:
+            await asyncio.sleep(enqueue_delay)
+            tasks.append(asyncio.create_task(job(program, duration)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return started
+
+    async def test_cheap_jobs_start_before_expensive_ones(self):
+        model = EvaluationCostModel(timeout_seconds=60.0)
+        model.observe(Program(id="cheap_parent", code=""), 0.01)
+        model.observe(Program(id="slow_parent", code=""), 30.0)
+        queue = EvaluationQueue(1, model, aging_rate=0.0)
+        started = await self.run_jobs(queue, [
+            (Program(id="blocker", code=""), 0.0, 0.05),
+            (child("slow_child", "slow_parent"), 0.0, 0.0),
+            (child("cheap_child", "cheap_parent"), 0.0, 0.0),
+        ])
+        self.assertEqual(started, ["blocker", "cheap_child", "slow_child"])
+        self.assertEqual(model.error_summary()["jobs"], 3)
+
+    async def test_aging_lets_a_long_waiting_job_go_first(self):
+        for aging_rate, expected in ((0.0, ["blocker", "cheap_child", "slow_child"]),
+                                     (10.0, ["blocker", "slow_child", "cheap_child"])):
+            model = EvaluationCostModel(timeout_seconds=60.0)
+            model.observe(Program(id="cheap_parent", code=""), 0.0)
+            model.observe(Program(id="slow_parent", code=""), 0.05)
+            queue = EvaluationQueue(1, model, aging_rate=aging_rate)
+            started = await self.run_jobs(queue, [
+                (Program(id="blocker", code=""), 0.0, 0.1),
+                (child("slow_child", "slow_parent"), 0.0, 0.0),
+                (child("cheap_child", "cheap_parent"), 0.05, 0.0),  # Waits 0.05s less than slow_child
+            ])
+            self.assertEqual(started, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
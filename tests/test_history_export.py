@@ -0,0 +1,155 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from core.interfaces import LLMCallRecord, Program, TaskDefinition
+from database_agent.agent import InMemoryDatabaseAgent
+from database_agent.code_store import CodeStore
+from database_agent.columnar_agent import ColumnarDatabaseAgent
+from database_agent.export import RunExporter, RunHistoryExport, export_database, pyarrow
+from database_agent.sqlite_agent import SQLiteDatabaseAgent
+from task_manager.agent import TaskManagerAgent
+
+
+def history_programs(count):
+    return [
+        Program(id=f"p{i}", code=f"def solve():\n    return {i}\n", generation=i // 10, parent_id=f"p{i - 1}" if i else None,
+                island_id=i % 3, status="evaluated", task_id="t", errors=["boom"] if i % 7 == 0 else [],
+                fitness_scores={"correctness": (i % 5) / 4, "runtime_ms": float(i), "memory_mb": 1.5},
+                llm_calls=[LLMCallRecord(model="m", prompt_tokens=i, completion_tokens=2, cost_usd=0.01, outcome="applied", started_at=float(i))] * (i % 3))
+        for i in range(count)
+    ]
+
+
+def read_jsonl(directory, table):
+    path = os.path.join(directory, f"{table}.jsonl.gz")
+    if not os.path.exists(path):
+        return []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestJsonlExport(unittest.IsolatedAsyncioTestCase):
+    async def test_backends_stream_every_program_and_call(self):
+        programs = history_programs(250)
+        expected_calls = sum(1 for p in programs if p.llm_calls)  # A record listed twice is one call
+        with tempfile.TemporaryDirectory() as directory:
+            sqlite = SQLiteDatabaseAgent(os.path.join(directory, "programs.sqlite3"))
+            databases = {"in_memory": InMemoryDatabaseAgent(CodeStore("delta")), "columnar": ColumnarDatabaseAgent(), "sqlite": sqlite}
+            try:
+                for name, database in databases.items():
+                    await database.save_programs(programs)
+                    batches = [len(batch) async for batch in database.iter_programs(64)]
+                    self.assertEqual(batches, [64, 64, 64, 58], name)
+
+                    output = os.path.join(directory, name)
+                    written = await export_database(database, output, batch_size=64, export_format="jsonl")
+                    self.assertEqual(written, {"programs": 250, "llm_calls": expected_calls}, name)
+                    rows = read_jsonl(output, "programs")
+                    self.assertEqual([row["id"] for row in rows], [p.id for p in programs], name)
+                    self.assertEqual(rows[8]["parent_id"], "p7")
+                    self.assertEqual(rows[8]["code"], programs[8].code)
+                    self.assertEqual(rows[8]["correctness"], 0.75)
+                    self.assertEqual(rows[8]["fitness_scores"]["memory_mb"], 1.5)
+                    self.assertEqual(rows[7]["errors"], ["boom"])
+                    calls = read_jsonl(output, "llm_calls")
+                    self.assertEqual(len(calls), expected_calls)
+                    self.assertEqual((calls[0]["program_id"], calls[0]["call_id"], calls[0]["prompt_tokens"]), ("p1", 0, 1))
+                    self.assertEqual(len({call["call_id"] for call in calls}), expected_calls)
+            finally:
+                await sqlite.close()
+
+    async def test_incremental_export_appends_settled_programs_once(self):
+        programs = history_programs(30)
+        with tempfile.TemporaryDirectory() as directory:
+            history = RunHistoryExport(RunExporter(directory, batch_size=8, export_format="jsonl"))
+            pending = Program(id="pending", code="", task_id="t")
+            await history.programs_saved(programs[:10] + [pending])
+            # One full batch is on disk, the rest waits for the next one.
+            self.assertEqual(len(read_jsonl(directory, "programs")), 8)
+            await history.programs_saved(programs[5:30])
+            pending.status = "failed_evaluation"
+            await history.programs_saved([pending])
+            await history.close()
+            ids = [row["id"] for row in read_jsonl(directory, "programs")]
+            self.assertEqual(ids, [p.id for p in programs] + ["pending"])
+
+            # A later run appending to the same directory adds to the existing file.
+            exporter = RunExporter(directory, batch_size=8, export_format="jsonl")
+            await exporter.append(programs[:3])
+            await exporter.flush()
+            self.assertEqual(len(read_jsonl(directory, "programs")), 34)
+
+    async def test_task_manager_exports_what_it_saves(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manager = TaskManagerAgent(TaskDefinition(id="t", description="d"),
+                                       config={"HISTORY_EXPORT_DIR": directory, "HISTORY_EXPORT_FORMAT": "jsonl"})
+            programs = history_programs(5)
+            programs[0].status = "unevaluated"
+            await manager._save_programs(programs)
+            await manager.history_export.close()
+            rows = read_jsonl(os.path.join(directory, "t"), "programs")
+            self.assertEqual([row["id"] for row in rows], ["p1", "p2", "p3", "p4"])
+            self.assertEqual(await manager.database.count_programs(), 5)
+
+    async def test_task_manager_exports_every_call_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manager = TaskManagerAgent(TaskDefinition(id="t", description="d"),
+                                       config={"HISTORY_EXPORT_DIR": directory, "HISTORY_EXPORT_FORMAT": "jsonl", "HISTORY_EXPORT_BATCH_SIZE": 2})
+            parent = Program(id="parent", code="", task_id="t", status="evaluated", fitness_scores={"correctness": 0.5})
+            shared = LLMCallRecord(model="m", prompt_tokens=100, completion_tokens=50, outcome="applied")
+            children = [Program(id=f"child{i}", code=str(i), task_id="t", parent_id="parent", llm_calls=[shared]) for i in range(3)]
+            manager.telemetry.record_calls([LLMCallRecord(model="m", prompt_tokens=7, outcome="failed")], 1, 0)
+            manager.telemetry.record_calls([LLMCallRecord(model="m", prompt_tokens=8, outcome="rejected")], 1, 0)
+            manager.telemetry.record_calls([shared], 1, 0, ",".join(child.id for child in children))
+            for i, child in enumerate(children):
+                manager.telemetry.register_offspring(child, parent)
+                child.status, child.fitness_scores = "evaluated", {"correctness": 1.0 if i == 1 else 0.0}
+                manager.telemetry.record_evaluation(child, 0.1)
+            await manager._save_programs(children)
+            await manager._finish_evolution()
+
+            calls = read_jsonl(os.path.join(directory, "t"), "llm_calls")
+            self.assertEqual([call["outcome"] for call in calls], ["failed", "rejected", "applied"])
+            self.assertEqual(sum(call["prompt_tokens"] for call in calls), 115)
+            self.assertEqual(calls[2]["program_id"], "child0,child1,child2")
+            self.assertTrue(calls[2]["improved_fitness"])
+            self.assertEqual(manager.telemetry.totals()["prompt_tokens"], 115)
+
+    async def test_unknown_format_is_rejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ValueError):
+                RunExporter(directory, export_format="csv")
+
+
+@unittest.skipUnless(pyarrow is not None, "pyarrow is not installed")
+class TestParquetExport(unittest.IsolatedAsyncioTestCase):
+    async def test_batches_become_parquet_parts(self):
+        import pyarrow.parquet
+        programs = history_programs(100)
+        database = InMemoryDatabaseAgent()
+        await database.save_programs(programs)
+        with tempfile.TemporaryDirectory() as directory:
+            await export_database(database, directory, batch_size=40, export_format="parquet")
+            parts = sorted(os.listdir(os.path.join(directory, "programs")))
+            self.assertEqual(parts, ["part-00000.parquet", "part-00001.parquet", "part-00002.parquet"])
+            self.assertEqual(pyarrow.parquet.ParquetFile(os.path.join(directory, "programs", parts[0])).metadata.num_row_groups, 1)
+
+            table = pyarrow.parquet.read_table(os.path.join(directory, "programs"))
+            self.assertEqual(table.column("id").to_pylist(), [p.id for p in programs])
+            self.assertEqual(table.column("runtime_ms").to_pylist()[9], 9.0)
+            self.assertEqual(json.loads(table.column("fitness_scores").to_pylist()[9])["memory_mb"], 1.5)
+            calls = pyarrow.parquet.read_table(os.path.join(directory, "llm_calls"))
+            self.assertEqual(calls.num_rows, sum(1 for p in programs if p.llm_calls))
+
+            # Appending continues the part numbering.
+            exporter = RunExporter(directory, batch_size=40, export_format="parquet")
+            await exporter.append(programs[:5])
+            await exporter.flush()
+            self.assertIn("part-00003.parquet", os.listdir(os.path.join(directory, "programs")))
+
+
+if __name__ == "__main__":
+    unittest.main()
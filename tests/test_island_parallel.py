@@ -0,0 +1,96 @@
+import asyncio
+import os
+import queue
+import sys
+import unittest
+from unittest.mock import patch
+
+from core.interfaces import Program, TaskDefinition
+from selection_controller.agent import SelectionControllerAgent
+from task_manager.checkpoint import task_to_dict
+from task_manager.island_parallel import IslandParallelCoordinator, _island_worker_main, split_islands
+
+
+def program(pid, correctness, runtime_ms=10.0):
+    return Program(id=pid, code="", fitness_scores={"correctness": correctness, "runtime_ms": runtime_ms}, status="evaluated")
+
+
+class Inbox(queue.Queue):
+    """Stands in for a multiprocessing queue when the workers share one process."""
+    def cancel_join_thread(self):
+        pass
+
+
+def crash_before_starting(worker_index, num_workers, task_data, config, inboxes, results):
+    sys.stderr.write(f"worker {worker_index} could not import its backend\n")
+    sys.stderr.flush()
+    os._exit(3)
+
+
+class TestIslandSplit(unittest.TestCase):
+    def test_islands_and_population_are_spread_evenly(self):
+        self.assertEqual(split_islands(4, 20, 2), [(2, 10), (2, 10)])
+        self.assertEqual(split_islands(5, 10, 2), [(3, 6), (2, 4)])
+        self.assertEqual(split_islands(2, 4, 8), [(1, 2), (1, 2)])
+
+
+class TestMigrationBetweenProcesses(unittest.TestCase):
+    def test_immigrants_replace_the_weakest_members_of_the_worst_island(self):
+        with patch("selection_controller.agent.settings.NUM_ISLANDS", 2):
+            selector = SelectionControllerAgent()
+        selector.initialize_islands([program("a", 1.0), program("b", 0.9), program("c", 0.2), program("d", 0.1)])
+
+        self.assertEqual([p.id for p in selector.emigrants(2)], ["a", "b"])
+        inserted = selector.immigrate([program("x", 0.8), program("a", 1.0)])
+        self.assertEqual([p.id for p in inserted], ["x"])
+        self.assertEqual([p.id for p in selector.islands[1].programs], ["c", "x"])
+        self.assertEqual(selector.islands[1].programs[1].island_id, 1)
+
+    def test_immigrants_never_replace_a_whole_island(self):
+        with patch("selection_controller.agent.settings.NUM_ISLANDS", 2):
+            selector = SelectionControllerAgent()
+        selector.initialize_islands([program("a", 1.0), program("b", 0.9), program("c", 0.2), program("d", 0.1)])
+
+        inserted = selector.immigrate([program("x", 0.3), program("y", 0.8), program("z", 0.5)])
+        self.assertEqual([p.id for p in inserted], ["y"])
+        self.assertEqual([p.id for p in selector.islands[1].programs], ["c", "y"])
+
+
+class TestIslandParallelRun(unittest.IsolatedAsyncioTestCase):
+    async def test_workers_exchange_migrants_every_generation(self):
+        # Both workers run in this process; each waits for the other's migrants, so the exchange is deterministic.
+        task = TaskDefinition(id="parallel_add", description="Add two numbers", function_name_to_evolve="add",
+                              input_output_examples=[{"input": [1, 2], "output": 3}, {"input": [2, 5], "output": 7}])
+        coordinator = IslandParallelCoordinator(task, config={"POPULATION_SIZE": 4, "GENERATIONS": 2, "NUM_ISLANDS": 2,
+                                                              "MIGRATION_INTERVAL": 1, "ISLAND_MIGRATION_WAIT_SECONDS": 10.0,
+                                                              "CHECKPOINT_DIR": None, "LLM_BACKEND": "local"}, num_workers=2)
+        inboxes, results = [Inbox(), Inbox()], Inbox()
+        await asyncio.gather(*(
+            _island_worker_main(k, 2, task_to_dict(coordinator.worker_task(k)), coordinator.worker_config(k), inboxes, results)
+            for k in range(2)
+        ))
+
+        messages = [results.get_nowait() for _ in range(results.qsize())]
+        totals = {message[1]: message[3] for message in messages if message[0] == "done"}
+        self.assertEqual(sorted(totals), [0, 1])
+        self.assertEqual([message[1] for message in messages if message[0] == "error"], [])
+        self.assertEqual(sum(1 for message in messages if message[0] == "generation"), 4)
+        for worker_totals in totals.values():
+            self.assertEqual(worker_totals["emigrants_sent"], 2)
+            self.assertGreater(worker_totals["immigrants_received"], 0)
+
+    async def test_a_process_that_dies_before_starting_is_reported(self):
+        task = TaskDefinition(id="parallel_add", description="Add two numbers")
+        coordinator = IslandParallelCoordinator(task, config={"POPULATION_SIZE": 4, "NUM_ISLANDS": 2}, num_workers=2)
+        coordinator.worker_target = crash_before_starting
+        self.assertEqual(await coordinator.execute(), [])
+
+        self.assertEqual(coordinator.worker_totals, {})
+        self.assertEqual(coordinator.worker_exitcodes, {0: 3, 1: 3})
+        for worker_index in range(2):
+            self.assertIn("exited with code 3", coordinator.worker_errors[worker_index])
+            self.assertIn(f"worker {worker_index} could not import its backend", coordinator.worker_errors[worker_index])
+
+
+if __name__ == '__main__':
+    unittest.main()
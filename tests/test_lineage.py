@@ -0,0 +1,125 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from core.interfaces import Program, TaskDefinition
+from database_agent.agent import InMemoryDatabaseAgent
+from database_agent.columnar_agent import ColumnarDatabaseAgent
+from database_agent.indexes import LineageIndex
+from database_agent.sqlite_agent import SQLiteDatabaseAgent
+from task_manager.agent import TaskManagerAgent
+
+
+def lineage_programs(count, seed=11):
+    """A forest: about one program in ten starts a new lineage, the rest descend from an earlier one."""
+    rng = random.Random(seed)
+    programs = []
+    for i in range(count):
+        parent = programs[rng.randrange(i)] if i and rng.random() > 0.1 else None
+        programs.append(Program(id=f"p{i}", code="", parent_id=parent.id if parent else None,
+                                generation=parent.generation + 1 if parent else 0,
+                                fitness_scores={"correctness": rng.random()}, task_id="t"))
+    return programs
+
+
+def ancestry(by_id, program_id):
+    chain, parent_id = [], by_id[program_id].parent_id
+    while parent_id is not None:
+        chain.append(parent_id)
+        parent_id = by_id[parent_id].parent_id
+    return chain
+
+
+class TestLineageIndex(unittest.TestCase):
+    def test_depth_and_root_follow_late_parents_and_reparenting(self):
+        index = LineageIndex([("c", "b"), ("d", "c")])
+        self.assertEqual((index.depth("d"), index.root("d")), (1, "c"))
+        index.add("b", "a")
+        index.add("a", None)
+        self.assertEqual((index.depth("d"), index.root("d")), (3, "a"))
+        self.assertEqual(index.ancestors("d"), ["c", "b", "a"])
+        self.assertEqual(index.ancestors("d", max_depth=2), ["c", "b"])
+        index.add("c", "x")  # Moved under a parent that was never saved
+        self.assertEqual((index.depth("d"), index.root("d")), (1, "c"))
+        self.assertEqual(index.descendants("a"), ["b"])
+        self.assertEqual(index.descendants("c"), ["d"])
+
+    def test_cyclic_links_terminate(self):
+        index = LineageIndex([("a", "b"), ("b", "a")])
+        self.assertEqual(index.ancestors("a"), ["b"])
+        self.assertEqual(index.descendants("a"), ["b"])
+
+
+class TestLineageQueries(unittest.IsolatedAsyncioTestCase):
+    async def test_backends_agree_on_ancestry_descendants_and_graph(self):
+        programs = lineage_programs(300)
+        with tempfile.TemporaryDirectory() as directory:
+            sqlite = SQLiteDatabaseAgent(os.path.join(directory, "programs.sqlite3"))
+            databases = [InMemoryDatabaseAgent(), ColumnarDatabaseAgent(), sqlite]
+            try:
+                for database in databases:
+                    # Children first for half of the programs: the index must relink them.
+                    await database.save_programs(programs[150:])
+                    await database.save_programs(programs[:150])
+                by_id = {p.id: p for p in programs}
+                ids = ["p0", "p5", "p77", "p299", "missing"]
+                for database in databases:
+                    ancestors = await database.get_ancestors(ids)
+                    for program_id in ids[:-1]:
+                        self.assertEqual([p.id for p in ancestors[program_id]], ancestry(by_id, program_id), database)
+                    self.assertEqual(ancestors["missing"], [])
+                    limited = await database.get_ancestors(["p299"], max_depth=1)
+                    self.assertEqual([p.id for p in limited["p299"]], [by_id["p299"].parent_id])
+
+                    descendants = await database.get_descendants(ids)
+                    counts = await database.count_descendants(ids)
+                    for program_id in ids:
+                        found = [p.id for p in descendants[program_id]]
+                        self.assertEqual(set(found), {p.id for p in programs if program_id in ancestry(by_id, p.id)})
+                        self.assertEqual(counts[program_id], len(found))
+                        generations = [by_id[pid].generation for pid in found]
+                        self.assertEqual(generations, sorted(generations))  # Breadth first
+                    children = await database.get_descendants(["p0"], max_depth=1)
+                    self.assertEqual({p.id for p in children["p0"]}, {p.id for p in programs if p.parent_id == "p0"})
+
+                graphs = [await database.get_lineage_graph("t") for database in databases]
+                for graph in graphs:
+                    nodes = {node["id"]: node for node in graph["nodes"]}
+                    self.assertEqual(len(nodes), 300)
+                    for program in programs:
+                        self.assertEqual(nodes[program.id]["depth"], program.generation)
+                    self.assertEqual(sorted(map(tuple, graph["edges"])), sorted((p.parent_id, p.id) for p in programs if p.parent_id))
+                self.assertEqual({n["id"]: n["root_id"] for n in graphs[0]["nodes"]}, {n["id"]: n["root_id"] for n in graphs[2]["nodes"]})
+            finally:
+                await sqlite.close()
+
+
+class TestLineageExport(unittest.IsolatedAsyncioTestCase):
+    async def test_each_task_writes_strict_json_to_its_own_file(self):
+        def reject(constant):
+            raise ValueError(f"{constant} is not valid JSON")
+        with tempfile.TemporaryDirectory() as directory:
+            for task_id in ("first", "second"):
+                manager = TaskManagerAgent(TaskDefinition(id=task_id, description="d"),
+                                           config={"LINEAGE_EXPORT_DIR": directory, "CHECKPOINT_DIR": None})
+                await manager.database.save_programs([
+                    Program(id=f"{task_id}_root", code="", task_id=task_id, status="evaluated", fitness_scores={"correctness": 1.0, "runtime_ms": 2.0}),
+                    Program(id=f"{task_id}_child", code="", task_id=task_id, parent_id=f"{task_id}_root", generation=1,
+                            status="failed_evaluation", fitness_scores={"correctness": 0.0, "runtime_ms": float("inf")}),
+                ])
+                await manager._finish_evolution()
+
+            self.assertEqual(sorted(os.listdir(directory)), ["first.json", "second.json"])
+            for task_id in ("first", "second"):
+                with open(os.path.join(directory, f"{task_id}.json")) as f:
+                    graph = json.loads(f.read(), parse_constant=reject)
+                nodes = {node["id"]: node for node in graph["nodes"]}
+                self.assertEqual(set(nodes), {f"{task_id}_root", f"{task_id}_child"})
+                self.assertIsNone(nodes[f"{task_id}_child"]["fitness_scores"]["runtime_ms"])
+                self.assertEqual(graph["edges"], [[f"{task_id}_root", f"{task_id}_child"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from litellm.exceptions import RateLimitError
+
+from code_generator.agent import CodeGeneratorAgent
+from code_generator.cassette import CassetteMissError, CassetteRecorder, CassetteReplayer
+from code_generator.local_backend import LocalLLMBackend
+from core.interfaces import Program, TaskDefinition
+from selection_controller.agent import SelectionControllerAgent
+from task_manager.agent import TaskManagerAgent
+
+
+def messages(prompt):
+    return [{"role": "user", "content": prompt}]
+
+
+class PassingEvaluator:
+    async def evaluate_program(self, program, task):
+        program.fitness_scores = {"correctness": 1.0, "runtime_ms": 1.0}
+        program.status = "evaluated"
+        return program
+
+
+class TestCassettes(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "run.jsonl")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    async def test_replay_serves_recorded_responses_by_hash_and_order(self):
+        recorder = CassetteRecorder(self.path, LocalLLMBackend(seed=1).acompletion)
+        recorded = []
+        for prompt in ["Function to Implement: `a`", "Function to Implement: `b`", "Function to Implement: `a`"]:
+            response = await recorder.acompletion(model="m", messages=messages(prompt))
+            recorded.append(response.choices[0].message.content)
+        recorder.close()
+
+        with open(self.path) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([entry["seq"] for entry in entries], [0, 1, 2])
+        self.assertNotIn("prompt", entries[0])
+
+        replayer = CassetteReplayer(self.path, strict=True)
+        second_b = await replayer.acompletion(model="m", messages=messages("Function to Implement: `b`"))
+        first_a = await replayer.acompletion(model="m", messages=messages("Function to Implement: `a`"))
+        self.assertEqual(second_b.choices[0].message.content, recorded[1])
+        self.assertEqual(first_a.choices[0].message.content, recorded[0])
+        self.assertEqual(first_a.usage.prompt_tokens, entries[0]["prompt_tokens"])
+        with self.assertRaises(CassetteMissError):
+            await replayer.acompletion(model="m", messages=messages("never recorded"))
+
+    async def test_errors_are_recorded_and_replayed(self):
+        recorder = CassetteRecorder(self.path, LocalLLMBackend(error_rates={"rate_limit": 1.0}).acompletion)
+        with self.assertRaises(RateLimitError):
+            await recorder.acompletion(model="m", messages=messages("prompt"))
+        recorder.close()
+
+        replayer = CassetteReplayer(self.path)
+        with self.assertRaises(RateLimitError):
+            await replayer.acompletion(model="m", messages=messages("prompt"))
+
+    async def test_non_strict_replay_falls_back_to_sequence_order(self):
+        recorder = CassetteRecorder(self.path, LocalLLMBackend().acompletion)
+        await recorder.acompletion(model="m", messages=messages("Runtime: 1.23 ms"))
+        recorder.close()
+
+        replayer = CassetteReplayer(self.path)
+        await replayer.acompletion(model="m", messages=messages("Runtime: 1.31 ms"))
+        self.assertEqual(replayer.stats["order_fallbacks"], 1)
+
+    async def test_code_generator_records_then_replays(self):
+        with patch("config.settings.LLM_CASSETTE_MODE", "record"), \
+             patch("config.settings.LLM_CASSETTE_PATH", self.path):
+            recording_agent = CodeGeneratorAgent(backend=LocalLLMBackend(seed=5))
+            recorded = await recording_agent.generate_code("Function to Implement: `solve`")
+        with patch("config.settings.LLM_CASSETTE_MODE", "replay"), \
+             patch("config.settings.LLM_CASSETTE_PATH", self.path):
+            replaying_agent = CodeGeneratorAgent()
+            replayed = await replaying_agent.generate_code("Function to Implement: `solve`")
+        self.assertEqual(recorded, replayed)
+
+    async def test_each_generator_replays_from_the_start(self):
+        recorder = CassetteRecorder(self.path, LocalLLMBackend(seed=2).acompletion)
+        await recorder.acompletion(model="m", messages=messages("Function to Implement: `solve`"))
+        recorder.close()
+        with patch("config.settings.LLM_CASSETTE_MODE", "replay"), \
+             patch("config.settings.LLM_CASSETTE_PATH", self.path), \
+             patch("config.settings.LLM_CASSETTE_STRICT", True):
+            first_run = await CodeGeneratorAgent().generate_code("Function to Implement: `solve`")
+            second_run = await CodeGeneratorAgent().generate_code("Function to Implement: `solve`")
+        self.assertEqual(first_run, second_run)
+
+    async def test_a_finished_run_closes_its_cassette_for_replay_in_the_same_process(self):
+        task = TaskDefinition(id="cassette_task", description="Add", function_name_to_evolve="add")
+        config = {"LLM_BACKEND": "local", "LLM_CASSETTE_PATH": self.path, "POPULATION_SIZE": 4, "GENERATIONS": 1, "NUM_ISLANDS": 2}
+        recording = TaskManagerAgent(task, config=dict(config, LLM_CASSETTE_MODE="record"))
+        recording.evaluator = PassingEvaluator()
+        recorded = await recording.execute()
+        recorder = recording.code_generator.backend
+        self.assertTrue(recorder._file.closed)
+
+        replaying = TaskManagerAgent(task, config=dict(config, LLM_CASSETTE_MODE="replay"))
+        replaying.evaluator = PassingEvaluator()
+        replayed = await replaying.execute()
+        self.assertEqual(replaying.code_generator.backend.stats["served"], recorder.sequence)
+        self.assertEqual([p.code for p in replayed], [p.code for p in recorded])
+
+
+class TestSeededSelection(unittest.TestCase):
+    def select(self):
+        with patch("selection_controller.agent.settings.RANDOM_SEED", 42):
+            selector = SelectionControllerAgent()
+        programs = [Program(id=f"p{i}", code="", fitness_scores={"correctness": i / 10}) for i in range(8)]
+        selector.initialize_islands(programs)
+        return [p.id for p in selector.select_parents(programs, 3)]
+
+    def test_fixed_seed_gives_same_parents(self):
+        self.assertEqual(self.select(), self.select())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from litellm.exceptions import RateLimitError
+
+from code_generator.agent import CodeGeneratorAgent
+from core.interfaces import Program, TaskDefinition, LLMCallRecord
+from monitoring_agent.telemetry import TelemetryCollector
+from task_manager.agent import TaskManagerAgent
+
+
+def make_response(content, prompt_tokens=12, completion_tokens=34):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+    )
+
+
+class StubCodeGenerator:
+    def __init__(self, code):
+        self.code = code
+
+    async def execute(self, prompt, temperature=None, output_format="code", parent_code_for_diff=None, call_records=None, **kwargs):
+        if call_records is not None:
+            call_records.append(LLMCallRecord(model="stub", prompt_tokens=100, completion_tokens=20, latency_seconds=1.5))
+        return self.code
+
+
+class TestGenerateCodeRecords(unittest.IsolatedAsyncioTestCase):
+    async def test_records_tokens_latency_and_retries(self):
+        agent = CodeGeneratorAgent()
+        attempts = []
+
+        async def fake_acompletion(model, messages, **kwargs):
+            attempts.append(model)
+            if len(attempts) == 1:
+                raise RateLimitError(message="slow down", llm_provider="test", model=model)
+            return make_response("def f():\n    return 1")
+
+        records = []
+        with patch("code_generator.agent.acompletion", fake_acompletion), \
+             patch("config.settings.API_RETRY_DELAY_SECONDS", 0):
+            await agent.generate_code("prompt", model_name="test-model", call_records=records)
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].model, "test-model")
+        self.assertEqual(records[0].retries, 1)
+        self.assertEqual(records[0].prompt_tokens, 12)
+        self.assertEqual(records[0].completion_tokens, 34)
+        self.assertGreaterEqual(records[0].latency_seconds, 0.0)
+
+
+class TestTaskManagerTelemetry(unittest.IsolatedAsyncioTestCase):
+    def make_manager(self, code):
+        task = TaskDefinition(
+            id="telemetry_task",
+            description="Add two numbers",
+            function_name_to_evolve="add",
+            input_output_examples=[{"input": [1, 2], "output": 3}],
+        )
+        manager = TaskManagerAgent(task_definition=task)
+        manager.code_generator = StubCodeGenerator(code)
+        return manager
+
+    async def test_applied_call_is_attached_and_improvement_recorded(self):
+        manager = self.make_manager("def add(a, b):\n    return a + b")
+        parent = Program(id="parent", code="def add(a, b):\n    return 0", island_id=1,
+                         fitness_scores={"correctness": 0.0, "runtime_ms": 1.0})
+
+        child = await manager.generate_offspring(parent, 1, "child")
+        self.assertEqual(child.llm_calls[0].outcome, "applied")
+
+        await manager.evaluate_population([child])
+        self.assertTrue(child.llm_calls[0].improved_fitness)
+
+        per_generation = manager.telemetry.per_generation()[1]
+        self.assertEqual(per_generation["llm_calls"], 1)
+        self.assertEqual(per_generation["total_tokens"], 120)
+        self.assertEqual(per_generation["calls_improved"], 1)
+        self.assertEqual(per_generation["programs_evaluated"], 1)
+        self.assertEqual(manager.telemetry.per_island()[1]["calls_applied"], 1)
+        self.assertEqual(manager.telemetry.calls[0]["program_id"], "child")
+
+    async def test_rejected_call_is_counted(self):
+        manager = self.make_manager("def add(a, b):\n    return 0")
+        parent = Program(id="parent", code="def add(a, b):\n    return 0", island_id=0)
+
+        child = await manager.generate_offspring(parent, 2, "child")
+        self.assertIsNone(child)
+        totals = manager.telemetry.totals()
+        self.assertEqual(totals["calls_rejected"], 1)
+        self.assertEqual(totals["improvement_yield"], 0.0)
+
+
+class TestTelemetryCollector(unittest.TestCase):
+    def test_rollups_cover_all_calls_but_only_recent_calls_are_kept(self):
+        telemetry = TelemetryCollector(max_calls=3)
+        for i in range(10):
+            telemetry.record_calls([LLMCallRecord(model="m", prompt_tokens=i)], generation=i // 5, island_id=0, program_id=f"p{i}")
+        self.assertEqual(telemetry.totals()["llm_calls"], 10)
+        self.assertEqual(telemetry.totals()["prompt_tokens"], 45)
+        self.assertEqual(telemetry.calls_recorded, 10)
+        self.assertEqual([call["program_id"] for call in telemetry.calls], ["p7", "p8", "p9"])
+
+
+if __name__ == '__main__':
+    unittest.main()
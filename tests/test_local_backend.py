@@ -0,0 +1,73 @@
+import unittest
+
+from litellm.exceptions import RateLimitError
+
+from code_generator.agent import CodeGeneratorAgent
+from code_generator.local_backend import LocalLLMBackend
+
+PARENT_CODE = "def solve(numbers):\n    if len(numbers) > 0:\n        return numbers[0] + 1\n    return 0"
+MUTATION_PROMPT = (
+    "Function to Improve: `solve`\n\n"
+    f"Current Code (Version from Generation 1):\n```python\n{PARENT_CODE}\n```\n\n"
+    "<<<<<<< SEARCH\n# Exact original code lines to be found and replaced\n=======\n>>>>>>> REPLACE\n"
+)
+
+
+class TestLocalLLMBackend(unittest.IsolatedAsyncioTestCase):
+    async def complete(self, backend, prompt):
+        response = await backend.acompletion(model="local", messages=[{"role": "user", "content": prompt}])
+        return response.choices[0].message.content
+
+    async def test_same_seed_is_deterministic(self):
+        first_backend, second_backend = LocalLLMBackend(seed=7), LocalLLMBackend(seed=7)
+        first = [await self.complete(first_backend, MUTATION_PROMPT) for _ in range(3)]
+        second = [await self.complete(second_backend, MUTATION_PROMPT) for _ in range(3)]
+        self.assertEqual(first, second)
+
+    async def test_tracked_prompts_are_bounded(self):
+        backend = LocalLLMBackend(seed=7, max_tracked_prompts=2)
+        first = await self.complete(backend, MUTATION_PROMPT)
+        for name in ("a", "b"):
+            await self.complete(backend, f"Function to Implement: `{name}`")
+        self.assertEqual(len(backend._prompt_counters), 2)
+        # The mutation prompt was forgotten, so it gets its first response again; so does a reset backend.
+        self.assertEqual(await self.complete(backend, MUTATION_PROMPT), first)
+        backend.reset()
+        self.assertEqual(await self.complete(backend, MUTATION_PROMPT), first)
+        self.assertEqual(backend.stats["calls"], 1)
+
+    async def test_mutation_diff_applies_to_parent(self):
+        agent = CodeGeneratorAgent(backend=LocalLLMBackend(seed=3))
+        for _ in range(5):
+            child = await agent.execute(MUTATION_PROMPT, output_format="diff", parent_code_for_diff=PARENT_CODE)
+            self.assertNotEqual(child, PARENT_CODE)
+            self.assertNotIn("<<<<<<< SEARCH", child)
+            compile(child, "<child>", "exec")
+
+    async def test_initial_program_uses_corpus_or_stub(self):
+        corpus = ["def solve(numbers):\n    return sum(numbers)"]
+        self.assertEqual(await self.complete(LocalLLMBackend(corpus=corpus), "Function to Implement: `solve`"), corpus[0])
+        stub = await self.complete(LocalLLMBackend(), "Function to Implement: `fibonacci`")
+        self.assertTrue(stub.startswith("def fibonacci("))
+
+    async def test_error_injection(self):
+        backend = LocalLLMBackend(error_rates={"rate_limit": 1.0})
+        with self.assertRaises(RateLimitError):
+            await self.complete(backend, "Function to Implement: `solve`")
+
+        malformed = LocalLLMBackend(error_rates={"malformed_diff": 1.0})
+        agent = CodeGeneratorAgent(backend=malformed)
+        result = await agent.execute(MUTATION_PROMPT, output_format="diff", parent_code_for_diff=PARENT_CODE)
+        self.assertEqual(result, PARENT_CODE)
+        self.assertEqual(malformed.stats["malformed_diffs"], 1)
+
+    async def test_usage_is_reported(self):
+        agent = CodeGeneratorAgent(backend=LocalLLMBackend())
+        records = []
+        await agent.generate_code("Function to Implement: `solve`", call_records=records)
+        self.assertGreater(records[0].prompt_tokens, 0)
+        self.assertEqual(records[0].cost_usd, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
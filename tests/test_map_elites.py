@@ -0,0 +1,130 @@
+import random
+import unittest
+
+from core.interfaces import Program, TaskDefinition
+from database_agent.map_elites_agent import MapElitesArchive, MapElitesDatabaseAgent
+from evaluator_agent.agent import EvaluatorAgent
+from task_manager.agent import TaskManagerAgent
+
+DESCRIPTORS = {"code_length": [10, 20], "runtime_ms": [1.0, 10.0]}
+
+
+def evaluated(program_id, code, correctness, runtime_ms=None, task_id="t"):
+    fitness = {"correctness": correctness}
+    if runtime_ms is not None:
+        fitness["runtime_ms"] = runtime_ms
+    return Program(id=program_id, code=code, fitness_scores=fitness, status="evaluated", task_id=task_id)
+
+
+class TestMapElitesArchive(unittest.TestCase):
+    def test_each_cell_keeps_its_best_program(self):
+        archive = MapElitesArchive(DESCRIPTORS)
+        self.assertEqual(archive.cell(evaluated("a", "x" * 15, 1.0, 5.0)), (1, 1))
+        self.assertEqual(archive.cell(evaluated("a", "x" * 25, 1.0)), (2, None))
+        self.assertEqual(archive.grid_size, 16)
+
+        self.assertTrue(archive.offer(evaluated("a", "short", 0.5, 0.5)))
+        self.assertFalse(archive.offer(evaluated("b", "tiny", 0.5, 0.5)))  # A tie keeps the incumbent
+        self.assertTrue(archive.offer(evaluated("c", "tiny", 0.9, 0.7)))
+        self.assertNotIn("a", archive)
+        self.assertTrue(archive.offer(evaluated("d", "x" * 30, 0.1, 50.0)))
+        self.assertEqual({p.id for p in archive.elites()}, {"c", "d"})
+
+        # Saved again with other descriptors, an elite moves and frees its old cell.
+        self.assertTrue(archive.offer(evaluated("c", "x" * 30, 0.9, 0.7)))
+        self.assertEqual(len(archive), 2)
+        self.assertTrue(archive.offer(evaluated("d", "x" * 12, 0.1, 50.0)))
+        self.assertEqual({archive.cell(p) for p in archive.elites()}, {(2, 0), (1, 2)})
+        self.assertEqual(archive.stats()["elites"], 2)
+
+        # Moving into a cell held by a fitter elite, it keeps its old cell.
+        moved = evaluated("d", "x" * 30, 0.2, 0.7)
+        self.assertFalse(archive.offer(moved))
+        self.assertIs(archive.get("d"), moved)
+        self.assertEqual({p.id for p in archive.elites()}, {"c", "d"})
+        self.assertEqual(len(archive), 2)
+
+    def test_sampling_is_uniform_over_occupied_cells(self):
+        archive = MapElitesArchive(DESCRIPTORS)
+        for i in range(9):
+            archive.offer(evaluated(f"p{i}", "x" * (5 + 10 * (i % 3)), i / 10, [0.5, 5.0, 50.0][i // 3]))
+        self.assertEqual(len(archive), 9)
+        rng = random.Random(1)
+        counts = {}
+        for _ in range(3000):
+            for program in archive.sample(3, rng):
+                counts[program.id] = counts.get(program.id, 0) + 1
+        self.assertEqual(len(counts), 9)
+        self.assertLess(max(counts.values()) / min(counts.values()), 1.3)
+        self.assertEqual(len(archive.sample(20, rng)), 9)
+
+
+class TestMapElitesDatabase(unittest.IsolatedAsyncioTestCase):
+    async def test_size_is_bounded_by_the_grid(self):
+        database = MapElitesDatabaseAgent(DESCRIPTORS)
+        rng = random.Random(3)
+        await database.save_program(Program(id="pending", code="", task_id="t"))
+        for i in range(2000):
+            await database.save_programs([evaluated(f"p{i}", "x" * rng.randrange(40), rng.random(), rng.choice([None, 0.5, 5.0, 50.0]))])
+        self.assertLessEqual(await database.count_programs(), 16 + 1)
+        self.assertEqual((await database.get_program("pending")).status, "unevaluated")
+
+        elites = await database.get_elites("t")
+        best = await database.get_best_programs("t", limit=3)
+        self.assertEqual(best, sorted(elites, key=lambda p: p.fitness_scores["correctness"], reverse=True)[:3])
+        parents = await database.get_programs_for_next_generation("t", 5)
+        self.assertEqual(len({database._archives["t"].cell(p) for p in parents}), 5)
+        self.assertEqual(database.archive_stats()["t"]["offers"], 2000)
+
+        await database.clear_database()
+        self.assertEqual(await database.count_programs(), 0)
+
+
+class TestEvaluatorDescriptors(unittest.IsolatedAsyncioTestCase):
+    async def test_example_runs_report_runtime_and_peak_memory(self):
+        task = TaskDefinition(id="double", description="Double a number", function_name_to_evolve="double",
+                              input_output_examples=[{"input": [2], "output": 4}])
+        program = await EvaluatorAgent(config={"DATABASE_TYPE": "map_elites"}).evaluate_program(Program(id="p", code="def double(x):\n    return 2 * x\n"), task)
+        self.assertEqual(program.fitness_scores["correctness"], 1.0)
+        self.assertLess(program.fitness_scores["runtime_ms"], 1000.0)
+        # Measured above the harness's own footprint, so a trivial program lands in the lowest bucket.
+        self.assertGreaterEqual(program.fitness_scores["memory_mb"], 0.0)
+        self.assertLess(program.fitness_scores["memory_mb"], 8.0)
+
+        grow = TaskDefinition(id="grow", description="Allocate", function_name_to_evolve="grow",
+                              input_output_examples=[{"input": [48], "output": 48}])
+        program = await EvaluatorAgent(config={"DATABASE_TYPE": "map_elites"}).evaluate_program(
+            Program(id="g", code="def grow(mb):\n    data = b'x' * (mb * 1024 * 1024)\n    return len(data) // (1024 * 1024)\n"), grow)
+        self.assertEqual(program.fitness_scores["correctness"], 1.0)
+        self.assertGreater(program.fitness_scores["memory_mb"], 32.0)
+
+    async def test_other_databases_keep_example_fitness_unchanged(self):
+        task = TaskDefinition(id="double", description="Double a number", function_name_to_evolve="double",
+                              input_output_examples=[{"input": [2], "output": 4}])
+        program = await EvaluatorAgent(config={"DATABASE_TYPE": "in_memory"}).evaluate_program(
+            Program(id="p", code="def double(x):\n    return 2 * x\n"), task)
+        self.assertEqual(program.fitness_scores["correctness"], 1.0)
+        self.assertEqual(program.fitness_scores["runtime_ms"], float('inf'))
+        self.assertNotIn("memory_mb", program.fitness_scores)
+
+
+class TestParentSelection(unittest.IsolatedAsyncioTestCase):
+    async def test_generational_and_steady_state_parents_come_from_the_archive(self):
+        manager = TaskManagerAgent(TaskDefinition(id="t", description="d"),
+                                   config={"DATABASE_TYPE": "map_elites", "CHECKPOINT_DIR": None, "POPULATION_SIZE": 4, "NUM_ISLANDS": 1,
+                                           "MAP_ELITES_DESCRIPTORS": {"code_length": [10, 20, 30]}})
+        elites = [Program(id=f"e{i}", code="x" * (10 * i + 5), task_id="t", status="evaluated",
+                          fitness_scores={"correctness": 0.1 * i, "runtime_ms": 1.0}) for i in range(4)]
+        await manager.database.save_programs(elites)
+        island_member = Program(id="island", code="", task_id="t", status="evaluated", fitness_scores={"correctness": 1.0})
+        manager.selection_controller.initialize_islands([island_member])
+
+        parents = await manager._select_parents([island_member])
+        self.assertEqual(len(parents), manager.num_parents_to_select)
+        self.assertTrue({p.id for p in parents} <= {p.id for p in elites})
+        self.assertEqual(len({manager.database._archives["t"].cell(p) for p in parents}), len(parents))
+        self.assertIn((await manager._sample_parent()).id, {p.id for p in elites})
+
+
+if __name__ == '__main__':
+    unittest.main()
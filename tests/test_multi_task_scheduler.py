@@ -0,0 +1,164 @@
+import asyncio
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from config import settings
+from core.interfaces import TaskDefinition
+from task_manager.agent import TaskManagerAgent
+from task_manager.scheduler import MultiTaskScheduler, ScheduledCodeGenerator, SlotPool, load_task_file
+
+
+class ConcurrencyTracker:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+    async def hold(self, seconds=0.01):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(seconds)
+        self.active -= 1
+
+
+class SharedCodeGenerator:
+    def __init__(self):
+        self.tracker = ConcurrencyTracker()
+        self.calls = 0
+
+    async def generate_code(self, prompt, temperature=None, call_records=None, **kwargs):
+        self.calls += 1
+        await self.tracker.hold()
+        return f"def add(a, b):\n    return a + b  # {self.calls}"
+
+    async def execute(self, prompt, temperature=None, output_format="code", parent_code_for_diff=None, call_records=None, **kwargs):
+        return await self.generate_code(prompt)
+
+
+class TrackingEvaluator:
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    async def evaluate_program(self, program, task):
+        await self.tracker.hold()
+        program.fitness_scores = {"correctness": 1.0, "runtime_ms": 1.0}
+        program.status = "evaluated"
+        return program
+
+
+class TestSlotPool(unittest.IsolatedAsyncioTestCase):
+    async def acquire_in_order(self, pool, holders, waiters):
+        """Fills the pool with `holders`, queues `waiters` and returns the order in which waiters get a slot."""
+        release = asyncio.Event()
+        order = []
+
+        async def use(task_id, record):
+            async with pool.slot(task_id):
+                if record:
+                    order.append(task_id)
+                await release.wait()
+
+        holding = [asyncio.create_task(use(task_id, False)) for task_id in holders]
+        await asyncio.sleep(0)
+        queued = []
+        for task_id in waiters:
+            queued.append(asyncio.create_task(use(task_id, True)))
+            await asyncio.sleep(0)
+        holding[0].cancel()  # Frees exactly one slot
+        await asyncio.sleep(0.01)
+        first = list(order)
+        release.set()
+        await asyncio.gather(*holding[1:], *queued)
+        return first
+
+    async def test_fair_policy_serves_the_task_holding_fewer_slots(self):
+        pool = SlotPool("llm", 2, "fair")
+        self.assertEqual(await self.acquire_in_order(pool, ["a", "a"], ["a", "a", "b"]), ["b"])
+        self.assertEqual(pool.in_use, 0)
+
+    async def test_priority_policy_serves_the_highest_priority(self):
+        pool = SlotPool("llm", 1, "priority")
+        pool.register("low", 1.0)
+        pool.register("high", 5.0)
+        self.assertEqual(await self.acquire_in_order(pool, ["low"], ["low", "high"]), ["high"])
+
+
+class TestMultiTaskScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_tasks_share_slots_and_keep_their_own_config(self):
+        generator = SharedCodeGenerator()
+        evaluation_tracker = ConcurrencyTracker()
+        scheduler = MultiTaskScheduler(llm_slots=2, evaluation_slots=3, code_generator=generator)
+        global_population = settings.POPULATION_SIZE
+        for task_id, population in [("small", 2), ("large", 6)]:
+            task = TaskDefinition(id=task_id, description="Add two numbers", function_name_to_evolve="add")
+            manager = scheduler.add_task(task, {"POPULATION_SIZE": population, "GENERATIONS": 2, "NUM_ISLANDS": 2})
+            manager.evaluator.evaluator = TrackingEvaluator(evaluation_tracker)
+
+        results = await scheduler.run()
+
+        self.assertEqual(settings.POPULATION_SIZE, global_population)
+        self.assertEqual([len(scheduler.managers[t].database._programs) for t in ("small", "large")], [2 + 2 * 2, 6 + 2 * 6])
+        self.assertLessEqual(generator.tracker.max_active, 2)
+        self.assertLessEqual(evaluation_tracker.max_active, 3)
+        by_task = {result.task_id: result for result in results}
+        self.assertIsNone(by_task["large"].error)
+        self.assertEqual(by_task["large"].throughput["offspring"], 12)
+        self.assertEqual(generator.calls, (2 + 2 * 2) + (6 + 2 * 6))
+
+    def test_overrides_reach_every_per_task_agent(self):
+        task = TaskDefinition(id="t", description="d", function_name_to_evolve="f")
+        manager = TaskManagerAgent(task, config={"EVALUATION_TIMEOUT_SECONDS": 3, "PROMPT_TOKEN_BUDGET": 500, "LITELLM_TEMPERATURE": 0.1})
+        other = TaskManagerAgent(task)
+        self.assertEqual(manager.evaluator.evaluation_timeout_seconds, 3)
+        self.assertEqual(manager.evaluation_queue.cost_model.timeout_seconds, 3)
+        self.assertEqual(manager.prompt_designer.token_budget, 500)
+        self.assertEqual(manager.code_generator.generation_config["temperature"], 0.1)
+        self.assertEqual(other.evaluator.evaluation_timeout_seconds, settings.EVALUATION_TIMEOUT_SECONDS)
+        self.assertEqual(other.prompt_designer.token_budget, settings.PROMPT_TOKEN_BUDGET)
+
+    def test_task_file_with_config_and_priority(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "tasks.json")
+            with open(path, "w") as f:
+                json.dump([{"id": "t1", "description": "d", "function_name_to_evolve": "f",
+                            "input_output_examples": [{"input": [1], "output": 1}],
+                            "config": {"GENERATIONS": 5}, "priority": 3}], f)
+            [scheduled] = load_task_file(path)
+        self.assertEqual(scheduled.task.id, "t1")
+        self.assertEqual(scheduled.config, {"GENERATIONS": 5})
+        self.assertEqual(scheduled.priority, 3.0)
+
+    def test_task_file_rejects_shared_client_settings(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "tasks.json")
+            with open(path, "w") as f:
+                json.dump([{"id": "t1", "description": "d", "config": {"PRO_MODEL": "m", "HEDGING_ENABLED": True}}], f)
+            with self.assertRaisesRegex(ValueError, "HEDGING_ENABLED"):
+                load_task_file(path)
+
+    async def test_model_and_temperature_overrides_go_with_each_call(self):
+        calls = []
+
+        class RecordingGenerator:
+            async def generate_code(self, prompt, model_name=None, temperature=None, **kwargs):
+                calls.append((model_name, temperature))
+                return ""
+
+        scheduled = ScheduledCodeGenerator(RecordingGenerator(), SlotPool("llm", 1), "t", {"PRO_MODEL": "small", "LITELLM_TEMPERATURE": 0.2})
+        await scheduled.generate_code("p")
+        await scheduled.generate_code("p", temperature=0.8)
+        self.assertEqual(calls, [("small", 0.2), ("small", 0.8)])
+
+    def test_databases_and_local_backend_read_the_task_config(self):
+        task = TaskDefinition(id="t", description="d", function_name_to_evolve="f")
+        for database_type in ("in_memory", "columnar", "map_elites"):
+            manager = TaskManagerAgent(task, config={"DATABASE_TYPE": database_type, "RANDOM_SEED": 5})
+            self.assertEqual(manager.database.rng.random(), random.Random(5).random())
+        manager = TaskManagerAgent(task, config={"LLM_BACKEND": "local", "LOCAL_LLM_SEED": 7})
+        self.assertEqual(manager.code_generator.backend.seed, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
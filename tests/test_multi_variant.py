@@ -0,0 +1,86 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from code_generator.agent import CodeGeneratorAgent
+from code_generator.local_backend import LocalLLMBackend
+from code_generator.variants import split_variants
+from core.interfaces import Program, TaskDefinition
+from task_manager.agent import TaskManagerAgent
+
+PARENT_CODE = "def add(a, b):\n    return a - b"
+
+
+def make_response(content):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=100, completion_tokens=30),
+    )
+
+
+def diff(search, replace):
+    return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE"
+
+
+class TestSplitVariants(unittest.TestCase):
+    def test_splits_on_headers(self):
+        text = f"### VARIANT 1\n{diff('a', 'b')}\n\n### Variant 2:\n{diff('c', 'd')}\n### VARIANT 3\n"
+        self.assertEqual(split_variants(text), [diff('a', 'b'), diff('c', 'd')])
+
+    def test_response_without_headers_is_one_variant(self):
+        self.assertEqual(split_variants(diff('a', 'b')), [diff('a', 'b')])
+        self.assertEqual(split_variants("  \n"), [])
+
+
+class TestExecuteVariants(unittest.IsolatedAsyncioTestCase):
+    async def test_variants_are_applied_separately_and_deduplicated(self):
+        response = "\n".join([
+            "### VARIANT 1", diff("return a - b", "return a + b"),
+            "### VARIANT 2", diff("return a - b", "return b + a"),
+            "### VARIANT 3", diff("return a - b", "return a + b"),
+            "### VARIANT 4", diff("not in the parent", "pass"),
+        ])
+
+        async def fake_acompletion(model, messages, **kwargs):
+            return make_response(response)
+
+        agent = CodeGeneratorAgent()
+        records = []
+        with patch("code_generator.agent.acompletion", fake_acompletion):
+            children = await agent.execute_variants("prompt", PARENT_CODE, model_name="test-model", call_records=records)
+
+        self.assertEqual(children, ["def add(a, b):\n    return a + b", "def add(a, b):\n    return b + a"])
+        self.assertEqual(len(records), 1)
+        self.assertEqual(agent.variant_stats["duplicates"], 1)
+        self.assertEqual(agent.variant_stats["unchanged"], 1)
+
+
+class TestTaskManagerVariants(unittest.IsolatedAsyncioTestCase):
+    async def test_one_call_yields_several_children_with_lineage(self):
+        task = TaskDefinition(
+            id="variant_task",
+            description="Add two numbers",
+            function_name_to_evolve="add",
+            input_output_examples=[{"input": [1, 2], "output": 3}],
+        )
+        manager = TaskManagerAgent(task_definition=task)
+        manager.code_generator = CodeGeneratorAgent(backend=LocalLLMBackend(seed=1))
+        parent = Program(id="parent", code="def add(a, b):\n    if a > 0:\n        return a + 1\n    return b + 2",
+                         island_id=2, fitness_scores={"correctness": 0.5, "runtime_ms": 1.0})
+
+        children = await manager.generate_offspring_variants(parent, 1, ["c0", "c1", "c2"])
+
+        self.assertGreaterEqual(len(children), 2)
+        self.assertEqual(len({child.code for child in children}), len(children))
+        for child in children:
+            self.assertEqual(child.parent_id, "parent")
+            self.assertEqual(child.island_id, 2)
+            self.assertNotEqual(child.code, parent.code)
+        self.assertEqual([child.id for child in children], ["c0", "c1", "c2"][:len(children)])
+        totals = manager.telemetry.totals()
+        self.assertEqual(totals["llm_calls"], 1)
+        self.assertEqual(totals["offspring"], len(children))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import random
+import threading
+import unittest
+from unittest.mock import AsyncMock
+
+from core.interfaces import Program, TaskDefinition
+from database_agent.columnar_agent import ColumnarDatabaseAgent
+from database_agent.near_duplicates import NearDuplicateIndex
+from selection_controller.agent import SelectionControllerAgent
+from task_manager.agent import TaskManagerAgent
+
+BASE_CODE = """def solve(numbers):
+    # Sum the even numbers
+    total = 0
+    for value in numbers:
+        if value % 2 == 0:
+            total += value
+    return total
+"""
+CLONE_CODE = BASE_CODE.replace("# Sum the even numbers", "# Add up the evens").replace("return total", "return total  # done")
+
+
+def random_code(rng, lines=8):
+    names = ["alpha", "beta", "gamma", "delta", "items", "result", "index", "count", "limit", "value"]
+    body = [f"    {rng.choice(names)} = {rng.choice(names)} {rng.choice('+-*')} {rng.randrange(100)}" for _ in range(lines)]
+    return "def solve(items):\n" + "\n".join(body) + f"\n    return {rng.choice(names)}\n"
+
+
+def jaccard(index, first, second):
+    a, b = index.shingles(first), index.shingles(second)
+    return len(a & b) / len(a | b)
+
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    def test_clones_are_found_and_unrelated_code_is_not(self):
+        index = NearDuplicateIndex()
+        index.add("base", BASE_CODE)
+        rng = random.Random(3)
+        for i in range(200):
+            index.add(f"other{i}", random_code(rng))
+        matches = index.similar(CLONE_CODE, threshold=0.9)
+        self.assertEqual([program_id for program_id, _ in matches], ["base"])
+        self.assertEqual(index.nearest(BASE_CODE, exclude="base"), None)
+        # Comment-only edits leave the shingle set unchanged.
+        self.assertEqual(matches[0][1], 1.0)
+
+    def test_queries_only_compare_bucket_mates(self):
+        index = NearDuplicateIndex()
+        rng = random.Random(5)
+        for i in range(500):
+            index.add(f"p{i}", random_code(rng, lines=12))
+        for _ in range(50):
+            index.similar(random_code(rng, lines=12), threshold=0.9)
+        self.assertLess(index.stats()["candidates_per_query"], 25)
+
+    def test_similarity_estimates_track_jaccard(self):
+        index = NearDuplicateIndex(num_permutations=128, bands=16)
+        rng = random.Random(7)
+        for _ in range(20):
+            first = random_code(rng, lines=20)
+            lines = first.splitlines()
+            lines[rng.randrange(1, 20)] = "    extra = 1"
+            second = "\n".join(lines)
+            index.add("first", first)
+            estimate = index.similar(second, threshold=0.0)
+            expected = jaccard(index, first, second)
+            self.assertTrue(not estimate or abs(estimate[0][1] - expected) < 0.2, (estimate, expected))
+
+    def test_replacing_and_discarding_keep_buckets_consistent(self):
+        index = NearDuplicateIndex()
+        index.add("a", BASE_CODE)
+        index.add("a", random_code(random.Random(1)))
+        self.assertEqual(index.similar(BASE_CODE, threshold=0.5), [])
+        index.discard("a")
+        self.assertEqual((len(index), index.stats()["buckets"]), (0, 0))
+        with self.assertRaises(ValueError):
+            NearDuplicateIndex(num_permutations=64, bands=5)
+
+
+class TestNearDuplicateSelection(unittest.TestCase):
+    def survivors(self, mode):
+        selector = SelectionControllerAgent(config={"NUM_ISLANDS": 1, "NEAR_DUPLICATE_SELECTION": mode})
+        selector.near_duplicates = NearDuplicateIndex()
+        rng = random.Random(2)
+        members = [Program(id="best", code=BASE_CODE, fitness_scores={"correctness": 1.0}, status="evaluated"),
+                   Program(id="other", code=random_code(rng), fitness_scores={"correctness": 0.5}, status="evaluated")]
+        offspring = [Program(id="clone", code=CLONE_CODE, fitness_scores={"correctness": 0.9}, island_id=0, status="evaluated"),
+                     Program(id="fresh", code=random_code(rng), fitness_scores={"correctness": 0.2}, island_id=0, status="evaluated")]
+        for program in members + offspring:
+            selector.near_duplicates.add(program.id, program.code)
+        selector.initialize_islands(members)
+        return [p.id for p in selector.select_survivors(members, offspring, 3)], selector
+
+    def test_clones_of_survivors_are_penalized_or_skipped(self):
+        self.assertEqual(self.survivors("off")[0], ["best", "clone", "other"])
+        self.assertEqual(self.survivors("penalize")[0], ["best", "other", "fresh"])
+        survivors, selector = self.survivors("skip")
+        self.assertEqual(survivors, ["best", "other", "fresh"])
+        self.assertEqual(selector.near_duplicates_held_back, 1)
+
+
+class TestNearDuplicateOffspring(unittest.IsolatedAsyncioTestCase):
+    def manager(self, **config):
+        config = dict({"NEAR_DUPLICATE_INDEX": True, "DATABASE_TYPE": "columnar"}, **config)
+        manager = TaskManagerAgent(TaskDefinition(id="t", description="d"), config=config)
+        manager.evaluator.evaluate_program = AsyncMock(side_effect=lambda program, task: program)
+        return manager
+
+    async def test_offspring_are_flagged_before_evaluation(self):
+        manager = self.manager()
+        self.assertIs(manager.selection_controller.near_duplicates, manager.database.near_duplicates)
+        await manager.database.save_programs([Program(id="base", code=BASE_CODE, status="evaluated", task_id="t")])
+        child = Program(id="child", code=CLONE_CODE, parent_id="base", task_id="t")
+        await manager._evaluate_safely(child)
+        self.assertEqual(child.near_duplicate_of, "base")
+        manager.evaluator.evaluate_program.assert_awaited_once()
+        await manager.database.save_programs([child])
+        self.assertEqual((await manager.database.get_program("child")).near_duplicate_of, "base")
+
+        distinct = Program(id="distinct", code=random_code(random.Random(4)), parent_id="base", task_id="t")
+        await manager._evaluate_safely(distinct)
+        self.assertIsNone(distinct.near_duplicate_of)
+        self.assertEqual(manager.near_duplicates_flagged, 1)
+
+    async def test_flagged_offspring_can_skip_evaluation(self):
+        manager = self.manager(NEAR_DUPLICATE_SKIP_EVALUATION=True, DATABASE_TYPE="in_memory")
+        await manager.database.save_programs([Program(id="base", code=BASE_CODE, status="evaluated", task_id="t")])
+        base = await manager.database.get_program("base")
+        child = Program(id="child", code=CLONE_CODE, parent_id="base", task_id="t")
+        manager.telemetry.register_offspring(child, base)
+        child = await manager._evaluate_safely(child)
+        self.assertEqual((child.status, child.near_duplicate_of), ("failed_evaluation", "base"))
+        self.assertEqual(child.fitness_scores["correctness"], 0.0)
+        self.assertIn("near-duplicate of program base", child.errors[0])
+        self.assertEqual(manager.telemetry._parent_keys, {})  # Counted as evaluated, so nothing waits for it
+        manager.evaluator.evaluate_program.assert_not_awaited()
+
+    async def test_offspring_are_hashed_off_the_event_loop(self):
+        manager = self.manager()
+        index = manager.database.near_duplicates
+        hashed_on = []
+        compute = index.hasher.signature
+
+        def recording_signature(code):
+            hashed_on.append(threading.current_thread() is threading.main_thread())
+            return compute(code)
+        index.hasher.signature = recording_signature
+        await manager._evaluate_safely(Program(id="child", code=CLONE_CODE, parent_id="base", task_id="t"))
+        self.assertEqual(hashed_on, [False])
+        await manager.database.save_programs([Program(id="child", code=CLONE_CODE, task_id="t")])
+        self.assertEqual(hashed_on, [False])  # Indexing the saved child reuses the cached signature
+
+    async def test_columnar_database_keeps_the_flag(self):
+        database = ColumnarDatabaseAgent(near_duplicates=NearDuplicateIndex())
+        await database.save_programs([Program(id="a", code=BASE_CODE, near_duplicate_of="b")])
+        self.assertEqual((await database.get_program("a")).near_duplicate_of, "b")
+        self.assertIn("a", database.near_duplicates)
+
+
+if __name__ == "__main__":
+    unittest.main()
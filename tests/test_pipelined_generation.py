@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from core.interfaces import Program, TaskDefinition
+from task_manager.agent import TaskManagerAgent
+
+
+class SlowFirstCallCodeGenerator:
+    def __init__(self):
+        self.calls = 0
+        self.slow_call_finished = None
+
+    async def generate_code(self, prompt, temperature=None, call_records=None, **kwargs):
+        self.calls += 1
+        return f"def add(a, b):\n    return a + b  # initial {self.calls}"
+
+    async def execute(self, prompt, temperature=None, output_format="code", parent_code_for_diff=None, call_records=None, **kwargs):
+        self.calls += 1
+        call_number = self.calls
+        if self.slow_call_finished is None:
+            self.slow_call_finished = False
+            await asyncio.sleep(0.3)
+            self.slow_call_finished = True
+        return f"def add(a, b):\n    return a + b  # child {call_number}"
+
+
+class RecordingEvaluator:
+    def __init__(self, code_generator):
+        self.code_generator = code_generator
+        self.started_before_slow_call_finished = []
+
+    async def evaluate_program(self, program, task):
+        if program.generation > 0 and self.code_generator.slow_call_finished is False:
+            self.started_before_slow_call_finished.append(program.id)
+        program.fitness_scores = {"correctness": 1.0, "runtime_ms": 1.0}
+        program.status = "evaluated"
+        return program
+
+
+class TestPipelinedGeneration(unittest.IsolatedAsyncioTestCase):
+    async def test_offspring_are_evaluated_while_other_calls_are_pending(self):
+        task = TaskDefinition(id="pipeline_task", description="Add two numbers", function_name_to_evolve="add")
+        with patch("config.settings.POPULATION_SIZE", 4), \
+             patch("config.settings.GENERATIONS", 1), \
+             patch("config.settings.NUM_ISLANDS", 2), \
+             patch("config.settings.DATABASE_SAVE_BATCH_SIZE", 2), \
+             patch("selection_controller.agent.settings.NUM_ISLANDS", 2):
+            manager = TaskManagerAgent(task_definition=task)
+        manager.code_generator = SlowFirstCallCodeGenerator()
+        manager.evaluator = RecordingEvaluator(manager.code_generator)
+
+        batches = []
+        original_save_programs = manager.database.save_programs
+
+        async def recording_save_programs(programs):
+            batches.append(len(programs))
+            await original_save_programs(programs)
+
+        manager.database.save_programs = recording_save_programs
+        await manager.execute()
+
+        self.assertEqual(len(manager.evaluator.started_before_slow_call_finished), 3)
+        self.assertEqual(await manager.database.count_programs(), 8)
+        # Initial population and its evaluation, then offspring in batches of two.
+        self.assertEqual(batches, [4, 4, 2, 2])
+
+    async def test_evaluate_population_keeps_already_evaluated_programs(self):
+        task = TaskDefinition(id="t", description="d")
+        manager = TaskManagerAgent(task_definition=task)
+        manager.evaluator = RecordingEvaluator(SlowFirstCallCodeGenerator())
+        done = Program(id="done", code="", status="evaluated", fitness_scores={"correctness": 0.5})
+        todo = Program(id="todo", code="")
+        result = await manager.evaluate_population([done, todo])
+        self.assertEqual([p.id for p in result], ["done", "todo"])
+        self.assertEqual(result[0].fitness_scores["correctness"], 0.5)
+        self.assertEqual(result[1].status, "evaluated")
+
+
+if __name__ == '__main__':
+    unittest.main()
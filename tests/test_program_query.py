@@ -0,0 +1,74 @@
+import os
+import random
+import tempfile
+import unittest
+
+from core.interfaces import Program, ProgramQuery
+from database_agent.agent import InMemoryDatabaseAgent
+from database_agent.sqlite_agent import SQLiteDatabaseAgent
+
+
+def random_programs(count, seed=3):
+    rng = random.Random(seed)
+    programs = []
+    for i in range(count):
+        programs.append(Program(
+            id=f"p{i}",
+            code="",
+            fitness_scores={"correctness": rng.choice([0.0, 0.5, 0.9, 1.0]), "runtime_ms": float(rng.randrange(1, 100))},
+            generation=rng.randrange(40),
+            parent_id=f"p{rng.randrange(i)}" if i else None,
+            island_id=rng.randrange(4),
+            status=rng.choice(["evaluated", "failed_evaluation"]),
+            task_id=rng.choice(["t", "u"]),
+        ))
+    return programs
+
+
+QUERIES = [
+    ProgramQuery(island_id=3, min_correctness=0.9, min_generation=20),
+    ProgramQuery(task_id="t", status="evaluated", order_by="runtime_ms", limit=5),
+    ProgramQuery(parent_id="p3"),
+    ProgramQuery(generation=7, fields=["id", "island_id"]),
+    ProgramQuery(max_generation=3, max_runtime_ms=50.0, order_by="correctness", descending=True, limit=4, fields=["id", "fitness_scores"]),
+    ProgramQuery(task_id="u", order_by="correctness", descending=True, limit=3),
+]
+
+
+class TestInMemoryProgramQuery(unittest.IsolatedAsyncioTestCase):
+    async def test_indexed_queries_match_a_full_scan(self):
+        database = InMemoryDatabaseAgent()
+        programs = random_programs(500)
+        await database.save_programs(programs)
+        # Overwrites and in-place changes that were saved again must move programs between index entries.
+        for program in programs[:100]:
+            program.island_id = (program.island_id + 1) % 4
+            program.generation += 1
+        await database.save_programs(programs[:100])
+
+        for query in QUERIES:
+            self.assertEqual(await database.query_programs(query), query.apply(programs), query)
+        self.assertEqual(await database.get_programs_by_generation(7), [p for p in programs if p.generation == 7])
+
+
+class TestSQLiteProgramQuery(unittest.IsolatedAsyncioTestCase):
+    async def test_queries_are_pushed_down_to_sql(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = SQLiteDatabaseAgent(os.path.join(directory, "programs.sqlite3"))
+            try:
+                programs = random_programs(300)
+                await database.save_programs(programs)
+                for query in QUERIES:
+                    expected = query.apply(programs)
+                    result = await database.query_programs(query)
+                    if query.fields is None:
+                        result, expected = [p.id for p in result], [p.id for p in expected]
+                    self.assertEqual(result, expected, query)
+                with self.assertRaises(ValueError):
+                    await database.query_programs(ProgramQuery(order_by="code"))
+            finally:
+                await database.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
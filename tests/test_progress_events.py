@@ -0,0 +1,119 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from core.interfaces import TaskDefinition
+from monitoring_agent.events import (
+    EventBus, EvaluationCompleted, GenerationCompleted, GenerationStarted, NewBestProgram, OffspringProduced
+)
+from task_manager.agent import TaskManagerAgent
+
+
+def started(gen):
+    return GenerationStarted("t", gen, max_generations=9)
+
+
+def evaluated(gen, pid):
+    return EvaluationCompleted("t", gen, program_id=pid, status="evaluated", fitness_scores={})
+
+
+class TestEventBus(unittest.IsolatedAsyncioTestCase):
+    async def test_overflow_policies(self):
+        bus = EventBus()
+        oldest = bus.subscribe(maxsize=2, overflow="drop_oldest")
+        newest = bus.subscribe(maxsize=2, overflow="drop_newest")
+        coalesced = bus.subscribe(maxsize=10, overflow="coalesce")
+        for event in [started(1), evaluated(1, "a"), evaluated(1, "b"), started(2)]:
+            bus.publish(event)
+
+        def drain(subscription):
+            events = []
+            while (event := subscription.get_nowait()) is not None:
+                events.append(event)
+            return events
+        self.assertEqual([e.generation for e in drain(oldest)], [1, 2])
+        self.assertEqual(oldest.dropped, 2)
+        self.assertEqual([type(e).__name__ for e in drain(newest)], ["GenerationStarted", "EvaluationCompleted"])
+        self.assertEqual([(type(e).__name__, e.generation) for e in drain(coalesced)],
+                         [("EvaluationCompleted", 1), ("GenerationStarted", 2)])
+
+    async def test_unobserved_event_types_are_not_wanted(self):
+        bus = EventBus()
+        self.assertFalse(bus.wants(GenerationStarted))
+        subscription = bus.subscribe([NewBestProgram])
+        self.assertTrue(bus.wants(NewBestProgram))
+        self.assertFalse(bus.wants(GenerationStarted))
+        subscription.close()
+        self.assertFalse(bus.wants(NewBestProgram))
+        self.assertIsNone(await subscription.get())
+
+
+class ConstantCodeGenerator:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_code(self, prompt, temperature=None, call_records=None, **kwargs):
+        self.calls += 1
+        return f"def add(a, b):\n    return a + b  # {self.calls}"
+
+    async def execute(self, prompt, temperature=None, output_format="code", parent_code_for_diff=None, call_records=None, **kwargs):
+        return await self.generate_code(prompt)
+
+
+class ImprovingEvaluator:
+    def __init__(self):
+        self.count = 0
+
+    async def evaluate_program(self, program, task):
+        self.count += 1
+        program.fitness_scores = {"correctness": 1.0, "runtime_ms": 100.0 - self.count}
+        program.status = "evaluated"
+        return program
+
+
+class TestTaskManagerEvents(unittest.IsolatedAsyncioTestCase):
+    async def run_manager(self):
+        with patch("config.settings.POPULATION_SIZE", 4), \
+             patch("config.settings.GENERATIONS", 2), \
+             patch("config.settings.NUM_ISLANDS", 2), \
+             patch("selection_controller.agent.settings.NUM_ISLANDS", 2):
+            manager = TaskManagerAgent(task_definition=TaskDefinition(id="events_task", description="Add", function_name_to_evolve="add"))
+        manager.code_generator = ConstantCodeGenerator()
+        manager.evaluator = ImprovingEvaluator()
+        return manager
+
+    async def test_run_publishes_typed_progress_events(self):
+        manager = await self.run_manager()
+        subscription = manager.events.subscribe(maxsize=1000)
+        await manager.execute()
+        events = []
+        while (event := subscription.get_nowait()) is not None:
+            events.append(event)
+
+        self.assertEqual([e.generation for e in events if isinstance(e, GenerationStarted)], [1, 2])
+        self.assertEqual([e.generation for e in events if isinstance(e, GenerationCompleted)], [1, 2])
+        self.assertEqual(sum(isinstance(e, OffspringProduced) for e in events), 8)
+        self.assertEqual(sum(isinstance(e, EvaluationCompleted) for e in events), 12)
+        # Every evaluation is faster than the last, so each one is a new best.
+        self.assertEqual(sum(isinstance(e, NewBestProgram) for e in events), 12)
+        self.assertEqual(subscription.dropped, 0)
+
+    async def test_slow_subscriber_does_not_hold_up_the_run(self):
+        manager = await self.run_manager()
+        received = []
+
+        async def slow(event):
+            received.append(event)
+            await asyncio.sleep(0.5)
+
+        subscription = manager.events.subscribe_callback(slow, maxsize=2, overflow="coalesce")
+        start_time = time.monotonic()
+        await manager.execute()
+        self.assertLess(time.monotonic() - start_time, 0.5)
+        self.assertGreater(subscription.dropped, 0)
+        subscription.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
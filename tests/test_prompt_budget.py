@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+from core.interfaces import Program, TaskDefinition
+from prompt_designer.agent import PromptDesignerAgent
+from prompt_designer.budget import condense_errors, estimate_tokens, sample_examples, truncate_middle
+
+PARENT_CODE = "def solve(numbers):\n    return sum(numbers)"
+
+
+def make_agent(n_examples=3):
+    task = TaskDefinition(
+        id="budget_task",
+        description="Sum a list of numbers.",
+        function_name_to_evolve="solve",
+        input_output_examples=[{"input": [list(range(i))], "output": sum(range(i))} for i in range(n_examples)],
+        allowed_imports=[],
+    )
+    return PromptDesignerAgent(task)
+
+
+def test_truncate_middle_keeps_tail():
+    text = "head\n" + "x" * 5000 + "\nValueError: the actual problem"
+    truncated = truncate_middle(text, 300)
+    assert truncated.startswith("head")
+    assert truncated.endswith("ValueError: the actual problem")
+    assert "characters omitted" in truncated
+
+
+def test_condense_errors_drops_duplicates():
+    errors = ["Error at 0x7f00aa", "Error  at 0x7f00bb", "Other error"]
+    assert condense_errors(errors, 100) == ["Error at 0x7f00aa", "Other error"]
+
+
+def test_sample_examples_is_ordered_and_bounded():
+    examples = [{"input": [i], "output": i} for i in range(100)]
+    chosen = sample_examples(examples, 10)
+    assert len(chosen) == 10
+    assert chosen == sorted(chosen)
+
+
+def test_examples_block_is_sampled_and_cached():
+    agent = make_agent(n_examples=50)
+    first = agent.design_initial_prompt()
+    second = agent.design_initial_prompt()
+    assert first == second
+    usage = agent.last_budget_usage
+    assert usage.examples_total == 50
+    assert 0 < usage.examples_included < 50
+    assert "further examples omitted" in first
+
+
+def test_mutation_prompt_fits_budget_without_touching_code():
+    parent = Program(id="p", code=PARENT_CODE)
+    traceback = "Traceback (most recent call last):\n" + "  File \"x.py\", line 1, in f\n" * 2000 + "IndexError: list index out of range"
+    feedback = {"correctness": 0.0, "errors": [traceback] * 20}
+    with patch("config.settings.PROMPT_TOKEN_BUDGET", 2000):
+        agent = make_agent()
+        prompt = agent.design_mutation_prompt(parent, feedback)
+    usage = agent.last_budget_usage
+    assert PARENT_CODE in prompt
+    assert usage.errors_total == 20 and usage.errors_included == 1
+    assert usage.truncated and not usage.over_budget
+    assert estimate_tokens(prompt) <= 2000
+    assert "IndexError: list index out of range" in prompt
+
+
+def test_bug_fix_prompt_trims_error_output():
+    agent = make_agent()
+    parent = Program(id="p", code=PARENT_CODE)
+    output = "noise line\n" * 10000 + "ZeroDivisionError: division by zero"
+    prompt = agent.design_bug_fix_prompt(parent, "ZeroDivisionError: division by zero", output)
+    assert PARENT_CODE in prompt
+    assert not agent.last_budget_usage.over_budget
+    assert agent.get_budget_summary()["bug_fix"]["truncated"] == 1
+
+
+def test_variant_instructions_count_towards_the_fixed_part():
+    parent = Program(id="p", code=PARENT_CODE)
+    feedback = {"correctness": 0.0, "errors": ["IndexError: list index out of range\n" + "x = y\n" * 3000]}
+    with patch("config.settings.PROMPT_TOKEN_BUDGET", 600):
+        agent = make_agent()
+        prompt = agent.design_mutation_prompt(parent, feedback, num_variants=4)
+        assert not agent.last_budget_usage.over_budget
+        assert estimate_tokens(prompt) <= 600
+        prompt = agent.design_bug_fix_prompt(parent, "IndexError: list index out of range", "x = y\n" * 3000, num_variants=4)
+        assert not agent.last_budget_usage.over_budget
@@ -0,0 +1,135 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from core.interfaces import LLMCallRecord, Program, TaskDefinition
+from evaluator_agent.agent import EvaluatorAgent
+from monitoring_agent.telemetry import TelemetryCollector
+from selection_controller.agent import Island, SelectionControllerAgent, fitness_improved
+from task_manager.agent import TaskManagerAgent
+from task_manager.run_control import RunController
+
+
+def program(pid, correctness, runtime_ms=10.0):
+    return Program(id=pid, code="", fitness_scores={"correctness": correctness, "runtime_ms": runtime_ms}, status="evaluated")
+
+
+def island(island_id, generation, last_improvement, programs=()):
+    result = Island(island_id, list(programs) or [program(f"i{island_id}", 1.0)])
+    result.generation = generation
+    result.last_improvement_generation = last_improvement
+    return result
+
+
+class TestRunController(unittest.TestCase):
+    def test_token_budget_stops_the_run(self):
+        telemetry = TelemetryCollector()
+        controller = RunController(telemetry, max_llm_tokens=1000)
+        self.assertIsNone(controller.check_budgets())
+        telemetry.record_calls([LLMCallRecord(model="m", prompt_tokens=900, completion_tokens=200)], generation=1, island_id=0)
+        self.assertIn("llm_tokens", controller.check_budgets())
+
+    def test_stagnant_islands_freeze_but_never_the_last_active_one(self):
+        controller = RunController(TelemetryCollector(), island_stagnation_generations=3)
+        islands = {0: island(0, 5, 0), 1: island(1, 5, 1), 2: island(2, 5, 4)}
+        controller.observe_generation(5, islands)
+        self.assertEqual([i.frozen for i in islands.values()], [True, True, False])
+
+        islands = {0: island(0, 5, 0), 1: island(1, 5, 0)}
+        controller.observe_generation(5, islands)
+        self.assertEqual(sum(i.frozen for i in islands.values()), 1)
+
+        islands[0].frozen = True
+        islands[0].last_improvement_generation = 5
+        controller.observe_generation(6, islands)
+        self.assertFalse(islands[0].frozen)
+
+    def test_convergence_after_patience_without_global_improvement(self):
+        controller = RunController(TelemetryCollector(), convergence_patience=2, runtime_tolerance=0.05)
+        islands = {0: island(0, 1, 0, [program("a", 1.0, 10.0)])}
+        self.assertIsNone(controller.observe_generation(1, islands))
+        islands[0].programs = [program("b", 1.0, 9.8)]  # Within the runtime tolerance: noise
+        self.assertIsNone(controller.observe_generation(2, islands))
+        self.assertIn("converged", controller.observe_generation(3, islands))
+
+    def test_state_round_trip_keeps_spent_time(self):
+        controller = RunController(TelemetryCollector())
+        controller.observe_generation(1, {0: island(0, 1, 0)})
+        state = controller.get_state()
+        state["elapsed_seconds"] = 100.0
+        restored = RunController(TelemetryCollector(), max_wall_clock_seconds=50)
+        restored.load_state(state)
+        self.assertEqual(restored.global_best_key, (1.0, 10.0))
+        self.assertIn("wall_clock_seconds", restored.check_budgets())
+
+    def test_each_task_is_charged_only_its_own_evaluation_cpu(self):
+        spin = "def spin(n):\n    total = 0\n    for i in range(n):\n        total += i\n    return n\n"
+        task = TaskDefinition(id="spin", description="d", function_name_to_evolve="spin", input_output_examples=[{"input": [2000000], "output": 2000000}])
+        busy = TaskManagerAgent(task, config={"RUN_MAX_EVALUATION_CPU_SECONDS": 0.01})
+        idle = TaskManagerAgent(task, config={"RUN_MAX_EVALUATION_CPU_SECONDS": 0.01})
+        self.assertIsInstance(busy.evaluator, EvaluatorAgent)
+        program = asyncio.run(busy.evaluator.evaluate_program(Program(id="p", code=spin), task))
+        self.assertEqual(program.fitness_scores["correctness"], 1.0)
+        self.assertGreater(busy.evaluator.cpu_seconds, 0.01)
+        self.assertIn("evaluation_cpu_seconds", busy.run_controller.check_budgets())
+        self.assertIsNone(idle.run_controller.check_budgets())
+        self.assertEqual(idle.run_controller.usage()["evaluation_cpu_seconds"], 0.0)
+
+
+class TestIslandStagnation(unittest.TestCase):
+    def test_runtime_gain_beyond_tolerance_counts_as_improvement(self):
+        self.assertTrue(fitness_improved((1.0, 8.0), (1.0, 10.0), 0.02))
+        self.assertFalse(fitness_improved((1.0, 9.9), (1.0, 10.0), 0.02))
+        self.assertFalse(fitness_improved((0.5, 1.0), (1.0, 10.0), 0.02))
+
+        test_island = Island(0, [program("a", 1.0, 10.0)])
+        test_island.update_metrics()
+        test_island.programs = [program("b", 1.0, 5.0)]
+        test_island.update_metrics()
+        self.assertEqual(test_island.last_improvement_generation, 1)
+        self.assertEqual(test_island.best_runtime_ms, 5.0)
+
+    def test_parents_are_not_drawn_from_frozen_islands(self):
+        selector = SelectionControllerAgent()
+        programs = [program(f"p{i}", 1.0) for i in range(8)]
+        selector.initialize_islands(programs)
+        for island_id in list(selector.islands)[1:]:
+            selector.islands[island_id].frozen = True
+        active_ids = {p.id for p in selector.islands[0].programs}
+        for _ in range(20):
+            self.assertTrue({p.id for p in selector.select_parents(programs, 1)} <= active_ids)
+
+
+class ConstantCodeGenerator:
+    async def generate_code(self, prompt, temperature=None, call_records=None, **kwargs):
+        return "def add(a, b):\n    return a + b"
+
+    async def execute(self, prompt, temperature=None, output_format="code", parent_code_for_diff=None, call_records=None, **kwargs):
+        return "def add(a, b):\n    return a + b  # unchanged behaviour"
+
+
+class ConstantEvaluator:
+    async def evaluate_program(self, program, task):
+        program.fitness_scores = {"correctness": 1.0, "runtime_ms": 1.0}
+        program.status = "evaluated"
+        return program
+
+
+class TestEarlyStopping(unittest.IsolatedAsyncioTestCase):
+    async def test_converged_run_stops_before_the_generation_limit(self):
+        with patch("config.settings.POPULATION_SIZE", 4), \
+             patch("config.settings.GENERATIONS", 10), \
+             patch("config.settings.NUM_ISLANDS", 2), \
+             patch("selection_controller.agent.settings.NUM_ISLANDS", 2), \
+             patch("config.settings.CONVERGENCE_PATIENCE_GENERATIONS", 2):
+            task = TaskDefinition(id="converge_task", description="Add two numbers", function_name_to_evolve="add")
+            manager = TaskManagerAgent(task_definition=task)
+            manager.code_generator = ConstantCodeGenerator()
+            manager.evaluator = ConstantEvaluator()
+            await manager.execute()
+        self.assertEqual(manager.selection_controller.current_generation, 3)
+        self.assertIn("converged", manager.run_controller.stop_reason)
+
+
+if __name__ == '__main__':
+    unittest.main()
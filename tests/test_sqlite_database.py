@@ -0,0 +1,139 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from core.interfaces import LLMCallRecord, Program, TaskDefinition
+from database_agent.agent import InMemoryDatabaseAgent
+from database_agent.sqlite_agent import SQLiteDatabaseAgent
+from task_manager.agent import TaskManagerAgent
+
+
+def program(pid, correctness=None, runtime_ms=None, generation=0, task_id="t"):
+    fitness = {}
+    if correctness is not None:
+        fitness["correctness"] = correctness
+    if runtime_ms is not None:
+        fitness["runtime_ms"] = runtime_ms
+    return Program(id=pid, code=f"# {pid}", fitness_scores=fitness, generation=generation, task_id=task_id, status="evaluated")
+
+
+class TestSQLiteDatabaseAgent(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "programs.sqlite3")
+        self.database = SQLiteDatabaseAgent(self.path)
+
+    async def asyncTearDown(self):
+        await self.database.close()
+        self.directory.cleanup()
+
+    async def test_programs_round_trip_and_persist(self):
+        saved = program("a", 0.5, 10.0)
+        saved.llm_calls = [LLMCallRecord(model="m", prompt_tokens=3, completion_tokens=4)]
+        saved.errors = ["boom"]
+        await self.database.save_program(saved)
+        saved.status = "changed after save"  # The stored copy is a snapshot
+        await self.database.save_programs([program("b", 1.0, 5.0, generation=1)])
+
+        reopened = SQLiteDatabaseAgent(self.path)
+        try:
+            restored = await reopened.get_program("a")
+            self.assertEqual(restored.llm_calls[0].prompt_tokens, 3)
+            self.assertEqual(restored.errors, ["boom"])
+            self.assertEqual(restored.status, "evaluated")
+            self.assertEqual(await reopened.count_programs(), 2)
+            self.assertEqual([p.id for p in await reopened.get_programs_by_generation(1)], ["b"])
+            self.assertIsNone(await reopened.get_program("missing"))
+        finally:
+            await reopened.close()
+
+    async def test_best_programs_are_ranked_in_sql_and_filtered_by_task(self):
+        await self.database.save_programs([
+            program("slow", 1.0, 50.0), program("fast", 1.0, 5.0), program("half", 0.5, 1.0),
+            program("unscored"), program("other_task", 1.0, 0.1, task_id="other"),
+        ])
+        self.assertEqual([p.id for p in await self.database.get_best_programs("t", limit=3)], ["slow", "fast", "half"])
+        self.assertEqual([p.id for p in await self.database.get_best_programs("t", limit=2, objective="runtime_ms", sort_order="asc")],
+                         ["half", "fast"])
+        self.assertEqual(len(await self.database.get_programs_for_next_generation("t", 2)), 2)
+        await self.database.clear_database()
+        self.assertEqual(await self.database.count_programs(), 0)
+
+    async def test_ties_keep_save_order_like_the_in_memory_database(self):
+        programs = [program(f"p{i}", [1.0, 0.5][i % 2], 10.0 - i) for i in range(6)] + [program("untagged", 0.5, 3.0, task_id=None)]
+        memory = InMemoryDatabaseAgent()
+        for database in (memory, self.database):
+            await database.save_programs(programs)
+            await database.save_programs([programs[0]])  # A re-save keeps its place
+        for objective in ("correctness", "runtime_ms"):
+            for sort_order in ("desc", "asc"):
+                expected = [p.id for p in await memory.get_best_programs("t", 5, objective, sort_order)]
+                self.assertEqual([p.id for p in await self.database.get_best_programs("t", 5, objective, sort_order)], expected)
+                self.assertEqual([p.id for p in await self.database.get_best_programs(None, 5, objective, sort_order)],
+                                 [p.id for p in await memory.get_best_programs(None, 5, objective, sort_order)])
+
+    async def test_a_failed_transaction_fails_every_caller_in_it(self):
+        def fail(rows):
+            raise sqlite3.OperationalError("disk I/O error")
+        self.database._insert_sync = fail
+        results = await asyncio.gather(*[self.database.save_programs([program(f"p{i}")]) for i in range(5)], return_exceptions=True)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(isinstance(result, sqlite3.OperationalError) for result in results))
+
+    async def test_concurrent_saves_are_group_committed_off_the_loop(self):
+        writer_threads = set()
+        insert = self.database._insert_sync
+
+        def recording_insert(rows):
+            writer_threads.add(threading.current_thread().name)
+            return insert(rows)
+        self.database._insert_sync = recording_insert
+
+        batches = [[program(f"p{b}_{i}", i / 50, float(i)) for i in range(50)] for b in range(100)]
+        await asyncio.gather(*[self.database.save_programs(batch) for batch in batches])
+
+        self.assertEqual(await self.database.count_programs(), 5000)
+        # The first batch commits alone; every batch queued behind it shares the next transaction.
+        self.assertEqual(self.database.transactions, 2)
+        self.assertEqual(len(writer_threads), 1)
+        self.assertTrue(next(iter(writer_threads)).startswith("sqlite-writer"))
+
+
+class TestRunsInOneFile(unittest.IsolatedAsyncioTestCase):
+    async def test_a_new_run_starts_without_the_last_runs_programs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config = {"DATABASE_TYPE": "sqlite", "DATABASE_PATH": os.path.join(directory, "run.sqlite3"),
+                      "POPULATION_SIZE": 2, "GENERATIONS": 0, "NUM_ISLANDS": 1, "CHECKPOINT_DIR": None}
+            earlier = SQLiteDatabaseAgent(config["DATABASE_PATH"])
+            await earlier.save_programs([program("stale", 1.0, 0.1), program("other", 1.0, 0.1, task_id="other")])
+            await earlier.close()
+
+            manager = TaskManagerAgent(TaskDefinition(id="t", description="d"), config=config)
+            manager.initialize_population = lambda: asyncio.sleep(0, result=[])
+            await manager.execute()
+            self.assertEqual(manager.database._connections, [])  # Closed at the end of the run
+
+            reopened = SQLiteDatabaseAgent(config["DATABASE_PATH"])
+            try:
+                self.assertIsNone(await reopened.get_program("stale"))
+                self.assertIsNotNone(await reopened.get_program("other"))
+            finally:
+                await reopened.close()
+
+
+class TestDatabaseSelection(unittest.IsolatedAsyncioTestCase):
+    async def test_task_manager_uses_the_configured_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.sqlite3")
+            manager = TaskManagerAgent(TaskDefinition(id="t", description="d"), config={"DATABASE_TYPE": "sqlite", "DATABASE_PATH": path})
+            self.assertIsInstance(manager.database, SQLiteDatabaseAgent)
+            await manager.database.close()
+            with self.assertRaises(ValueError):
+                TaskManagerAgent(TaskDefinition(id="t", description="d"), config={"DATABASE_TYPE": "bogus"})
+
+
+if __name__ == '__main__':
+    unittest.main()
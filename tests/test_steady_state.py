@@ -0,0 +1,74 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from core.interfaces import TaskDefinition
+from task_manager.agent import TaskManagerAgent
+
+
+class CountingCodeGenerator:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_code(self, prompt, temperature=None, call_records=None, **kwargs):
+        self.calls += 1
+        return f"def add(a, b):\n    return a + b  # initial {self.calls}"
+
+    async def execute(self, prompt, temperature=None, output_format="code", parent_code_for_diff=None, call_records=None, **kwargs):
+        self.calls += 1
+        return f"def add(a, b):\n    return a + b  # child {self.calls}"
+
+
+class SlowFirstChildEvaluator:
+    """Evaluates instantly, except for the first child, which takes much longer than all the others together."""
+
+    def __init__(self):
+        self.finished = []
+
+    async def evaluate_program(self, program, task):
+        if program.id.endswith("_child0"):
+            await asyncio.sleep(0.3)
+        program.fitness_scores = {"correctness": 1.0, "runtime_ms": 1.0}
+        program.status = "evaluated"
+        self.finished.append(program.id)
+        return program
+
+
+class TestSteadyStateEvolution(unittest.IsolatedAsyncioTestCase):
+    def make_manager(self):
+        task = TaskDefinition(
+            id="steady_task",
+            description="Add two numbers",
+            function_name_to_evolve="add",
+            input_output_examples=[{"input": [1, 2], "output": 3}],
+        )
+        with patch("config.settings.EVOLUTION_MODE", "steady_state"), \
+             patch("config.settings.STEADY_STATE_WORKERS", 2), \
+             patch("config.settings.POPULATION_SIZE", 4), \
+             patch("config.settings.GENERATIONS", 2), \
+             patch("config.settings.NUM_ISLANDS", 2), \
+             patch("selection_controller.agent.settings.NUM_ISLANDS", 2):
+            manager = TaskManagerAgent(task_definition=task)
+        manager.code_generator = CountingCodeGenerator()
+        manager.evaluator = SlowFirstChildEvaluator()
+        return manager
+
+    async def test_slow_evaluation_does_not_stall_other_workers(self):
+        manager = self.make_manager()
+        best = await manager.execute()
+
+        children = [program_id for program_id in manager.evaluator.finished if "_child" in program_id]
+        self.assertEqual(len(children), 8)
+        self.assertEqual(children[-1], "steady_task_gen1_child0")
+        self.assertEqual(await manager.database.count_programs(), 12)
+        self.assertEqual(manager.selection_controller.current_generation, 2)
+        self.assertEqual(best[0].fitness_scores["correctness"], 1.0)
+
+    def test_unknown_mode_is_rejected(self):
+        with patch("config.settings.EVOLUTION_MODE", "bogus"):
+            with self.assertRaises(ValueError):
+                TaskManagerAgent(task_definition=TaskDefinition(id="t", description="d"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import tempfile
+import unittest
+
+from core.interfaces import LLMCallRecord, Program, TaskDefinition
+from database_agent.archive import ProgramArchive
+from evaluator_agent import cache
+from task_manager.agent import TaskManagerAgent
+
+
+class CountingCodeGenerator:
+    def __init__(self):
+        self.initial_calls = 0
+
+    async def generate_code(self, prompt, temperature=None, call_records=None, **kwargs):
+        self.initial_calls += 1
+        return f"def add(a, b):\n    return a + b  # initial {self.initial_calls}"
+
+    async def execute(self, prompt, temperature=None, output_format="code", parent_code_for_diff=None, call_records=None, **kwargs):
+        return parent_code_for_diff + "\n# child"
+
+
+class CountingEvaluator:
+    def __init__(self, correctness=1.0):
+        self.correctness = correctness
+        self.evaluated = []
+
+    async def evaluate_program(self, program, task):
+        self.evaluated.append(program.id)
+        program.fitness_scores = {"correctness": self.correctness, "runtime_ms": 1.0}
+        program.status = "evaluated" if self.correctness == 1.0 else "failed_evaluation"
+        return program
+
+
+def add_task(task_id="add_task", description="Add two integers and return the sum", examples=None):
+    return TaskDefinition(id=task_id, description=description, function_name_to_evolve="add",
+                          input_output_examples=examples or [{"input": [1, 2], "output": 3}])
+
+
+class TestProgramArchive(unittest.TestCase):
+    def test_lookup_prefers_same_task_then_similar_descriptions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            archive = ProgramArchive(directory)
+            scored = lambda code, correctness: Program(id=code, code=code, fitness_scores={"correctness": correctness, "runtime_ms": 1.0})
+            archive.add(add_task(), [scored("same", 0.5)], "fp")
+            archive.add(add_task("other", "Add two integers and return their sum"), [scored("similar", 1.0)], "fp")
+            archive.add(add_task("far", "Sort a list of strings by length"), [scored("unrelated", 1.0)], "fp")
+            archive.add(add_task("three", examples=[{"input": [1, 2, 3], "output": 6}]), [scored("arity", 1.0)], "fp")
+            self.assertEqual(archive.add(add_task(), [scored("same", 0.5)], "fp"), 0)
+
+            reloaded = ProgramArchive(directory)
+            self.assertEqual([e["code"] for e in reloaded.lookup(add_task(), 10, 0.6)], ["same", "similar"])
+            # A new task id ranks by description similarity first, then archived fitness.
+            self.assertEqual([e["code"] for e in reloaded.lookup(add_task("new", "Add two integers and return their sum"), 10, 0.6)],
+                             ["similar", "same"])
+
+
+class TestEvaluationCache(unittest.IsolatedAsyncioTestCase):
+    def scored(self, code, correctness=1.0):
+        return Program(id=code, code=code, status="evaluated", fitness_scores={"correctness": correctness, "runtime_ms": 1.0})
+
+    def test_least_recently_used_results_are_dropped(self):
+        evaluations = cache.EvaluationCache(max_entries=2)
+        for code in ("a", "b"):
+            evaluations.store(self.scored(code), "fp")
+        self.assertIsNotNone(evaluations.lookup(Program(id="x", code="a"), "fp"))
+        evaluations.store(self.scored("c"), "fp")
+        self.assertEqual(len(evaluations), 2)
+        self.assertIsNone(evaluations.lookup(Program(id="y", code="b"), "fp"))
+        self.assertIsNotNone(evaluations.lookup(Program(id="z", code="a"), "fp"))
+
+    def test_results_reach_the_file_on_flush(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "evaluations.jsonl")
+            evaluations = cache.EvaluationCache(path)
+            for code in ("a", "b", "c"):
+                evaluations.store(self.scored(code), "fp", seconds=0.5)
+            self.assertFalse(os.path.exists(path))
+            evaluations.flush()
+            evaluations.flush()
+            reloaded = cache.EvaluationCache(path, max_entries=2)
+            self.assertEqual(len(reloaded), 2)
+            self.assertEqual(reloaded.lookup(Program(id="x", code="c"), "fp")["seconds"], 0.5)
+
+    async def test_a_cache_hit_still_counts_as_an_evaluation(self):
+        manager = TaskManagerAgent(task_definition=add_task(), config={"POPULATION_SIZE": 4, "NUM_ISLANDS": 2})
+        manager.evaluator = CountingEvaluator()
+        parent = Program(id="parent", code="def add(a, b):\n    return 0", status="evaluated", fitness_scores={"correctness": 0.5, "runtime_ms": 1.0})
+        await manager._timed_evaluation(Program(id="first", code="def add(a, b):\n    return a + b"))
+
+        record = LLMCallRecord(model="m", outcome="applied")
+        child = Program(id="child", code="def add(a, b):\n    return a + b", parent_id="parent", llm_calls=[record])
+        manager.telemetry.register_offspring(child, parent)
+        await manager._timed_evaluation(child)
+        self.assertEqual(manager.evaluator.evaluated, ["first"])
+        self.assertEqual(child.fitness_scores["correctness"], 1.0)
+        self.assertTrue(record.improved_fitness)
+        self.assertEqual(manager.telemetry._parent_keys, {})
+        self.assertIn("child", manager.evaluation_queue.cost_model._programs)
+
+
+class TestWarmStart(unittest.IsolatedAsyncioTestCase):
+    def manager(self, task, directory, evaluator):
+        manager = TaskManagerAgent(task_definition=task, config={
+            "ARCHIVE_DIR": directory, "POPULATION_SIZE": 4, "GENERATIONS": 1, "NUM_ISLANDS": 2,
+        })
+        manager.code_generator = CountingCodeGenerator()
+        manager.evaluator = evaluator
+        return manager
+
+    async def test_rerun_seeds_from_archive_without_llm_or_sandbox_calls(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = self.manager(add_task(), directory, CountingEvaluator())
+            await first.execute()
+            self.assertEqual(first.code_generator.initial_calls, 4)
+
+            second = self.manager(add_task(), directory, CountingEvaluator())
+            population = await second.initialize_population()
+            self.assertEqual(second.code_generator.initial_calls, 0)
+            self.assertEqual(second.evaluator.evaluated, [])  # Same code and tests: served by the evaluation cache
+            self.assertEqual(len(population), 4)
+            self.assertTrue(all(p.fitness_scores["correctness"] == 1.0 for p in population))
+
+    async def test_seeds_are_revalidated_when_the_tests_change(self):
+        with tempfile.TemporaryDirectory() as directory:
+            await self.manager(add_task(), directory, CountingEvaluator()).execute()
+            changed = add_task(examples=[{"input": [1, 2], "output": 3}, {"input": [2, 2], "output": 5}])
+            self.assertNotEqual(cache.tests_fingerprint(changed), cache.tests_fingerprint(add_task()))
+
+            rerun = self.manager(changed, directory, CountingEvaluator(correctness=0.0))
+            population = await rerun.initialize_population()
+            self.assertEqual(len(rerun.evaluator.evaluated), 4)
+            self.assertEqual(rerun.code_generator.initial_calls, 4)  # No seed still passes
+            self.assertEqual(len(population), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()